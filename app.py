@@ -1,8 +1,6 @@
 from datetime import datetime
-import logging
 import os
 import sqlite3
-from logging.handlers import RotatingFileHandler
 
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, g
 from flask_login import LoginManager, login_required, login_user, logout_user, current_user
@@ -10,32 +8,43 @@ from flask_babel import Babel
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from config import get_config
+from modules.app_cache import cached
 from modules.db_utils import (
     get_db_connection,
+    init_app as init_db,
     load_active_db_path,
     save_active_db_path,
     list_available_dbs,
+    get_database_settings,
 )
 from modules.credentials_config import DEFAULT_ADMIN, DEMO_USER
+from modules import app_logging, query_stats
+from modules.query_stats import InstrumentedConnection
+from modules.metrics import init_app as init_metrics, prometheus_response, table_counts, wants_prometheus
 
 # Configuración base de la app
 config = get_config()
 app = Flask(__name__, static_folder="static", static_url_path="/static", template_folder="templates")
 app.config.from_object(config)
 
+# Una conexión del pool por petición (flask.g), compartida por todos los módulos
+init_db(app)
+
 # --- FIX: Asegurar que el directorio de logs exista ANTES de importar módulos ---
 log_dir = os.path.join(app.root_path, 'logs')
 if not os.path.exists(log_dir):
     os.makedirs(log_dir)
 
-# Configuración centralizada de Logging
-log_file = os.path.join(log_dir, 'app.log')
-handler = RotatingFileHandler(log_file, maxBytes=1024 * 1024, backupCount=5)
-handler.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-handler.setFormatter(formatter)
-app.logger.addHandler(handler)
-app.logger.setLevel(logging.INFO)
+# Configuración centralizada de Logging: JSON en logs/app.log escrito desde
+# una cola (la petición no espera al disco), con id de petición y una línea
+# de acceso con duración y tiempo de BD
+app_logging.init_app(app, log_dir)
+
+# Conteo y tiempo de SQL por petición, Server-Timing y logs/slow_queries.log.
+# Se registra antes que los demás before_request para medir también los suyos.
+query_stats.init_app(app, log_dir)
+# Latencia, errores, tiempo de BD y bytes exportados por endpoint (/metrics)
+init_metrics(app)
 # --------------------------------------------------------------------
 
 from modules.db_utils import (
@@ -92,6 +101,9 @@ from modules import (
     inventory_dashboard,
     inventory_report,
     report_generator,
+    search,
+    jobs,
+    derived_schema,
 )
 from modules.compras import compras_bp
 from modules.import_compras import compras_import_bp
@@ -134,13 +146,17 @@ class User:
         return False
 
 
+USER_CACHE_FIELDS = ("id", "email", "nombre", "apellido", "nombre_completo", "rol", "estado")
+
+
 @login_manager.user_loader
 def load_user(user_id):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("SELECT * FROM usuarios WHERE id = ?", (user_id,))
-    user_data = c.fetchone()
-    conn.close()
+    def load(conn):
+        row = conn.execute("SELECT * FROM usuarios WHERE id = ?", (user_id,)).fetchone()
+        # Solo los campos que usa User (sin contraseña) se guardan en caché
+        return {k: row[k] for k in USER_CACHE_FIELDS if k in row.keys()} if row else None
+
+    user_data = cached(f"usuario:{user_id}", ("usuarios",), load)
     if user_data:
         return User(user_data)
     return None
@@ -181,20 +197,24 @@ def inject_global_data():
     Ahora 'sedes' y 'LANGUAGES' estarán disponibles en cualquier archivo HTML.
     """
     try:
-        conn = get_db_connection()
-        sedes = conn.execute("SELECT id, nombre FROM sedes ORDER BY nombre").fetchall()
+        sedes = cached(
+            "sedes",
+            ("sedes",),
+            lambda conn: [dict(row) for row in conn.execute("SELECT id, nombre FROM sedes ORDER BY nombre").fetchall()],
+        )
 
         # Contar solicitudes pendientes para notificaciones (solo para admins)
         pending_requests = 0
         if current_user.is_authenticated and hasattr(current_user, "rol") and current_user.rol == "admin":
             try:
-                pending_requests = (
-                    conn.execute("SELECT COUNT(id) FROM solicitudes WHERE estado = 'pendiente'").fetchone()[0]
+                pending_requests = cached(
+                    "solicitudes_pendientes",
+                    ("solicitudes",),
+                    lambda conn: conn.execute("SELECT COUNT(id) FROM solicitudes WHERE estado = 'pendiente'").fetchone()[0],
                 )
             except sqlite3.OperationalError:
                 pending_requests = 0
 
-        conn.close()
         return dict(
             sedes=sedes,
             LANGUAGES=LANGUAGES,
@@ -254,6 +274,13 @@ app.register_blueprint(inventory_report.inventory_report_bp)
 app.register_blueprint(inventory_dashboard.inventory_dashboard_bp)
 app.register_blueprint(visualizador_inventario.visualizador_bp)
 app.register_blueprint(report_generator.report_generator_bp)
+app.register_blueprint(search.search_bp)
+
+# Aviso de tablas y triggers derivados sin migrar (se instalan con python migrate.py esquema)
+derived_schema.init_app(app)
+
+# Reanudar importaciones/reportes en segundo plano interrumpidos (los manejadores ya están registrados)
+jobs.init_app(app)
 
 
 @app.route("/")
@@ -264,7 +291,7 @@ def index():
 
 @app.route("/health")
 def health():
-    return jsonify({"status": "ok"})
+    return jsonify({"status": "ok", "database": get_database_settings()})
 
 
 @app.route("/routes")
@@ -275,22 +302,16 @@ def list_routes():
     return jsonify(routes)
 
 
-# Simple metrics
+# Métricas: texto de Prometheus si el cliente lo pide, conteos por tabla en JSON si no
 @app.route("/metrics")
 def metrics():
     conn = get_db_connection()
-    c = conn.cursor()
-    data = {}
     try:
-        for table in ["empleados", "equipos_agrupados", "equipos_individuales", "licencias_office365", "facturas", "tickets"]:
-            try:
-                c.execute(f"SELECT COUNT(*) FROM {table}")
-                data[table] = c.fetchone()[0]
-            except Exception:
-                data[table] = 0
+        if wants_prometheus():
+            return prometheus_response(conn)
+        return jsonify(table_counts(conn))
     finally:
         conn.close()
-    return jsonify(data)
 
 
 PROTECTED_ENDPOINTS = {
@@ -300,8 +321,7 @@ PROTECTED_ENDPOINTS = {
 
 
 def user_has_permission(user_id, permission_code):
-    try:
-        conn = get_db_connection()
+    def load(conn):
         c = conn.cursor()
         c.execute(
             """
@@ -315,10 +335,11 @@ def user_has_permission(user_id, permission_code):
             (user_id, permission_code),
         )
         return c.fetchone() is not None
+
+    try:
+        return cached(f"permiso:{user_id}:{permission_code}", ("permisos",), load)
     except Exception:
         return False
-    finally:
-        conn.close()
 
 
 @app.before_request
@@ -342,13 +363,6 @@ def before():
         if not g.user_id or not user_has_permission(g.user_id, required):
             flash("No tienes permiso para acceder a esta área.", "danger")
             return redirect(url_for("auth.login"))
-    app.logger.info(f"REQ {endpoint}")
-
-
-@app.after_request
-def after(resp):
-    app.logger.info(f"RESP {resp.status_code}")
-    return resp
 
 
 def ensure_default_admin():
@@ -464,14 +478,14 @@ def tasks():
         data = request.get_json()
         title = data.get("title")
         description = data.get("description")
-        conn = sqlite3.connect("todo.db")
+        conn = sqlite3.connect("todo.db", factory=InstrumentedConnection)
         c = conn.cursor()
         c.execute("INSERT INTO tasks (title, description) VALUES (?, ?)", (title, description))
         conn.commit()
         conn.close()
         return jsonify({"message": "Task added successfully"}), 201
     else:
-        conn = sqlite3.connect("todo.db")
+        conn = sqlite3.connect("todo.db", factory=InstrumentedConnection)
         c = conn.cursor()
         c.execute("SELECT * FROM tasks")
         tasks = c.fetchall()
@@ -486,7 +500,7 @@ def task(task_id):
         title = data.get("title")
         description = data.get("description")
         status = data.get("status")
-        conn = sqlite3.connect("todo.db")
+        conn = sqlite3.connect("todo.db", factory=InstrumentedConnection)
         c = conn.cursor()
         c.execute(
             "UPDATE tasks SET title=?, description=?, status=? WHERE id=?",
@@ -496,7 +510,7 @@ def task(task_id):
         conn.close()
         return jsonify({"message": "Task updated successfully"})
     elif request.method == "DELETE":
-        conn = sqlite3.connect("todo.db")
+        conn = sqlite3.connect("todo.db", factory=InstrumentedConnection)
         c = conn.cursor()
         c.execute("DELETE FROM tasks WHERE id=?", (task_id,))
         conn.commit()
@@ -0,0 +1,15 @@
+"""
+Benchmarks reproducibles de WORKMANAGER ERP.
+
+- datagen: genera con semilla fija una base SQLite con sedes, empleados,
+  equipos, licencias y tickets, y archivos Excel "desordenados" como los que
+  llegan a los importadores.
+- runner: cronometra las vistas más usadas (con el cliente de pruebas de
+  Flask) y los flujos de importación y exportación completos, y compara el
+  resultado con la línea base guardada en benchmarks/baselines/<escala>.json.
+
+Uso:
+    python -m benchmarks --scale small            # medir y comparar
+    python -m benchmarks --scale small --save     # actualizar la línea base
+    python -m benchmarks.datagen --scale medium --out /tmp/erp.db --workbooks /tmp/excel
+"""
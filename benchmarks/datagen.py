@@ -0,0 +1,432 @@
+"""
+Generador de datos sintéticos del ERP con semilla fija.
+
+La misma escala y semilla producen exactamente las mismas filas (las fechas
+parten de BASE_DATE, no del reloj), de modo que dos corridas del benchmark
+miden la misma carga. Los datos imitan los reales:
+
+- sedes con ciudades repetidas y códigos en formatos mixtos;
+- empleados con correo Office, cédula y algunos nombres repetidos;
+- equipos cuyo asignado viene como correo, nombre con mayúsculas y espacios
+  sobrantes, cédula, un nombre que no existe o vacío;
+- licencias por correo (algunas externas) y tickets por sede;
+- libros Excel de varias hojas con títulos sobre el encabezado, filas vacías,
+  alias de columnas y filas de totales, y un libro con el formato de secciones
+  que espera scripts/parse_disorganized_inventory.py.
+
+Las tablas se llenan antes de que la aplicación cree sus triggers (vínculos,
+resumen, búsqueda, conteos): la primera petición los instala y rellena como
+en una base existente que se actualiza.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+from datetime import date, timedelta
+
+from openpyxl import Workbook
+from werkzeug.security import generate_password_hash
+
+from create_production_db import create_tables
+
+DEFAULT_SEED = 20240601
+BASE_DATE = date(2024, 6, 1)
+
+SCALES = {
+    "tiny": {"sedes": 4, "empleados": 60, "equipos": 400, "licencias": 40, "tickets": 80, "workbook_rows": 120},
+    "small": {"sedes": 12, "empleados": 2000, "equipos": 20000, "licencias": 1500, "tickets": 3000, "workbook_rows": 2000},
+    "medium": {"sedes": 40, "empleados": 20000, "equipos": 100000, "licencias": 15000, "tickets": 20000, "workbook_rows": 10000},
+    "large": {"sedes": 80, "empleados": 100000, "equipos": 1000000, "licencias": 80000, "tickets": 150000, "workbook_rows": 50000},
+}
+
+ADMIN_EMAIL = "bench@workmanager.local"
+ADMIN_PASSWORD = "bench"
+
+CIUDADES = [
+    ("Bogotá", "Cundinamarca"), ("Medellín", "Antioquia"), ("Cali", "Valle del Cauca"),
+    ("Barranquilla", "Atlántico"), ("Cartagena", "Bolívar"), ("Montería", "Córdoba"),
+    ("Pasto", "Nariño"), ("Bucaramanga", "Santander"), ("Pereira", "Risaralda"),
+    ("Santa Marta", "Magdalena"), ("Villavicencio", "Meta"), ("Neiva", "Huila"),
+]
+NOMBRES = [
+    "Ana", "Luis", "Carlos", "María", "Jorge", "Paula", "Andrés", "Laura", "Camilo", "Diana",
+    "Felipe", "Natalia", "Julián", "Sandra", "Óscar", "Valentina", "Mauricio", "Carolina", "Sebastián", "Juliana",
+]
+APELLIDOS = [
+    "Gómez", "Rodríguez", "Martínez", "López", "García", "Pérez", "Sánchez", "Ramírez", "Torres", "Díaz",
+    "Vargas", "Moreno", "Rojas", "Jiménez", "Castro", "Ortiz", "Rubio", "Herrera", "Mejía", "Ospina",
+]
+CARGOS = ["Auxiliar administrativo", "Enfermera jefe", "Médico general", "Analista", "Coordinador", "Técnico de sistemas"]
+AREAS = ["Administración", "Urgencias", "Consulta externa", "Laboratorio", "Farmacia", "Sistemas", "Facturación"]
+RAZONES = ["IPS Salud Total S.A.S.", "Clínica del Norte S.A.", "Laboratorios Unidos Ltda."]
+
+# tecnología -> (prefijo del código, marcas, modelos)
+TECNOLOGIAS = {
+    "PC": ("PC", ["Dell", "HP", "Lenovo"], ["OptiPlex 3080", "ProDesk 400 G7", "ThinkCentre M70q"]),
+    "PORTATIL": ("PT", ["Dell", "HP", "Lenovo", "Asus"], ["Latitude 5420", "ProBook 450 G8", "ThinkPad E14", "VivoBook 15"]),
+    "MONITOR": ("MN", ["Samsung", "LG", "Dell"], ["S22F350", "22MK430H", "E2220H"]),
+    "IMPRESORA": ("IM", ["Epson", "HP", "Kyocera"], ["L3250", "LaserJet M404", "Ecosys P2040"]),
+    "POS": ("PS", ["Ingenico", "Verifone"], ["Move 5000", "V200c"]),
+    "SWITCH": ("SW", ["Cisco", "TP-Link"], ["Catalyst 2960", "TL-SG1016"]),
+    "TELEFONO": ("TL", ["Grandstream", "Yealink"], ["GXP1610", "T31P"]),
+}
+ESTADOS_EQUIPO = ["disponible"] * 2 + ["asignado"] * 6 + ["mantenimiento", "dado_de_baja"]
+PROCESADORES = ["Intel Core i3-10100", "Intel Core i5-10400", "Intel Core i7-10700", "AMD Ryzen 5 5600G"]
+RAMS = ["4 GB", "8 GB", "16 GB"]
+DISCOS = [("SSD", "256 GB"), ("SSD", "512 GB"), ("HDD", "1 TB")]
+SISTEMAS = ["Windows 10 Pro", "Windows 11 Pro", "Ubuntu 22.04"]
+LICENCIAS = ["Microsoft 365 Business Basic", "Microsoft 365 Business Standard", "Office 365 E3", "Exchange Online (Plan 1)"]
+CATEGORIAS_TICKET = ["Hardware", "Software", "Red", "Impresoras", "Accesos"]
+PRIORIDADES = ["baja", "media", "media", "alta", "critica"]
+ESTADOS_TICKET = ["abierto", "en_proceso", "resuelto", "resuelto", "cerrado"]
+
+TICKETS_DDL = """
+    CREATE TABLE IF NOT EXISTS tickets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        numero_ticket TEXT UNIQUE,
+        titulo TEXT,
+        descripcion TEXT,
+        categoria TEXT,
+        prioridad TEXT,
+        estado TEXT,
+        sede_id INTEGER,
+        asignado_a TEXT,
+        created_at TEXT
+    )"""
+
+LICENCIAS_DDL = """
+    CREATE TABLE IF NOT EXISTS licencias_office365 (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT NOT NULL UNIQUE,
+        tipo_licencia TEXT,
+        usuario_asignado TEXT,
+        cedula_usuario TEXT,
+        empleado_id INTEGER,
+        sede_id INTEGER,
+        estado TEXT DEFAULT 'activa',
+        fecha_asignacion TEXT,
+        fecha_vencimiento TEXT,
+        costo_mensual REAL,
+        observaciones TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )"""
+
+# Alias de encabezado que aparecen en los inventarios reales (columna -> variantes).
+# El código siempre usa un alias reconocido para que las filas se inserten; los
+# demás incluyen alias sin mapeo, que el importador guarda en import_unmapped.
+HEADER_ALIASES = {
+    "codigo": ["Codigo de barras", "CODIGO", " codigo "],
+    "serial": ["Serial", "SERIAL O MAC", "Serie No.", "serial "],
+    "tecnologia": ["Tipo de dispositivo", "TECNOLOGIA", "DISPOSITIVO"],
+    "marca": ["Marca", "MARCA"],
+    "modelo": ["Modelo", "MODELO"],
+    "procesador": ["Procesador", "PROCESADOR"],
+    "ram": ["Cantidad de ram", "CANTIDAD RAM", "RAM"],
+    "estado": ["Estado", "ESTADO ACTUAL", "ESTADO"],
+    "asignado": ["Asignado a", "ASIGNADO NUEVO", "Responsable"],
+    "area": ["Area", "AREA ", "Area o Ciudad"],
+    "fecha": ["Fecha LLegada", "FECHA DE LLEGADA", "Fecha"],
+}
+
+
+def scale_counts(scale):
+    """Cantidades de la escala (nombre de SCALES o dict con las mismas claves)."""
+    if isinstance(scale, dict):
+        return dict(SCALES["tiny"], **scale)
+    if scale not in SCALES:
+        raise ValueError(f"Escala desconocida: {scale} (opciones: {', '.join(SCALES)})")
+    return dict(SCALES[scale])
+
+
+def _day(rng, span=1500):
+    return (BASE_DATE - timedelta(days=rng.randrange(span))).isoformat()
+
+
+def _messy(rng, text):
+    """El mismo texto como lo escribe una persona: mayúsculas y espacios variables."""
+    roll = rng.random()
+    if roll < 0.15:
+        return f"  {text.upper()} "
+    if roll < 0.3:
+        return text.lower() + " "
+    return text
+
+
+def _sedes(rng, count):
+    rows = []
+    for i in range(1, count + 1):
+        ciudad, departamento = CIUDADES[(i - 1) % len(CIUDADES)]
+        sufijo = (i - 1) // len(CIUDADES) + 1
+        # Códigos en formatos mixtos, como los cargados a mano
+        codigo = rng.choice([f"{ciudad[:3].upper()}-{sufijo:02d}", f"{ciudad[:3].lower()} {sufijo}", f"S{i:03d}"])
+        rows.append((
+            i, codigo, f"Sede {ciudad} {sufijo}",
+            f"Calle {rng.randrange(1, 150)} # {rng.randrange(1, 99)}-{rng.randrange(1, 99)}",
+            ciudad, departamento, f"60{rng.randrange(10**7, 10**8)}", f"sede{i}@workmanager.local",
+            "activa" if rng.random() < 0.9 else "inactiva", BASE_DATE.isoformat(),
+        ))
+    return rows
+
+
+def _empleados(rng, count, sedes):
+    rows = []
+    for i in range(1, count + 1):
+        nombre = rng.choice(NOMBRES)
+        apellido = f"{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}"
+        usuario = f"{nombre[0]}{apellido.split()[0]}{i}".lower()
+        usuario = usuario.translate(str.maketrans("áéíóúñ", "aeioun"))
+        rows.append((
+            i, str(10_000_000 + i * 7), nombre, apellido, rng.choice(CARGOS), rng.choice(AREAS),
+            _day(rng, 4000), rng.choice(RAZONES), sedes[rng.randrange(len(sedes))][4],
+            f"HV-{i:06d}", usuario, f"{usuario}@workmanager.local",
+            "activo" if rng.random() < 0.93 else "retirado",
+            f"3{rng.randrange(10**8, 10**9)}", rng.randrange(1, len(sedes) + 1), BASE_DATE.isoformat(),
+        ))
+    return rows
+
+
+def _asignado(rng, empleado):
+    """Texto del asignado de un equipo; None si el equipo no tiene asignado."""
+    roll = rng.random()
+    if empleado is None or roll < 0.3:
+        return None
+    if roll < 0.55:
+        return _messy(rng, empleado[11])
+    if roll < 0.8:
+        return _messy(rng, f"{empleado[2]} {empleado[3]}")
+    if roll < 0.95:
+        return empleado[1]
+    return f"{rng.choice(NOMBRES)} Externo {rng.randrange(1000)}"
+
+
+def _equipos(rng, count, sedes, empleados):
+    tecnologias = list(TECNOLOGIAS)
+    for i in range(1, count + 1):
+        tecnologia = rng.choice(tecnologias)
+        prefijo, marcas, modelos = TECNOLOGIAS[tecnologia]
+        sede = sedes[rng.randrange(len(sedes))]
+        empleado = empleados[rng.randrange(len(empleados))] if empleados else None
+        tipo_disco, espacio = rng.choice(DISCOS)
+        computador = tecnologia in ("PC", "PORTATIL")
+        yield (
+            f"{prefijo}-{i:07d}", f"{rng.choice('ABCDEFGHJK')}{rng.randrange(10**9, 10**10)}",
+            tecnologia, rng.choice(marcas), rng.choice(modelos),
+            rng.choice(PROCESADORES) if computador else None,
+            rng.choice(RAMS) if computador else None,
+            tipo_disco if computador else None, espacio if computador else None,
+            rng.choice(SISTEMAS) if computador else None,
+            rng.choice(ESTADOS_EQUIPO), _asignado(rng, empleado), _day(rng), rng.choice(AREAS),
+            sede[4], sede[0], f"OC-{rng.randrange(1000, 9999)}", BASE_DATE.isoformat(),
+        )
+
+
+def _licencias(rng, count, empleados):
+    rows = []
+    for i in range(1, count + 1):
+        if empleados and i <= len(empleados) and rng.random() < 0.85:
+            empleado = empleados[i - 1]
+            email, usuario, cedula, sede_id = empleado[11], f"{empleado[2]} {empleado[3]}", empleado[1], empleado[14]
+        else:
+            email, usuario, cedula, sede_id = f"externo{i}@proveedor.local", None, None, None
+        rows.append((
+            email, rng.choice(LICENCIAS), usuario, cedula, sede_id,
+            "activa" if rng.random() < 0.9 else "vencida", _day(rng, 700),
+            (BASE_DATE + timedelta(days=rng.randrange(-60, 365))).isoformat(),
+            rng.choice([6.0, 12.5, 20.6, 36.0]), BASE_DATE.isoformat(),
+        ))
+    return rows
+
+
+def _tickets(rng, count, sedes):
+    for i in range(1, count + 1):
+        categoria = rng.choice(CATEGORIAS_TICKET)
+        yield (
+            f"TCK-2024-{i:06d}", f"{categoria}: incidencia {i}", f"Descripción de la incidencia {i}",
+            categoria, rng.choice(PRIORIDADES), rng.choice(ESTADOS_TICKET),
+            rng.randrange(1, len(sedes) + 1), rng.choice(NOMBRES), f"{_day(rng, 365)} 08:00:00",
+        )
+
+
+def _batched(rows, size=10000):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def generate_database(path, scale="small", seed=DEFAULT_SEED):
+    """
+    Crea la base SQLite en `path` (reemplazándola) y devuelve los conteos por
+    tabla. Incluye el usuario administrador ADMIN_EMAIL para las vistas con
+    login.
+    """
+    counts = scale_counts(scale)
+    rng = random.Random(seed)
+    if os.path.exists(path):
+        os.remove(path)
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = OFF")
+        create_tables(conn, "sqlite")
+        conn.execute("ALTER TABLE empleados ADD COLUMN sede_id INTEGER")
+        conn.execute(LICENCIAS_DDL)
+        conn.execute(TICKETS_DDL)
+
+        # pbkdf2 fijo: el hash por defecto cambia entre versiones de werkzeug
+        conn.execute(
+            "INSERT INTO usuarios (nombre, apellido, email, password, rol) VALUES (?, ?, ?, ?, 'admin')",
+            ("Benchmark", "Admin", ADMIN_EMAIL, generate_password_hash(ADMIN_PASSWORD, method="pbkdf2:sha256:1000")),
+        )
+
+        sedes = _sedes(rng, counts["sedes"])
+        conn.executemany("""
+            INSERT INTO sedes (id, codigo, nombre, direccion, ciudad, departamento, telefono, email, estado, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, sedes)
+
+        empleados = _empleados(rng, counts["empleados"], sedes)
+        conn.executemany("""
+            INSERT INTO empleados (id, cedula, nombre, apellido, cargo, departamento, fecha_ingreso, razon_social,
+                                   ciudad, codigo_unico_hv_equipo, usuario_windows, correo_office, estado,
+                                   telefono, sede_id, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, empleados)
+
+        for batch in _batched(_equipos(rng, counts["equipos"], sedes, empleados)):
+            conn.executemany("""
+                INSERT INTO equipos_individuales (codigo_barras_individual, serial, tecnologia, marca, modelo,
+                                                  procesador, cantidad_ram, tipo_disco, espacio_disco, so, estado,
+                                                  asignado_nuevo, fecha_llegada, area, ciudad, sede_id, oc,
+                                                  created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, batch)
+
+        conn.executemany("""
+            INSERT INTO licencias_office365 (email, tipo_licencia, usuario_asignado, cedula_usuario, sede_id, estado,
+                                             fecha_asignacion, fecha_vencimiento, costo_mensual, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, _licencias(rng, counts["licencias"], empleados))
+
+        for batch in _batched(_tickets(rng, counts["tickets"], sedes)):
+            conn.executemany("""
+                INSERT INTO tickets (numero_ticket, titulo, descripcion, categoria, prioridad, estado, sede_id,
+                                     asignado_a, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, batch)
+        conn.commit()
+        conn.execute("PRAGMA synchronous = FULL")
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("sedes", "empleados", "equipos_individuales", "licencias_office365", "tickets")
+        }
+    finally:
+        conn.close()
+
+
+def _inventory_sheet(ws, rng, rows, sede, start):
+    """Una hoja por sede: títulos, encabezado con alias, filas vacías y total."""
+    columns = list(HEADER_ALIASES)
+    ws.append([f"INVENTARIO TECNOLÓGICO {sede.upper()}"])
+    ws.append([f"Corte: {BASE_DATE.isoformat()}", None, None, "Responsable: Sistemas"])
+    ws.append([])
+    ws.append([rng.choice(HEADER_ALIASES[c]) for c in columns])
+    for i in range(start, start + rows):
+        tecnologia = rng.choice(list(TECNOLOGIAS))
+        prefijo, marcas, modelos = TECNOLOGIAS[tecnologia]
+        if rng.random() < 0.03:
+            ws.append([])
+            continue
+        ws.append([
+            f"IMP-{prefijo}-{i:07d}",
+            # Seriales numéricos como número, como los deja Excel
+            rng.randrange(10**9, 10**10) if rng.random() < 0.2 else f"SN{rng.randrange(10**8, 10**9)}",
+            _messy(rng, tecnologia), rng.choice(marcas), rng.choice(modelos),
+            rng.choice(PROCESADORES) if tecnologia in ("PC", "PORTATIL") else None,
+            rng.choice(RAMS) if tecnologia in ("PC", "PORTATIL") else None,
+            rng.choice(ESTADOS_EQUIPO), f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}" if rng.random() < 0.7 else None,
+            rng.choice(AREAS), _day(rng),
+        ])
+    ws.append([])
+    ws.append(["TOTAL", rows])
+
+
+def disorganized_parser():
+    """Instancia del parser de scripts/ (al importarse escribe su log en logs/ del directorio actual)."""
+    os.makedirs("logs", exist_ok=True)
+    from scripts.parse_disorganized_inventory import DisorganizedInventoryParser
+
+    return DisorganizedInventoryParser()
+
+
+def _disorganized_sheet(ws, rng, rows):
+    """Formato de secciones de parse_disorganized_inventory: sección, subsección, encabezado y datos."""
+    layout = disorganized_parser().inventory_types["INVENTARIO BODEGA MEDELLIN"]
+    subsections = [s for s in layout if s != "OTROS:"]
+    ws.append(["INVENTARIO BODEGA MEDELLIN"])
+    per_section = max(1, rows // len(subsections))
+    for subsection in subsections:
+        headers = layout[subsection]
+        ws.append([subsection])
+        ws.append(headers)
+        for _ in range(per_section):
+            tecnologia = rng.choice(list(TECNOLOGIAS))
+            _, marcas, modelos = TECNOLOGIAS[tecnologia]
+            values = {
+                "SERIAL": f"SN{rng.randrange(10**8, 10**9)}", "MODELO": rng.choice(modelos),
+                "MARCA": rng.choice(marcas), "PROCESADOR": rng.choice(PROCESADORES), "RAM": rng.choice(RAMS),
+                "ALMACENAMIENTO": rng.choice(DISCOS)[1], "ESTADO": rng.choice(ESTADOS_EQUIPO),
+                "DISPOSITIVO": tecnologia, "SEDE UBICACIÓN": rng.choice(CIUDADES)[0], "SEDE": rng.choice(CIUDADES)[0],
+            }
+            ws.append([values.get(h) for h in headers])
+        ws.append([])
+
+
+def generate_workbooks(directory, rows=2000, seed=DEFAULT_SEED, sheets=4):
+    """
+    Escribe en `directory` los libros de prueba y devuelve sus rutas:
+    - inventario_sedes.xlsx: `rows` equipos repartidos en `sheets` hojas desordenadas;
+    - inventario_desorganizado.xlsx: secciones de la bodega para el parser de scripts/.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    sedes_path = os.path.join(directory, "inventario_sedes.xlsx")
+    wb = Workbook(write_only=True)
+    per_sheet = max(1, rows // sheets)
+    for n in range(sheets):
+        ciudad = CIUDADES[n % len(CIUDADES)][0]
+        _inventory_sheet(wb.create_sheet(ciudad[:31]), rng, per_sheet, ciudad, n * per_sheet + 1)
+    wb.save(sedes_path)
+
+    bodega_path = os.path.join(directory, "inventario_desorganizado.xlsx")
+    wb = Workbook(write_only=True)
+    _disorganized_sheet(wb.create_sheet("Bodega"), rng, rows)
+    wb.save(bodega_path)
+    return {"inventario_sedes": sedes_path, "inventario_desorganizado": bodega_path}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos del ERP para benchmarks.")
+    parser.add_argument("--scale", default="small", choices=sorted(SCALES))
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--out", required=True, help="ruta de la base SQLite a crear")
+    parser.add_argument("--workbooks", help="carpeta donde escribir los libros Excel")
+    args = parser.parse_args(argv)
+
+    for table, total in generate_database(args.out, args.scale, args.seed).items():
+        print(f"{table}: {total}")
+    if args.workbooks:
+        for path in generate_workbooks(args.workbooks, SCALES[args.scale]["workbook_rows"], args.seed).values():
+            print(f"  + {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""
+Runner de benchmarks al estilo de pytest-benchmark, sin dependencias extra.
+
+Cada caso se registra con @case y recibe el entorno (BenchEnv): una copia
+nueva de la base generada por datagen, la aplicación real (app.py) con un
+cliente de pruebas autenticado como administrador y los trabajos en segundo
+plano ejecutados en el mismo hilo. El caso devuelve la función a cronometrar
+y, opcionalmente, una preparación por ronda que no cuenta en el tiempo.
+
+Por caso se guardan min/max/media/mediana/desviación en milisegundos y las
+sentencias SQL por ronda (encabezado Server-Timing de query_stats), que no
+dependen de la máquina. Una regresión es una mediana por encima de la línea
+base en más de la tolerancia (y del umbral de ruido) o más sentencias SQL.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import re
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.datagen import ADMIN_EMAIL, DEFAULT_SEED, SCALES, disorganized_parser, generate_database, generate_workbooks
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(ROOT, "benchmarks", "baselines")
+# Bases y libros generados, reutilizados entre corridas con la misma escala y semilla
+DATA_DIR = os.getenv("BENCHMARK_DATA_DIR", os.path.join(ROOT, "benchmarks", ".data"))
+
+DEFAULT_ROUNDS = 5
+DEFAULT_WARMUP = 1
+DEFAULT_TOLERANCE = 0.25
+NOISE_FLOOR_MS = 5.0
+
+_TIMING = re.compile(r'desc="(\d+) consultas"')
+_TMP_FILE = re.compile(r'name="tmp_file" value="([^"]+)"')
+
+CASES = {}
+
+
+class BenchmarkError(Exception):
+    """Un caso no pudo ejecutarse (respuesta con error, trabajo fallido)."""
+
+
+def case(name, group, rounds=None):
+    """Registra un caso: la función recibe el entorno y devuelve run o (run, setup)."""
+    def decorator(func):
+        CASES[name] = {"name": name, "group": group, "factory": func, "rounds": rounds}
+        return func
+    return decorator
+
+
+class BenchEnv:
+    """Base, aplicación y cliente para una escala y semilla."""
+
+    def __init__(self, scale="small", seed=DEFAULT_SEED, regenerate=False):
+        self.scale = scale
+        self.seed = seed
+        self.statements = 0
+        self.workdir = tempfile.mkdtemp(prefix="wm_bench_")
+
+        source_dir = os.path.join(DATA_DIR, f"{scale}-{seed}")
+        pristine = os.path.join(source_dir, "erp.db")
+        if regenerate or not os.path.exists(pristine):
+            os.makedirs(source_dir, exist_ok=True)
+            generate_database(pristine, scale, seed)
+            generate_workbooks(os.path.join(source_dir, "excel"), SCALES[scale]["workbook_rows"], seed)
+        self.workbooks = {
+            os.path.splitext(name)[0]: os.path.join(source_dir, "excel", name)
+            for name in sorted(os.listdir(os.path.join(source_dir, "excel")))
+        }
+        # Cada corrida parte de la misma base: los casos de importación la modifican
+        self.db_path = os.path.join(self.workdir, "erp.db")
+        shutil.copyfile(pristine, self.db_path)
+
+        from modules import app_cache, db_utils, jobs
+
+        db_utils.load_active_db_path = lambda: self.db_path
+        app_cache.shared_store = None
+        app_cache.clear_local()
+        # Los trabajos se ejecutan en el hilo del caso con jobs.run_job
+        jobs._schedule = lambda job_id: None
+
+        from app import app
+        from modules.app_logging import access_logger
+
+        app.config["TESTING"] = True
+        # Sin la línea de acceso de cada petición en la salida del informe
+        access_logger.setLevel(logging.WARNING)
+        self.app = app
+        self.client = app.test_client()
+        with self.connect() as conn:
+            self.admin_id = conn.execute("SELECT id FROM usuarios WHERE email = ?", (ADMIN_EMAIL,)).fetchone()[0]
+            self.sede_id = conn.execute("SELECT MIN(id) FROM sedes").fetchone()[0]
+            self.empleado_id = conn.execute("SELECT MIN(id) FROM empleados").fetchone()[0]
+        with self.client.session_transaction() as session:
+            session["_user_id"] = str(self.admin_id)
+            session["_fresh"] = True
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _check(self, response, path):
+        if response.status_code >= 300:
+            raise BenchmarkError(f"{path}: HTTP {response.status_code}")
+        match = _TIMING.search(response.headers.get("Server-Timing", ""))
+        if match:
+            self.statements += int(match.group(1))
+        return response
+
+    def get(self, path, **kwargs):
+        """GET completo (incluido el cuerpo en streaming); devuelve los bytes recibidos."""
+        response = self._check(self.client.get(path, **kwargs), path)
+        return len(response.get_data())
+
+    def post(self, path, **kwargs):
+        return self._check(self.client.post(path, **kwargs), path)
+
+    def close(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+# --- Casos ---
+
+def _endpoint(name, path, **kwargs):
+    @case(name, "vistas")
+    def factory(env):
+        url = path.format(env=env)
+        return lambda: env.get(url, **kwargs)
+    return factory
+
+
+_endpoint("inventarios", "/inventarios")
+_endpoint("inventarios_pagina", "/inventarios/api/individuales/page")
+_endpoint("inventarios_dashboard", "/inventarios/api/dashboard")
+_endpoint("busqueda", "/api/search?q=lenovo")
+_endpoint("sedes", "/sedes")
+_endpoint("sede_detalle", "/sede/{env.sede_id}")
+_endpoint("licencias", "/licencias/")
+_endpoint("hoja_vida_empleado", "/gestion-humana/empleados/{env.empleado_id}/hoja-vida")
+_endpoint("metrics_json", "/metrics")
+_endpoint("metrics_prometheus", "/metrics?format=prometheus")
+
+
+@case("exportar_csv_licencias", "exportacion")
+def export_universal(env):
+    return lambda: env.get("/export/licencias/csv")
+
+
+@case("exportar_csv_equipos", "exportacion")
+def export_csv(env):
+    return lambda: env.get("/export_import/export/csv/equipos_individuales")
+
+
+@case("exportar_excel_equipos", "exportacion", rounds=3)
+def export_excel(env):
+    return lambda: env.get("/export_import/export/excel/equipos_individuales")
+
+
+@case("importar_excel_sedes", "importacion", rounds=3)
+def import_workbook(env):
+    """Vista previa, procesar y trabajo de importación del libro de varias hojas."""
+    from modules import jobs
+
+    path = env.workbooks["inventario_sedes"]
+
+    def setup():
+        with env.connect() as conn:
+            conn.execute("DELETE FROM equipos_individuales WHERE codigo_barras_individual LIKE 'IMP-%'")
+
+    def run():
+        with open(path, "rb") as f:
+            preview = env.post(
+                "/export_import/importador/preview",
+                data={"target": "auto", "files": (f, os.path.basename(path))},
+                content_type="multipart/form-data",
+            )
+        match = _TMP_FILE.search(preview.get_data(as_text=True))
+        if not match:
+            raise BenchmarkError("La vista previa no devolvió el archivo temporal")
+        response = env.post(
+            "/export_import/importador/procesar",
+            data={"tmp_file": match.group(1), "target": "auto"},
+            headers={"Accept": "application/json"},
+        )
+        job_id = response.get_json()["job_id"]
+        jobs.run_job(job_id)
+        job = jobs.get_job(job_id)
+        if job["status"] != "done":
+            raise BenchmarkError(f"Importación {job_id}: {job['status']} {job.get('error') or ''}")
+        return job["result"]["processed"]
+
+    return run, setup
+
+
+@case("parser_desorganizado", "importacion", rounds=3)
+def parse_disorganized(env):
+    parser = disorganized_parser()
+    return lambda: sum(len(rows) for rows in parser.parse_file(env.workbooks["inventario_desorganizado"]).values())
+
+
+# --- Medición ---
+
+def measure(env, spec, rounds=None, warmup=DEFAULT_WARMUP):
+    """Ejecuta un caso y devuelve sus estadísticas (ms) y sentencias SQL por ronda."""
+    made = spec["factory"](env)
+    run, setup = made if isinstance(made, tuple) else (made, None)
+    rounds = rounds or spec["rounds"] or DEFAULT_ROUNDS
+
+    for _ in range(warmup):
+        if setup:
+            setup()
+        run()
+
+    times = []
+    statements = []
+    for _ in range(rounds):
+        if setup:
+            setup()
+        env.statements = 0
+        start = time.perf_counter()
+        run()
+        times.append((time.perf_counter() - start) * 1000)
+        statements.append(env.statements)
+
+    return {
+        "group": spec["group"],
+        "rounds": rounds,
+        "min_ms": round(min(times), 3),
+        "max_ms": round(max(times), 3),
+        "mean_ms": round(statistics.mean(times), 3),
+        "median_ms": round(statistics.median(times), 3),
+        "stddev_ms": round(statistics.stdev(times), 3) if len(times) > 1 else 0.0,
+        "statements": max(statements) if any(statements) else None,
+    }
+
+
+def run_benchmarks(scale="small", seed=DEFAULT_SEED, only=None, rounds=None, warmup=DEFAULT_WARMUP, regenerate=False):
+    """Mide los casos seleccionados (subcadena del nombre o del grupo) y devuelve el informe."""
+    env = BenchEnv(scale, seed, regenerate=regenerate)
+    try:
+        results = {}
+        for name, spec in CASES.items():
+            if only and not any(o in name or o == spec["group"] for o in only):
+                continue
+            results[name] = measure(env, spec, rounds, warmup)
+    finally:
+        env.close()
+    return {
+        "scale": scale,
+        "seed": seed,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "machine": machine_info(),
+        "results": results,
+    }
+
+
+def machine_info():
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+# --- Línea base ---
+
+def baseline_path(scale):
+    return os.path.join(BASELINE_DIR, f"{scale}.json")
+
+
+def load_baseline(scale):
+    path = baseline_path(scale)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_baseline(report):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    path = baseline_path(report["scale"])
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+    return path
+
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE, noise_floor_ms=NOISE_FLOOR_MS):
+    """Regresiones frente a la línea base: [{name, metric, baseline, current}]."""
+    regressions = []
+    reference = (baseline or {}).get("results", {})
+    for name, current in report["results"].items():
+        previous = reference.get(name)
+        if not previous:
+            continue
+        slower = current["median_ms"] - previous["median_ms"]
+        if current["median_ms"] > previous["median_ms"] * (1 + tolerance) and slower > noise_floor_ms:
+            regressions.append({
+                "name": name, "metric": "median_ms",
+                "baseline": previous["median_ms"], "current": current["median_ms"],
+            })
+        if previous.get("statements") is not None and (current["statements"] or 0) > previous["statements"]:
+            regressions.append({
+                "name": name, "metric": "statements",
+                "baseline": previous["statements"], "current": current["statements"],
+            })
+    return regressions
+
+
+def print_report(report, baseline=None):
+    reference = (baseline or {}).get("results", {})
+    print(f"\nEscala {report['scale']} (semilla {report['seed']})")
+    print(f"{'caso':<26}{'mediana':>11}{'min':>11}{'max':>11}{'desv':>10}{'SQL':>7}{'base':>11}{'Δ':>9}")
+    for name, r in report["results"].items():
+        previous = reference.get(name)
+        base = f"{previous['median_ms']:.1f}" if previous else "-"
+        delta = f"{(r['median_ms'] / previous['median_ms'] - 1) * 100:+.0f}%" if previous and previous["median_ms"] else "-"
+        print(
+            f"{name:<26}{r['median_ms']:>11.1f}{r['min_ms']:>11.1f}{r['max_ms']:>11.1f}"
+            f"{r['stddev_ms']:>10.1f}{r['statements'] if r['statements'] is not None else '-':>7}{base:>11}{delta:>9}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de WORKMANAGER ERP.")
+    parser.add_argument("--scale", default="small", choices=sorted(SCALES))
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--only", action="append", help="caso o grupo (se puede repetir)")
+    parser.add_argument("--rounds", type=int, help="rondas por caso (por defecto, las del caso)")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="fracción de la mediana base")
+    parser.add_argument("--save", action="store_true", help="guardar el resultado como línea base")
+    parser.add_argument("--json", help="escribir el informe en esta ruta")
+    parser.add_argument("--regenerate", action="store_true", help="volver a generar los datos")
+    parser.add_argument("--list", action="store_true", help="listar los casos y salir")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, spec in CASES.items():
+            print(f"{spec['group']:<12} {name}")
+        return 0
+
+    # Las rutas relativas de la aplicación (tmp_imports, logs) son las del proyecto
+    os.chdir(ROOT)
+    report = run_benchmarks(args.scale, args.seed, args.only, args.rounds, args.warmup, args.regenerate)
+    baseline = load_baseline(args.scale)
+    print_report(report, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.save:
+        if baseline and args.only:
+            # Conservar los casos que no se midieron en esta corrida
+            report["results"] = dict(baseline["results"], **report["results"])
+        print(f"\nLínea base guardada en {save_baseline(report)}")
+        return 0
+    if baseline is None:
+        print(f"\nSin línea base para '{args.scale}'; usa --save para crearla.")
+        return 0
+    if baseline.get("machine") != report["machine"]:
+        print("\nAviso: la línea base se tomó en otra máquina; los tiempos no son comparables del todo.")
+
+    regressions = compare(report, baseline, args.tolerance)
+    for r in regressions:
+        print(f"REGRESIÓN {r['name']} ({r['metric']}): {r['baseline']} -> {r['current']}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -284,7 +284,8 @@ TABLE_DEFINITIONS = {
                 marca_modelo_cctv TEXT,
                 serial_cctv TEXT,
                 mueble_asignado TEXT,
-                origen_dato TEXT DEFAULT 'manual'
+                origen_dato TEXT DEFAULT 'manual',
+                empleado_id INTEGER
             )""",
         "equipos_agrupados": """
             CREATE TABLE IF NOT EXISTS equipos_agrupados (
@@ -294,6 +295,7 @@ TABLE_DEFINITIONS = {
                 sede_id INTEGER,
                 asignado_anterior TEXT,
                 asignado_actual TEXT,
+                empleado_id INTEGER,
                 descripcion_general TEXT,
                 estado_general TEXT DEFAULT 'disponible',
                 creador_registro TEXT,
@@ -495,7 +497,8 @@ TABLE_DEFINITIONS = {
                 marca_modelo_cctv TEXT,
                 serial_cctv TEXT,
                 mueble_asignado TEXT,
-                origen_dato TEXT DEFAULT 'manual'
+                origen_dato TEXT DEFAULT 'manual',
+                empleado_id INTEGER
             )""",
         "equipos_agrupados": """
             CREATE TABLE IF NOT EXISTS equipos_agrupados (
@@ -505,6 +508,7 @@ TABLE_DEFINITIONS = {
                 sede_id INTEGER,
                 asignado_anterior TEXT,
                 asignado_actual TEXT,
+                empleado_id INTEGER,
                 descripcion_general TEXT,
                 estado_general TEXT DEFAULT 'disponible',
                 creador_registro TEXT,
@@ -707,7 +711,8 @@ TABLE_DEFINITIONS = {
                 marca_modelo_cctv VARCHAR(255),
                 serial_cctv VARCHAR(255),
                 mueble_asignado VARCHAR(255),
-                origen_dato VARCHAR(50) DEFAULT 'manual'
+                origen_dato VARCHAR(50) DEFAULT 'manual',
+                empleado_id INTEGER
             ) ENGINE=InnoDB;""",
         "equipos_agrupados": """
             CREATE TABLE IF NOT EXISTS equipos_agrupados (
@@ -717,6 +722,7 @@ TABLE_DEFINITIONS = {
                 sede_id INTEGER,
                 asignado_anterior VARCHAR(255),
                 asignado_actual VARCHAR(255),
+                empleado_id INTEGER,
                 descripcion_general TEXT,
                 estado_general VARCHAR(50) DEFAULT 'disponible',
                 creador_registro VARCHAR(255),
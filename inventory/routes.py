@@ -6,9 +6,8 @@ import shutil
 from werkzeug.utils import secure_filename
 from datetime import datetime
 import pandas as pd
-from openpyxl import Workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
 
+from modules.excel_export import StreamingWorkbook
 from .processor import process_inventory_files
 from models import db, InventoryItem # Asumimos que models.py está en la raíz
 
@@ -87,17 +86,13 @@ def download_excel():
     df_db = pd.DataFrame(data)
     df_db.drop('_sa_instance_state', axis=1, inplace=True, errors='ignore')
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "INVENTARIO_GENERAL"
-    
-    for r in dataframe_to_rows(df_db, index=False, header=True):
-        ws.append(r)
+    book = StreamingWorkbook()
+    book.add_sheet("INVENTARIO_GENERAL", list(df_db.columns)).write_dataframe(df_db)
 
     reports_dir = os.path.join(current_app.static_folder, 'reports')
     os.makedirs(reports_dir, exist_ok=True)
     filename = f"INVENTARIO_EXPORTADO_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
     filepath = os.path.join(reports_dir, filename)
-    wb.save(filepath)
+    book.save(filepath)
 
     return send_from_directory(reports_dir, filename, as_attachment=True)
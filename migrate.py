@@ -1,17 +1,120 @@
 import os
 import sys
-import pandas as pd
-from sqlalchemy import create_engine
-from dotenv import load_dotenv
 
 # Reutilizamos las rutinas de creaciÃ³n de tablas/conexiÃ³n de create_production_db.py
 from create_production_db import get_db_connection as get_prod_db_connection, create_tables
+from modules.db_indexes import apply_index_pack, advise_indexes, print_advice
+from modules.derived_schema import upgrade_derived_schema
+from modules.employee_links import install_employee_links, linked_tables, relink, unresolved_names
+from modules.inventory_summary import rebuild_inventory_summary
+from modules.search import fts5_available, rebuild_search_index
+
+
+def _db_type(scheme):
+    """Normaliza el esquema devuelto por create_production_db.get_db_connection."""
+    if 'postgres' in scheme:
+        return 'postgres'
+    if 'mysql' in scheme or 'mariadb' in scheme:
+        return 'mysql'
+    return 'sqlite'
+
+
+def apply_indexes():
+    """
+    Aplica el paquete versionado de índices (modules/db_indexes.py) a la base de
+    datos activa: DATABASE_URL si está definida o la SQLite local.
+    """
+    conn, scheme = get_prod_db_connection()
+    try:
+        summary = apply_index_pack(conn, _db_type(scheme))
+    finally:
+        conn.close()
+    print(f"Índices creados: {len(summary['created'])}, sin cambios: {len(summary['unchanged'])}")
+    for name in summary['created']:
+        print(f"  + {name}")
+    for name, reason in summary['skipped']:
+        print(f"  - {name}: {reason}")
+    return summary
+
+
+def advise():
+    """Asesor de índices: EXPLAIN QUERY PLAN sobre las consultas reales de la app (SQLite)."""
+    conn, scheme = get_prod_db_connection()
+    try:
+        if _db_type(scheme) != 'sqlite':
+            print("[ERROR] El asesor de índices solo está disponible para SQLite.")
+            return 1
+        return 1 if print_advice(advise_indexes(conn)) else 0
+    finally:
+        conn.close()
+
+def upgrade_schema():
+    """Instala las tablas y triggers derivados que falten (solo SQLite)."""
+    conn, scheme = get_prod_db_connection()
+    try:
+        if _db_type(scheme) != 'sqlite':
+            print("[ERROR] El esquema derivado solo está disponible para SQLite.")
+            return 1
+        for name, installed in upgrade_derived_schema(conn).items():
+            print(f"  - {name}: {'instalado' if installed else 'no aplica'}")
+        return 0
+    finally:
+        conn.close()
+
+def rebuild_search():
+    """Recrea el índice FTS5 de /api/search y sus triggers (solo SQLite)."""
+    conn, scheme = get_prod_db_connection()
+    try:
+        if _db_type(scheme) != 'sqlite' or not fts5_available(conn):
+            print("[ERROR] El índice de búsqueda requiere SQLite con FTS5.")
+            return 1
+        for tipo, total in rebuild_search_index(conn).items():
+            print(f"  - {tipo}: {total} filas indexadas")
+        return 0
+    finally:
+        conn.close()
+
+def rebuild_summary():
+    """Recrea el resumen materializado del inventario y sus triggers (solo SQLite)."""
+    conn, scheme = get_prod_db_connection()
+    try:
+        if _db_type(scheme) != 'sqlite':
+            print("[ERROR] El resumen materializado solo está disponible para SQLite.")
+            return 1
+        for dimension, grupos in rebuild_inventory_summary(conn).items():
+            print(f"  - {dimension}: {grupos} grupos")
+        return 0
+    finally:
+        conn.close()
+
+
+def rebuild_links():
+    """Recalcula empleado_id de equipos y licencias y lista lo no resuelto (solo SQLite)."""
+    conn, scheme = get_prod_db_connection()
+    try:
+        if _db_type(scheme) != 'sqlite' or not install_employee_links(conn):
+            print("[ERROR] Los vínculos de empleados requieren SQLite con la tabla empleados.")
+            return 1
+        for table in linked_tables(conn):
+            print(f"  - {table}: {relink(conn, table)} filas recalculadas")
+        conn.commit()
+        for item in unresolved_names(conn, limit=50):
+            print(f"  ? {item['tabla']}.{item['columna']} = {item['valor']!r}: "
+                  f"{item['filas']} filas, {item['candidatos']} candidatos")
+        return 0
+    finally:
+        conn.close()
+
 
 def migrate_data():
     """
     Migra datos desde una base de datos SQLite local a una base de datos
     de producción (PostgreSQL o MySQL) definida por la variable de entorno DATABASE_URL.
     """
+    import pandas as pd
+    from sqlalchemy import create_engine
+    from dotenv import load_dotenv
+
     print("=============================================")
     print("== INICIANDO MIGRACIÓN DE DATOS A PRODUCCIÓN ==")
     print("=============================================")
@@ -42,7 +145,7 @@ def migrate_data():
     # Usamos la variable de entorno que el .bat ya ha configurado
     prod_conn, db_type = get_prod_db_connection()
     if prod_conn:
-        create_tables(prod_conn, db_type)
+        create_tables(prod_conn, _db_type(db_type))
         prod_conn.close()
     # ----------------------------------------------------
 
@@ -75,7 +178,24 @@ def migrate_data():
         except Exception as e:
             print(f" FALLÓ. Error: {e}")
 
+    print("\nAplicando paquete de índices...")
+    apply_indexes()
+
     print("\n[INFO] Proceso de migración finalizado.")
 
 if __name__ == "__main__":
-    migrate_data()
+    command = sys.argv[1] if len(sys.argv) > 1 else "migrate"
+    if command == "indexes":
+        apply_indexes()
+    elif command == "advise":
+        sys.exit(advise())
+    elif command == "esquema":
+        sys.exit(upgrade_schema())
+    elif command == "search":
+        sys.exit(rebuild_search())
+    elif command == "resumen":
+        sys.exit(rebuild_summary())
+    elif command == "vinculos":
+        sys.exit(rebuild_links())
+    else:
+        migrate_data()
@@ -1,12 +1,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
-import sqlite3
+from modules.db_utils import get_db_connection
 
 admin_bp = Blueprint('admin', __name__, template_folder='../templates', static_folder='../static')
 
-def get_db_connection():
-    conn = sqlite3.connect('workmanager_erp.db')
-    conn.row_factory = sqlite3.Row
-    return conn
 
 @admin_bp.route('/admin')
 def admin():
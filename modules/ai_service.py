@@ -3,14 +3,11 @@ import sqlite3
 import requests
 import json
 from datetime import datetime
+from modules.db_utils import get_db_connection
+from modules.query_stats import InstrumentedConnection
 
 ai_service_bp = Blueprint('ai_service', __name__, template_folder='../templates', static_folder='../static')
 
-def get_db_connection():
-    conn = sqlite3.connect('workmanager_erp.db')
-    conn.row_factory = sqlite3.Row
-    return conn
-
 
 def _get_inventory_agent_stats(conn):
     """Construye métricas del agente de inventario para los dashboards."""
@@ -59,7 +56,7 @@ def new_ai_log():
     if request.method == 'POST':
         query = request.form['query']
         response = request.form['response']
-        conn = sqlite3.connect('workmanager_erp.db')
+        conn = sqlite3.connect('workmanager_erp.db', factory=InstrumentedConnection)
         c = conn.cursor()
         c.execute("INSERT INTO ai_logs (query, response) VALUES (?, ?)", (query, response))
         conn.commit()
@@ -70,7 +67,7 @@ def new_ai_log():
 
 @ai_service_bp.route('/ai_log/<int:ai_log_id>/edit', methods=['GET', 'POST'])
 def edit_ai_log(ai_log_id):
-    conn = sqlite3.connect('workmanager_erp.db')
+    conn = sqlite3.connect('workmanager_erp.db', factory=InstrumentedConnection)
     c = conn.cursor()
     if request.method == 'POST':
         query = request.form['query']
@@ -87,7 +84,7 @@ def edit_ai_log(ai_log_id):
 
 @ai_service_bp.route('/ai_log/<int:ai_log_id>/delete', methods=['POST'])
 def delete_ai_log(ai_log_id):
-    conn = sqlite3.connect('workmanager_erp.db')
+    conn = sqlite3.connect('workmanager_erp.db', factory=InstrumentedConnection)
     c = conn.cursor()
     c.execute("DELETE FROM ai_logs WHERE id=?", (ai_log_id,))
     conn.commit()
@@ -97,7 +94,7 @@ def delete_ai_log(ai_log_id):
 
 @ai_service_bp.route('/api/ai_logs', methods=['GET'])
 def api_ai_logs():
-    conn = sqlite3.connect('workmanager_erp.db')
+    conn = sqlite3.connect('workmanager_erp.db', factory=InstrumentedConnection)
     c = conn.cursor()
     c.execute("SELECT * FROM ai_logs")
     ai_logs = c.fetchall()
@@ -0,0 +1,339 @@
+"""
+Caché de datos globales por petición (context processor, usuario y permisos).
+
+Cada página ejecutaba varias consultas idénticas: las sedes y las solicitudes
+pendientes en inject_global_data (en cada render), el usuario en load_user y
+el JOIN de permisos en before_request. cached() las resuelve en tres niveles:
+
+1. La petición actual (flask.g): un valor se calcula una sola vez por petición.
+2. El proceso: caché LRU con caducidad (APP_CACHE_TTL segundos, APP_CACHE_SIZE
+   entradas).
+3. Opcionalmente, un almacén compartido entre workers de gunicorn indicado en
+   APP_CACHE_URL:
+       sqlite:////var/cache/workmanager/cache.db
+       memcached://127.0.0.1:11211   (requiere pymemcache)
+
+Invalidación: cache_versiones guarda un contador por etiqueta (sedes,
+usuarios, permisos, solicitudes, insumos) que los triggers de las tablas origen
+incrementan en cada escritura. La clave de cada valor incluye las versiones de
+sus etiquetas, así que un cambio hecho por cualquier worker (o script) deja de
+coincidir con las entradas anteriores sin tener que borrarlas. Las versiones se
+leen una vez por petición con una consulta sobre una tabla de pocas filas.
+
+La tabla y los triggers los instala la migración del esquema derivado
+(install_cache_versions); las lecturas solo comprueban en sqlite_master qué
+etiquetas tienen sus triggers. En una base SQLite sin migrar, los valores de
+etiquetas sin triggers no se guardan. Con bases de datos distintas de SQLite
+no hay triggers que avisen de los cambios (un permiso revocado seguiría
+vigente hasta APP_CACHE_TTL), así que solo se reutilizan dentro de la
+petición.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+from flask import g, has_app_context
+
+from modules.db_utils import derived_ready, get_db_connection, pool_key, schema_objects
+from modules.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+APP_CACHE_TTL = int(os.getenv("APP_CACHE_TTL", "300"))
+APP_CACHE_SIZE = int(os.getenv("APP_CACHE_SIZE", "2048"))
+APP_CACHE_URL = os.getenv("APP_CACHE_URL", "")
+
+VERSION_TABLE = "cache_versiones"
+# etiqueta -> tablas cuyas escrituras la invalidan
+CACHE_TAGS = {
+    "sedes": ("sedes",),
+    "usuarios": ("usuarios",),
+    "permisos": ("user_roles", "role_permissions", "permissions", "roles"),
+    "solicitudes": ("solicitudes",),
+    "insumos": ("insumos",),
+}
+
+_MISS = object()
+
+
+class LocalCache:
+    """LRU en memoria con caducidad por entrada."""
+
+    def __init__(self, max_size=APP_CACHE_SIZE):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISS
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return _MISS
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def _store_key(key):
+    """
+    Clave en el almacén compartido: hash de la clave completa, que incluye la
+    clave del pool (la URL de la base de datos, con su contraseña).
+    memcached además no admite espacios ni claves de más de 250 caracteres.
+    """
+    return "wm:" + hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+class SQLiteStore:
+    """Almacén compartido en un archivo SQLite (valores JSON)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (clave TEXT PRIMARY KEY, valor TEXT NOT NULL, expira REAL NOT NULL)"
+            )
+            # Entradas de versiones anteriores guardadas con la clave en claro
+            conn.execute("DELETE FROM cache WHERE clave NOT LIKE 'wm:%'")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute("SELECT valor, expira FROM cache WHERE clave = ?", (_store_key(key),)).fetchone()
+        if row is None or row[1] < time.time():
+            return _MISS
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (clave, valor, expira) VALUES (?, ?, ?)",
+            (_store_key(key), json.dumps(value), time.time() + ttl),
+        )
+        # Limpieza ocasional de entradas vencidas
+        if hash(key) % 100 == 0:
+            conn.execute("DELETE FROM cache WHERE expira < ?", (time.time(),))
+
+
+class MemcacheStore:
+    """Almacén compartido en memcached (pymemcache)."""
+
+    def __init__(self, host, port):
+        from pymemcache.client.base import Client
+
+        self._client = Client((host, port), connect_timeout=0.5, timeout=0.5)
+
+    def get(self, key):
+        raw = self._client.get(_store_key(key))
+        return _MISS if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl):
+        self._client.set(_store_key(key), json.dumps(value), expire=int(ttl))
+
+
+def _create_shared_store(url):
+    if not url:
+        return None
+    parsed = urlparse(url)
+    try:
+        if parsed.scheme == "sqlite":
+            return SQLiteStore(parsed.path)
+        if parsed.scheme == "memcached":
+            return MemcacheStore(parsed.hostname or "127.0.0.1", parsed.port or 11211)
+        logger.warning("APP_CACHE_URL no soportada: %s", url)
+    except Exception as e:
+        logger.warning("No se pudo abrir la caché compartida %s: %s", url, e)
+    return None
+
+
+local_cache = LocalCache()
+shared_store = _create_shared_store(APP_CACHE_URL)
+
+
+def _create_version_triggers(conn, tag, tables):
+    bump = f"UPDATE {VERSION_TABLE} SET version = version + 1 WHERE etiqueta = '{tag}';"
+    statements = []
+    for table in tables:
+        for suffix, event in (("ai", "INSERT"), ("au", "UPDATE"), ("ad", "DELETE")):
+            statements.append(f"DROP TRIGGER IF EXISTS cache_{table}_{suffix};")
+            statements.append(f"CREATE TRIGGER cache_{table}_{suffix} AFTER {event} ON {table} BEGIN {bump} END;")
+    conn.executescript("\n".join(statements))
+
+
+def install_cache_versions(conn):
+    """
+    Paso de migración: crea cache_versiones y los triggers que falten.
+    Devuelve False si la base de datos no es SQLite.
+    """
+    if not isinstance(conn, sqlite3.Connection):
+        return False
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (
+            etiqueta TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    triggers = schema_objects(conn, "trigger")
+    tables = schema_objects(conn, "table")
+    for tag, sources in CACHE_TAGS.items():
+        conn.execute(f"INSERT OR IGNORE INTO {VERSION_TABLE} (etiqueta, version) VALUES (?, 0)", (tag,))
+        missing = [t for t in sources if t in tables and f"cache_{t}_ai" not in triggers]
+        if missing:
+            _create_version_triggers(conn, tag, missing)
+    conn.commit()
+    return True
+
+
+def _tag_status(conn):
+    """(etiquetas cuyas tablas existentes tienen sus triggers, existen todas las tablas)."""
+    tables = schema_objects(conn, "table")
+    if VERSION_TABLE not in tables:
+        return set(), False
+    triggers = schema_objects(conn, "trigger")
+    ready = {
+        tag for tag, sources in CACHE_TAGS.items()
+        if all(f"cache_{t}_ai" in triggers for t in sources if t in tables)
+    }
+    return ready, {t for group in CACHE_TAGS.values() for t in group} <= tables
+
+
+def _tags_installed(conn):
+    ready, complete = _tag_status(conn)
+    return len(ready) == len(CACHE_TAGS), complete
+
+
+def cache_versions_ready(conn):
+    """True si todas las etiquetas tienen sus triggers instalados."""
+    return derived_ready(conn, "cache", _tags_installed)
+
+
+def _ready_tags(conn):
+    """Etiquetas cuyas versiones se pueden usar (las que tienen triggers)."""
+    if cache_versions_ready(conn):
+        return set(CACHE_TAGS)
+    return _tag_status(conn)[0]
+
+
+def cache_versions(conn):
+    """{etiqueta: versión} de las etiquetas con triggers instalados ({} si no es SQLite)."""
+    try:
+        if not isinstance(conn, sqlite3.Connection):
+            return {}
+        ready = _ready_tags(conn)
+        if not ready:
+            return {}
+        rows = conn.execute(f"SELECT etiqueta, version FROM {VERSION_TABLE}").fetchall()
+        return {tag: version for tag, version in rows if tag in ready}
+    except sqlite3.Error as e:
+        logger.warning("No se pudieron leer las versiones de caché: %s", e)
+        return {}
+
+
+def _request_state():
+    """Versiones y valores ya resueltos en la petición actual."""
+    if not has_app_context():
+        return None
+    state = g.get("_app_cache")
+    if state is None:
+        state = g._app_cache = {"versions": None, "values": {}}
+    return state
+
+
+def cached(name, tags, loader, ttl=None, version=None, max_bytes=None):
+    """
+    Valor `name` calculado por loader() (JSON serializable), reutilizado
+    mientras no cambien las tablas de `tags` y no pasen `ttl` segundos.
+
+    version: versión propia del valor; no forma parte de la clave, así que cada
+    `name` ocupa una sola entrada y la de una versión anterior se reemplaza.
+    max_bytes: los valores que ocupan más (en JSON) no se guardan.
+    """
+    # Familia del valor para las métricas ("usuario:7" -> "usuario")
+    family = name.split(":", 1)[0]
+    state = _request_state()
+    if state is not None and name in state["values"]:
+        record_cache(family, "request")
+        return state["values"][name]
+
+    conn = get_db_connection()
+    try:
+        if state is None:
+            versions = cache_versions(conn)
+        else:
+            if state["versions"] is None:
+                state["versions"] = cache_versions(conn)
+            versions = state["versions"]
+        key = "|".join([str(pool_key(conn)), name] + [f"{tag}={versions.get(tag, '')}" for tag in tags])
+        # Sin versión para alguna etiqueta (PostgreSQL/MySQL o migración pendiente): no se guarda
+        cacheable = isinstance(conn, sqlite3.Connection) and all(tag in versions for tag in tags)
+
+        entry = local_cache.get(key) if cacheable else _MISS
+        level = "local"
+        if _entry_value(entry, version) is _MISS and cacheable and shared_store is not None:
+            level = "shared"
+            try:
+                entry = shared_store.get(key)
+            except Exception as e:
+                logger.warning("Caché compartida no disponible: %s", e)
+                entry = _MISS
+            if _entry_value(entry, version) is not _MISS:
+                local_cache.set(key, entry, ttl or APP_CACHE_TTL)
+        value = _entry_value(entry, version)
+        if value is _MISS:
+            level = "miss"
+            value = loader(conn)
+            entry = value if version is None else [version, value]
+            if cacheable and (max_bytes is None or len(json.dumps(entry)) <= max_bytes):
+                local_cache.set(key, entry, ttl or APP_CACHE_TTL)
+                if shared_store is not None:
+                    try:
+                        shared_store.set(key, entry, ttl or APP_CACHE_TTL)
+                    except Exception as e:
+                        logger.warning("Caché compartida no disponible: %s", e)
+    finally:
+        conn.close()
+    record_cache(family, level)
+
+    if state is not None:
+        state["values"][name] = value
+    return value
+
+
+def _entry_value(entry, version):
+    """Valor guardado en `entry`, o _MISS si falta o es de otra versión."""
+    if version is None or entry is _MISS:
+        return entry
+    if isinstance(entry, list) and len(entry) == 2 and entry[0] == version:
+        return entry[1]
+    return _MISS
+
+
+def clear_local():
+    """Vacía la caché del proceso (pruebas y cambios de base de datos activa)."""
+    local_cache.clear()
@@ -0,0 +1,319 @@
+"""
+Logging estructurado fuera del camino de la petición.
+
+Cada petición escribía dos líneas (REQ/RESP) directamente en un
+RotatingFileHandler y en la consola: con un disco lento el worker esperaba a
+la escritura. Ahora los registros pasan por una cola:
+
+- en el hilo de la petición solo se completa el mensaje, se agrega el
+  contexto (id de petición, método, ruta, endpoint) y se encola sin esperar;
+  con la cola llena (LOG_QUEUE_SIZE) el registro se descarta y se cuenta en
+  workmanager_log_records_dropped_total en vez de bloquear;
+- un hilo (BatchQueueListener) toma de la cola todos los registros
+  disponibles, hasta LOG_BATCH_SIZE, y los escribe con una sola escritura y
+  un solo flush por destino.
+
+logs/app.log tiene un objeto JSON por línea (ts, level, logger, message, el
+contexto de la petición y los campos pasados en extra=). Al terminar cada
+petición se registra una línea de acceso (logger workmanager.requests) con
+estado, duration_ms, db_ms y db_statements (modules/query_stats). El id de
+petición se toma de la cabecera X-Request-ID (proxy) o se genera, y se
+devuelve en la respuesta.
+
+Muestreo: los registros INFO y DEBUG se conservan con probabilidad
+LOG_SAMPLE_RATE (1 = todos). La decisión depende del id de petición, así que
+una petición queda completa o no aparece. WARNING o superior, respuestas con
+error y peticiones de LOG_SLOW_REQUEST_MS o más se escriben siempre.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import re
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask import g, has_request_context, request
+from flask.logging import default_handler
+
+from modules.metrics import log_dropped
+from modules.query_stats import current_recorder
+
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1"))
+LOG_SLOW_REQUEST_MS = float(os.getenv("LOG_SLOW_REQUEST_MS", "1000"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "500"))
+LOG_CONSOLE = os.getenv("LOG_CONSOLE", "1") != "0"
+LOG_MAX_BYTES = 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+REQUEST_ID_HEADER = "X-Request-ID"
+CONSOLE_FORMAT = "[%(asctime)s] %(levelname)s in %(module)s: %(message)s"
+
+access_logger = logging.getLogger("workmanager.requests")
+
+_REQUEST_ID_KEY = "_request_id"
+_START_KEY = "_log_start"
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,64}")
+
+# Atributos propios de LogRecord; el resto son campos pasados en extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "keep"}
+
+_listeners = []
+
+
+def request_id():
+    """Id de la petición en curso (el de X-Request-ID o uno nuevo); None fuera de una petición."""
+    if not has_request_context():
+        return None
+    value = g.get(_REQUEST_ID_KEY)
+    if value is None:
+        incoming = request.headers.get(REQUEST_ID_HEADER, "")
+        value = incoming if _VALID_REQUEST_ID.fullmatch(incoming) else uuid.uuid4().hex
+        setattr(g, _REQUEST_ID_KEY, value)
+    return value
+
+
+class RequestContextFilter(logging.Filter):
+    """Agrega al registro el id, método, ruta y endpoint de la petición en curso."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = request_id()
+            record.method = request.method
+            record.path = request.path
+            record.endpoint = request.endpoint
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Conserva una fracción (LOG_SAMPLE_RATE) de los registros por debajo de WARNING."""
+
+    def __init__(self, rate=None):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        rate = LOG_SAMPLE_RATE if self.rate is None else self.rate
+        if rate >= 1 or record.levelno >= logging.WARNING or getattr(record, "keep", False):
+            return True
+        key = getattr(record, "request_id", None) or uuid.uuid4().hex
+        return zlib.crc32(key.encode()) % 10000 < rate * 10000
+
+
+class JsonFormatter(logging.Formatter):
+    """Un objeto JSON por registro, con los campos de extra= y la traza si la hay."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class LogQueueHandler(QueueHandler):
+    """Encola sin esperar; el formato (JSON o texto) se aplica en el hilo de escritura."""
+
+    def prepare(self, record):
+        # Copia con el mensaje ya resuelto y la traza como texto: los args y
+        # exc_info pueden no ser serializables ni seguir válidos en otro hilo
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_dropped.inc(logger=record.name)
+
+
+class _BatchWriter:
+    """Escritura de varios registros con una sola llamada a write y a flush."""
+
+    def emit(self, record):
+        self.emit_batch([record])
+
+    def emit_batch(self, records):
+        lines = []
+        for record in records:
+            if record.levelno < self.level or not self.filter(record):
+                continue
+            try:
+                lines.append(self.format(record) + self.terminator)
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+        with self.lock:
+            try:
+                self._write("".join(lines))
+            except Exception:
+                self.handleError(records[-1])
+
+
+class BatchedStreamHandler(_BatchWriter, logging.StreamHandler):
+    def _write(self, data):
+        self.stream.write(data)
+        self.stream.flush()
+
+
+class BatchedFileHandler(_BatchWriter, RotatingFileHandler):
+    """RotatingFileHandler que decide la rotación una vez por lote."""
+
+    def _write(self, data):
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes > 0 and 0 < self.stream.tell() and self.stream.tell() + len(data) >= self.maxBytes:
+            self.doRollover()
+        self.stream.write(data)
+        self.stream.flush()
+
+
+class BatchQueueListener(QueueListener):
+    """Vacía la cola por lotes: todo lo acumulado mientras se escribía el lote anterior."""
+
+    def __init__(self, log_queue, *handlers, batch_size=None):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size or LOG_BATCH_SIZE
+
+    def stop(self):
+        # Puede llamarse de nuevo al salir del proceso
+        if self._thread is not None:
+            super().stop()
+
+    def handle_batch(self, records):
+        for handler in self.handlers:
+            if hasattr(handler, "emit_batch"):
+                handler.emit_batch(records)
+                continue
+            for record in records:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+    def _monitor(self):
+        log_queue = self.queue
+        has_task_done = hasattr(log_queue, "task_done")
+        while True:
+            batch = [self.dequeue(True)]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.dequeue(False))
+                except queue.Empty:
+                    break
+            records = [r for r in batch if r is not self._sentinel]
+            if records:
+                self.handle_batch(records)
+            if has_task_done:
+                for _ in batch:
+                    log_queue.task_done()
+            if len(records) < len(batch):
+                break
+
+
+def queued(*handlers, size=None, batch_size=None):
+    """
+    QueueHandler que entrega los registros a `handlers` desde un hilo propio.
+    El hilo queda en handler.listener y se detiene (vaciando la cola) con stop()
+    o al salir del proceso.
+    """
+    log_queue = queue.Queue(LOG_QUEUE_SIZE if size is None else size)
+    listener = BatchQueueListener(log_queue, *handlers, batch_size=batch_size)
+    listener.start()
+    if not _listeners:
+        atexit.register(stop)
+    _listeners.append(listener)
+
+    handler = LogQueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter())
+    handler.listener = listener
+    return handler
+
+
+def stop():
+    """Escribe lo pendiente y detiene los hilos de escritura."""
+    while _listeners:
+        _listeners.pop().stop()
+
+
+# --- Integración con Flask ---
+
+def _start_request():
+    g.setdefault(_START_KEY, time.perf_counter())
+    request_id()
+
+
+def _finish_request(response):
+    start = g.get(_START_KEY)
+    if start is None:
+        return response
+    response.headers.setdefault(REQUEST_ID_HEADER, request_id())
+    duration_ms = round((time.perf_counter() - start) * 1000, 2)
+    recorder = current_recorder()
+    status = response.status_code
+    access_logger.log(
+        logging.WARNING if status >= 500 else logging.INFO,
+        "%s %s %s %.1f ms", request.method, request.path, status, duration_ms,
+        extra={
+            "status": status,
+            "duration_ms": duration_ms,
+            "db_ms": round(recorder.total * 1000, 2) if recorder is not None else None,
+            "db_statements": recorder.count if recorder is not None else None,
+            "keep": status >= 400 or duration_ms >= LOG_SLOW_REQUEST_MS,
+        },
+    )
+    return response
+
+
+def init_app(app, log_dir):
+    """
+    Envía app.logger, el log de acceso y los loggers de modules/ a
+    <log_dir>/app.log (JSON) y a la consola a través de la cola, y registra el
+    id de petición y la línea de acceso. Devuelve el QueueHandler.
+    """
+    file_handler = BatchedFileHandler(
+        os.path.join(log_dir, "app.log"), maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+    file_handler.setFormatter(JsonFormatter())
+    targets = [file_handler]
+    if LOG_CONSOLE:
+        console = BatchedStreamHandler()
+        console.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        targets.append(console)
+
+    handler = queued(*targets)
+    handler.addFilter(SamplingFilter())
+    # La consola también se escribe desde la cola
+    app.logger.removeHandler(default_handler)
+    for logger in (app.logger, access_logger, logging.getLogger("modules")):
+        logger.addHandler(handler)
+        if logger.level == logging.NOTSET or logger.level > logging.INFO:
+            logger.setLevel(logging.INFO)
+    access_logger.propagate = False
+
+    # Antes que los demás before_request para que la duración los incluya
+    app.before_request_funcs.setdefault(None, []).insert(0, _start_request)
+    app.after_request(_finish_request)
+    return handler
@@ -1,7 +1,6 @@
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
-import sqlite3
-import os
 from datetime import datetime
+from modules.db_utils import get_db_connection
 
 asignaciones_bp = Blueprint(
     "asignaciones",
@@ -10,15 +9,6 @@ asignaciones_bp = Blueprint(
     template_folder="../templates"
 )
 
-DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "workmanager_erp.db")
-
-
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
 @asignaciones_bp.route("/")
 def lista_asignaciones():
     """
@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, abort, request, redirect, url_for, flash
 from modules.db_utils import get_db_connection
+from modules.notification_events import publish_notification
 
 asset_profile_bp = Blueprint(
     "asset_profile", __name__, template_folder="../templates"
@@ -77,13 +78,15 @@ def edit_individual(item_id):
         # --- Lógica de Notificación ---
         estado_anterior = equipo['estado']
         estado_nuevo = updated_fields.get('estado')
+        notificacion = None
         if estado_anterior != estado_nuevo:
             try:
                 # Asumimos que el admin (user_id=1) recibe las notificaciones
                 admin_user_id = 1 
                 mensaje = f"El estado del equipo #{item_id} ({updated_fields.get('marca')} {updated_fields.get('modelo')}) cambió de '{estado_anterior}' a '{estado_nuevo}'."
                 url_notificacion = url_for('asset_profile.profile_individual', item_id=item_id, _external=True)
-                conn.execute("INSERT INTO notificaciones (user_id, message, url) VALUES (?, ?, ?)", (admin_user_id, mensaje, url_notificacion))
+                cursor = conn.execute("INSERT INTO notificaciones (user_id, message, url) VALUES (?, ?, ?)", (admin_user_id, mensaje, url_notificacion))
+                notificacion = (cursor.lastrowid, admin_user_id, mensaje, url_notificacion)
             except Exception as e:
                 # Si la notificación falla, no detenemos la actualización del equipo
                 print(f"ADVERTENCIA: No se pudo crear la notificación. Error: {e}")
@@ -91,6 +94,9 @@ def edit_individual(item_id):
         try:
             conn.execute(query, tuple(values))
             conn.commit()
+            if notificacion:
+                # Se publica solo después del commit: la notificación ya existe para todos
+                publish_notification(*notificacion)
             flash("Equipo actualizado correctamente.", "success")
             return redirect(url_for("asset_profile.profile_individual", item_id=item_id))
         except Exception as e:
@@ -1,7 +1,9 @@
-from flask import Blueprint, request, jsonify, render_template
+from flask import Blueprint, request, jsonify, render_template, url_for
 import os
 import json
+import time
 from scripts.auto_import_inventory import AutoInventoryImporter
+from modules.jobs import get_job, job_handler, list_jobs, submit_job
 import logging
 
 auto_import_bp = Blueprint('auto_import', __name__)
@@ -25,41 +27,95 @@ def api_auto_import():
         if not file.filename.endswith('.json'):
             return jsonify({'success': False, 'error': 'File must be JSON'}), 400
 
-        # Save uploaded file temporarily
-        temp_path = os.path.join('uploads', 'temp_import.json')
+        # Save uploaded file temporarily (one file per job)
         os.makedirs('uploads', exist_ok=True)
+        temp_path = os.path.join('uploads', f"auto_import_{int(time.time() * 1000)}.json")
         file.save(temp_path)
 
-        # Initialize importer
-        importer = AutoInventoryImporter()
-
-        # Import data
-        stats = importer.import_from_json(temp_path)
-
-        # Clean up temp file
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-
-        if stats:
-            logging.info(f"Auto import completed successfully: {stats}")
-            return jsonify({
-                'success': True,
-                'stats': stats,
-                'message': 'Importación completada exitosamente'
-            })
-        else:
-            return jsonify({'success': False, 'error': 'Import failed'}), 500
+        # Import runs in the background; poll /api/auto_import/status?job=<id>
+        job_id = submit_job('auto_import', {'path': temp_path})
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status_url': url_for('auto_import.get_import_status', job=job_id),
+            'message': 'Importación en cola'
+        }), 202
 
     except Exception as e:
         logging.error(f"Auto import error: {e}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
+
+# Sections of the JSON file, in the order AutoInventoryImporter.import_from_json uses
+AUTO_IMPORT_SECTIONS = [
+    'equipos_agrupados',
+    'equipos_individuales',
+    'inventario_general',
+    'equipos_asignados',
+    'equipos_baja',
+    'tandas_nuevas',
+]
+
+
+# Progress is counted in sections, not rows
+@job_handler('auto_import', rows=False)
+def run_auto_import_job(job):
+    """Import the JSON file section by section; a resumed job skips finished sections."""
+    path = job.params['path']
+    # Leaving the handler always ends the job (done, failed or cancelled), so the
+    # upload is removed here; a crashed process keeps it for the resumed job
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        sections = [name for name in AUTO_IMPORT_SECTIONS if name in data]
+        done = (job.checkpoint or {}).get('section', 0)
+        importer = AutoInventoryImporter()
+        importer.stats.update(job.stats)
+        job.progress(processed=done, total=len(sections))
+
+        for position, name in enumerate(sections):
+            if position < done:
+                continue
+            getattr(importer, f'import_{name}')(data[name])
+            job.progress(processed=position + 1, checkpoint={'section': position + 1}, **importer.stats)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+    logging.info(f"Auto import completed successfully: {importer.stats}")
+    return importer.stats
+
+
 @auto_import_bp.route('/api/auto_import/status', methods=['GET'])
 def get_import_status():
-    """Get the status of current imports"""
-    # This could be expanded to show real-time progress
+    """Get the status of a given import job (?job=<id>) or of the latest one"""
+    job_id = request.args.get('job', type=int)
+    if job_id:
+        job = get_job(job_id)
+    else:
+        recent = list_jobs(kind='auto_import', limit=1)
+        job = recent[0] if recent else None
+
+    if job is None:
+        return jsonify({
+            'status': 'idle',
+            'last_import': None,
+            'message': 'No hay importaciones activas'
+        })
+
+    messages = {
+        'queued': 'Importación en cola',
+        'running': 'Importación en curso',
+        'done': 'Importación completada exitosamente',
+        'failed': 'Error en la importación',
+        'cancelled': 'Importación cancelada',
+    }
     return jsonify({
-        'status': 'idle',
-        'last_import': None,
-        'message': 'No hay importaciones activas'
+        'status': job['status'],
+        'job_id': job['id'],
+        'progress': job['percent'],
+        'stats': job['result'] if job['status'] == 'done' else job['stats'],
+        'error': job['error'],
+        'last_import': job['finished_at'],
+        'message': messages.get(job['status'], job['status'])
     })
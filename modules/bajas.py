@@ -1,6 +1,5 @@
 from flask import Blueprint, render_template
-import sqlite3
-import os
+from modules.db_utils import get_db_connection
 
 bajas_bp = Blueprint(
     "bajas",
@@ -9,15 +8,6 @@ bajas_bp = Blueprint(
     template_folder="../templates"
 )
 
-DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "workmanager_erp.db")
-
-
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
 @bajas_bp.route("/")
 def lista_bajas():
     """
@@ -1,19 +1,11 @@
 from flask import Blueprint, render_template, request, Response, flash, redirect, url_for
 from flask_login import login_required
 import sqlite3
-import io
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-import barcode
-from barcode.writer import ImageWriter
+from modules.db_utils import get_db_connection
+from modules.label_sheets import render_label_sheet
 
 barcodes_bp = Blueprint('barcodes', __name__, url_prefix='/barcodes', template_folder='../templates')
 
-def get_db_connection():
-    conn = sqlite3.connect('workmanager_erp.db')
-    conn.row_factory = sqlite3.Row
-    return conn
 
 # --- CONFIGURACIÓN CENTRAL DE ACTIVOS PARA CÓDIGOS DE BARRAS ---
 ASSET_CONFIG = {
@@ -107,58 +99,16 @@ def generate_pdf():
     finally:
         conn.close()
 
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-
-    label_width = 2.625 * inch
-    label_height = 1 * inch
-    left_margin = 0.18 * inch
-    top_margin = 0.5 * inch
-    x_gap = 0.14 * inch
-    y_gap = 0
-    cols = 3
-    rows = 10
-    x_pos = left_margin
-    y_pos = height - top_margin - label_height
-    
-    c.setFont("Helvetica", 7)
-
-    for i, item in enumerate(items):
-        if i > 0 and i % (cols * rows) == 0:
-            c.showPage() # Nueva página
-            c.setFont("Helvetica", 7)
-            x_pos = left_margin
-            y_pos = height - top_margin - label_height
-
-        # --- Dibuja la etiqueta ---
-        barcode_value = str(item[config['barcode_field']]) if item[config['barcode_field']] else ''
-        if not barcode_value: continue
-
-        code128 = barcode.get_barcode_class('code128')
-        code = code128(barcode_value, writer=ImageWriter())
-        barcode_image = io.BytesIO()
-        code.write(barcode_image)
-        barcode_image.seek(0)
-
-        c.drawImage(barcode_image, x_pos + 0.1 * inch, y_pos + 0.4 * inch, width=2.4 * inch, height=0.4 * inch, preserveAspectRatio=True)
-        
-        line1 = ' '.join(str(item.get(field, '')) for field in config['display_fields'][:2])
-        line2 = ' '.join(str(item.get(field, '')) for field in config['display_fields'][2:])
-        c.drawString(x_pos + 0.1 * inch, y_pos + 0.25 * inch, line1[:45]) # Limitar longitud
-        c.drawString(x_pos + 0.1 * inch, y_pos + 0.15 * inch, line2[:45])
-        c.drawCentredString(x_pos + label_width / 2, y_pos + 0.05 * inch, barcode_value)
-
-        col_num = i % cols
-        if col_num == cols - 1: # Última columna
-            x_pos = left_margin
-            y_pos -= (label_height + y_gap)
-        else:
-            x_pos += (label_width + x_gap)
-
-    c.save()
-    buffer.seek(0)
-
-    return Response(buffer, mimetype='application/pdf', headers={
+    labels = []
+    for row in items:
+        item = dict(row)
+        fields = config['display_fields']
+        labels.append((
+            item.get(config['barcode_field']),
+            ' '.join(str(item.get(field) or '') for field in fields[:2]),
+            ' '.join(str(item.get(field) or '') for field in fields[2:]),
+        ))
+
+    return Response(render_label_sheet(labels), mimetype='application/pdf', headers={
         'Content-Disposition': 'inline; filename=codigos_de_barras.pdf'
-    })
\ No newline at end of file
+    })
@@ -0,0 +1,83 @@
+"""
+Consecutivos de códigos de barras.
+
+code_sequences guarda el último número usado por (código de sede, código de
+tecnología). reserve_codes() lo incrementa y devuelve el nuevo valor en una
+sola sentencia (UPSERT ... RETURNING), dentro de la transacción de quien
+inserta: dos altas simultáneas nunca reciben el mismo número (SQLite
+serializa las escrituras y el segundo espera al commit del primero) y reservar
+N códigos para una importación cuesta lo mismo que reservar uno.
+
+Cada reserva parte del mayor entre last_value y el mayor consecutivo numérico
+que ya exista en la tabla de equipos para ese prefijo (comparando números, no
+texto: MED-MON-1000 es mayor que MED-MON-999). Así los códigos que llegan por
+importación o se escriben a mano no se vuelven a entregar. La búsqueda es un
+recorrido del índice único de la columna limitado al prefijo.
+"""
+
+SEQUENCE_TABLE = "code_sequences"
+
+_CREATE_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {SEQUENCE_TABLE} (
+        sede_code TEXT NOT NULL,
+        tech_code TEXT NOT NULL,
+        last_value INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (sede_code, tech_code)
+    )
+"""
+
+
+def ensure_code_sequences(conn):
+    conn.execute(_CREATE_SQL)
+
+
+def _existing_max(conn, table, column, prefix):
+    """Mayor consecutivo numérico ya usado con `prefix` en table.column."""
+    # El rango (>= prefijo, < prefijo + U+10FFFF) permite usar el índice
+    row = conn.execute(
+        f"""
+        SELECT MAX(CAST(SUBSTR({column}, ?) AS INTEGER))
+          FROM {table}
+         WHERE {column} >= ? AND {column} < ?
+           AND {column} LIKE ? ESCAPE '\\' AND SUBSTR({column}, ?) GLOB '[0-9]*'
+        """,
+        (
+            len(prefix) + 1, prefix, prefix + "\U0010ffff",
+            prefix.replace("%", r"\%").replace("_", r"\_") + "%", len(prefix) + 1,
+        ),
+    ).fetchone()
+    return (row[0] or 0) if row else 0
+
+
+def reserve_numbers(conn, sede_code, tech_code, count=1, used=None):
+    """
+    Reserva `count` consecutivos y devuelve el rango. used() da el mayor número
+    ya usado fuera de la secuencia; la reserva continúa desde el mayor entre
+    ese valor y last_value. No hace commit.
+    """
+    if count < 1:
+        return range(0)
+    ensure_code_sequences(conn)
+    floor = used() if used else 0
+    last = conn.execute(
+        f"INSERT INTO {SEQUENCE_TABLE} (sede_code, tech_code, last_value) VALUES (?, ?, ? + ?) "
+        f"ON CONFLICT (sede_code, tech_code) DO UPDATE SET last_value = MAX(last_value, ?) + ? "
+        f"RETURNING last_value",
+        (sede_code, tech_code, floor, count, floor, count),
+    ).fetchone()[0]
+    return range(last - count + 1, last + 1)
+
+
+def reserve_codes(conn, sede_code, tech_code, count=1, table="equipos_individuales",
+                  column="codigo_barras_individual", prefix=None, width=3):
+    """
+    Reserva `count` códigos "<prefijo><consecutivo>" (prefijo por defecto
+    SEDE-TEC-) y los devuelve en orden. table/column indican dónde buscar
+    los consecutivos ya usados. No hace commit.
+    """
+    if prefix is None:
+        prefix = f"{sede_code}-{tech_code}-"
+    numbers = reserve_numbers(
+        conn, sede_code, tech_code, count, used=lambda: _existing_max(conn, table, column, prefix)
+    )
+    return [f"{prefix}{str(n).zfill(width)}" for n in numbers]
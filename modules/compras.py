@@ -1,6 +1,5 @@
 from flask import Blueprint, render_template, request
-import sqlite3
-import os
+from modules.db_utils import get_db_connection
 
 compras_bp = Blueprint(
     "compras",
@@ -9,15 +8,6 @@ compras_bp = Blueprint(
     template_folder="../templates"
 )
 
-DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "workmanager_erp.db")
-
-
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
 @compras_bp.route("/")
 def lista_compras():
     """
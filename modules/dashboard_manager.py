@@ -1,13 +1,11 @@
 from flask import Blueprint, jsonify
 from flask_login import login_required
 import sqlite3
+from modules.db_utils import get_db_connection
+from modules.inventory_summary import summary_rows, summary_totals
 
 dashboard_manager_bp = Blueprint('dashboard_manager', __name__, url_prefix='/dashboard')
 
-def get_db_connection():
-    conn = sqlite3.connect('workmanager_erp.db')
-    conn.row_factory = sqlite3.Row
-    return conn
 
 # --- Definición de Widgets Disponibles ---
 # Cada función obtiene los datos para un widget específico.
@@ -21,8 +19,8 @@ def get_kpi_empleados():
 
 def get_kpi_inventario():
     conn = get_db_connection()
-    asignados = conn.execute("SELECT COUNT(id) FROM equipos_individuales WHERE estado = 'asignado'").fetchone()[0]
-    total = conn.execute("SELECT COUNT(id) FROM equipos_individuales").fetchone()[0]
+    asignados = summary_totals(conn, "estado", "asignado")["total"]
+    total = summary_totals(conn)["total"]
     conn.close()
     return {'title': 'Equipos Asignados', 'value': asignados, 'total': total, 'icon': 'fa-laptop'}
 
@@ -49,18 +47,16 @@ def get_kpi_inventario_por_estado():
     """Nuevo widget que cuenta equipos por cada estado."""
     conn = get_db_connection()
     try:
-        # Agrupa por estado y cuenta cuántos hay en cada grupo
-        estados = conn.execute("""
-            SELECT estado, COUNT(id) as cantidad
-            FROM equipos_individuales
-            GROUP BY estado
-            ORDER BY cantidad DESC
-        """).fetchall()
+        # Conteo por estado desde el resumen materializado
+        estados = [
+            {'estado': row['clave'] or None, 'cantidad': row['total']}
+            for row in summary_rows(conn, 'estado')
+        ]
     except sqlite3.OperationalError:
         estados = []
     conn.close()
     # Devuelve un tipo 'list' para que el frontend sepa cómo renderizarlo
-    return {'title': 'Equipos por Estado', 'type': 'list', 'icon': 'fa-clipboard-check', 'data': [dict(e) for e in estados]}
+    return {'title': 'Equipos por Estado', 'type': 'list', 'icon': 'fa-clipboard-check', 'data': estados}
 
 WIDGETS = {
     'empleados': get_kpi_empleados,
@@ -0,0 +1,278 @@
+"""
+Paquete versionado de índices y asesor de índices (EXPLAIN QUERY PLAN).
+
+Cada índice del paquete indica la versión en la que se introdujo o cambió su
+definición. apply_index_pack() crea los índices pendientes y lo registra en la
+tabla schema_index_pack, de modo que volver a ejecutarlo no hace nada y una
+definición con versión mayor se vuelve a crear.
+
+Uso:
+    python migrate.py indexes   # aplica el paquete a la base de datos activa
+    python migrate.py advise    # informe de consultas que recorren tablas completas
+"""
+
+import re
+import sqlite3
+from datetime import datetime
+
+INDEX_PACK_VERSION = 2
+
+# (nombre, tabla, columnas o expresiones, versión)
+# Las expresiones LOWER/UPPER replican literalmente las comparaciones del código,
+# SQLite solo usa un índice de expresión cuando la expresión coincide tal cual.
+INDEX_PACK = [
+    # equipos_individuales: búsquedas del importador, filtros por sede/estado/tecnología
+    ("idx_ei_codigo_barras", "equipos_individuales", ["codigo_barras_individual"], 1),
+    ("idx_ei_serial", "equipos_individuales", ["serial"], 1),
+    ("idx_ei_sede_estado", "equipos_individuales", ["sede_id", "estado"], 1),
+    ("idx_ei_lower_estado", "equipos_individuales", ["LOWER(estado)"], 1),
+    ("idx_ei_asignado_nuevo", "equipos_individuales", ["asignado_nuevo"], 1),
+    ("idx_ei_lower_asignado_nuevo", "equipos_individuales", ["LOWER(asignado_nuevo)"], 1),
+    ("idx_ei_tecnologia", "equipos_individuales", ["tecnologia"], 1),
+    ("idx_ei_upper_tecnologia", "equipos_individuales", ["UPPER(tecnologia)"], 1),
+    # empleado_id resuelto (modules/employee_links): JOIN por igualdad con empleados
+    ("idx_ei_empleado", "equipos_individuales", ["empleado_id"], 2),
+    # equipos_agrupados
+    ("idx_ea_sede", "equipos_agrupados", ["sede_id"], 1),
+    ("idx_ea_empleado", "equipos_agrupados", ["empleado_id"], 2),
+    # empleados: login por cédula, cruces con licencias por correo
+    ("idx_emp_cedula", "empleados", ["cedula"], 1),
+    ("idx_emp_correo_office", "empleados", ["correo_office"], 1),
+    ("idx_emp_lower_correo_office", "empleados", ["LOWER(correo_office)"], 1),
+    ("idx_emp_sede", "empleados", ["sede_id"], 1),
+    # licencias_office365
+    ("idx_lic_email", "licencias_office365", ["email"], 1),
+    ("idx_lic_lower_email", "licencias_office365", ["LOWER(email)"], 1),
+    ("idx_lic_sede", "licencias_office365", ["sede_id"], 1),
+    ("idx_lic_cedula_usuario", "licencias_office365", ["cedula_usuario"], 1),
+    ("idx_lic_empleado", "licencias_office365", ["empleado_id"], 2),
+    # notificaciones no leídas por usuario
+    ("idx_notif_user_read", "notificaciones", ["user_id", "is_read"], 1),
+]
+
+# Catálogo de consultas reales de la aplicación que revisa el asesor.
+# (nombre, origen, sql)
+QUERY_CATALOG = [
+    ("importador_lookup", "export_import.import_inventario_row",
+     "SELECT id FROM equipos_individuales WHERE codigo_barras_individual=? OR serial=?"),
+    ("dashboard_asignados", "inventarios.api_inventarios_dashboard",
+     "SELECT COUNT(*) FROM equipos_individuales WHERE LOWER(estado) = 'asignado'"),
+    ("busqueda_tecnologia_estado", "inventarios.api_search_inventory",
+     "SELECT id FROM equipos_individuales WHERE UPPER(tecnologia) = ? AND LOWER(estado) = ?"),
+    ("equipos_por_sede", "sedes.sede_detail",
+     "SELECT * FROM equipos_individuales WHERE sede_id = ?"),
+    ("equipos_por_empleado", "gestion_humana.hoja_vida_empleado",
+     "SELECT * FROM equipos_individuales WHERE empleado_id = ?"),
+    ("empleado_por_cedula", "app.login",
+     "SELECT * FROM empleados WHERE cedula = ?"),
+    ("empleado_por_correo", "licencias.sincronizar",
+     "SELECT id FROM empleados WHERE LOWER(correo_office) = ?"),
+    ("licencia_por_email", "licencias.api_guardar_licencia",
+     "SELECT id FROM licencias_office365 WHERE LOWER(email)=LOWER(?)"),
+    ("licencias_empleados", "licencias.dashboard_licencias",
+     "SELECT l.id, e.id FROM licencias_office365 l "
+     "LEFT JOIN empleados e ON e.id = l.empleado_id"),
+    ("licencias_por_sede", "sedes.sede_detail",
+     "SELECT * FROM licencias_office365 WHERE sede_id = ?"),
+    ("notificaciones_no_leidas", "notifications.get_unread_notifications",
+     "SELECT id, message, url, created_at FROM notificaciones "
+     "WHERE user_id = ? AND is_read = 0 ORDER BY created_at DESC LIMIT 10"),
+]
+
+_TRACKING_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_index_pack (
+        name VARCHAR(128) PRIMARY KEY,
+        version INTEGER NOT NULL,
+        applied_at TEXT
+    )
+"""
+
+_COLUMN_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def _placeholder(db_type):
+    return "?" if db_type == "sqlite" else "%s"
+
+
+def _table_columns(cur, db_type, table):
+    """{columna: tipo declarado} de la tabla (vacío si no existe)."""
+    if db_type == "sqlite":
+        cur.execute(f"PRAGMA table_info({table})")
+        return {row[1]: (row[2] or "").lower() for row in cur.fetchall()}
+    if db_type == "mysql":
+        # column_type conserva la longitud: varchar(255), int(11), text...
+        cur.execute(
+            "SELECT column_name, column_type FROM information_schema.columns "
+            "WHERE table_schema = DATABASE() AND table_name = %s",
+            (table,),
+        )
+    else:
+        cur.execute(
+            "SELECT column_name, data_type FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = %s",
+            (table,),
+        )
+    return {row[0]: str(row[1]).lower() for row in cur.fetchall()}
+
+
+def _mysql_index_exists(cur, table, name):
+    cur.execute(
+        "SELECT 1 FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s LIMIT 1",
+        (table, name),
+    )
+    return cur.fetchone() is not None
+
+
+def _referenced_columns(expression):
+    """Columnas usadas por una columna simple o una expresión LOWER(col)."""
+    inner = expression[expression.find("(") + 1:expression.rfind(")")] if "(" in expression else expression
+    return [inner.strip()]
+
+
+# MySQL (utf8mb4) indexa como mucho 767 bytes por columna: 191 caracteres
+_MYSQL_PREFIX = 191
+_MYSQL_LENGTH_RE = re.compile(r"^(?:var)?char\((\d+)\)")
+
+
+def _mysql_key_part(column, column_type):
+    """Columna del índice con longitud de prefijo si su tipo la requiere."""
+    column_type = column_type or ""
+    if column_type.endswith("text") or column_type.endswith("blob"):
+        return f"{column}({_MYSQL_PREFIX})"
+    length = _MYSQL_LENGTH_RE.match(column_type)
+    if length and int(length.group(1)) > _MYSQL_PREFIX:
+        return f"{column}({_MYSQL_PREFIX})"
+    return column
+
+
+def index_sql(name, table, columns, db_type, column_types=None):
+    """
+    Sentencia CREATE INDEX para el dialecto indicado, o None si el dialecto no
+    admite el índice (MySQL no indexa expresiones sobre columnas TEXT).
+    column_types: {columna: tipo} de la tabla; en MySQL solo las columnas TEXT
+    o VARCHAR largas llevan longitud de prefijo. MySQL no admite IF NOT EXISTS:
+    apply_index_pack revisa information_schema.statistics antes de crearlo.
+    """
+    expressions = [c for c in columns if not _COLUMN_RE.match(c)]
+    if db_type == "mysql":
+        if expressions:
+            return None
+        column_types = column_types or {}
+        cols = ", ".join(_mysql_key_part(c, column_types.get(c)) for c in columns)
+        return f"CREATE INDEX {name} ON {table} ({cols})"
+    return f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+
+
+def _drop_index_sql(name, table, db_type):
+    if db_type == "mysql":
+        return f"DROP INDEX {name} ON {table}"
+    return f"DROP INDEX IF EXISTS {name}"
+
+
+def apply_index_pack(conn, db_type="sqlite"):
+    """
+    Crea los índices del paquete que falten o cuya versión haya cambiado.
+    Omite índices de tablas/columnas que aún no existen en esta base de datos.
+    Devuelve un resumen {created, skipped, unchanged}.
+    """
+    cur = conn.cursor()
+    cur.execute(_TRACKING_TABLE)
+    cur.execute("SELECT name, version FROM schema_index_pack")
+    applied = {row[0]: row[1] for row in cur.fetchall()}
+    ph = _placeholder(db_type)
+    summary = {"created": [], "skipped": [], "unchanged": []}
+    columns_cache = {}
+
+    for name, table, columns, version in INDEX_PACK:
+        if applied.get(name, 0) >= version:
+            summary["unchanged"].append(name)
+            continue
+        if table not in columns_cache:
+            columns_cache[table] = _table_columns(cur, db_type, table)
+        existing = columns_cache[table]
+        missing = [c for col in columns for c in _referenced_columns(col) if c not in existing]
+        if not existing:
+            summary["skipped"].append((name, f"no existe la tabla {table}"))
+            continue
+        if missing:
+            summary["skipped"].append((name, f"faltan columnas en {table}: {', '.join(missing)}"))
+            continue
+        sql = index_sql(name, table, columns, db_type, existing)
+        if sql is None:
+            summary["skipped"].append((name, f"{db_type} no admite índices de expresión sobre TEXT"))
+            continue
+        # MySQL no tiene IF [NOT] EXISTS en índices
+        exists = db_type == "mysql" and _mysql_index_exists(cur, table, name)
+        if name in applied and (db_type != "mysql" or exists):
+            cur.execute(_drop_index_sql(name, table, db_type))
+            exists = False
+        if not exists:
+            cur.execute(sql)
+        now = datetime.now().isoformat(timespec="seconds")
+        if name in applied:
+            cur.execute(
+                f"UPDATE schema_index_pack SET version = {ph}, applied_at = {ph} WHERE name = {ph}",
+                (version, now, name),
+            )
+        else:
+            cur.execute(
+                f"INSERT INTO schema_index_pack (name, version, applied_at) VALUES ({ph}, {ph}, {ph})",
+                (name, version, now),
+            )
+        summary["created"].append(name)
+
+    conn.commit()
+    if db_type == "sqlite" and summary["created"]:
+        # Estadísticas para que el planificador elija bien entre índices
+        cur.execute("ANALYZE")
+        conn.commit()
+    cur.close()
+    return summary
+
+
+def _full_scans(plan_details):
+    """Tablas recorridas completas según EXPLAIN QUERY PLAN de SQLite."""
+    scans = []
+    for detail in plan_details:
+        if detail.startswith("SCAN ") and " USING " not in detail:
+            scans.append(detail[5:].split(" ")[0])
+    return scans
+
+
+def advise_indexes(conn, catalog=None):
+    """
+    Ejecuta EXPLAIN QUERY PLAN sobre el catálogo de consultas (solo SQLite) y
+    devuelve una lista de hallazgos con el plan y las tablas recorridas completas.
+    """
+    report = []
+    cur = conn.cursor()
+    for name, origin, sql in catalog or QUERY_CATALOG:
+        params = (None,) * sql.count("?")
+        entry = {"name": name, "origin": origin, "sql": sql, "plan": [], "full_scans": [], "error": None}
+        try:
+            cur.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            entry["plan"] = [row[3] for row in cur.fetchall()]
+            entry["full_scans"] = _full_scans(entry["plan"])
+        except sqlite3.Error as e:
+            entry["error"] = str(e)
+        report.append(entry)
+    cur.close()
+    return report
+
+
+def print_advice(report):
+    flagged = 0
+    for entry in report:
+        if entry["error"]:
+            status = f"OMITIDA ({entry['error']})"
+        elif entry["full_scans"]:
+            status = "SCAN COMPLETO: " + ", ".join(entry["full_scans"])
+            flagged += 1
+        else:
+            status = "OK"
+        print(f"[{status}] {entry['name']} ({entry['origin']})")
+        for detail in entry["plan"]:
+            print(f"      {detail}")
+    print(f"\n{flagged}/{len(report)} consultas recorren tablas completas.")
+    return flagged
@@ -1,55 +1,590 @@
+import logging
 import os
 import sqlite3
+import threading
+import time
+from collections import deque
+from urllib.parse import urlparse
+
 import psycopg2
 import mysql.connector
-from urllib.parse import urlparse
+from flask import current_app, g, has_app_context
+
+from modules.query_stats import InstrumentedConnection, instrument_cursor
 
 DEFAULT_DB_FILENAME = "workmanager_erp.db"
 ACTIVE_DB_PATH_FILE = "active_db.txt"
 
-def get_db_connection():
+logger = logging.getLogger(__name__)
+
+# --- Pool de conexiones ---
+# Cada worker de gunicorn mantiene su propio pool (se reinicia tras un fork).
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 8))
+POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+# Segundos de vida máxima de una conexión antes de reciclarla.
+POOL_RECYCLE = float(os.environ.get("DB_POOL_RECYCLE", 1800))
+# Conexiones ociosas más tiempo que esto se validan con SELECT 1 (PostgreSQL/MySQL).
+POOL_PING_INTERVAL = float(os.environ.get("DB_POOL_PING_INTERVAL", 30))
+# Esperas por una conexión libre por encima de este umbral se registran como warning.
+POOL_WAIT_WARN = float(os.environ.get("DB_POOL_WAIT_WARN", 0.1))
+# Segundos durante los que se reutiliza la ruta resuelta por load_active_db_path().
+ACTIVE_DB_PATH_TTL = float(os.environ.get("DB_PATH_CACHE_TTL", 30))
+
+# Perfil de PRAGMAs aplicado a cada conexión SQLite nueva. WAL permite que los
+# lectores sigan consultando mientras un importador o un borrado masivo escribe.
+# recursive_triggers hace que INSERT OR REPLACE dispare los triggers de DELETE
+# de la fila reemplazada: sin él, los resúmenes y conteos mantenidos por
+# triggers suman la fila nueva sin restar la anterior.
+# Se puede ajustar con SQLITE_PRAGMAS="busy_timeout=10000;cache_size=-64000".
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "cache_size": -20000,
+    "mmap_size": 268435456,
+    "temp_store": "MEMORY",
+    "recursive_triggers": "ON",
+}
+
+_REQUEST_CONN_KEY = "_db_conn"
+_EXTENSION_KEY = "db_utils"
+
+
+class PoolTimeout(RuntimeError):
+    """No se obtuvo una conexión libre del pool dentro de POOL_TIMEOUT."""
+
+
+class PooledSQLiteConnection(InstrumentedConnection):
+    """
+    Conexión SQLite cuyo close() la devuelve al pool en lugar de cerrarla.
+    Al ser subclase de sqlite3.Connection sigue funcionando con pandas,
+    `with conn:` y la asignación de row_factory. Sus consultas se registran
+    por petición (modules/query_stats).
+    """
+
+    _pool = None
+    _lent = False
+    _pool_checked_out = False
+
+    def close(self):
+        if self._lent:
+            # Prestada a la petición: se libera en el teardown.
+            return
+        if self._pool is not None:
+            self._pool.release(self)
+        else:
+            sqlite3.Connection.close(self)
+
+    def _close_raw(self):
+        sqlite3.Connection.close(self)
+
+    def __del__(self):
+        if self._pool_checked_out and self._pool is not None:
+            self._pool.forget(self)
+
+
+class PooledConnection:
+    """
+    Envoltorio para conexiones PostgreSQL/MySQL: delega todo en la conexión real
+    salvo close(), que devuelve la conexión al pool.
+    """
+
+    def __init__(self, raw, pool):
+        object.__setattr__(self, "_raw", raw)
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_lent", False)
+        object.__setattr__(self, "_pool_checked_out", False)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __setattr__(self, name, value):
+        if name.startswith("_pool") or name == "_lent":
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._raw, name, value)
+
+    def cursor(self, *args, **kwargs):
+        return instrument_cursor(self._raw.cursor(*args, **kwargs))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self._raw.commit()
+        else:
+            self._raw.rollback()
+        return False
+
+    def close(self):
+        if self._lent:
+            return
+        self._pool.release(self)
+
+    def _close_raw(self):
+        self._raw.close()
+
+    def __del__(self):
+        if self._pool_checked_out:
+            self._pool.forget(self)
+
+
+class ConnectionPool:
+    """
+    Pool acotado de conexiones con validación y métricas de espera.
+
+    `factory` crea una conexión nueva ya envuelta (PooledSQLiteConnection o
+    PooledConnection); `ping` valida conexiones ociosas antes de prestarlas.
+    """
+
+    def __init__(self, key, factory, max_size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                 recycle=POOL_RECYCLE, ping=None, ping_interval=POOL_PING_INTERVAL):
+        self.key = key
+        self._factory = factory
+        self._ping = ping
+        self.max_size = max(1, int(max_size))
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+        self._idle = deque()
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            "acquired": 0,
+            "created": 0,
+            "discarded": 0,
+            "waits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+        }
+
+    def acquire(self):
+        start = time.monotonic()
+        waited = False
+        conn = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = self.timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(
+                        f"Sin conexiones libres en el pool ({self.max_size}) tras {self.timeout}s"
+                    )
+                waited = True
+                self._cond.wait(remaining)
+
+        waited_for = time.monotonic() - start
+        if conn is not None and not self._is_usable(conn):
+            self._discard(conn, reserve=True)
+            conn = None
+        if conn is None:
+            try:
+                conn = self._create()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+
+        conn._pool_checked_out = True
+        with self._cond:
+            self._stats["acquired"] += 1
+            if waited:
+                self._stats["waits"] += 1
+                self._stats["wait_time_total"] += waited_for
+                self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited_for)
+        if waited and waited_for >= POOL_WAIT_WARN:
+            logger.warning("Espera de %.3fs por una conexión del pool %s", waited_for, self.key)
+        return conn
+
+    def release(self, conn):
+        if not conn._pool_checked_out:
+            # Doble close(): la conexión ya está en el pool.
+            return
+        conn._pool_checked_out = False
+        try:
+            _reset_connection(conn)
+        except Exception:
+            self._discard(conn)
+            return
+        conn._pool_last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def forget(self, conn):
+        """Libera el hueco de una conexión prestada que nunca se devolvió."""
+        conn._pool_checked_out = False
+        with self._cond:
+            self._size -= 1
+            self._stats["discarded"] += 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            data = dict(self._stats)
+            data.update(
+                key=self.key,
+                max_size=self.max_size,
+                size=self._size,
+                idle=len(self._idle),
+                in_use=self._size - len(self._idle),
+            )
+        return data
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+        for conn in idle:
+            try:
+                conn._close_raw()
+            except Exception:
+                pass
+
+    def _create(self):
+        conn = self._factory(self)
+        now = time.monotonic()
+        conn._pool_created = now
+        conn._pool_last_used = now
+        with self._cond:
+            self._stats["created"] += 1
+        return conn
+
+    def _is_usable(self, conn):
+        now = time.monotonic()
+        if self.recycle and now - conn._pool_created > self.recycle:
+            return False
+        if self._ping is not None and now - conn._pool_last_used > self.ping_interval:
+            try:
+                return self._ping(conn)
+            except Exception:
+                return False
+        return True
+
+    def _discard(self, conn, reserve=False):
+        """Cierra la conexión; con reserve=True el hueco queda para su reemplazo."""
+        try:
+            conn._close_raw()
+        except Exception:
+            pass
+        with self._cond:
+            self._stats["discarded"] += 1
+            if not reserve:
+                self._size -= 1
+                self._cond.notify()
+
+
+def _reset_connection(conn):
+    """Deja la conexión limpia antes de devolverla al pool."""
+    if isinstance(conn, sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = sqlite3.Row
+    else:
+        conn._raw.rollback()
+
+
+def _ping_connection(conn):
+    cur = conn._raw.cursor()
+    try:
+        cur.execute("SELECT 1")
+        cur.fetchone()
+    finally:
+        cur.close()
+    conn._raw.rollback()
+    return True
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = os.getpid()
+
+
+def sqlite_pragma_profile():
+    """Perfil de PRAGMAs efectivo: SQLITE_PRAGMAS más los ajustes de la variable de entorno."""
+    profile = dict(SQLITE_PRAGMAS)
+    for item in os.environ.get("SQLITE_PRAGMAS", "").replace(",", ";").split(";"):
+        name, sep, value = item.partition("=")
+        if sep and name.strip():
+            profile[name.strip().lower()] = value.strip()
+    return profile
+
+
+def apply_sqlite_pragmas(conn, pragmas=None):
+    """Aplica el perfil de PRAGMAs a una conexión SQLite."""
+    for name, value in (pragmas or sqlite_pragma_profile()).items():
+        value = str(value)
+        if not name.isidentifier() or not value.replace("-", "").replace(".", "").isalnum():
+            raise ValueError(f"PRAGMA inválido: {name}={value}")
+        conn.execute(f"PRAGMA {name}={value}")
+
+
+def _connect_sqlite(db_path):
+    def factory(pool):
+        pragmas = sqlite_pragma_profile()
+        # timeout de sqlite3 en segundos; busy_timeout del perfil en milisegundos
+        timeout = int(pragmas.get("busy_timeout", 5000)) / 1000
+        conn = sqlite3.connect(
+            db_path, factory=PooledSQLiteConnection, check_same_thread=False, timeout=timeout
+        )
+        apply_sqlite_pragmas(conn, pragmas)
+        conn.row_factory = sqlite3.Row
+        conn._pool = pool
+        return conn
+    return factory
+
+
+def _connect_postgres(result):
+    def factory(pool):
+        try:
+            raw = psycopg2.connect(
+                dbname=result.path[1:],
+                user=result.username,
+                password=result.password,
+                host=result.hostname,
+                port=result.port
+            )
+        except Exception as e:
+            print(f"Error conectando a PostgreSQL: {e}")
+            raise e
+        return PooledConnection(raw, pool)
+    return factory
+
+
+def _connect_mysql(result):
+    def factory(pool):
+        try:
+            raw = mysql.connector.connect(
+                host=result.hostname,
+                user=result.username,
+                password=result.password,
+                database=result.path[1:],
+                port=result.port
+            )
+        except Exception as e:
+            print(f"Error conectando a MariaDB/MySQL: {e}")
+            raise e
+        return PooledConnection(raw, pool)
+    return factory
+
+
+def _pool_spec():
+    """Devuelve (clave, factory, ping) para la base de datos activa."""
     # Render, Vercel, Heroku, etc., inyectan la URL de la BD en esta variable de entorno.
     db_url = os.environ.get("DATABASE_URL")
 
     if db_url:
-        # Conexión a PostgreSQL en producción
         result = urlparse(db_url)
         scheme = result.scheme.lower()
-
         if 'postgres' in scheme:
-            try:
-                conn = psycopg2.connect(
-                    dbname=result.path[1:],
-                    user=result.username,
-                    password=result.password,
-                    host=result.hostname,
-                    port=result.port
-                )
-            except Exception as e:
-                print(f"Error conectando a PostgreSQL: {e}")
-                raise e
-        elif 'mysql' in scheme or 'mariadb' in scheme:
-            try:
-                conn = mysql.connector.connect(
-                    host=result.hostname,
-                    user=result.username,
-                    password=result.password,
-                    database=result.path[1:],
-                    port=result.port
-                )
-            except Exception as e:
-                print(f"Error conectando a MariaDB/MySQL: {e}")
-                raise e
-        else:
-            raise ValueError(f"Esquema de base de datos no soportado: {scheme}")
-    else:
-        # Conexión a SQLite para desarrollo local
-        db_path = load_active_db_path()
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-    return conn
+            return db_url, _connect_postgres(result), _ping_connection
+        if 'mysql' in scheme or 'mariadb' in scheme:
+            return db_url, _connect_mysql(result), _ping_connection
+        raise ValueError(f"Esquema de base de datos no soportado: {scheme}")
+
+    # SQLite para desarrollo local
+    db_path = os.path.abspath(load_active_db_path())
+    return db_path, _connect_sqlite(db_path), None
+
+
+def get_pool():
+    """Pool del proceso actual para la base de datos activa."""
+    global _pools_pid
+    key, factory, ping = _pool_spec()
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # Proceso hijo (fork de gunicorn): no heredar conexiones del padre.
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(key, factory, ping=ping)
+    return pool
+
+
+def pool_stats():
+    """Métricas de todos los pools del proceso (para /health y monitoreo)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return [pool.stats() for pool in pools]
+
+
+# --- Esquema derivado (modules/derived_schema) ---
+# Cada pieza que instala la migración (resumen, vínculos, versiones...) tiene
+# una comprobación de lectura que solo consulta el catálogo de SQLite. Una
+# comprobación positiva se recuerda por base de datos y proceso; solo cuando
+# la pieza ya cubre todas sus tablas origen, así una tabla creada después de
+# la migración vuelve a revisarse en cada lectura.
+
+# pieza -> claves de pool donde ya está instalada y completa
+_derived_ready = {}
+
+
+def pool_key(conn):
+    """Clave del pool de la conexión (ruta o URL de la base), o None fuera del pool."""
+    return getattr(getattr(conn, "_pool", None), "key", None)
+
+
+def table_columns(conn, table):
+    """Columnas de `table` en SQLite (vacío si la tabla no existe)."""
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+
+
+def schema_objects(conn, kind):
+    """Nombres de sqlite_master del tipo `kind` ('table', 'trigger', 'index')."""
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = ?", (kind,)).fetchall()}
+
+
+def derived_ready(conn, piece, check):
+    """
+    True si la pieza `piece` del esquema derivado está instalada en la base
+    de `conn` (siempre False con PostgreSQL/MySQL). check(conn) inspecciona
+    el catálogo sin DDL y devuelve (instalada, completa).
+    """
+    key = pool_key(conn)
+    if key is not None and key in _derived_ready.get(piece, ()):
+        return True
+    if not isinstance(conn, sqlite3.Connection):
+        return False
+    installed, complete = check(conn)
+    if installed and complete and key is not None:
+        _derived_ready.setdefault(piece, set()).add(key)
+    return installed
+
+
+def reset_derived_ready():
+    """Olvida las comprobaciones recordadas (pruebas y cambios de base de datos)."""
+    _derived_ready.clear()
+
+
+def check_database_settings():
+    """
+    Verificación de arranque: abre una conexión y devuelve la configuración
+    efectiva de la base de datos (para SQLite, el valor real de cada PRAGMA del
+    perfil). Las diferencias con el perfil se listan en "warnings".
+    """
+    try:
+        pool = get_pool()
+        conn = pool.acquire()
+    except Exception as e:
+        logger.error("No se pudo verificar la base de datos: %s", e)
+        return {"engine": "unknown", "error": str(e)}
+
+    try:
+        if not isinstance(conn, sqlite3.Connection):
+            return {"engine": urlparse(pool.key).scheme.lower(), "pool_size": POOL_SIZE}
+
+        expected = sqlite_pragma_profile()
+        pragmas = {}
+        warnings = []
+        for name, value in expected.items():
+            row = conn.execute(f"PRAGMA {name}").fetchone()
+            actual = row[0] if row else None
+            pragmas[name] = actual
+            if str(actual).lower() != _pragma_expected(name, value):
+                warnings.append(f"{name}={actual} (esperado {value})")
+        for warning in warnings:
+            logger.warning("PRAGMA SQLite distinto al perfil: %s", warning)
+        return {
+            "engine": "sqlite",
+            "path": pool.key,
+            "sqlite_version": sqlite3.sqlite_version,
+            "pragmas": pragmas,
+            "warnings": warnings,
+            "pool_size": POOL_SIZE,
+        }
+    finally:
+        conn.close()
+
+
+_PRAGMA_ENUMS = {
+    "recursive_triggers": {"off": "0", "on": "1"},
+    "synchronous": {"off": "0", "normal": "1", "full": "2", "extra": "3"},
+    "temp_store": {"default": "0", "file": "1", "memory": "2"},
+}
+
+
+def _pragma_expected(name, value):
+    """Valor que SQLite devuelve al consultar un PRAGMA configurado con `value`."""
+    value = str(value).lower()
+    return _PRAGMA_ENUMS.get(name, {}).get(value, value)
+
+
+def get_database_settings():
+    """Resultado de check_database_settings() calculado al registrar la app."""
+    state = current_app.extensions.get(_EXTENSION_KEY) or {}
+    return state.get("settings", {})
+
+
+def get_db_connection():
+    """
+    Devuelve una conexión del pool.
+
+    Dentro de una petición (con init_app registrado) se presta una única conexión
+    por petición a través de flask.g: todas las llamadas comparten la misma y
+    close() no hace nada hasta el teardown. Fuera de una petición, close()
+    devuelve la conexión al pool.
+    """
+    if has_app_context() and _EXTENSION_KEY in current_app.extensions:
+        pool = get_pool()
+        conn = g.get(_REQUEST_CONN_KEY)
+        if conn is not None and conn._pool is pool:
+            return conn
+        if conn is not None:
+            # La base de datos activa cambió durante la petición.
+            release_request_connection()
+        conn = pool.acquire()
+        conn._lent = True
+        setattr(g, _REQUEST_CONN_KEY, conn)
+        return conn
+    return get_pool().acquire()
+
+
+def release_request_connection(exc=None):
+    """Devuelve al pool la conexión prestada a la petición actual."""
+    conn = g.pop(_REQUEST_CONN_KEY, None)
+    if conn is not None:
+        conn._lent = False
+        conn.close()
+
+
+def init_app(app):
+    """
+    Registra el préstamo de conexiones por petición en la app Flask y ejecuta
+    la verificación de arranque de la base de datos.
+    """
+    app.extensions[_EXTENSION_KEY] = {"settings": check_database_settings()}
+    app.teardown_appcontext(release_request_connection)
+
+
+_active_db_path_cache = {"path": None, "expires": 0.0}
+
 
 def load_active_db_path():
+    """
+    Ruta de la base de datos activa, reutilizando la última resolución durante
+    ACTIVE_DB_PATH_TTL segundos para no consultar el sistema de archivos en cada conexión.
+    """
+    now = time.monotonic()
+    cached = _active_db_path_cache["path"]
+    if cached is not None and now < _active_db_path_cache["expires"]:
+        return cached
+    path = _resolve_active_db_path()
+    _active_db_path_cache["path"] = path
+    _active_db_path_cache["expires"] = now + ACTIVE_DB_PATH_TTL
+    return path
+
+
+def _resolve_active_db_path():
     """
     Carga la ruta de la base de datos activa.
     Prioriza workmanager_erp.db y luego una guardada, o devuelve workmanager_erp.db por defecto.
@@ -89,6 +624,7 @@ def save_active_db_path(db_path):
     active_db_file_path = os.path.join(project_root, ACTIVE_DB_PATH_FILE)
     with open(active_db_file_path, 'w') as f:
         f.write(db_path)
+    _active_db_path_cache["path"] = None
     return db_path
 
 def list_available_dbs():
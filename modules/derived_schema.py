@@ -0,0 +1,79 @@
+"""
+Migración del esquema derivado (solo SQLite).
+
+Tablas y triggers que la app mantiene a partir de los datos: el vínculo de
+equipos y licencias con empleados, el resumen materializado del inventario,
+las marcas de categoría y la versión de las pestañas del tablero, las
+versiones de la caché de datos globales y las de cada sede, los conteos de
+filas de /metrics y el índice de búsqueda. Antes se creaban en la primera
+lectura de cada proceso, de modo que una petición cualquiera podía quedar
+ejecutando ALTER TABLE, creando triggers y recalculando tablas completas.
+Ahora se instalan en un único paso, fuera de la app:
+    python migrate.py esquema
+
+Los pasos recalculan tablas completas la primera vez, así que no se ejecutan
+al arrancar: cada worker de gunicorn los repetiría y podría superar el tiempo
+de arranque. La app solo avisa en el log de los pasos pendientes.
+
+Las lecturas solo comprueban en sqlite_master que cada pieza esté instalada;
+mientras no lo esté (p. ej. tras cambiar a una base de datos sin migrar)
+calculan en vivo, como con PostgreSQL o MySQL.
+"""
+
+import sqlite3
+
+from modules.app_cache import cache_versions_ready, install_cache_versions
+from modules.db_utils import get_db_connection
+from modules.employee_links import install_employee_links, links_ready
+from modules.inventory_summary import install_inventory_summary, summary_ready
+from modules.inventory_tabs import install_inventory_tabs, tabs_ready
+from modules.metrics import install_table_counts, table_counts_ready
+from modules.search import install_search_index, search_ready
+from modules.sede_snapshot import install_sede_snapshots, sede_snapshots_ready
+
+# (nombre, paso, comprobación de lectura) en orden de instalación. Los vínculos van primero: en una base
+# sin migrar escriben empleado_id en todas las filas, antes de que existan los
+# triggers de los demás pasos (los de versión de sede leen esa columna)
+STEPS = (
+    ("vinculos", install_employee_links, links_ready),
+    ("resumen", install_inventory_summary, summary_ready),
+    ("pestanas", install_inventory_tabs, tabs_ready),
+    ("cache", install_cache_versions, cache_versions_ready),
+    ("sedes", install_sede_snapshots, sede_snapshots_ready),
+    ("conteos", install_table_counts, table_counts_ready),
+    ("busqueda", install_search_index, search_ready),
+)
+
+
+def upgrade_derived_schema(conn):
+    """
+    Instala lo que falte del esquema derivado. Devuelve {nombre: instalado}
+    ({} si la base de datos no es SQLite).
+    """
+    if not isinstance(conn, sqlite3.Connection):
+        return {}
+    return {name: bool(step(conn)) for name, step, _ in STEPS}
+
+
+def pending_steps(conn):
+    """Nombres de los pasos sin instalar (solo lee el catálogo; [] si no es SQLite)."""
+    if not isinstance(conn, sqlite3.Connection):
+        return []
+    return [name for name, _, ready in STEPS if not ready(conn)]
+
+
+def init_app(app):
+    """Avisa al arrancar si la base de datos activa tiene pasos sin migrar (sin DDL)."""
+    conn = get_db_connection()
+    try:
+        pending = pending_steps(conn)
+    except sqlite3.Error as e:
+        app.logger.warning("No se pudo revisar el esquema derivado: %s", e)
+        return
+    finally:
+        conn.close()
+    if pending:
+        app.logger.warning(
+            "Esquema derivado sin instalar (%s): las lecturas calculan en vivo; ejecuta python migrate.py esquema",
+            ", ".join(pending),
+        )
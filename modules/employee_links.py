@@ -0,0 +1,344 @@
+"""
+Vínculo resuelto entre empleados y sus equipos y licencias (columna empleado_id).
+
+Las vistas relacionaban empleados con equipos y licencias comparando texto en
+cada lectura (LOWER(correo_office) = LOWER(asignado_nuevo), nombre LIKE
+'%...%'), condiciones que no pueden usar índices. Ahora cada fila de
+equipos_individuales, equipos_agrupados y licencias_office365 guarda el
+empleado_id resuelto y las consultas hacen un JOIN por igualdad indexado.
+
+Resolución (LINK_RULES): por cada columna de la fila se prueban, en orden,
+las claves del empleado (correo Office, "nombre apellido", cédula, código de
+hoja de vida) comparando sin mayúsculas ni espacios sobrantes. Una clave
+solo resuelve si identifica a un único empleado; los nombres repetidos quedan
+sin resolver y aparecen en unresolved_names().
+
+En SQLite la resolución ocurre al escribir: triggers en las tablas vinculadas
+(al insertar o cambiar el texto del asignado) y en empleados (al crear,
+renombrar o borrar un empleado se recalculan las filas afectadas), de modo que
+las importaciones quedan vinculadas sin pasos adicionales. El trabajo en
+segundo plano "vinculos_empleados" recalcula todo por lotes (bases de datos
+sin triggers o después de corregir datos).
+
+La columna, los índices y los triggers los instala la migración del esquema
+derivado (install_employee_links). Las lecturas no ejecutan DDL: arman el JOIN
+con employee_ref(), que usa empleado_id si los vínculos están instalados y, si
+no, resuelve el empleado en la propia consulta (más lento, mismo resultado).
+"""
+
+import logging
+import sqlite3
+
+from modules.db_utils import derived_ready, get_db_connection, schema_objects, table_columns
+from modules.jobs import job_handler
+
+logger = logging.getLogger(__name__)
+
+EMPLOYEE_TABLE = "empleados"
+LINK_COLUMN = "empleado_id"
+
+# Normalización aplicada a ambos lados de la comparación
+_NORMS = {
+    "texto": "LOWER(TRIM({}))",
+    "codigo": "TRIM({})",
+}
+
+# clave -> (expresión sobre empleados con {p} como prefijo, normalización, columnas requeridas)
+EMPLOYEE_KEYS = {
+    "correo": ("LOWER(TRIM({p}correo_office))", "texto", ("correo_office",)),
+    "nombre": ("LOWER(TRIM({p}nombre || ' ' || COALESCE({p}apellido, '')))", "texto", ("nombre", "apellido")),
+    "cedula": ("TRIM({p}cedula)", "codigo", ("cedula",)),
+    "codigo_hv": ("TRIM({p}codigo_unico_hv_equipo)", "codigo", ("codigo_unico_hv_equipo",)),
+}
+
+# tabla -> ((columna, claves del empleado que la identifican), ...) en orden de prioridad
+LINK_RULES = {
+    "equipos_individuales": (
+        ("asignado_nuevo", ("correo", "nombre", "cedula")),
+        ("codigo_unificado", ("codigo_hv",)),
+        ("codigo_barras_individual", ("codigo_hv",)),
+    ),
+    "equipos_agrupados": (
+        ("asignado_actual", ("correo", "nombre", "cedula")),
+    ),
+    "licencias_office365": (
+        ("email", ("correo",)),
+        ("cedula_usuario", ("cedula",)),
+        ("cedula", ("cedula",)),
+        ("usuario_asignado", ("nombre",)),
+    ),
+}
+
+# Columna con el texto que se muestra en el reporte de no resueltos
+REPORT_COLUMNS = {
+    "equipos_individuales": "asignado_nuevo",
+    "equipos_agrupados": "asignado_actual",
+    "licencias_office365": "usuario_asignado",
+}
+
+# Mismos nombres que en el paquete de índices (db_indexes) para no duplicarlos
+LINK_INDEXES = {
+    "equipos_individuales": "idx_ei_empleado",
+    "equipos_agrupados": "idx_ea_empleado",
+    "licencias_office365": "idx_lic_empleado",
+}
+
+BACKFILL_BATCH = 2000
+
+
+def _active_rules(table, columns, employee_columns):
+    """Reglas aplicables según las columnas que existen en esta base de datos."""
+    rules = []
+    for column, keys in LINK_RULES[table]:
+        if column not in columns:
+            continue
+        usable = tuple(k for k in keys if set(EMPLOYEE_KEYS[k][2]) <= employee_columns)
+        if usable:
+            rules.append((column, usable))
+    return rules
+
+
+def _row_value(rule_key, ref, column):
+    return _NORMS[EMPLOYEE_KEYS[rule_key][1]].format(f"{ref}.{column}")
+
+
+def resolve_expression(rules, ref):
+    """
+    Expresión SQL con el empleado_id de la fila `ref` (alias o new/old): el
+    primer nivel que identifique a un único empleado, o NULL.
+    """
+    levels = []
+    for column, keys in rules:
+        for key in keys:
+            value = _row_value(key, ref, column)
+            employee = EMPLOYEE_KEYS[key][0].format(p="")
+            levels.append(
+                f"(SELECT CASE WHEN COUNT(*) = 1 THEN MAX(id) END FROM {EMPLOYEE_TABLE} "
+                f"WHERE {employee} = {value} AND {value} != '')"
+            )
+    if not levels:
+        return "NULL"
+    return levels[0] if len(levels) == 1 else f"COALESCE({', '.join(levels)})"
+
+
+def _create_indexes(conn, table, rules):
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {LINK_INDEXES[table]} ON {table} ({LINK_COLUMN})")
+    for column, keys in rules:
+        for norm in sorted({EMPLOYEE_KEYS[k][1] for k in keys}):
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_vinculo_{table}_{column}_{norm} "
+                f"ON {table} ({_NORMS[norm].format(column)})"
+            )
+
+
+def _create_row_triggers(conn, table, rules):
+    resolve_new = resolve_expression(rules, "new")
+    watched = ", ".join(column for column, _ in rules)
+    conn.executescript(f"""
+        DROP TRIGGER IF EXISTS vinculo_{table}_ai;
+        DROP TRIGGER IF EXISTS vinculo_{table}_au;
+        CREATE TRIGGER vinculo_{table}_ai AFTER INSERT ON {table}
+        WHEN new.{LINK_COLUMN} IS NULL AND {resolve_new} IS NOT NULL
+        BEGIN UPDATE {table} SET {LINK_COLUMN} = {resolve_new} WHERE id = new.id; END;
+        CREATE TRIGGER vinculo_{table}_au AFTER UPDATE OF {watched} ON {table}
+        WHEN new.{LINK_COLUMN} IS NOT {resolve_new}
+        BEGIN UPDATE {table} SET {LINK_COLUMN} = {resolve_new} WHERE id = new.id; END;
+    """)
+
+
+def _create_employee_triggers(conn, linked):
+    """Triggers en empleados que recalculan las filas que el cambio puede afectar."""
+    keys = {col for _, _, cols in EMPLOYEE_KEYS.values() for col in cols}
+    watched = sorted(keys & table_columns(conn, EMPLOYEE_TABLE))
+    on_new = []
+    on_old = []
+    for table, rules in linked.items():
+        resolve_row = resolve_expression(rules, table)
+        # Filas sin vincular con una clave del empleado: el nuevo puede
+        # resolverlas y la salida del anterior puede deshacer una ambigüedad
+        for column, keys in rules:
+            for key in keys:
+                value = _row_value(key, table, column)
+                for ref, statements in (("new", on_new), ("old", on_old)):
+                    candidate = EMPLOYEE_KEYS[key][0].format(p=f"{ref}.")
+                    statements.append(
+                        f"UPDATE {table} SET {LINK_COLUMN} = {resolve_row} "
+                        f"WHERE {LINK_COLUMN} IS NULL AND {value} = {candidate};"
+                    )
+        on_old.append(f"UPDATE {table} SET {LINK_COLUMN} = {resolve_row} WHERE {LINK_COLUMN} = old.id;")
+    conn.executescript(f"""
+        DROP TRIGGER IF EXISTS vinculo_{EMPLOYEE_TABLE}_ai;
+        DROP TRIGGER IF EXISTS vinculo_{EMPLOYEE_TABLE}_au;
+        DROP TRIGGER IF EXISTS vinculo_{EMPLOYEE_TABLE}_ad;
+        CREATE TRIGGER vinculo_{EMPLOYEE_TABLE}_ai AFTER INSERT ON {EMPLOYEE_TABLE}
+        BEGIN {' '.join(on_new)} END;
+        CREATE TRIGGER vinculo_{EMPLOYEE_TABLE}_au AFTER UPDATE OF {', '.join(watched)} ON {EMPLOYEE_TABLE}
+        BEGIN {' '.join(on_old + on_new)} END;
+        CREATE TRIGGER vinculo_{EMPLOYEE_TABLE}_ad AFTER DELETE ON {EMPLOYEE_TABLE}
+        BEGIN {' '.join(on_old)} END;
+    """)
+
+
+def linked_tables(conn):
+    """{tabla: reglas} de las tablas vinculables presentes en la base de datos."""
+    employee_columns = table_columns(conn, EMPLOYEE_TABLE)
+    if not employee_columns:
+        return {}
+    linked = {}
+    for table in LINK_RULES:
+        columns = table_columns(conn, table)
+        rules = _active_rules(table, columns, employee_columns) if columns else []
+        if rules:
+            linked[table] = rules
+    return linked
+
+
+def install_employee_links(conn):
+    """
+    Paso de migración: agrega empleado_id, sus índices y los triggers de
+    resolución que falten; la primera vez vincula las filas existentes.
+    Devuelve False si la base de datos no es SQLite o no tiene empleados.
+    """
+    if not isinstance(conn, sqlite3.Connection):
+        return False
+    linked = linked_tables(conn)
+    if not linked:
+        return False
+    triggers = schema_objects(conn, "trigger")
+    # Índices de las claves del empleado antes de vincular: sin ellos cada
+    # subconsulta del recálculo recorre empleados completa por cada fila
+    for name, (expression, _, cols) in EMPLOYEE_KEYS.items():
+        if set(cols) <= table_columns(conn, EMPLOYEE_TABLE):
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{EMPLOYEE_TABLE}_vinculo_{name} "
+                f"ON {EMPLOYEE_TABLE} ({expression.format(p='')})"
+            )
+    created = False
+    for table, rules in linked.items():
+        if LINK_COLUMN not in table_columns(conn, table):
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {LINK_COLUMN} INTEGER")
+        if f"vinculo_{table}_ai" not in triggers:
+            _create_indexes(conn, table, rules)
+            _create_row_triggers(conn, table, rules)
+            conn.execute(f"UPDATE {table} SET {LINK_COLUMN} = {resolve_expression(rules, table)}")
+            created = True
+    if created or f"vinculo_{EMPLOYEE_TABLE}_ai" not in triggers:
+        _create_employee_triggers(conn, linked)
+    conn.commit()
+    return True
+
+
+def _links_installed(conn):
+    linked = linked_tables(conn)
+    triggers = schema_objects(conn, "trigger")
+    if not linked or f"vinculo_{EMPLOYEE_TABLE}_ai" not in triggers:
+        return False, False
+    installed = all(
+        f"vinculo_{table}_ai" in triggers and LINK_COLUMN in table_columns(conn, table) for table in linked
+    )
+    return installed, len(linked) == len(LINK_RULES)
+
+
+def links_ready(conn):
+    """True si las tablas vinculables que existen tienen empleado_id y sus triggers."""
+    return derived_ready(conn, "vinculos", _links_installed)
+
+
+def employee_ref(conn, table, alias):
+    """
+    Expresión con el id del empleado de las filas `alias` de `table`, para
+    JOIN con empleados: empleado_id si los vínculos están instalados (o en
+    PostgreSQL/MySQL, donde la columna viene de create_tables); si no, la
+    resolución en vivo (NULL si la tabla no se puede vincular).
+    """
+    if links_ready(conn) or not isinstance(conn, sqlite3.Connection):
+        return f"{alias}.{LINK_COLUMN}"
+    rules = linked_tables(conn).get(table)
+    return resolve_expression(rules, alias) if rules else "NULL"
+
+
+def relink(conn, table, first_id=None, last_id=None):
+    """Recalcula empleado_id de `table` (opcionalmente solo un rango de ids). No hace commit."""
+    rules = linked_tables(conn).get(table)
+    if not rules:
+        return 0
+    sql = f"UPDATE {table} SET {LINK_COLUMN} = {resolve_expression(rules, table)}"
+    params = ()
+    if first_id is not None:
+        sql += " WHERE id BETWEEN ? AND ?"
+        params = (first_id, last_id)
+    return conn.execute(sql, params).rowcount
+
+
+def unresolved_names(conn, limit=500):
+    """
+    Textos de asignación que no se pudieron vincular, agrupados, con el
+    número de filas y de empleados candidatos por nombre (0 = no existe,
+    más de 1 = ambiguo).
+    """
+    name_key = EMPLOYEE_KEYS["nombre"][0].format(p="")
+    report = []
+    for table in linked_tables(conn):
+        column = REPORT_COLUMNS[table]
+        if column not in table_columns(conn, table) or LINK_COLUMN not in table_columns(conn, table):
+            continue
+        value = _NORMS["texto"].format(f"t.{column}")
+        rows = conn.execute(
+            f"""
+            SELECT MIN(t.{column}) AS valor, COUNT(*) AS filas,
+                   (SELECT COUNT(*) FROM {EMPLOYEE_TABLE} WHERE {name_key} = {value}) AS candidatos
+              FROM {table} t
+             WHERE t.{LINK_COLUMN} IS NULL AND {value} != ''
+             GROUP BY {value}
+             ORDER BY filas DESC
+             LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+        report.extend(
+            {"tabla": table, "columna": column, "valor": r[0], "filas": r[1], "candidatos": r[2]} for r in rows
+        )
+    return report
+
+
+@job_handler("vinculos_empleados")
+def run_relink_job(job):
+    """Recalcula empleado_id de todas las tablas vinculadas por lotes de ids."""
+    conn = get_db_connection()
+    try:
+        # El recálculo escribe empleado_id: instala lo que falte antes de empezar
+        install_employee_links(conn)
+        tables = list(linked_tables(conn))
+        bounds = {
+            table: conn.execute(f"SELECT MIN(id), MAX(id), COUNT(*) FROM {table}").fetchone() for table in tables
+        }
+        total = sum(b[2] or 0 for b in bounds.values())
+        checkpoint = job.checkpoint or {}
+        processed = checkpoint.get("processed", 0)
+        job.progress(total=total)
+        for position, table in enumerate(tables):
+            if position < checkpoint.get("table", 0):
+                continue
+            low, high, _ = bounds[table]
+            if low is None:
+                continue
+            start = checkpoint.get("next_id", low) if position == checkpoint.get("table", 0) else low
+            while start <= high:
+                end = start + BACKFILL_BATCH - 1
+                relink(conn, table, start, end)
+                conn.commit()
+                processed += conn.execute(
+                    f"SELECT COUNT(*) FROM {table} WHERE id BETWEEN ? AND ?", (start, end)
+                ).fetchone()[0]
+                start = end + 1
+                job.progress(processed=processed, checkpoint={"table": position, "next_id": start, "processed": processed})
+        # Filas con asignado escrito que siguen sin empleado
+        return {
+            table: conn.execute(
+                f"SELECT COUNT(*) FROM {table} WHERE {LINK_COLUMN} IS NULL "
+                f"AND TRIM(COALESCE({REPORT_COLUMNS[table]}, '')) != ''"
+            ).fetchone()[0]
+            for table in tables
+        }
+    finally:
+        conn.close()
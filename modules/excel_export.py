@@ -0,0 +1,178 @@
+"""
+Exportación a Excel (.xlsx) con memoria constante.
+
+StreamingWorkbook usa el modo write_only de openpyxl: cada fila se serializa
+al archivo temporal de la hoja en cuanto se agrega, en lugar de mantener todas
+las celdas del libro en memoria. Los estilos del encabezado se crean una sola
+vez y los anchos de columna se fijan antes de escribir la primera fila (en
+write_only no se pueden cambiar después).
+
+Las filas se agregan por lotes desde un cursor (export_stream.QueryStream) o
+desde DataFrames, en una o varias hojas:
+
+    book = StreamingWorkbook()
+    book.add_sheet("Empleados", stream.columns).write_batches(stream.batches())
+    return xlsx_response(book, "empleados.xlsx")
+"""
+
+import math
+import tempfile
+
+import pandas as pd
+from flask import send_file
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+HEADER_COLOR = "1F4E78"
+MAX_WIDTH = 60
+# Filas del primer lote usadas para estimar anchos automáticos
+WIDTH_SAMPLE_ROWS = 200
+# Filas convertidas por lote al escribir un DataFrame
+DATAFRAME_BATCH_ROWS = 5000
+
+
+def _header_style(size=10):
+    return {
+        "font": Font(name="Calibri", bold=True, size=size, color="FFFFFF"),
+        "fill": PatternFill(start_color=HEADER_COLOR, end_color=HEADER_COLOR, fill_type="solid"),
+        "alignment": Alignment(horizontal="center", vertical="center", wrap_text=True),
+    }
+
+
+def _cell_value(value):
+    """Convierte NaN/NaT y tipos no soportados por openpyxl a valores simples."""
+    if value is None:
+        return None
+    if isinstance(value, float):
+        return None if math.isnan(value) else value
+    if isinstance(value, (str, int)):
+        return value
+    if value is pd.NaT:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).decode("utf-8", errors="replace")
+    if hasattr(value, "item"):  # escalares numpy
+        return value.item()
+    return value
+
+
+def _auto_widths(headers, rows):
+    widths = [len(str(h)) + 2 for h in headers]
+    for row in rows[:WIDTH_SAMPLE_ROWS]:
+        for i, value in enumerate(row[:len(widths)]):
+            if value is not None:
+                widths[i] = max(widths[i], len(str(value)) + 2)
+    return [min(max(w, 8), MAX_WIDTH) for w in widths]
+
+
+class SheetWriter:
+    """Hoja en escritura; se obtiene con StreamingWorkbook.add_sheet()."""
+
+    def __init__(self, book, ws, headers, widths, freeze, autofilter):
+        self._book = book
+        self.ws = ws
+        self.headers = list(headers)
+        self._widths = widths
+        self._freeze = freeze
+        self._autofilter = autofilter
+        self._started = False
+        self.rows = 0
+
+    def _start(self, first_rows):
+        widths = self._widths
+        if widths is None:
+            widths = _auto_widths(self.headers, first_rows)
+        elif isinstance(widths, (int, float)):
+            widths = [widths] * len(self.headers)
+        for i, width in enumerate(widths, 1):
+            self.ws.column_dimensions[get_column_letter(i)].width = width
+        if self._freeze:
+            self.ws.freeze_panes = "A2"
+        header_cells = []
+        for name in self.headers:
+            cell = WriteOnlyCell(self.ws, value=name)
+            style = self._book.header_style
+            cell.font, cell.fill, cell.alignment = style["font"], style["fill"], style["alignment"]
+            header_cells.append(cell)
+        self.ws.append(header_cells)
+        self._started = True
+
+    def append_rows(self, rows):
+        """Agrega un lote de filas (secuencias de valores en el orden de headers)."""
+        rows = [[_cell_value(v) for v in row] for row in rows]
+        if not self._started:
+            self._start(rows)
+        append = self.ws.append
+        for row in rows:
+            append(row)
+        self.rows += len(rows)
+        return self
+
+    def write_batches(self, batches):
+        """Agrega lotes de filas, p. ej. QueryStream.batches()."""
+        for rows in batches:
+            self.append_rows(rows)
+        return self
+
+    def write_dataframe(self, frames):
+        """Agrega un DataFrame o un iterable de DataFrames (mismas columnas que headers)."""
+        if isinstance(frames, pd.DataFrame):
+            frames = [frames]
+        for df in frames:
+            if list(df.columns) != self.headers:
+                df = df.reindex(columns=self.headers)
+            for start in range(0, len(df), DATAFRAME_BATCH_ROWS):
+                part = df.iloc[start:start + DATAFRAME_BATCH_ROWS].astype(object)
+                self.append_rows(part.itertuples(index=False, name=None))
+        return self
+
+    def _finish(self):
+        if not self._started:
+            self._start([])
+        if self._autofilter and self.headers:
+            self.ws.auto_filter.ref = f"A1:{get_column_letter(len(self.headers))}{self.rows + 1}"
+
+
+class StreamingWorkbook:
+    """Libro .xlsx de solo escritura con una o varias hojas."""
+
+    def __init__(self, header_size=10):
+        self.wb = Workbook(write_only=True)
+        self.header_style = _header_style(header_size)
+        self._sheets = []
+
+    def add_sheet(self, title, headers, widths=None, freeze=True, autofilter=True):
+        """
+        Crea una hoja con encabezado estilizado. widths: lista, número fijo o
+        None para estimarlos con el primer lote.
+        """
+        ws = self.wb.create_sheet(title=str(title)[:31])
+        sheet = SheetWriter(self, ws, headers, widths, freeze, autofilter)
+        self._sheets.append(sheet)
+        return sheet
+
+    def save(self, target):
+        """Guarda en una ruta o archivo abierto en modo binario."""
+        for sheet in self._sheets:
+            sheet._finish()
+        if not self._sheets:
+            self.wb.create_sheet("Hoja1")
+        self.wb.save(target)
+
+
+def xlsx_response(book, filename):
+    """Descarga del libro desde un archivo temporal (se borra al cerrar la respuesta)."""
+    tmp = tempfile.TemporaryFile(suffix=".xlsx")
+    try:
+        book.save(tmp)
+        tmp.seek(0)
+    except Exception:
+        tmp.close()
+        raise
+    return send_file(tmp, mimetype=XLSX_MIMETYPE, as_attachment=True, download_name=filename)
@@ -2,16 +2,23 @@ import os
 import time
 import json
 import unicodedata
-import sqlite3
 import csv
 import io
+import itertools
+import logging
 import re
 import warnings
+from contextlib import contextmanager
 import pandas as pd
+from openpyxl import load_workbook
 from flask import (
     Blueprint, render_template, request,
     flash, redirect, url_for, send_file
 )
+from modules.db_utils import get_db_connection
+from modules.export_stream import export_query
+
+logger = logging.getLogger(__name__)
 
 export_import_bp = Blueprint(
     "export_import",
@@ -19,7 +26,6 @@ export_import_bp = Blueprint(
     url_prefix="/importador"
 )
 
-DB_PATH = "workmanager_erp.db"
 TMP_DIR = "tmp_imports"
 os.makedirs(TMP_DIR, exist_ok=True)
 TABLE_COL_CACHE = {}
@@ -242,9 +248,7 @@ for canonical, variants in HEADER_SYNONYMS.items():
 # ==========================
 
 def db_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_db_connection()
 
 
 def _get_table_columns(cur, table_name):
@@ -324,9 +328,20 @@ def build_column_mapping(headers):
 # 📥 LECTURA DE ARCHIVOS
 # ==============================
 
+# Filas por lote al leer archivos (cada lote se importa y se libera)
+IMPORT_READ_ROWS = int(os.getenv("IMPORT_READ_ROWS", "10000"))
+# Filas iniciales donde se busca el encabezado
+HEADER_SCAN_ROWS = 25
+CSV_SNIFF_BYTES = 2048
+CSV_ESTIMATE_BYTES = 65536
+# Filas por hoja en la vista previa del importador
+PREVIEW_ROWS = 10
+CSV_ENCODING = "latin1"
+
+
 def _find_header_row(df):
     """Detecta la fila que parece encabezado en hojas desorganizadas."""
-    max_check = min(len(df), 25)
+    max_check = min(len(df), HEADER_SCAN_ROWS)
     best_idx = 0
     best_score = 0
     for idx in range(0, max_check):
@@ -344,19 +359,71 @@ def _find_header_row(df):
             best_idx = idx
     return best_idx
 
+
+def _header_names(df, header_idx):
+    return [str(val).strip() if pd.notna(val) else "" for val in df.iloc[header_idx]]
+
+
+def _apply_header(block, headers):
+    """
+    Asigna los encabezados a un bloque leído sin encabezado (columnas por
+    posición), quita columnas sin nombre y filas totalmente vacías.
+    """
+    block = block.reindex(columns=range(len(headers)))
+    keep = [i for i, name in enumerate(headers) if name]
+    clean = block.iloc[:, keep]
+    clean.columns = [headers[i] for i in keep]
+    return clean.dropna(how="all")
+
+
 def _normalize_dataframe(df):
     """Usa la fila detectada como encabezado y devuelve DataFrame limpio."""
     header_idx = _find_header_row(df)
-    headers = []
-    for val in df.iloc[header_idx]:
-        headers.append(str(val).strip() if pd.notna(val) else "")
-    clean = df.iloc[header_idx + 1:].copy()
-    clean.columns = headers
-    # Eliminar columnas vacías
-    clean = clean[[c for c in clean.columns if c]]
-    # Eliminar filas totalmente vacías
-    clean = clean.dropna(how="all")
-    return clean
+    headers = _header_names(df, header_idx)
+    return _apply_header(df.iloc[header_idx + 1:], headers)
+
+
+def _normalized_batches(blocks):
+    """
+    Recibe bloques crudos de una hoja (columnas por posición, índice = número
+    de fila en la hoja) y produce lotes normalizados con el encabezado que
+    _find_header_row detecta en las primeras filas.
+    """
+    blocks = iter(blocks)
+    head = []
+    rows = 0
+    for block in blocks:
+        head.append(block)
+        rows += len(block)
+        if rows >= HEADER_SCAN_ROWS:
+            break
+    if not rows:
+        return
+    first = pd.concat(head) if len(head) > 1 else head[0]
+    header_idx = _find_header_row(first)
+    headers = _header_names(first, header_idx)
+
+    batch = _apply_header(first.iloc[header_idx + 1:], headers)
+    if not batch.empty:
+        yield batch
+    for block in blocks:
+        batch = _apply_header(block, headers)
+        if not batch.empty:
+            yield batch
+
+
+def _row_blocks(rows, batch_rows, start=0):
+    """Agrupa filas (listas de celdas) en DataFrames sin inferir tipos."""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            yield pd.DataFrame(batch, index=range(start, start + len(batch)), dtype=object)
+            start += len(batch)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch, index=range(start, start + len(batch)), dtype=object)
+
 
 def _reset_stream(stream):
     """Rebobina flujos si soportan seek para reutilizarlos en relecturas."""
@@ -366,85 +433,462 @@ def _reset_stream(stream):
         except Exception:
             pass
 
-def _read_csv_loose(file_path_or_obj):
+
+@contextmanager
+def _open_text(file_path_or_obj):
+    """Abre una ruta o un archivo subido como texto latin1 sin leerlo completo."""
+    if not hasattr(file_path_or_obj, "read"):
+        with open(file_path_or_obj, "r", encoding=CSV_ENCODING, newline="") as f:
+            yield f
+        return
+    stream = getattr(file_path_or_obj, "stream", file_path_or_obj)
+    _reset_stream(stream)
+    if isinstance(stream, io.TextIOBase):
+        yield stream
+        return
+    wrapper = io.TextIOWrapper(stream, encoding=CSV_ENCODING, newline="")
+    try:
+        yield wrapper
+    finally:
+        wrapper.detach()  # no cerrar el archivo subido
+
+
+def _sniff_dialect(file_path_or_obj):
+    with _open_text(file_path_or_obj) as f:
+        sample = f.read(CSV_SNIFF_BYTES)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;|\t")
+    except Exception:
+        pass
+    # Títulos antes del encabezado confunden al Sniffer: usar el separador más frecuente
+    counts = {sep: sample.count(sep) for sep in ",;|\t"}
+    best = max(counts, key=counts.get)
+    if not counts[best]:
+        return csv.excel
+    return type("sniffed", (csv.excel,), {"delimiter": best})
+
+
+def _csv_width(file_path_or_obj, dialect):
+    """Máximo de campos en las filas donde se busca el encabezado."""
+    with _open_text(file_path_or_obj) as f:
+        rows = itertools.islice(csv.reader(f, dialect), HEADER_SCAN_ROWS + 1)
+        return max((len(row) for row in rows), default=0)
+
+
+def _iter_csv_blocks(file_path_or_obj, batch_rows):
     """
-    Lector de CSV tolerante: no omite filas, rellena/podA3 columnas para alinear longitudes.
+    Bloques crudos de un CSV con el motor C de pandas por trozos. El ancho se
+    fija con las primeras filas (los títulos sobre el encabezado suelen tener
+    una sola celda); los campos de más a la derecha no tendrían encabezado.
+    Si el CSV está mal formado, continúa desde la fila donde falló con el
+    lector tolerante (no omite filas).
+    """
+    dialect = _sniff_dialect(file_path_or_obj)
+    width = _csv_width(file_path_or_obj, dialect)
+    if not width:
+        return
+    produced = 0
+    try:
+        if hasattr(file_path_or_obj, "read"):
+            _reset_stream(getattr(file_path_or_obj, "stream", file_path_or_obj))
+        reader = pd.read_csv(
+            getattr(file_path_or_obj, "stream", file_path_or_obj),
+            sep=dialect.delimiter,
+            quotechar=dialect.quotechar or '"',
+            engine="c",
+            encoding=CSV_ENCODING,
+            header=None,
+            names=range(width),
+            dtype=str,
+            skip_blank_lines=False,
+            chunksize=batch_rows,
+        )
+        with reader:
+            for block in reader:
+                block.index = range(produced, produced + len(block))
+                produced += len(block)
+                yield block
+        return
+    except pd.errors.EmptyDataError:
+        return
+    except pd.errors.ParserError:
+        pass
+
+    with _open_text(file_path_or_obj) as f:
+        rows = csv.reader(f, dialect)
+        for _ in range(produced):
+            next(rows, None)
+        # Celdas vacías como nulos, igual que read_csv
+        rows = ([cell if cell != "" else None for cell in row] for row in rows)
+        yield from _row_blocks(rows, batch_rows, start=produced)
+
+
+def _iter_excel_blocks(file_path_or_obj, name, batch_rows):
     """
-    # Preparar flujo de lectura
+    Por hoja: (bloques crudos, filas aproximadas). .xlsx en modo read_only,
+    .xls con pandas.
+    """
+    if name.endswith(".xls"):
+        with warnings.catch_warnings():
+            warnings.filterwarnings(
+                "ignore",
+                message="Print area cannot be set to Defined name",
+                category=UserWarning,
+            )
+            sheets = pd.read_excel(file_path_or_obj, sheet_name=None, header=None)
+        for sheet_df in sheets.values():
+            if sheet_df is not None and not sheet_df.empty:
+                yield [sheet_df], len(sheet_df)
+        return
+
     if hasattr(file_path_or_obj, "read"):
-        content = file_path_or_obj.read()
         _reset_stream(file_path_or_obj)
-        if not isinstance(content, str):
-            content = content.decode("latin1", errors="ignore")
-        data_stream = io.StringIO(content)
-    else:
-        data_stream = open(file_path_or_obj, "r", encoding="latin1", newline="")
-
-    with data_stream as f:
-        sample = f.read(2048)
-        try:
-            dialect = csv.Sniffer().sniff(sample, delimiters=",;|\t")
-        except Exception:
-            dialect = csv.excel
-        f.seek(0)
-        reader = csv.reader(f, dialect)
-        rows = [row for row in reader]
-
-    if not rows:
-        return pd.DataFrame()
+    with warnings.catch_warnings():
+        warnings.filterwarnings(
+            "ignore",
+            message="Print area cannot be set to Defined name",
+            category=UserWarning,
+        )
+        wb = load_workbook(file_path_or_obj, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            # max_row sale de la etiqueta <dimension> de la hoja: no recorre filas
+            yield _row_blocks(ws.iter_rows(values_only=True), batch_rows), ws.max_row
+    finally:
+        wb.close()
 
-    max_cols = max(len(r) for r in rows)
-    padded = [r + [""] * (max_cols - len(r)) for r in rows]
-    return pd.DataFrame(padded)
 
-def load_dataframes(file_path_or_obj):
-    """Lee CSV o Excel y devuelve una lista de DataFrames normalizados."""
-    name = (
+def _source_name(file_path_or_obj):
+    return (
         file_path_or_obj.filename
         if hasattr(file_path_or_obj, "filename")
         else str(file_path_or_obj)
     ).lower()
 
-    dfs = []
-    if name.endswith(".xlsx") or name.endswith(".xls"):
-        with warnings.catch_warnings():
-            warnings.filterwarnings(
-                "ignore",
-                message="Print area cannot be set to Defined name",
-                category=UserWarning,
-            )
-            sheets = pd.read_excel(file_path_or_obj, sheet_name=None, header=None)
-        for _, sheet_df in sheets.items():
-            if sheet_df is None or sheet_df.empty:
-                continue
-            dfs.append(_normalize_dataframe(sheet_df))
-    else:
-        _reset_stream(file_path_or_obj)
+
+def _csv_row_estimate(file_path_or_obj):
+    """Filas aproximadas de un CSV a partir del tamaño y los primeros KB."""
+    if hasattr(file_path_or_obj, "read"):
+        stream = getattr(file_path_or_obj, "stream", file_path_or_obj)
         try:
-            df = pd.read_csv(
-                file_path_or_obj,
-                sep=None,
-                engine="python",
-                encoding="latin1",
-                header=None,
-                on_bad_lines="error"
-            )
+            stream.seek(0, os.SEEK_END)
+            size = stream.tell()
         except Exception:
-            _reset_stream(file_path_or_obj)
-            df = _read_csv_loose(file_path_or_obj)
-        dfs.append(_normalize_dataframe(df))
-    return dfs
+            return None
+    else:
+        size = os.path.getsize(file_path_or_obj)
+    with _open_text(file_path_or_obj) as f:
+        sample = f.read(CSV_ESTIMATE_BYTES)
+    if not sample:
+        return 0
+    lines = sample.count("\n") + (0 if sample.endswith("\n") else 1)
+    if len(sample) >= size:
+        return lines
+    # latin1: un carácter por byte
+    return int(lines * size / len(sample))
+
+
+def _iter_sheets(file_path_or_obj, batch_rows):
+    """(bloques crudos, filas aproximadas) por cada hoja del archivo."""
+    name = _source_name(file_path_or_obj)
+    if name.endswith(".xlsx") or name.endswith(".xls"):
+        return _iter_excel_blocks(file_path_or_obj, name, batch_rows)
+    return iter([(_iter_csv_blocks(file_path_or_obj, batch_rows), _csv_row_estimate(file_path_or_obj))])
+
+
+def iter_dataframes(file_path_or_obj, batch_rows=None):
+    """
+    Lee CSV o Excel por lotes sin cargar el archivo completo.
+    Produce (n_hoja, DataFrame normalizado) con a lo sumo batch_rows filas; el
+    índice de cada fila es su posición en la hoja. Los lotes de una misma hoja
+    comparten encabezados.
+    """
+    batch_rows = batch_rows or IMPORT_READ_ROWS
+    frame = 0
+    for blocks, _ in _iter_sheets(file_path_or_obj, batch_rows):
+        produced = False
+        for batch in _normalized_batches(blocks):
+            produced = True
+            yield frame, batch
+        if produced:
+            frame += 1
+
+
+def preview_file(file_path_or_obj, rows=PREVIEW_ROWS):
+    """
+    Muestra de cada hoja sin leer el archivo completo. Devuelve una lista de
+    {"frame", "headers", "sample", "rows_estimate", "rows_exact"}: las primeras
+    `rows` filas normalizadas y una estimación de filas de datos (exacta si la
+    hoja es pequeña). "frame" coincide con el número de hoja de iter_dataframes.
+    """
+    previews = []
+    for blocks, hint in _iter_sheets(file_path_or_obj, HEADER_SCAN_ROWS + rows):
+        batches = _normalized_batches(blocks)
+        first = next(batches, None)
+        if first is None:
+            continue
+        second = next(batches, None)
+        batches.close()
+        sample = first.head(rows)
+        if second is None:
+            estimate = len(first)
+        elif hint:
+            estimate = max(hint - int(first.index[0]), len(first) + len(second))
+        else:
+            estimate = None
+        previews.append({
+            "frame": len(previews),
+            "headers": list(sample.columns),
+            "sample": sample,
+            "rows_estimate": estimate,
+            "rows_exact": second is None,
+        })
+    return previews
+
+
+def load_dataframes(file_path_or_obj):
+    """Lee CSV o Excel y devuelve una lista de DataFrames normalizados."""
+    frames = {}
+    for frame, batch in iter_dataframes(file_path_or_obj):
+        frames.setdefault(frame, []).append(batch)
+    return [pd.concat(batches) if len(batches) > 1 else batches[0] for batches in frames.values()]
 
 
 # ==============================
 # 🧩 LÓGICA DE IMPORTACIÓN
 # ==============================
 
-def import_rows(df, target, mapping, source=None):
+# Filas por bloque: cada bloque se resuelve con una consulta de claves y se
+# escribe en su propia transacción.
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "2000"))
+# Filas de ejemplo por causa y causas distintas en el resumen de errores
+IMPORT_ERROR_ROWS = 5
+IMPORT_ERROR_CAUSES = 20
+# Claves por consulta IN (...) (SQLite antiguo admite 999 parámetros)
+_LOOKUP_BATCH = 400
+
+# Destinos con clave: tabla, columnas donde se busca la clave y cómo se obtiene.
+# require_key=False inserta aunque la fila no traiga clave (muebles sin código).
+UPSERT_TARGETS = {
+    "inventario": {
+        "table": "equipos_individuales",
+        "lookup": ("codigo_barras_individual", "serial"),
+        "key": lambda d: d.get("codigo_barras_individual") or d.get("serial"),
+        "require_key": True,
+        "filter_columns": True,
+    },
+    "licencias": {
+        "table": "licencias_office365",
+        "lookup": ("email",),
+        "key": lambda d: d.get("email"),
+        "require_key": True,
+        "filter_columns": False,
+    },
+    "empleados": {
+        "table": "empleados",
+        "lookup": ("cedula",),
+        "key": lambda d: d.get("cedula"),
+        "require_key": True,
+        "filter_columns": False,
+    },
+    "inventario_administrativo": {
+        "table": "inventario_administrativo",
+        "lookup": ("codigo_interno",),
+        "key": lambda d: d.get("codigo_interno"),
+        "require_key": False,
+        "filter_columns": False,
+    },
+}
+
+
+def _normalized_rows(df, mapping):
+    """
+    Normaliza las columnas del mapeo de forma vectorizada (str + strip, nulos a
+    None) y devuelve (índice, data, extras) por fila, como el recorrido con
+    iterrows pero sin convertir cada fila en una Series.
+    """
+    columns = []
+    for col_orig, canonical in mapping.items():
+        if col_orig not in df.columns:
+            continue
+        series = df[col_orig]
+        if isinstance(series, pd.DataFrame):  # encabezados repetidos
+            series = series.iloc[:, 0]
+        values = series.astype(str).str.strip().astype(object).where(series.notna(), None)
+        columns.append((col_orig, canonical, values.tolist()))
+
+    for pos, idx in enumerate(df.index):
+        data = {}
+        extras = {}
+        for col_orig, canonical, values in columns:
+            val = values[pos]
+            if val is None:
+                continue
+            if canonical is None:
+                extras[col_orig] = val
+            else:
+                data[canonical] = val
+        yield idx, data, extras
+
+
+def _lookup_ids(cur, table, lookup, keys):
+    """Resuelve un conjunto de claves a ids con consultas IN por lotes."""
+    found = {}
+    keys = list(keys)
+    cols = ", ".join(lookup)
+    for start in range(0, len(keys), _LOOKUP_BATCH):
+        batch = keys[start:start + _LOOKUP_BATCH]
+        wanted = set(batch)
+        qs = ", ".join(["?"] * len(batch))
+        where = " OR ".join(f"{col} IN ({qs})" for col in lookup)
+        cur.execute(
+            f"SELECT id, {cols} FROM {table} WHERE {where} ORDER BY id",
+            batch * len(lookup)
+        )
+        for row in cur.fetchall():
+            for value in tuple(row)[1:]:
+                if value is not None and str(value) in wanted:
+                    found.setdefault(str(value), row[0])
+    return found
+
+
+def _executemany_runs(cur, sql_for, rows):
+    """
+    Agrupa filas consecutivas con las mismas columnas y ejecuta un executemany
+    por grupo; así los ids nuevos conservan el orden del archivo.
+    """
+    run_cols, run_vals = None, []
+    for cols, vals in rows:
+        if cols != run_cols and run_vals:
+            cur.executemany(sql_for(run_cols), run_vals)
+            run_vals = []
+        run_cols = cols
+        run_vals.append(vals)
+    if run_vals:
+        cur.executemany(sql_for(run_cols), run_vals)
+
+
+def _upsert_chunk(cur, spec, chunk):
+    """
+    Inserta/actualiza un bloque de filas. Las filas con la misma clave se
+    combinan en orden (la última gana), que es lo que dejaban las
+    actualizaciones fila a fila; los contadores se calculan igual que antes.
+    """
+    table, lookup, key_of = spec["table"], spec["lookup"], spec["key"]
+    valid_cols = _get_table_columns(cur, table) if spec["filter_columns"] else None
+
+    keys = {key_of(data) for _, data in chunk}
+    existing = _lookup_ids(cur, table, lookup, {k for k in keys if k})
+
+    entities = {}   # ref -> [id o None, data combinada]
+    by_key = {}     # valor de clave -> ref, para filas repetidas en el bloque
+    inserted = updated = 0
+    for _, data in chunk:
+        key = key_of(data)
+        if not key and spec["require_key"]:
+            continue
+        if valid_cols is not None:
+            data = {k: v for k, v in data.items() if k in valid_cols}
+            if not data:
+                continue
+
+        ref = None
+        if key is not None:
+            ref = ("id", existing[key]) if key in existing else by_key.get(key)
+        if ref is None:
+            ref = ("new", len(entities))
+            entities[ref] = [None, {}]
+            inserted += 1
+        else:
+            entities.setdefault(ref, [ref[1], {}])
+            updated += 1
+        entities[ref][1].update(data)
+
+        if key is not None:
+            by_key[key] = ref
+        for col in lookup:
+            if data.get(col):
+                by_key[data[col]] = ref
+
+    inserts = [
+        (tuple(data), tuple(data.values()))
+        for entity_id, data in entities.values() if entity_id is None
+    ]
+    _executemany_runs(
+        cur,
+        lambda cols: f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join(['?'] * len(cols))})",
+        inserts
+    )
+
+    updates = {}
+    for entity_id, data in entities.values():
+        if entity_id is not None:
+            updates.setdefault(tuple(data), []).append(tuple(data.values()) + (entity_id,))
+    for cols, vals in updates.items():
+        set_clause = ", ".join(f"{k}=?" for k in cols)
+        cur.executemany(f"UPDATE {table} SET {set_clause} WHERE id=?", vals)
+
+    return inserted, updated
+
+
+def _insert_chunk(cur, table, mapper, chunk):
+    """Destinos sin clave: cada fila es un registro nuevo."""
+    rows = [mapper(data) for _, data in chunk]
+    _executemany_runs(
+        cur,
+        lambda cols: f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join(['?'] * len(cols))})",
+        [(tuple(r), tuple(r.values())) for r in rows]
+    )
+    return len(rows), 0
+
+
+def _import_chunk_rows(cur, target, chunk, errors):
+    """Ruta fila a fila: destinos sin escritura por lotes y bloques con errores."""
+    importer = ROW_IMPORTERS.get(target)
+    inserted = updated = 0
+    for idx, data in chunk:
+        if importer is None:
+            errors.append(f"Destino no soportado: {target}")
+            continue
+        try:
+            inserted, updated = importer(cur, data, inserted, updated)
+        except Exception as e:
+            errors.append(f"Fila {idx+1}: {e}")
+    return inserted, updated
+
+
+def _import_chunk(cur, target, chunk, errors):
+    """
+    Escribe un bloque con sentencias agrupadas. Si alguna falla se deshace el
+    bloque y se repite fila a fila para reportar qué filas tienen error.
+    """
+    if target in UPSERT_TARGETS or target in INSERT_TARGETS:
+        cur.execute("SAVEPOINT import_chunk")
+        try:
+            if target in UPSERT_TARGETS:
+                result = _upsert_chunk(cur, UPSERT_TARGETS[target], chunk)
+            else:
+                table, mapper = INSERT_TARGETS[target]
+                result = _insert_chunk(cur, table, mapper, chunk)
+            cur.execute("RELEASE SAVEPOINT import_chunk")
+            return result
+        except Exception:
+            cur.execute("ROLLBACK TO SAVEPOINT import_chunk")
+            cur.execute("RELEASE SAVEPOINT import_chunk")
+    return _import_chunk_rows(cur, target, chunk, errors)
+
+
+def import_rows(df, target, mapping, source=None, on_chunk=None):
     """
     df         → DataFrame ya cargado
     target     → 'inventario' | 'licencias' | 'empleados'
     mapping    → {col_original: canonical or None}
+    on_chunk   → callback opcional tras confirmar cada bloque; recibe los
+                 acumulados {rows, inserted, updated, staged, errors}, donde
+                 rows es la cantidad de filas del DataFrame ya procesadas.
+
+    Procesa el archivo en bloques de IMPORT_CHUNK_SIZE filas: una consulta de
+    claves por bloque, escritura con executemany y commit por bloque.
     """
     conn = db_conn()
     cur = conn.cursor()
@@ -473,61 +917,101 @@ def import_rows(df, target, mapping, source=None):
         conn.close()
         return inserted, updated, errors, staged
 
-    for idx, row in df.iterrows():
-        data = {}
-        extras = {}
-        for col_orig, canonical in mapping.items():
-            if canonical is None:
-                val_extra = row.get(col_orig)
-                if pd.notna(val_extra):
-                    extras[col_orig] = str(val_extra).strip()
-                continue
-            val = row.get(col_orig)
-            if pd.isna(val):
+    def flush(chunk, unmapped):
+        ins, upd = _import_chunk(cur, target, chunk, errors)
+        if unmapped:
+            cur.executemany(
+                "INSERT INTO import_unmapped (target, source, row_index, payload) VALUES (?, ?, ?, ?)",
+                unmapped
+            )
+        conn.commit()
+        return ins, upd
+
+    def report(rows):
+        if on_chunk is not None:
+            on_chunk({
+                "rows": rows,
+                "inserted": inserted,
+                "updated": updated,
+                "staged": staged,
+                "errors": len(errors),
+            })
+
+    chunk = []
+    unmapped = []
+    pos = -1
+    try:
+        for pos, (idx, data, extras) in enumerate(_normalized_rows(df, mapping)):
+            if not data and not extras:
                 continue
-            data[canonical] = str(val).strip()
 
-        if not data and not extras:
-            continue
+            if extras:
+                unmapped.append((target, source or "", idx + 1, json.dumps(extras, ensure_ascii=False)))
+                staged += 1
+                if target == "inventario" or "observaciones" in data:
+                    existing = data.get("observaciones", "")
+                    extra_text = " | ".join(f"{k}:{v}" for k, v in extras.items())
+                    data["observaciones"] = (existing + " " + extra_text).strip()
+
+            chunk.append((idx, data))
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                ins, upd = flush(chunk, unmapped)
+                inserted += ins
+                updated += upd
+                chunk, unmapped = [], []
+                report(pos + 1)
+
+        if chunk:
+            ins, upd = flush(chunk, unmapped)
+            inserted += ins
+            updated += upd
+        report(pos + 1)
+    finally:
+        conn.close()
+    return inserted, updated, errors, staged
 
-        if extras:
-            cur.execute(
-                "INSERT INTO import_unmapped (target, source, row_index, payload) VALUES (?, ?, ?, ?)",
-                (target, source or "", idx + 1, json.dumps(extras, ensure_ascii=False))
-            )
-            staged += 1
 
-        if extras:
-            if target == "inventario" or "observaciones" in data:
-                existing = data.get("observaciones", "")
-                extra_text = " | ".join(f"{k}:{v}" for k, v in extras.items())
-                data["observaciones"] = (existing + " " + extra_text).strip()
+_ROW_ERROR = re.compile(r"Fila (\d+): (.*)", re.S)
 
-        try:
-            if target == "inventario":
-                inserted, updated = import_inventario_row(cur, data, inserted, updated)
-            elif target == "licencias":
-                inserted, updated = import_licencia_row(cur, data, inserted, updated)
-            elif target == "empleados":
-                inserted, updated = import_empleado_row(cur, data, inserted, updated)
-            elif target == "bajas":
-                inserted, updated = import_baja_row(cur, data, inserted, updated)
-            elif target == "insumos":
-                inserted, updated = import_insumo_row(cur, data, inserted, updated)
-            elif target == "tandas":
-                inserted, updated = import_tanda_row(cur, data, inserted, updated)
-            elif target == "sedes":
-                inserted, updated = import_sede_row(cur, data, inserted, updated)
-            elif target == "inventario_administrativo":
-                inserted, updated = import_admin_row(cur, data, inserted, updated)
-            else:
-                errors.append(f"Destino no soportado: {target}")
-        except Exception as e:
-            errors.append(f"Fila {idx+1}: {e}")
 
-    conn.commit()
-    conn.close()
-    return inserted, updated, errors, staged
+def summarize_errors(errors, summary=None):
+    """
+    Agrupa los errores de import_rows por causa: {causa: {"count": n, "rows":
+    [primeras filas]}}. `summary` es un resumen previo para acumular entre
+    lotes; el resultado es serializable (va en el punto de control del trabajo).
+    """
+    summary = {cause: {"count": e["count"], "rows": list(e["rows"])} for cause, e in (summary or {}).items()}
+    for message in errors:
+        match = _ROW_ERROR.fullmatch(message)
+        cause, row = (match.group(2), int(match.group(1))) if match else (message, None)
+        entry = summary.get(cause)
+        if entry is None:
+            if len(summary) >= IMPORT_ERROR_CAUSES:
+                cause = "Otros errores"
+                entry = summary.setdefault(cause, {"count": 0, "rows": []})
+            else:
+                entry = summary[cause] = {"count": 0, "rows": []}
+        entry["count"] += 1
+        if row is not None and len(entry["rows"]) < IMPORT_ERROR_ROWS:
+            entry["rows"].append(row)
+    return summary
+
+
+def top_errors(summary, limit=10):
+    """Causas más frecuentes del resumen: [{"cause", "count", "rows"}]."""
+    ranked = sorted((summary or {}).items(), key=lambda item: item[1]["count"], reverse=True)
+    return [{"cause": cause, **entry} for cause, entry in ranked[:limit]]
+
+
+def log_import_errors(summary, source="", target=""):
+    """Un solo registro por importación con los errores agrupados por causa."""
+    if not summary:
+        return
+    total = sum(entry["count"] for entry in summary.values())
+    logger.warning(
+        "Importación %s -> %s: %d filas con error (%d causas)", source or "-", target or "-", total, len(summary),
+        extra={"event": "import_errors", "source": source, "target": target, "errors": top_errors(summary)},
+    )
 
 
 def import_inventario_row(cur, data, inserted, updated):
@@ -660,8 +1144,8 @@ def import_baja_row(cur, data, inserted, updated):
     return inserted, updated
 
 
-def import_insumo_row(cur, data, inserted, updated):
-    mapped = {
+def _map_insumo(data):
+    return {
         "nombre_insumo": data.get("nombre_insumo"),
         "serial_equipo": data.get("serial_equipo"),
         "cantidad_total": data.get("cantidad_total"),
@@ -671,6 +1155,10 @@ def import_insumo_row(cur, data, inserted, updated):
         "creador_registro": data.get("creador_registro") or "IMPORTADOR",
         "observaciones": data.get("observaciones"),
     }
+
+
+def import_insumo_row(cur, data, inserted, updated):
+    mapped = _map_insumo(data)
     cols = ", ".join(mapped.keys())
     qs = ", ".join(["?"] * len(mapped))
     cur.execute(
@@ -727,8 +1215,8 @@ def import_admin_row(cur, data, inserted, updated):
     return inserted, updated
 
 
-def import_tanda_row(cur, data, inserted, updated):
-    mapped = {
+def _map_tanda(data):
+    return {
         "numero_tanda": data.get("numero_tanda"),
         "descripcion": data.get("descripcion"),
         "cantidad_equipos": data.get("cantidad_equipos"),
@@ -736,6 +1224,10 @@ def import_tanda_row(cur, data, inserted, updated):
         "valor_total": data.get("valor_total"),
         "observaciones": data.get("observaciones"),
     }
+
+
+def import_tanda_row(cur, data, inserted, updated):
+    mapped = _map_tanda(data)
     cols = ", ".join(mapped.keys())
     qs = ", ".join(["?"] * len(mapped))
     cur.execute(
@@ -746,6 +1238,24 @@ def import_tanda_row(cur, data, inserted, updated):
     return inserted, updated
 
 
+ROW_IMPORTERS = {
+    "inventario": import_inventario_row,
+    "licencias": import_licencia_row,
+    "empleados": import_empleado_row,
+    "bajas": import_baja_row,
+    "insumos": import_insumo_row,
+    "tandas": import_tanda_row,
+    "sedes": import_sede_row,
+    "inventario_administrativo": import_admin_row,
+}
+
+# Destinos sin clave que se escriben por lotes: tabla y mapeo de columnas
+INSERT_TARGETS = {
+    "insumos": ("insumos", _map_insumo),
+    "tandas": ("tandas_equipos_nuevos", _map_tanda),
+}
+
+
 # ==============================
 # 🌐 RUTAS FLASK
 # ==============================
@@ -773,10 +1283,10 @@ def importar_procesar():
 def exportar(destino):
     conn = db_conn()
     if destino == "inventario":
-        query = "SELECT * FROM equipos_individuales"
+        query = export_query("equipos_individuales", conn)
         filename = "inventario_tecnologico.csv"
     elif destino == "licencias":
-        query = "SELECT * FROM licencias_office365"
+        query = export_query("licencias_office365", conn)
         filename = "licencias_office365.csv"
     elif destino == "empleados":
         query = "SELECT * FROM empleados"
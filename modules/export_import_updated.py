@@ -14,11 +14,6 @@ from flask import (
     redirect,
     url_for,
 )
-from openpyxl import Workbook
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
 try:
     from barcode import Code128
     from barcode.writer import ImageWriter
@@ -27,21 +22,30 @@ except Exception:
     BARCODE_AVAILABLE = False
 from PIL import Image, ImageDraw, ImageFont
 import io
-import zipfile
 import csv
 import json
-import re
+from contextlib import nullcontext
 from datetime import datetime
-import os
 import json as pyjson
 
 from modules.export_import import (
     TMP_DIR,
-    load_dataframes,
+    iter_dataframes,
+    preview_file,
     build_column_mapping,
     detect_target_from_headers,
     import_rows,
+    log_import_errors,
+    summarize_errors,
+    top_errors,
 )
+from modules.db_utils import get_db_connection
+from modules.excel_export import StreamingWorkbook, xlsx_response
+from modules.export_stream import QueryStream, csv_chunks, export_query, json_chunks, streaming_response, txt_chunks
+from modules.inventory_summary import SOURCE_TABLE as SUMMARY_SOURCE_TABLE, deferred_summary
+from modules.report_engine import ReportLayout, cursor_rows, render_report
+from modules.life_sheets import LIFE_SHEET_BULK_MAX, iter_life_sheets, life_sheet_pdf, zip_chunks
+from modules.jobs import cancel_job, get_job, job_handler, list_jobs, stream_job, submit_job
 from werkzeug.utils import secure_filename
 
 # Nombre unico para evitar choque con el blueprint legacy de importador
@@ -67,10 +71,6 @@ MODULES = [
 ]
 EXPORT_FORMATS = ["excel", "csv", "json", "pdf", "txt", "image"]
 
-def get_db_connection():
-    conn = sqlite3.connect('workmanager_erp.db')
-    conn.row_factory = sqlite3.Row
-    return conn
 
 @export_import_bp.route('/export/excel/<table>')
 def export_excel(table):
@@ -81,28 +81,22 @@ def export_excel(table):
         # Get selected columns from request
         selected_columns = request.args.get('columns', '').split(',') if request.args.get('columns') else None
 
-        conn = get_db_connection()
-        query = f"SELECT * FROM {table_real}"
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-
-        # Filter columns if specified
-        if selected_columns and selected_columns[0]:
-            available_columns = [col for col in selected_columns if col in df.columns]
-            if available_columns:
-                df = df[available_columns]
-
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name=table, index=False)
-
-        output.seek(0)
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=safe_filename(table_real, 'xlsx')
-        )
+        stream = QueryStream(export_query(table_real))
+        try:
+            columns = stream.columns
+            batches = stream.batches()
+            # Filter columns if specified
+            if selected_columns and selected_columns[0]:
+                positions = [columns.index(col) for col in selected_columns if col in columns]
+                if positions:
+                    columns = [columns[i] for i in positions]
+                    batches = ([[row[i] for i in positions] for row in rows] for rows in batches)
+
+            book = StreamingWorkbook()
+            book.add_sheet(table, columns).write_batches(batches)
+        finally:
+            stream.close()
+        return xlsx_response(book, safe_filename(table_real, 'xlsx'))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -112,21 +106,8 @@ def export_json(table):
         table_real = resolve_table(table)
         if not table_exists(table_real):
             return jsonify({'error': f'No existe la tabla {table_real}'}), 404
-        conn = get_db_connection()
-        query = f"SELECT * FROM {table_real}"
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-
-        # Convert DataFrame to JSON
-        json_data = df.to_json(orient='records', date_format='iso', indent=2)
-
-        # Create response
-        response = Response(
-            json_data,
-            mimetype='application/json',
-            headers={'Content-Disposition': f'attachment; filename={safe_filename(table_real, "json")}'}
-        )
-        return response
+        stream = QueryStream(export_query(table_real))
+        return streaming_response(json_chunks(stream), stream, 'application/json', safe_filename(table_real, "json"))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -140,49 +121,18 @@ def export_pdf(table):
         selected_columns = request.args.get('columns', '').split(',') if request.args.get('columns') else None
 
         conn = get_db_connection()
-        query = f"SELECT * FROM {table_real}"
+        query = export_query(table_real, conn)
         if selected_columns and selected_columns[0]:
             query = f"SELECT {', '.join(selected_columns)} FROM {table_real}"
 
-        cursor = conn.cursor()
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        column_names = [description[0] for description in cursor.description]
-        conn.close()
-
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        elements = []
-
-        # Title
-        styles = getSampleStyleSheet()
-        title = Paragraph(f"Reporte de {table.title()}", styles['Title'])
-        elements.append(title)
-
-        # Table data
-        data = [column_names] + [list(row) for row in rows]
-
-        # Create table
-        table = Table(data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), '#343a40'),
-            ('TEXTCOLOR', (0, 0), (-1, 0), '#ffffff'),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), '#f8f9fa'),
-            ('TEXTCOLOR', (0, 1), (-1, -1), '#000000'),
-            ('ALIGN', (0, 1), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 1, '#000000'),
-        ]))
-
-        elements.append(table)
-        doc.build(elements)
+        try:
+            cursor = conn.execute(query)
+            column_names = [description[0] for description in cursor.description]
+            layout = ReportLayout(f"Reporte de {table.title()}", column_names)
+            buffer = io.BytesIO(render_report(layout, cursor_rows(cursor)))
+        finally:
+            conn.close()
 
-        buffer.seek(0)
         return send_file(
             buffer,
             mimetype='application/pdf',
@@ -201,33 +151,12 @@ def export_csv(table):
         # Get selected columns from request
         selected_columns = request.args.get('columns', '').split(',') if request.args.get('columns') else None
 
-        conn = get_db_connection()
-        query = f"SELECT * FROM {table_real}"
+        query = export_query(table_real)
         if selected_columns and selected_columns[0]:
             query = f"SELECT {', '.join(selected_columns)} FROM {table_real}"
 
-        cursor = conn.cursor()
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        column_names = [description[0] for description in cursor.description]
-        conn.close()
-
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(column_names)
-        writer.writerows(rows)
-
-        output.seek(0)
-        buffer = io.BytesIO()
-        buffer.write(output.getvalue().encode('utf-8'))
-        buffer.seek(0)
-
-        return send_file(
-            buffer,
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=safe_filename(table_real, 'csv')
-        )
+        stream = QueryStream(query)
+        return streaming_response(csv_chunks(stream), stream, 'text/csv', safe_filename(table_real, 'csv'))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -237,33 +166,8 @@ def export_txt(table):
         table_real = resolve_table(table)
         if not table_exists(table_real):
             return jsonify({'error': f'No existe la tabla {table_real}'}), 404
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT * FROM {table_real}")
-        rows = cursor.fetchall()
-        column_names = [description[0] for description in cursor.description]
-        conn.close()
-
-        output = io.StringIO()
-        output.write(f"REPORTE DE {table.upper()}\n")
-        output.write("=" * 50 + "\n\n")
-
-        for row in rows:
-            for i, col in enumerate(column_names):
-                output.write(f"{col}: {row[i]}\n")
-            output.write("-" * 30 + "\n")
-
-        output.seek(0)
-        buffer = io.BytesIO()
-        buffer.write(output.getvalue().encode('utf-8'))
-        buffer.seek(0)
-
-        return send_file(
-            buffer,
-            mimetype='text/plain',
-            as_attachment=True,
-            download_name=safe_filename(table_real, 'txt')
-        )
+        stream = QueryStream(export_query(table_real))
+        return streaming_response(txt_chunks(stream, table), stream, 'text/plain', safe_filename(table_real, 'txt'))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -279,7 +183,7 @@ def export_image(table):
             return jsonify({'error': f'No existe la tabla {table_real}'}), 404
 
         conn = get_db_connection()
-        df = pd.read_sql_query(f"SELECT * FROM {table_real} LIMIT 25", conn)
+        df = pd.read_sql_query(f"{export_query(table_real, conn)} LIMIT 25", conn)
         conn.close()
 
         if df.empty:
@@ -357,7 +261,7 @@ def generate_life_sheet(item_id):
                 return jsonify({'error': f'No existe la tabla {table_real}'}), 404
         conn = get_db_connection()
         cursor = conn.cursor()
-        cursor.execute(f"SELECT * FROM {table_real} WHERE id = ?", (item_id,))
+        cursor.execute(f"{export_query(table_real, conn)} WHERE id = ?", (item_id,))
         item = cursor.fetchone()
         column_names = [description[0] for description in cursor.description]
         conn.close()
@@ -365,35 +269,7 @@ def generate_life_sheet(item_id):
         if not item:
             return jsonify({'error': 'Item not found'}), 404
 
-        # Create PDF life sheet
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        elements = []
-
-        styles = getSampleStyleSheet()
-
-        # Title
-        title = Paragraph("HOJA DE VIDA DEL EQUIPO", styles['Title'])
-        elements.append(title)
-
-        # Equipment details
-        details = []
-        for i, col in enumerate(column_names):
-            details.append([col.upper(), str(item[i])])
-
-        table = Table(details)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), '#343a40'),
-            ('TEXTCOLOR', (0, 0), (0, -1), '#ffffff'),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('GRID', (0, 0), (-1, -1), 1, '#000000'),
-        ]))
-
-        elements.append(table)
-        doc.build(elements)
-
-        buffer.seek(0)
+        buffer = io.BytesIO(life_sheet_pdf(table_real, column_names, tuple(item)))
         return send_file(
             buffer,
             mimetype='application/pdf',
@@ -403,6 +279,60 @@ def generate_life_sheet(item_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@export_import_bp.route('/export/life_sheets', methods=['GET', 'POST'])
+def generate_life_sheets_zip():
+    """
+    ZIP con las hojas de vida filtradas por sede, tecnologia y/o ids
+    (ids=1,2,3 o repetido). Se envía a medida que se generan los PDF.
+    """
+    values = request.values
+    table_param = values.get("table")
+    table_real = resolve_table(table_param) if table_param else "equipos_individuales"
+    if not table_exists(table_real):
+        return jsonify({'error': f'No existe la tabla {table_real}'}), 404
+
+    ids = [i.strip() for raw in values.getlist("ids") for i in str(raw).split(",") if i.strip()]
+    filters = []
+    params = []
+    if ids:
+        filters.append(f"id IN ({','.join('?' for _ in ids)})")
+        params.extend(ids)
+    if values.get("sede"):
+        filters.append("sede_id = ?")
+        params.append(values.get("sede"))
+    if values.get("tecnologia"):
+        filters.append("LOWER(tecnologia) = LOWER(?)")
+        params.append(values.get("tecnologia"))
+    if not filters:
+        return jsonify({'error': 'Indica sede, tecnologia o ids para la descarga masiva.'}), 400
+
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(
+            f"{export_query(table_real, conn)} WHERE {' AND '.join(filters)} ORDER BY id LIMIT ?",
+            (*params, LIFE_SHEET_BULK_MAX + 1),
+        )
+        columns = [d[0] for d in cursor.description]
+        rows = [tuple(row) for row in cursor.fetchall()]
+    except sqlite3.OperationalError as e:
+        return jsonify({'error': str(e)}), 400
+    finally:
+        conn.close()
+    if not rows:
+        return jsonify({'error': 'No hay equipos con esos filtros'}), 404
+    if len(rows) > LIFE_SHEET_BULK_MAX:
+        return jsonify({'error': f'La descarga masiva admite hasta {LIFE_SHEET_BULK_MAX} equipos; usa más filtros.'}), 400
+
+    # Las filas ya están en memoria: el generador no usa la conexión de la petición
+    return Response(
+        zip_chunks(iter_life_sheets(table_real, columns, rows)),
+        mimetype='application/zip',
+        headers={
+            'Content-Disposition': f"attachment; filename={safe_filename('hojas_vida', 'zip')}",
+            'X-Accel-Buffering': 'no',
+        },
+    )
+
 @export_import_bp.route('/import/excel/<table>', methods=['POST'])
 def import_excel(table):
     try:
@@ -435,7 +365,8 @@ def import_excel(table):
 
         # Insert data into database
         imported_count = 0
-        for _, row in df.iterrows():
+        row_errors = []
+        for position, (_, row) in enumerate(df.iterrows(), start=1):
             try:
                 if table_real == 'inventarios':
                     cursor.execute("""
@@ -478,14 +409,19 @@ def import_excel(table):
                     df.to_sql(table_real, conn, if_exists='append', index=False)
                 imported_count += 1
             except Exception as row_error:
-                # Log individual row errors but continue with other rows
-                print(f"Error importing row: {row_error}")
+                # Se continúa con las demás filas; los errores se reportan agrupados al final
+                row_errors.append(f"Fila {position}: {row_error}")
                 continue
 
         conn.commit()
         conn.close()
 
-        return jsonify({'message': f'Successfully imported {imported_count} records into {table_real}'})
+        summary = summarize_errors(row_errors)
+        log_import_errors(summary, source=file.filename, target=table_real)
+        return jsonify({
+            'message': f'Successfully imported {imported_count} records into {table_real}',
+            'errors': top_errors(summary),
+        })
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -710,76 +646,83 @@ def importar_form_legacy():
     return redirect(url_for("export_import_v2.importar_form"))
 
 
-@export_import_bp.route('/importador/preview', methods=['POST'])
-def importar_preview():
-    target = request.form.get("target", "auto")
+MANIFEST_PREFIX = "import_manifest_"
 
-    # Permitir varios archivos a la vez; si no hay lista, intentar con el campo legacy "file"
-    uploaded_files = [f for f in request.files.getlist("files") if f and f.filename]
-    if not uploaded_files:
-        legacy = request.files.get("file")
-        if legacy and legacy.filename:
-            uploaded_files = [legacy]
-
-    if not uploaded_files:
-        flash("Debes seleccionar al menos un archivo CSV o Excel.", "danger")
-        return redirect(url_for("export_import_v2.importar_form"))
-
-    dataframes = []
-    saved_paths = []
-    errors = []
-    file_previews = []
 
+def _sample_sources(sources):
+    """
+    Lee solo la muestra y el encabezado de cada hoja (preview_file).
+    sources: [(nombre visible, ruta, es_temporal)].
+    Con varios archivos, las hojas con columnas repetidas se importan una sola vez.
+    Devuelve (archivos del manifiesto, muestras, resumen por hoja, errores).
+    """
+    dedupe = len(sources) > 1
     seen_headers = set()
-    for f in uploaded_files:
-        tmp_name = f"import_{int(time.time() * 1000)}_{secure_filename(f.filename)}"
-        tmp_path = os.path.join(TMP_DIR, tmp_name)
-        f.save(tmp_path)
-        saved_paths.append(tmp_path)
+    manifest_files = []
+    samples = []
+    file_previews = []
+    errors = []
+    for name, path, temporary in sources:
         try:
-            loaded_frames = load_dataframes(tmp_path)
-            for df in loaded_frames:
-                cleaned = _clean_dataframe(df)
-                header_key = tuple(cleaned.columns)
-                if header_key in seen_headers:
-                    continue  # evita duplicar mismas columnas de varias hojas
-                seen_headers.add(header_key)
-                dataframes.append(_deduplicate_columns(cleaned))
-                file_previews.append({
-                    "name": f.filename,
-                    "rows": len(cleaned),
-                    "cols": len(cleaned.columns),
-                    "headers": list(cleaned.columns)[:10],
-                })
+            previews = preview_file(path)
         except Exception as e:
-            errors.append(f"{f.filename}: {e}")
+            errors.append(f"{name}: {e}")
+            continue
+        frames = []
+        for preview in previews:
+            sample = _deduplicate_columns(_clean_dataframe(preview["sample"]))
+            header_key = tuple(sample.columns)
+            if dedupe and header_key in seen_headers:
+                continue  # evita duplicar mismas columnas de varias hojas
+            seen_headers.add(header_key)
+            frames.append({"frame": preview["frame"], "rows_estimate": preview["rows_estimate"]})
+            samples.append(sample)
+            file_previews.append({
+                "name": name,
+                "rows": preview["rows_estimate"] if preview["rows_estimate"] is not None else "?",
+                "estimated": not preview["rows_exact"],
+                "cols": len(sample.columns),
+                "headers": list(sample.columns)[:10],
+            })
+        if frames:
+            manifest_files.append({"name": name, "path": path, "temporary": temporary, "frames": frames})
+    return manifest_files, samples, file_previews, errors
+
+
+def _write_manifest(files, headers):
+    """Guarda en TMP_DIR la lista de archivos/hojas a importar; el procesamiento lee los originales."""
+    tmp_name = f"{MANIFEST_PREFIX}{int(time.time() * 1000)}.json"
+    with open(os.path.join(TMP_DIR, tmp_name), "w", encoding="utf-8") as f:
+        pyjson.dump({
+            "files": files,
+            "headers": headers,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        }, f, ensure_ascii=False)
+    return tmp_name
+
+
+def _render_preview(sources, target, empty_message="El archivo no contiene datos legibles."):
+    """Vista previa por muestreo y manifiesto para el paso de procesamiento."""
+    manifest_files, samples, file_previews, errors = _sample_sources(sources)
 
     if errors:
         flash("Algunos archivos tuvieron problemas de lectura: " + "; ".join(errors), "warning")
 
-    if not dataframes:
-        flash("El archivo no contiene datos legibles.", "warning")
+    if not samples:
+        flash(empty_message, "warning")
         return redirect(url_for("export_import_v2.importar_form"))
 
-    combined_df = pd.concat(dataframes, ignore_index=True)
-    headers = list(combined_df.columns)
+    headers = []
+    for sample in samples:
+        headers.extend(c for c in sample.columns if c not in headers)
     mapping, norm_headers = build_column_mapping(headers)
     mapping = _apply_ai_mapping(headers, mapping)
     if target == "auto" or not target:
         target = detect_target_from_headers(norm_headers)
 
-    # Persistimos un archivo combinado para el paso de procesamiento
-    if len(saved_paths) == 1:
-        tmp_name = os.path.basename(saved_paths[0])
-    else:
-        tmp_name = f"import_combo_{int(time.time())}.csv"
-        tmp_path = os.path.join(TMP_DIR, tmp_name)
-        combined_df.to_csv(tmp_path, index=False)
-
-    if len(uploaded_files) > 1:
-        flash(f"Se cargaron {len(uploaded_files)} archivos. Se combinaron para la vista previa y el procesamiento.", "info")
-
-    preview_rows = combined_df.head(10).to_dict(orient="records")
+    tmp_name = _write_manifest(manifest_files, headers)
+    preview_rows = pd.concat(samples, ignore_index=True).head(10).to_dict(orient="records")
+    estimates = [f["rows_estimate"] for m in manifest_files for f in m["frames"]]
 
     return render_template(
         "importador_universal.html",
@@ -793,15 +736,48 @@ def importar_preview():
         preview_rows=preview_rows,
         detected_target=target,
         file_previews=file_previews,
-        combined_shape={"rows": len(combined_df), "cols": len(combined_df.columns)},
+        combined_shape={
+            "rows": sum(e or 0 for e in estimates),
+            "cols": len(headers),
+            "estimated": any(f["estimated"] for f in file_previews),
+        },
     )
 
 
+@export_import_bp.route('/importador/preview', methods=['POST'])
+def importar_preview():
+    target = request.form.get("target", "auto")
+
+    # Permitir varios archivos a la vez; si no hay lista, intentar con el campo legacy "file"
+    uploaded_files = [f for f in request.files.getlist("files") if f and f.filename]
+    if not uploaded_files:
+        legacy = request.files.get("file")
+        if legacy and legacy.filename:
+            uploaded_files = [legacy]
+
+    if not uploaded_files:
+        flash("Debes seleccionar al menos un archivo CSV o Excel.", "danger")
+        return redirect(url_for("export_import_v2.importar_form"))
+
+    sources = []
+    for f in uploaded_files:
+        tmp_name = f"import_{int(time.time() * 1000)}_{secure_filename(f.filename)}"
+        tmp_path = os.path.join(TMP_DIR, tmp_name)
+        f.save(tmp_path)
+        sources.append((f.filename, tmp_path, True))
+
+    if len(uploaded_files) > 1:
+        flash(f"Se cargaron {len(uploaded_files)} archivos. Se combinaron para la vista previa y el procesamiento.", "info")
+
+    return _render_preview(sources, target)
+
+
 @export_import_bp.route('/importador/preview_folder', methods=['POST'])
 def importar_preview_folder():
     """
     Analiza una carpeta completa de archivos, los combina y presenta una vista previa para mapeo.
     Similar a la funcionalidad "Get Data from Folder" de Power BI.
+    Solo se muestrea cada archivo; el procesamiento los lee directamente desde la carpeta.
     """
     folder_alias = request.form.get("folder_source")
     target = request.form.get("target", "auto")
@@ -823,72 +799,13 @@ def importar_preview_folder():
         return redirect(url_for("export_import_v2.importar_form"))
 
     allowed_ext = (".csv", ".xls", ".xlsx")
-    files = [f for f in os.listdir(folder_path) if f.lower().endswith(allowed_ext)]
+    files = sorted(f for f in os.listdir(folder_path) if f.lower().endswith(allowed_ext))
     if not files:
         flash("La carpeta no contiene archivos CSV/Excel para importar.", "warning")
         return redirect(url_for("export_import_v2.importar_form"))
 
-    dataframes = []
-    file_previews = []
-    errors = []
-
-    seen_headers = set()
-    for name in files:
-        path = os.path.join(folder_path, name)
-        try:
-            loaded_frames = load_dataframes(path)
-            for df in loaded_frames:
-                cleaned = _clean_dataframe(df)
-                header_key = tuple(cleaned.columns)
-                if header_key in seen_headers:
-                    continue
-                seen_headers.add(header_key)
-                dataframes.append(_deduplicate_columns(cleaned))
-                file_previews.append({
-                    "name": name,
-                    "rows": len(cleaned),
-                    "cols": len(cleaned.columns),
-                    "headers": list(cleaned.columns)[:10],
-                })
-        except Exception as e:
-            errors.append(f"{name}: {e}")
-
-    if errors:
-        flash("Algunos archivos tuvieron problemas de lectura: " + "; ".join(errors), "warning")
-
-    if not dataframes:
-        flash("No se encontraron datos legibles en la carpeta.", "warning")
-        return redirect(url_for("export_import_v2.importar_form"))
-
-    combined_df = pd.concat(dataframes, ignore_index=True)
-    headers = list(combined_df.columns)
-    mapping, norm_headers = build_column_mapping(headers)
-    mapping = _apply_ai_mapping(headers, mapping)
-    if target == "auto" or not target:
-        target = detect_target_from_headers(norm_headers)
-
-    tmp_name = f"folder_import_{int(time.time())}.csv"
-    tmp_path = os.path.join(TMP_DIR, tmp_name)
-    combined_df.to_csv(tmp_path, index=False)
-
-    preview_rows = combined_df.head(10).to_dict(orient="records")
-
-    return render_template(
-        "importador_universal.html",
-        modules=MODULES,
-        export_formats=EXPORT_FORMATS,
-        tmp_file=tmp_name,
-        target=target,
-        headers=headers,
-        column_mapping=mapping,
-        preview_rows=preview_rows,
-        detected_target=target,
-        file_previews=file_previews,
-        combined_shape={"rows": len(combined_df), "cols": len(combined_df.columns)},
-    )
-
-# Aquí iría la lógica para combinar archivos y generar la vista previa, similar a importar_preview
-    return redirect(url_for("export_import_v2.importar_form"))
+    sources = [(name, os.path.join(folder_path, name), False) for name in files]
+    return _render_preview(sources, target, "No se encontraron datos legibles en la carpeta.")
 
 
 @export_import_bp.route('/importador/procesar', methods=['POST'])
@@ -908,60 +825,193 @@ def importar_procesar():
         flash("El archivo temporal ya no existe. Vuelve a subir el archivo.", "danger")
         return redirect(url_for("export_import_v2.importar_form"))
 
-    try:
-        dataframes = load_dataframes(tmp_path)
-    except Exception as e:
-        flash(f"Error leyendo el archivo: {e}", "danger")
-        return redirect(url_for("export_import_v2.importar_form"))
+    # La importación corre en segundo plano; el avance se consulta en /importador/status?job=<id>
+    job_id = submit_job("importador", {
+        "tmp_file": tmp_file,
+        "target": target,
+        "user_mapping": user_mapping,
+        "selected_columns": selected_columns,
+    })
+    status_url = url_for("export_import_v2.import_status", job=job_id)
+    if request.accept_mimetypes.best == "application/json" or request.headers.get("X-Requested-With") == "XMLHttpRequest":
+        return jsonify({"job_id": job_id, "status_url": status_url}), 202
+
+    flash(f"Importación en proceso (trabajo #{job_id}). Puedes seguir el avance en {status_url}", "info")
+    return redirect(url_for("export_import_v2.importar_form"))
 
-    total_inserted = 0
-    total_updated = 0
-    total_staged = 0
-    all_errors = []
-
-    for df in dataframes:
-        df = _clean_dataframe(df)
-        if selected_columns:
-            usable_cols = [c for c in selected_columns if c in df.columns]
-            if usable_cols:
-                df = df[usable_cols]
-        headers = list(df.columns)
-        # Usar el mapeo del usuario si está disponible; completar con autodetección.
-        # Si una columna queda sin mapear, se envía como None para que se guarde en import_unmapped.
-        auto_mapping, norm_headers = build_column_mapping(headers)
-        final_mapping = {}
-        for i, header in enumerate(headers):
-            user_choice = user_mapping.get(f"map-{i}", "").strip()
-            if user_choice:
-                final_mapping[header] = user_choice  # elección explícita del usuario
-            else:
-                final_mapping[header] = auto_mapping.get(header)  # puede ser None y se usará para staging
 
-        current_target = detect_target_from_headers(norm_headers) if target == "auto" else target
-        inserted, updated, errors, staged = import_rows(df, current_target, final_mapping, source=tmp_file)
-        total_inserted += inserted
-        total_updated += updated
-        total_staged += staged
-        all_errors.extend(errors)
+def _frame_mapping(headers, choices, target):
+    """Mapeo final de columnas y destino para una hoja. choices: {encabezado: campo elegido}."""
+    # Usar el mapeo del usuario si está disponible; completar con autodetección.
+    # Si una columna queda sin mapear, se envía como None para que se guarde en import_unmapped.
+    auto_mapping, norm_headers = build_column_mapping(headers)
+    final_mapping = {}
+    for header in headers:
+        user_choice = choices.get(header)
+        if user_choice:
+            final_mapping[header] = user_choice  # elección explícita del usuario
+        else:
+            final_mapping[header] = auto_mapping.get(header)  # puede ser None y se usará para staging
+    current_target = detect_target_from_headers(norm_headers) if target == "auto" else target
+    return final_mapping, current_target
+
+
+def _user_choices(user_mapping, headers):
+    """Convierte los campos map-<i> del formulario en {encabezado: campo}."""
+    choices = {}
+    for key, value in user_mapping.items():
+        index = key[len("map-"):]
+        if value.strip() and index.isdigit() and int(index) < len(headers):
+            choices[headers[int(index)]] = value.strip()
+    return choices
+
+
+def _import_sources(tmp_path):
+    """
+    Archivos a importar: los del manifiesto de la vista previa (con sus hojas)
+    o el archivo temporal directamente. Devuelve (fuentes, encabezados del manifiesto).
+    """
+    if os.path.basename(tmp_path).startswith(MANIFEST_PREFIX):
+        with open(tmp_path, "r", encoding="utf-8") as f:
+            manifest = pyjson.load(f)
+        return manifest["files"], manifest["headers"]
+    return [{"name": os.path.basename(tmp_path), "path": tmp_path, "temporary": True, "frames": None}], None
 
+
+def _rows_estimate(sources):
+    """
+    Filas aproximadas de todas las fuentes: las del manifiesto ya traen la
+    estimación; para un archivo subido directamente se toma de preview_file.
+    None si alguna hoja no se puede estimar.
+    """
+    estimates = []
+    for source in sources:
+        frames = source["frames"]
+        if frames is None:
+            try:
+                frames = preview_file(source["path"])
+            except Exception:
+                return None
+        estimates.extend(f.get("rows_estimate") for f in frames)
+    if not estimates or None in estimates:
+        return None
+    return sum(estimates)
+
+
+@job_handler("importador")
+def run_import_job(job):
+    """
+    Importa por lotes de lectura, directamente desde los archivos originales
+    (sin cargarlos completos). El punto de control es el archivo, la hoja y
+    la siguiente fila por importar.
+    """
+    params = job.params
+    tmp_file = params["tmp_file"]
+    target = params["target"]
+    user_mapping = params.get("user_mapping") or {}
+    selected_columns = params.get("selected_columns") or []
+    tmp_path = os.path.join(TMP_DIR, tmp_file)
+    sources, manifest_headers = _import_sources(tmp_path)
+    choices = _user_choices(user_mapping, manifest_headers) if manifest_headers else None
+
+    checkpoint = job.checkpoint or {}
+    resume_source = checkpoint.get("source", 0)
+    resume_frame = checkpoint.get("frame", 0)
+    resume_row = checkpoint.get("row", 0)
+    processed = checkpoint.get("processed", 0)
+    totals = checkpoint.get("totals") or {"inserted": 0, "updated": 0, "staged": 0, "errors": 0}
+    error_sample = checkpoint.get("error_sample") or []
+    error_summary = checkpoint.get("error_summary") or {}
+
+    rows_estimate = _rows_estimate(sources)
+    if rows_estimate is not None:
+        job.progress(total=rows_estimate)
+
+    # Las importaciones de inventario recalculan el resumen al final en vez de
+    # actualizarlo fila a fila con los triggers
+    if target == "auto" or TABLE_ALIASES.get(target, target) == SUMMARY_SOURCE_TABLE:
+        summary = deferred_summary(rows=rows_estimate, job_id=job.id)
+    else:
+        summary = nullcontext()
+
+    # Salir del manejador termina el trabajo (hecho, fallido o cancelado): los
+    # temporales se borran siempre; si el proceso cae se conservan para reanudar
     try:
-        os.remove(tmp_path)
-    except Exception:
-        pass
+        with summary:
+            for position, source in enumerate(sources):
+                if position < resume_source:
+                    continue
+                allowed = {f["frame"] for f in source["frames"]} if source["frames"] is not None else None
+                mappings = {}
+                for frame, batch in iter_dataframes(source["path"]):
+                    if allowed is not None and frame not in allowed:
+                        continue
+                    if position == resume_source:
+                        if frame < resume_frame:
+                            continue
+                        if frame == resume_frame and resume_row:
+                            batch = batch[batch.index >= resume_row]
+                            if batch.empty:
+                                continue
+                    batch = _deduplicate_columns(_clean_dataframe(batch))
+                    if selected_columns:
+                        usable_cols = [c for c in selected_columns if c in batch.columns]
+                        if usable_cols:
+                            batch = batch[usable_cols]
+                    if frame not in mappings:
+                        headers = list(batch.columns)
+                        frame_choices = choices if choices is not None else _user_choices(user_mapping, headers)
+                        mappings[frame] = _frame_mapping(headers, frame_choices, target)
+                    final_mapping, current_target = mappings[frame]
+                    base = dict(totals)
+
+                    def on_chunk(part, position=position, frame=frame, batch=batch, base=base, done=processed):
+                        rows = part["rows"]
+                        if not rows:
+                            return
+                        current = {k: base[k] + part[k] for k in base}
+                        job.progress(
+                            processed=done + rows,
+                            checkpoint={
+                                "source": position,
+                                "frame": frame,
+                                "row": int(batch.index[rows - 1]) + 1,
+                                "processed": done + rows,
+                                "totals": current,
+                                "error_sample": error_sample,
+                                "error_summary": error_summary,
+                            },
+                            **current,
+                        )
+
+                    inserted, updated, errors, staged = import_rows(
+                        batch, current_target, final_mapping, source=source["name"], on_chunk=on_chunk
+                    )
+                    totals = {
+                        "inserted": base["inserted"] + inserted,
+                        "updated": base["updated"] + updated,
+                        "staged": base["staged"] + staged,
+                        "errors": base["errors"] + len(errors),
+                    }
+                    error_sample = (error_sample + errors)[:20]
+                    error_summary = summarize_errors(errors, error_summary)
+                    processed += len(batch)
+    finally:
+        for path in [src["path"] for src in sources if src["temporary"]] + [tmp_path]:
+            try:
+                os.remove(path)
+            except Exception:
+                pass
+    job.progress(processed=processed, total=processed)
 
-    flash(f"Importación completada. Nuevos: {total_inserted}, Actualizados: {total_updated}.", "success")
-    if all_errors:
-        flash(f"{len(all_errors)} advertencias / errores. Ejemplo:", "warning")
-        for e in all_errors[:5]:
-            flash(e, "warning")
-    if total_staged:
-        flash(f"{total_staged} filas guardadas con columnas no mapeadas (staging import_unmapped). Ajusta el mapeo o revisa esos datos.", "info")
     try:
-        _log_import_summary(target, total_inserted, total_updated, len(all_errors), tmp_file, total_staged)
+        _log_import_summary(target, totals["inserted"], totals["updated"], totals["errors"], tmp_file, totals["staged"])
     except Exception as e:
-        flash(f"No se pudo registrar el log de importaciA3n: {e}", "warning")
+        error_sample.append(f"No se pudo registrar el log de importación: {e}")
+    # Un solo registro con los errores agrupados por causa, no uno por fila
+    log_import_errors(error_summary, source=tmp_file, target=target)
 
-    return redirect(url_for("export_import_v2.importar_form"))
+    return dict(totals, processed=processed, error_sample=error_sample[:5], errors_by_cause=top_errors(error_summary))
 
 
 def _log_import_summary(target: str, inserted: int, updated: int, errors: int, source: str = "", staged: int = 0):
@@ -1097,7 +1147,24 @@ def _apply_ai_mapping(headers, mapping):
 
 @export_import_bp.route('/importador/status', methods=['GET'])
 def import_status():
-    """Devuelve estado reciente de importaciones y conteo de tablas para refrescar tabs."""
+    """
+    Devuelve estado reciente de importaciones y conteo de tablas para refrescar tabs.
+    Con ?job=<id> devuelve el avance de ese trabajo; con ?job=<id>&stream=1 (o
+    Accept: text/event-stream) lo transmite como eventos SSE hasta que termina.
+    """
+    job_id = request.args.get("job", type=int)
+    if job_id:
+        if request.args.get("stream") or request.accept_mimetypes.best == "text/event-stream":
+            return Response(
+                stream_job(job_id),
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+        job = get_job(job_id)
+        if job is None:
+            return jsonify({"error": "Trabajo no encontrado"}), 404
+        return jsonify(job)
+
     conn = get_db_connection()
     cur = conn.cursor()
     try:
@@ -1128,7 +1195,16 @@ def import_status():
         table_counts = []
 
     conn.close()
-    return jsonify({"logs": logs, "tables": table_counts})
+    return jsonify({"logs": logs, "tables": table_counts, "jobs": list_jobs(kind="importador", limit=5)})
+
+
+@export_import_bp.route('/importador/jobs/<int:job_id>/cancel', methods=['POST'])
+def cancel_import_job(job_id):
+    """Cancela un trabajo de importación; lo ya confirmado por bloques se conserva."""
+    job = cancel_job(job_id)
+    if job is None:
+        return jsonify({"error": "Trabajo no encontrado"}), 404
+    return jsonify(job)
 
 
 @export_import_bp.route('/importador/unmapped.csv', methods=['GET'])
@@ -0,0 +1,204 @@
+"""
+Exportaciones en streaming (CSV, JSON, TXT).
+
+En lugar de cargar la tabla completa (fetchall / pd.read_sql_query) y copiarla
+a un buffer, QueryStream recorre el cursor por lotes con fetchmany; en
+PostgreSQL usa un cursor con nombre (del lado del servidor) para que el
+resultado tampoco se materialice en el cliente. Los codificadores producen
+bytes lote a lote y streaming_response los envía de inmediato, con gzip
+opcional si el cliente lo acepta.
+
+La respuesta se sigue enviando después del teardown de la petición, así que el
+stream toma su propia conexión del pool (no la prestada a la petición) y la
+devuelve al terminar o al cerrarse la respuesta.
+
+    stream = QueryStream("SELECT * FROM empleados")
+    return streaming_response(csv_chunks(stream), stream, "text/csv", "empleados.csv")
+
+Las exportaciones de tablas completas usan export_query(), que omite las
+columnas que mantiene la propia app (INTERNAL_COLUMNS).
+"""
+
+import csv
+import io
+import json
+import os
+import sqlite3
+import uuid
+import zlib
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Response, request
+
+from modules.db_utils import get_db_connection, get_pool
+from modules.employee_links import LINK_COLUMN
+from modules.inventory_tabs import CATEGORY_FLAGS
+
+# Filas por fetchmany y por bloque enviado al cliente
+STREAM_BATCH_ROWS = int(os.getenv("STREAM_BATCH_ROWS", "1000"))
+# Comprimir con gzip cuando el cliente lo acepta (desactivar con 0 si un proxy ya comprime)
+STREAM_GZIP = os.getenv("STREAM_EXPORT_GZIP", "1") != "0"
+
+# Columnas calculadas por triggers (marcas de categoría del tablero y vínculo
+# con empleados), no datos del usuario
+INTERNAL_COLUMNS = frozenset(CATEGORY_FLAGS + (LINK_COLUMN,))
+
+
+def export_query(table, conn=None):
+    """SELECT de todas las columnas de `table` salvo INTERNAL_COLUMNS."""
+    own = conn is None
+    conn = conn or get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(f"SELECT * FROM {table} WHERE 1 = 0")
+        columns = [d[0] for d in cur.description]
+    finally:
+        cur.close()
+        if own:
+            conn.close()
+    public = [col for col in columns if col not in INTERNAL_COLUMNS]
+    if len(public) == len(columns):
+        return f"SELECT * FROM {table}"
+    return f"SELECT {', '.join(public)} FROM {table}"
+
+
+class QueryStream:
+    """
+    Resultado de una consulta leído por lotes. La consulta se ejecuta (y se lee
+    el primer lote) al crearlo, de modo que los errores de SQL ocurren antes de
+    enviar cabeceras y `columns` ya está disponible.
+    """
+
+    def __init__(self, sql, params=(), batch_size=None):
+        self.batch_size = batch_size or STREAM_BATCH_ROWS
+        self._conn = get_pool().acquire()
+        self._cursor = None
+        try:
+            raw = getattr(self._conn, "_raw", None)
+            if raw is not None and type(raw).__module__.startswith("psycopg2"):
+                # Cursor con nombre: PostgreSQL entrega el resultado por partes
+                self._cursor = raw.cursor(name=f"export_{uuid.uuid4().hex}")
+                self._cursor.itersize = self.batch_size
+            else:
+                self._cursor = self._conn.cursor()
+            self._cursor.execute(sql, params)
+            # En cursores con nombre, description solo existe tras el primer fetch
+            self._first = self._cursor.fetchmany(self.batch_size)
+            self.columns = [d[0] for d in self._cursor.description or []]
+        except Exception:
+            self.close()
+            raise
+
+    def batches(self):
+        """Lotes de filas (tuplas) hasta agotar el cursor; cierra al terminar."""
+        try:
+            rows, self._first = self._first, None
+            while rows:
+                yield [tuple(row) for row in rows]
+                rows = self._cursor.fetchmany(self.batch_size)
+        finally:
+            self.close()
+
+    def close(self):
+        """Libera cursor y conexión (se puede llamar varias veces)."""
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            if self._cursor is not None:
+                self._cursor.close()
+        except Exception:
+            pass
+        finally:
+            if not isinstance(conn, sqlite3.Connection):
+                try:
+                    conn.rollback()  # termina la transacción del cursor con nombre
+                except Exception:
+                    pass
+            conn.close()
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).decode("utf-8", errors="replace")
+    return str(value)
+
+
+def csv_chunks(stream, bom=False):
+    """CSV con encabezado; bom=True antepone el BOM UTF-8 que espera Excel."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(stream.columns)
+    prefix = "\ufeff" if bom else ""
+    for rows in stream.batches():
+        writer.writerows(rows)
+        yield (prefix + buffer.getvalue()).encode("utf-8")
+        prefix = ""
+        buffer.seek(0)
+        buffer.truncate()
+    if prefix or buffer.tell():
+        yield (prefix + buffer.getvalue()).encode("utf-8")
+
+
+def json_chunks(stream):
+    """Arreglo JSON de objetos {columna: valor}, escrito registro a registro."""
+    columns = stream.columns
+    separator = "[\n"
+    for rows in stream.batches():
+        parts = []
+        for row in rows:
+            parts.append(separator + json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=_json_default))
+            separator = ",\n"
+        yield "".join(parts).encode("utf-8")
+    yield ("[]\n" if separator == "[\n" else "\n]\n").encode("utf-8")
+
+
+def txt_chunks(stream, title):
+    """Reporte de texto plano: un bloque "columna: valor" por registro."""
+    yield (f"REPORTE DE {title.upper()}\n" + "=" * 50 + "\n\n").encode("utf-8")
+    columns = stream.columns
+    for rows in stream.batches():
+        parts = []
+        for row in rows:
+            for col, value in zip(columns, row):
+                parts.append(f"{col}: {value}\n")
+            parts.append("-" * 30 + "\n")
+        yield "".join(parts).encode("utf-8")
+
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: formato gzip
+    for chunk in chunks:
+        # SYNC_FLUSH por bloque: el cliente recibe cada lote sin esperar al final
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def _client_accepts_gzip():
+    if not STREAM_GZIP or request.args.get("gzip") == "0":
+        return False
+    return "gzip" in request.headers.get("Accept-Encoding", "").lower()
+
+
+def streaming_response(chunks, stream, mimetype, filename):
+    """
+    Respuesta que envía `chunks` a medida que se generan. Se cierra el stream
+    aunque el cliente se desconecte antes de empezar a leer.
+    """
+    headers = {
+        "Content-Disposition": f"attachment; filename={filename}",
+        # Evitar que nginx acumule la respuesta completa antes de enviarla
+        "X-Accel-Buffering": "no",
+        "Vary": "Accept-Encoding",
+    }
+    if _client_accepts_gzip():
+        chunks = _gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    response = Response(chunks, mimetype=mimetype, headers=headers)
+    response.call_on_close(stream.close)
+    return response
@@ -3,11 +3,12 @@ EXTENSIONES PARA modules/inventarios.py
 Agregar estas rutas a tu módulo existente
 """
 
-from flask import Blueprint, request, jsonify, send_file
-import sqlite3
+from flask import Blueprint, request, jsonify
 from datetime import datetime
-import pandas as pd
-from io import BytesIO
+from modules.db_utils import get_db_connection
+from modules.excel_export import StreamingWorkbook, xlsx_response
+from modules.export_stream import QueryStream, csv_chunks, streaming_response
+from modules.inventory_summary import summary_rows, summary_totals
 
 # Crear blueprint (si lo usas independiente)
 # Si lo integras en inventarios.py existente, usa el blueprint que ya tienes
@@ -27,8 +28,7 @@ def buscar_serial_masivo():
         if not seriales:
             return jsonify({'success': False, 'error': 'No se proporcionaron seriales'}), 400
         
-        conn = sqlite3.connect('workmanager_erp.db')
-        conn.row_factory = sqlite3.Row
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         placeholders = ','.join(['?' for _ in seriales])
@@ -58,54 +58,32 @@ def buscar_serial_masivo():
 def estadisticas_completas():
     """Estadísticas detalladas del inventario"""
     try:
-        conn = sqlite3.connect('workmanager_erp.db')
+        conn = get_db_connection()
         cursor = conn.cursor()
         
-        # Total
-        cursor.execute("SELECT COUNT(*) FROM equipos_individuales")
-        total = cursor.fetchone()[0]
+        # Totales, asignados y disponibles (resumen materializado)
+        totales = summary_totals(conn)
+        total = totales['total']
+        asignados = totales['con_asignado']
+        disponibles = totales['disponible_si']
         
         # Por estado
-        cursor.execute("""
-            SELECT estado, COUNT(*) 
-            FROM equipos_individuales 
-            WHERE estado IS NOT NULL
-            GROUP BY estado
-        """)
-        por_estado = {row[0]: row[1] for row in cursor.fetchall()}
+        por_estado = {row['clave']: row['total'] for row in summary_rows(conn, 'estado') if row['clave']}
         
         # Por sede
-        cursor.execute("""
-            SELECT s.nombre, COUNT(ei.id) as total
-            FROM equipos_individuales ei
-            LEFT JOIN sedes s ON ei.sede_id = s.id
-            WHERE s.nombre IS NOT NULL
-            GROUP BY s.nombre
-            ORDER BY total DESC
-        """)
-        por_sede = {row[0]: row[1] for row in cursor.fetchall()}
+        cursor.execute("SELECT id, nombre FROM sedes WHERE nombre IS NOT NULL")
+        nombres = {str(row[0]): row[1] for row in cursor.fetchall()}
+        por_sede = {}
+        for row in summary_rows(conn, 'sede'):
+            if row['clave'] in nombres:
+                nombre = nombres[row['clave']]
+                por_sede[nombre] = por_sede.get(nombre, 0) + row['total']
         
         # Por tecnología
-        cursor.execute("""
-            SELECT tecnologia, COUNT(*) 
-            FROM equipos_individuales 
-            WHERE tecnologia IS NOT NULL
-            GROUP BY tecnologia
-            ORDER BY COUNT(*) DESC
-            LIMIT 10
-        """)
-        por_tecnologia = {row[0]: row[1] for row in cursor.fetchall()}
-        
-        # Asignados vs Disponibles
-        cursor.execute("""
-            SELECT 
-                SUM(CASE WHEN asignado_nuevo IS NOT NULL AND asignado_nuevo != '' THEN 1 ELSE 0 END) as asignados,
-                SUM(CASE WHEN disponible = 'Si' THEN 1 ELSE 0 END) as disponibles
-            FROM equipos_individuales
-        """)
-        row = cursor.fetchone()
-        asignados = row[0] or 0
-        disponibles = row[1] or 0
+        por_tecnologia = {
+            row['clave']: row['total'] for row in summary_rows(conn, 'tecnologia') if row['clave']
+        }
+        por_tecnologia = dict(list(por_tecnologia.items())[:10])
         
         conn.close()
         
@@ -128,8 +106,7 @@ def estadisticas_completas():
 def equipos_empleado(cedula):
     """Obtener todos los equipos asignados a un empleado"""
     try:
-        conn = sqlite3.connect('workmanager_erp.db')
-        conn.row_factory = sqlite3.Row
+        conn = get_db_connection()
         cursor = conn.cursor()
         
         # Obtener empleado
@@ -163,12 +140,8 @@ def equipos_empleado(cedula):
 
 @extensiones_bp.route('/api/exportar_inventario_completo')
 def exportar_inventario_completo():
-    """Exportar inventario completo a Excel"""
-    try:
-        conn = sqlite3.connect('workmanager_erp.db')
-        
-        # Cargar datos
-        df = pd.read_sql_query("""
+    """Exportar inventario completo a Excel (o CSV en streaming con ?formato=csv)"""
+    query = """
             SELECT 
                 ei.*,
                 s.nombre as sede_nombre,
@@ -176,23 +149,21 @@ def exportar_inventario_completo():
             FROM equipos_individuales ei
             LEFT JOIN sedes s ON ei.sede_id = s.id
             ORDER BY ei.id DESC
-        """, conn)
-        
-        conn.close()
-        
+        """
+    try:
+        # Cargar datos por lotes desde el cursor
+        stream = QueryStream(query)
+        nombre = f'inventario_completo_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
+        if request.args.get('formato') == 'csv':
+            return streaming_response(csv_chunks(stream, bom=True), stream, 'text/csv', nombre + '.csv')
+
         # Crear Excel
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='Inventario Completo', index=False)
-        
-        output.seek(0)
-        
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'inventario_completo_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        )
+        try:
+            book = StreamingWorkbook()
+            book.add_sheet('Inventario Completo', stream.columns).write_batches(stream.batches())
+        finally:
+            stream.close()
+        return xlsx_response(book, nombre + '.xlsx')
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -1,10 +1,11 @@
-import os
-import sqlite3
 from datetime import datetime
 from flask import (
     Blueprint, render_template, request,
     redirect, url_for, flash, jsonify
 )
+from modules.db_utils import get_db_connection
+from modules.employee_links import employee_ref, links_ready, unresolved_names
+from modules.jobs import submit_job
 
 gestion_humana_bp = Blueprint(
     "gestion_humana",
@@ -13,18 +14,17 @@ gestion_humana_bp = Blueprint(
     template_folder="../templates"
 )
 
-DB_PATH = os.path.join(
-    os.path.dirname(os.path.abspath(__file__)),
-    "..",
-    "workmanager_erp.db"
-)
+_SCHEMA_READY = set()
 
 
 def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    _ensure_employee_columns(conn)
-    _ensure_hr_tables(conn)
+    conn = get_db_connection()
+    # Las verificaciones de esquema solo se ejecutan una vez por base de datos y proceso.
+    key = conn._pool.key
+    if key not in _SCHEMA_READY:
+        _ensure_employee_columns(conn)
+        _ensure_hr_tables(conn)
+        _SCHEMA_READY.add(key)
     return conn
 
 
@@ -854,18 +854,15 @@ def hoja_vida_empleado(empleado_id):
     """, (empleado_id,))
     solicitudes = cur.fetchall()
 
-    # Historial de equipos asignados
-    cur.execute("""
-        SELECT ei.*, 'individual' as tipo
-        FROM equipos_individuales ei
-        WHERE ei.asignado_nuevo = ? OR ei.codigo_barras_individual = ?
-        UNION
-        SELECT ea.*, 'agrupado' as tipo
-        FROM equipos_agrupados ea
-        WHERE ea.asignado_actual = ?
-        ORDER BY created_at DESC
-    """, (f"{empleado['nombre']} {empleado['apellido'] or ''}".strip(), empleado["codigo_unico_hv_equipo"] or "", f"{empleado['nombre']} {empleado['apellido'] or ''}".strip()))
-    equipos = cur.fetchall()
+    # Historial de equipos asignados (vínculo resuelto en empleado_id)
+    equipos = []
+    for tabla, tipo in (("equipos_individuales", "individual"), ("equipos_agrupados", "agrupado")):
+        cur.execute(
+            f"SELECT t.*, '{tipo}' as tipo FROM {tabla} t WHERE {employee_ref(conn, tabla, 't')} = ?",
+            (empleado_id,),
+        )
+        equipos.extend(cur.fetchall())
+    equipos.sort(key=lambda equipo: equipo["created_at"] or "", reverse=True)
 
     conn.close()
 
@@ -878,6 +875,33 @@ def hoja_vida_empleado(empleado_id):
     )
 
 
+@gestion_humana_bp.route("/empleados/vinculos/sin-resolver", methods=["GET"])
+def vinculos_sin_resolver():
+    """
+    Textos de asignación (equipos y licencias) que no corresponden a un único
+    empleado: sin coincidencias o con varios candidatos.
+    """
+    conn = get_conn()
+    if not links_ready(conn):
+        return jsonify({
+            "success": False,
+            "message": "Vínculos no instalados en esta base de datos (python migrate.py esquema)",
+        }), 400
+    limit = request.args.get("limit", 500, type=int)
+    return jsonify({"success": True, "pendientes": unresolved_names(conn, limit=limit)})
+
+
+@gestion_humana_bp.route("/empleados/vinculos/recalcular", methods=["POST"])
+def recalcular_vinculos():
+    """Recalcula empleado_id en todas las tablas vinculadas (trabajo en segundo plano)."""
+    job_id = submit_job("vinculos_empleados", {})
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "status_url": url_for("export_import_v2.import_status", job=job_id),
+    }), 202
+
+
 @gestion_humana_bp.route("/api/search")
 def api_search_empleados():
     """
@@ -1,8 +1,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
-import sqlite3
 import os
 import csv
 from datetime import datetime
+from modules.db_utils import get_db_connection
 
 asignaciones_import_bp = Blueprint(
     "asignaciones_import",
@@ -12,14 +12,8 @@ asignaciones_import_bp = Blueprint(
 )
 
 
-def get_db_path():
-    return os.path.join(current_app.root_path, "workmanager_erp.db")
-
-
 def get_conn():
-    conn = sqlite3.connect(get_db_path())
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_db_connection()
 
 
 def parse_fecha(value: str):
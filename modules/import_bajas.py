@@ -1,8 +1,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
-import sqlite3
 import os
 import csv
 from datetime import datetime
+from modules.db_utils import get_db_connection
 
 bajas_import_bp = Blueprint(
     "bajas_import",
@@ -12,16 +12,6 @@ bajas_import_bp = Blueprint(
 )
 
 
-def get_db_path():
-    return os.path.join(current_app.root_path, "workmanager_erp.db")
-
-
-def get_db_connection():
-    conn = sqlite3.connect(get_db_path())
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
 def parse_date(value: str):
     """
     Intenta convertir la fecha del CSV a un formato YYYY-MM-DD.
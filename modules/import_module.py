@@ -1,9 +1,9 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 import os
 import pandas as pd
-import sqlite3
 from werkzeug.utils import secure_filename
 from datetime import datetime
+from modules.db_utils import get_db_connection
 
 import_bp = Blueprint('import_module', __name__, template_folder='../templates', static_folder='../static')
 
@@ -12,11 +12,6 @@ ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def get_db_connection():
-    db_path = os.path.join(current_app.root_path, 'workmanager_erp.db')
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    return conn
 
 def get_column_mapping(table_name):
     """Retorna el mapeo de columnas según la tabla destino."""
@@ -13,18 +13,25 @@ import glob
 import subprocess
 import sys
 from flask import Blueprint, render_template, jsonify, request, current_app, send_from_directory
+from modules.code_sequences import reserve_codes
+from modules.db_utils import get_db_connection
+from modules.inventory_summary import summary_rows
 
 class InventarioMaestro:
     """
     Clase principal para gestión avanzada de inventario
     """
 
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, conn=None):
         self.db_path = db_path or os.path.join(os.path.dirname(__file__), "..", "..", "workmanager_erp.db")
-        self._ensure_connection()
+        self._ensure_connection(conn)
 
-    def _ensure_connection(self):
+    def _ensure_connection(self, conn=None):
         """Asegura que la conexión a la base de datos esté disponible"""
+        if conn is not None:
+            # Conexión compartida (p. ej. la de la petición en curso)
+            self.conn = conn
+            return
         try:
             self.conn = sqlite3.connect(self.db_path)
             self.conn.row_factory = sqlite3.Row
@@ -59,44 +66,28 @@ class InventarioMaestro:
 
             stats['total_equipos'] = stats['equipos_individuales'] + stats['equipos_agrupados']
 
-            # Estadísticas por estado (individuales)
-            cursor.execute("""
-                SELECT estado, COUNT(*) as cantidad
-                FROM equipos_individuales
-                GROUP BY estado
-            """)
-            for row in cursor.fetchall():
-                estado = row[0] or 'sin_estado'
-                stats['por_estado'][estado] = row[1]
+            # Estadísticas por estado (individuales), desde el resumen materializado
+            for row in summary_rows(self.conn, 'estado'):
+                estado = row['clave'] or 'sin_estado'
+                stats['por_estado'][estado] = row['total']
                 if estado.lower() == 'disponible':
-                    stats['equipos_disponibles'] += row[1]
+                    stats['equipos_disponibles'] += row['total']
                 elif estado.lower() == 'asignado':
-                    stats['equipos_asignados'] += row[1]
+                    stats['equipos_asignados'] += row['total']
                 elif estado.lower() == 'baja':
-                    stats['equipos_baja'] += row[1]
+                    stats['equipos_baja'] += row['total']
 
             # Estadísticas por tecnología
-            cursor.execute("""
-                SELECT tecnologia, COUNT(*) as cantidad
-                FROM equipos_individuales
-                WHERE tecnologia IS NOT NULL AND tecnologia != ''
-                GROUP BY tecnologia
-                ORDER BY cantidad DESC
-            """)
-            for row in cursor.fetchall():
-                stats['por_tecnologia'][row[0]] = row[1]
+            for row in summary_rows(self.conn, 'tecnologia'):
+                if row['clave']:
+                    stats['por_tecnologia'][row['clave']] = row['total']
 
             # Estadísticas por sede
-            cursor.execute("""
-                SELECT s.nombre, COUNT(ei.id) as cantidad
-                FROM equipos_individuales ei
-                LEFT JOIN sedes s ON ei.sede_id = s.id
-                GROUP BY s.nombre
-                ORDER BY cantidad DESC
-            """)
-            for row in cursor.fetchall():
-                sede = row[0] or 'Sin sede asignada'
-                stats['por_sede'][sede] = row[1]
+            cursor.execute("SELECT id, nombre FROM sedes")
+            nombres = {str(row[0]): row[1] for row in cursor.fetchall()}
+            for row in summary_rows(self.conn, 'sede'):
+                sede = nombres.get(row['clave']) or 'Sin sede asignada'
+                stats['por_sede'][sede] = stats['por_sede'].get(sede, 0) + row['total']
 
             return stats
 
@@ -208,11 +199,10 @@ class InventarioMaestro:
 
             # Generar códigos de barras si no existen
             if 'codigo_barras_individual' not in df_procesado.columns or df_procesado['codigo_barras_individual'].isna().all():
-                contador = self._obtener_ultimo_contador()
-                df_procesado['codigo_barras_individual'] = [
-                    self._generar_codigo_barras(row.get('tecnologia'), contador + i)
-                    for i, row in df_procesado.iterrows()
-                ]
+                df_procesado['codigo_barras_individual'] = self._reservar_codigos_barras(
+                    df_procesado['tecnologia'] if 'tecnologia' in df_procesado.columns
+                    else pd.Series([None] * len(df_procesado), index=df_procesado.index)
+                )
 
             # Insertar en base de datos
             registros_insertados = self._insertar_dataframe(df_procesado)
@@ -265,14 +255,8 @@ class InventarioMaestro:
             'observaciones': ['OBSERVACIONES', 'NOTAS', 'COMENTARIOS']
         }
 
-    def _obtener_ultimo_contador(self) -> int:
-        """Obtiene el último contador de códigos de barras"""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM equipos_individuales")
-        return cursor.fetchone()[0]
-
-    def _generar_codigo_barras(self, tecnologia: str, contador: int) -> str:
-        """Genera código de barras único basado en tecnología"""
+    def _codigo_tecnologia(self, tecnologia: str) -> str:
+        """Código corto de la tecnología (PORT, DESK, MON...)"""
         mapeo_tech = {
             'PORTATIL': 'PORT', 'LAPTOP': 'PORT',
             'PC ESCRITORIO': 'DESK', 'DESKTOP': 'DESK',
@@ -284,14 +268,24 @@ class InventarioMaestro:
         }
 
         tech_upper = str(tecnologia).upper() if tecnologia else 'GEN'
-        codigo_tech = 'GEN'
-
         for tech, codigo in mapeo_tech.items():
             if tech in tech_upper:
-                codigo_tech = codigo
-                break
+                return codigo
+        return 'GEN'
 
-        return f"{codigo_tech}-{str(contador).zfill(4)}"
+    def _reservar_codigos_barras(self, tecnologias: pd.Series) -> List[str]:
+        """
+        Un código único por fila con el formato del importador maestro
+        (PORT-0001): reserva en code_sequences un bloque de
+        consecutivos por tecnología (una sentencia por tecnología, no por fila).
+        """
+        codigos_tech = tecnologias.map(self._codigo_tecnologia)
+        codigos = pd.Series(index=tecnologias.index, dtype=object)
+        for codigo_tech, filas in codigos_tech.groupby(codigos_tech).groups.items():
+            codigos[filas] = reserve_codes(
+                self.conn, '', codigo_tech, len(filas), prefix=f"{codigo_tech}-", width=4
+            )
+        return codigos.tolist()
 
     def _insertar_dataframe(self, df: pd.DataFrame, chunk_size: int = 500) -> int:
         """Inserta DataFrame en la base de datos por lotes"""
@@ -428,7 +422,7 @@ inventario_maestro_bp = Blueprint(
 
 
 def _get_maestro_instance():
-    return InventarioMaestro(db_path=os.path.join(PROJECT_ROOT, "workmanager_erp.db"))
+    return InventarioMaestro(conn=get_db_connection())
 
 
 @inventario_maestro_bp.route("/", methods=["GET"])
@@ -1,17 +1,20 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 import sqlite3
-import os
+import json
+import base64
 from datetime import datetime, timezone
+from modules import search
+from modules.code_sequences import reserve_codes
+from modules.db_utils import get_db_connection
+from modules.employee_links import employee_ref
+from modules.inventory_summary import summary_rows
+from modules.inventory_tabs import cached_json, category_filter
 
 inventarios_bp = Blueprint('inventarios', __name__, template_folder='../templates')
 
-DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "workmanager_erp.db")
-
 def get_connection():
-    """Returna conexión con row_factory lista para dicts."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Returna la conexión de la petición (pool de db_utils) con row_factory lista para dicts."""
+    return get_db_connection()
 
 SEDE_LABELS = {
     1: 'Sede Principal Bogota',
@@ -268,8 +271,7 @@ def get_sede_name(sede_id):
 
 
 def get_sedes_options():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
     c = conn.cursor()
     c.execute("SELECT id, nombre, ciudad FROM sedes ORDER BY nombre")
     sedes = [dict(row) for row in c.fetchall()]
@@ -277,43 +279,28 @@ def get_sedes_options():
     return sedes
 
 
+def _codigo_sede(conn, sede_id):
+    cur = conn.cursor()
+    cur.execute("SELECT codigo FROM sedes WHERE id = ? LIMIT 1", (sede_id,))
+    sede_row = cur.fetchone()
+    return sede_row['codigo'] if sede_row and sede_row['codigo'] else "GEN"
+
+
+def _codigo_tecnologia(tecnologia):
+    if not tecnologia:
+        return "TEC"
+    # Tomar las primeras 3 letras y limpiar caracteres no alfanuméricos
+    return ''.join(filter(str.isalnum, tecnologia))[:3].upper()
+
+
 def generar_codigo_individual(conn, sede_id, tecnologia):
     """
     Genera un código de barras individual único basado en la sede y la tecnología.
     Formato: [CODIGO_SEDE]-[CODIGO_TEC]-[CONSECUTIVO]
     Ejemplo: MED-MON-001
+    El consecutivo se reserva en code_sequences; no hace commit.
     """
-    cur = conn.cursor()
-
-    # 1. Obtener código de la sede (ej: MED para Medellín)
-    cur.execute("SELECT codigo FROM sedes WHERE id = ? LIMIT 1", (sede_id,))
-    sede_row = cur.fetchone()
-    sede_code = sede_row['codigo'] if sede_row and sede_row['codigo'] else "GEN"
-
-    # 2. Obtener código de la tecnología (ej: MON para Monitor)
-    tec_code = "TEC"
-    if tecnologia:
-        # Tomar las primeras 3 letras y limpiar caracteres no alfanuméricos
-        tec_code = ''.join(filter(str.isalnum, tecnologia))[:3].upper()
-
-    # 3. Encontrar el último consecutivo para esta combinación
-    prefix = f"{sede_code}-{tec_code}-"
-    cur.execute("""
-        SELECT codigo_barras_individual FROM equipos_individuales
-        WHERE codigo_barras_individual LIKE ?
-        ORDER BY codigo_barras_individual DESC
-        LIMIT 1
-    """, (f"{prefix}%",))
-    last_code_row = cur.fetchone()
-
-    last_num = 0
-    if last_code_row:
-        try:
-            last_num = int(last_code_row['codigo_barras_individual'].split('-')[-1])
-        except (ValueError, IndexError):
-            last_num = 0
-
-    return f"{prefix}{str(last_num + 1).zfill(3)}"
+    return reserve_codes(conn, _codigo_sede(conn, sede_id), _codigo_tecnologia(tecnologia), 1)[0]
 
 def generar_codigo_agrupado(conn, sede_id):
     """
@@ -321,29 +308,10 @@ def generar_codigo_agrupado(conn, sede_id):
     Formato: [CODIGO_SEDE]-AGRU-[CONSECUTIVO]
     Ejemplo: MED-AGRU-001
     """
-    cur = conn.cursor()
-    cur.execute("SELECT codigo FROM sedes WHERE id = ? LIMIT 1", (sede_id,))
-    sede_row = cur.fetchone()
-    sede_code = sede_row['codigo'] if sede_row and sede_row['codigo'] else "GEN"
-
-    prefix = f"{sede_code}-AGRU-"
-    cur.execute(
-        """
-        SELECT codigo_barras_unificado FROM equipos_agrupados
-        WHERE codigo_barras_unificado LIKE ?
-        ORDER BY codigo_barras_unificado DESC
-        LIMIT 1
-        """,
-        (f"{prefix}%",),
-    )
-    last_code_row = cur.fetchone()
-    last_num = 0
-    if last_code_row:
-        try:
-            last_num = int(last_code_row['codigo_barras_unificado'].split('-')[-1])
-        except (ValueError, IndexError):
-            last_num = 0
-    return f"{prefix}{str(last_num + 1).zfill(3)}"
+    return reserve_codes(
+        conn, _codigo_sede(conn, sede_id), "AGRU", 1,
+        table="equipos_agrupados", column="codigo_barras_unificado",
+    )[0]
 
 def build_individual_payload(form):
     data = {}
@@ -403,6 +371,8 @@ def api_generar_codigo():
     conn = get_connection()
     try:
         codigo = generar_codigo_individual(conn, sede_id, tecnologia)
+        # El código queda reservado aunque el formulario no se envíe
+        conn.commit()
     finally:
         conn.close()
     return jsonify({'codigo': codigo})
@@ -537,8 +507,7 @@ def normalize_inventory_item(row, item_type='individual'):
 
 @inventarios_bp.route('/inventarios')
 def inventarios():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
     c = conn.cursor()
 
     # Get grouped equipment with statistics
@@ -579,274 +548,176 @@ def inventarios():
         sede_labels=SEDE_LABELS,
     )
 
-@inventarios_bp.route('/inventarios/api/dashboard', methods=['GET'])
-def api_inventarios_dashboard():
-    """
-    Devuelve datasets listos para poblar las pestañas adicionales del inventario.
-    Todo se alimenta de las tablas del inventario general (individual, agrupado, bajas y tandas).
-    """
-    conn = get_connection()
-    c = conn.cursor()
-    try:
-        # Equipos agrupados (resumen)
-        c.execute("""
-            SELECT id, codigo_barras_unificado, descripcion_general, estado_general,
-                   asignado_actual, sede_id, nit, observaciones, fecha_creacion
-              FROM equipos_agrupados
-             ORDER BY id DESC
-        """)
-        agrupados = [normalize_inventory_item(row, 'agrupado') for row in c.fetchall()]
+# --- Tablero de inventarios: una consulta por pestaña ---------------------
 
-        # Equipos individuales (resumen)
-        c.execute("""
-            SELECT id, codigo_barras_individual, codigo_unificado, serial, marca, modelo, tecnologia,
-                   estado, asignado_nuevo, area, sede_id, observaciones
-              FROM equipos_individuales
-             ORDER BY id DESC
-        """)
-        individuales = [normalize_inventory_item(row) for row in c.fetchall()]
+DASHBOARD_PAGE_SIZE = 100
+DASHBOARD_MAX_PAGE_SIZE = 1000
 
-        # Resumen por sede
-        c.execute("""
-            SELECT ei.sede_id,
-                   COUNT(*) as total,
-                   SUM(CASE WHEN LOWER(COALESCE(ei.estado, '')) IN ('disponible','activo','nuevo','buen estado','bueno') THEN 1 ELSE 0 END) as disponibles,
-                   SUM(CASE WHEN LOWER(COALESCE(ei.estado, '')) IN ('asignado','usado') OR (ei.asignado_nuevo IS NOT NULL AND TRIM(ei.asignado_nuevo) != '') THEN 1 ELSE 0 END) as asignados,
-                   SUM(CASE WHEN LOWER(COALESCE(ei.estado, '')) LIKE 'baja%' OR LOWER(COALESCE(ei.estado,'')) = 'baja' THEN 1 ELSE 0 END) as bajas
-              FROM equipos_individuales ei
-             GROUP BY ei.sede_id
-             ORDER BY total DESC
-        """)
-        por_sede = [
-            {
-                "sede": get_sede_name(row["sede_id"]),
-                "total": row["total"],
-                "disponibles": row["disponibles"],
-                "asignados": row["asignados"],
-                "bajas": row["bajas"],
-            }
-            for row in c.fetchall()
-        ]
-
-        # Resumen por usuario asignado
-        c.execute("""
-            SELECT TRIM(asignado_nuevo) as usuario,
-                   COUNT(*) as total,
-                   SUM(CASE WHEN LOWER(COALESCE(estado,'')) LIKE 'baja%' THEN 1 ELSE 0 END) as bajas,
-                   SUM(CASE WHEN LOWER(COALESCE(estado,'')) IN ('asignado','activo','usado') THEN 1 ELSE 0 END) as activos
-              FROM equipos_individuales
-             WHERE asignado_nuevo IS NOT NULL AND TRIM(asignado_nuevo) != ''
-             GROUP BY TRIM(asignado_nuevo)
-             ORDER BY total DESC
-             LIMIT 200
-        """)
-        por_usuario = [
-            {
-                "usuario": row["usuario"],
-                "total": row["total"],
-                "activos": row["activos"],
-                "bajas": row["bajas"],
-            }
-            for row in c.fetchall()
-        ]
-
-        # Resumen por área
-        c.execute("""
-            SELECT TRIM(area) as area,
-                   COUNT(*) as total,
-                   SUM(CASE WHEN LOWER(COALESCE(estado,'')) LIKE 'baja%' THEN 1 ELSE 0 END) as bajas
-              FROM equipos_individuales
-             WHERE area IS NOT NULL AND TRIM(area) != ''
-             GROUP BY TRIM(area)
-             ORDER BY total DESC
-        """)
-        por_area = [
-            {
-                "area": row["area"],
-                "total": row["total"],
-                "bajas": row["bajas"],
-            }
-            for row in c.fetchall()
-        ]
-
-        def _map_with_sede(rows):
-            data = []
-            for row in rows:
-                data.append({
-                    "id": row["id"],
-                    "codigo": row["codigo_barras_individual"],
-                    "serial": row["serial"],
-                    "marca": row["marca"],
-                    "modelo": row["modelo"],
-                    "tecnologia": row["tecnologia"],
-                    "estado": row["estado"],
-                    "asignado": row["asignado_nuevo"],
-                    "sede": get_sede_name(row["sede_id"]),
-                    "area": row["area"],
-                    "observaciones": row["observaciones"],
-                })
-            return data
+_CATEGORY_COLUMNS = """id, codigo_barras_individual, serial, marca, modelo, tecnologia, estado, asignado_nuevo,
+                   sede_id, area, observaciones"""
 
-        # Categorías especiales
-        c.execute("""
-            SELECT id, codigo_barras_individual, serial, marca, modelo, tecnologia, estado, asignado_nuevo,
-                   sede_id, area, observaciones
-              FROM equipos_individuales
-             WHERE LOWER(COALESCE(estado,'')) LIKE '%repot%'
-                OR LOWER(COALESCE(observaciones,'')) LIKE '%repot%'
-        """)
-        repotenciados = _map_with_sede(c.fetchall())
 
-        c.execute("""
-            SELECT id, codigo_barras_individual, serial, marca, modelo, tecnologia, estado, asignado_nuevo,
-                   sede_id, area, observaciones
-              FROM equipos_individuales
-             WHERE LOWER(COALESCE(estado,'')) LIKE '%prest%'
-                OR LOWER(COALESCE(observaciones,'')) LIKE '%prest%'
-        """)
-        prestamos = _map_with_sede(c.fetchall())
+def _paged_rows(c, columns, from_where, order, limit, offset, params=()):
+    """Filas de una página y total de filas de la consulta."""
+    c.execute(f"SELECT COUNT(*) FROM {from_where}", params)
+    total = c.fetchone()[0]
+    sql = f"SELECT {columns} FROM {from_where} ORDER BY {order}"
+    if limit:
+        sql += f" LIMIT {int(limit)} OFFSET {int(offset)}"
+    c.execute(sql, params)
+    return c.fetchall(), total
 
-        c.execute("""
-            SELECT id, codigo_barras_individual, serial, marca, modelo, tecnologia, estado, asignado_nuevo,
-                   sede_id, area, observaciones
-              FROM equipos_individuales
-             WHERE LOWER(COALESCE(tecnologia,'')) LIKE '%telemed%'
-                OR LOWER(COALESCE(observaciones,'')) LIKE '%telemed%'
-        """)
-        telemedicina = _map_with_sede(c.fetchall())
 
-        c.execute("""
-            SELECT id, codigo_barras_individual, serial, marca, modelo, tecnologia, estado, asignado_nuevo,
-                   sede_id, area, observaciones
-              FROM equipos_individuales
-             WHERE LOWER(COALESCE(tecnologia,'')) LIKE '%d2k%'
-                OR LOWER(COALESCE(tecnologia,'')) LIKE '%dme%'
-                OR LOWER(COALESCE(observaciones,'')) LIKE '%d2k%'
-                OR LOWER(COALESCE(observaciones,'')) LIKE '%dme%'
-        """)
-        d2k_dme = _map_with_sede(c.fetchall())
+def _page_of(items, limit, offset):
+    return (items[offset:offset + limit] if limit else items), len(items)
 
-        c.execute("""
-            SELECT id, codigo_barras_individual, serial, marca, modelo, tecnologia, estado, asignado_nuevo,
-                   sede_id, area, observaciones, tipo_componente_adicional,
-                   marca_modelo_componente_adicional, serial_componente_adicional
-              FROM equipos_individuales
-             WHERE tipo_componente_adicional IS NOT NULL AND TRIM(tipo_componente_adicional) != ''
-        """)
-        componentes_adicionales = []
-        for row in c.fetchall():
-            componentes_adicionales.append({
-                "id": row["id"],
-                "codigo": row["codigo_barras_individual"],
-                "serial": row["serial"],
-                "marca": row["marca"],
-                "modelo": row["modelo"],
-                "tecnologia": row["tecnologia"],
-                "estado": row["estado"],
-                "asignado": row["asignado_nuevo"],
-                "sede": get_sede_name(row["sede_id"]),
-                "area": row["area"],
-                "observaciones": row["observaciones"],
-                "tipo_componente": row["tipo_componente_adicional"],
-                "descripcion_componente": row["marca_modelo_componente_adicional"],
-                "serial_componente": row["serial_componente_adicional"],
-            })
-        # Componentes adicionales de la tabla específica (si existe)
-        try:
-            c.execute("""
-                SELECT ea.id, ea.codigo_barras_individual, ea.tipo_accesorio, ea.marca, ea.modelo,
-                       ea.serial, ea.estado, ea.observaciones, ea.caracteristicas, ei.sede_id, ei.asignado_nuevo, ei.area
-                  FROM equipos_adicionales ea
-             LEFT JOIN equipos_individuales ei ON ei.id = ea.equipo_principal_id
-            """)
-            for row in c.fetchall():
-                componentes_adicionales.append({
-                    "id": row["id"],
-                    "codigo": row["codigo_barras_individual"],
-                    "serial": row["serial"],
-                    "marca": row["marca"],
-                    "modelo": row["modelo"],
-                    "tecnologia": None,
-                    "estado": row["estado"],
-                    "asignado": row["asignado_nuevo"],
-                    "sede": get_sede_name(row["sede_id"]),
-                    "area": row["area"],
-                    "observaciones": row["observaciones"],
-                    "tipo_componente": row["tipo_accesorio"],
-                    "descripcion_componente": row["caracteristicas"] or row["modelo"],
-                    "serial_componente": row["serial"],
-                })
-        except sqlite3.OperationalError:
-            pass
 
-        # Totales por tecnología
-        c.execute("""
-            SELECT COALESCE(tecnologia, 'Sin tecnologia') as tecnologia,
-                   COUNT(*) as total,
-                   SUM(CASE WHEN LOWER(COALESCE(estado,'')) LIKE 'baja%' THEN 1 ELSE 0 END) as bajas,
-                   SUM(CASE WHEN LOWER(COALESCE(estado,'')) IN ('disponible','activo','nuevo','buen estado','bueno') THEN 1 ELSE 0 END) as disponibles
-              FROM equipos_individuales
-             GROUP BY COALESCE(tecnologia, 'Sin tecnologia')
-             ORDER BY total DESC
-        """)
-        tecnologias = [
-            {
-                "tecnologia": row["tecnologia"],
-                "total": row["total"],
-                "disponibles": row["disponibles"],
-                "bajas": row["bajas"],
-            }
-            for row in c.fetchall()
-        ]
-
-        # Equipos asignados (individuales y agrupados)
-        c.execute("""
-            SELECT id, codigo_barras_individual, serial, marca, modelo, estado, asignado_nuevo,
-                   sede_id, fecha, area
-              FROM equipos_individuales
-             WHERE (asignado_nuevo IS NOT NULL AND TRIM(asignado_nuevo) != '')
-                OR LOWER(COALESCE(estado,'')) = 'asignado'
-        """)
-        asignados = [
-            {
-                "id": row["id"],
-                "tipo": "individual",
-                "codigo": row["codigo_barras_individual"],
-                "serial": row["serial"],
-                "marca": row["marca"],
-                "modelo": row["modelo"],
-                "estado": row["estado"],
-                "usuario": row["asignado_nuevo"],
-                "sede": get_sede_name(row["sede_id"]),
-                "fecha": row["fecha"],
-                "area": row["area"],
-            }
-            for row in c.fetchall()
-        ]
-        c.execute("""
-            SELECT id, codigo_barras_unificado, descripcion_general, estado_general, asignado_actual,
-                   sede_id, fecha_creacion
-              FROM equipos_agrupados
-             WHERE asignado_actual IS NOT NULL AND TRIM(asignado_actual) != ''
-        """)
-        for row in c.fetchall():
-            asignados.append({
-                "id": row["id"],
-                "tipo": "agrupado",
-                "codigo": row["codigo_barras_unificado"],
-                "serial": None,
-                "marca": row["descripcion_general"],
-                "modelo": None,
-                "estado": row["estado_general"],
-                "usuario": row["asignado_actual"],
-                "sede": get_sede_name(row["sede_id"]),
-                "fecha": row["fecha_creacion"],
-                "area": None,
-            })
+def _map_with_sede(row):
+    return {
+        "id": row["id"],
+        "codigo": row["codigo_barras_individual"],
+        "serial": row["serial"],
+        "marca": row["marca"],
+        "modelo": row["modelo"],
+        "tecnologia": row["tecnologia"],
+        "estado": row["estado"],
+        "asignado": row["asignado_nuevo"],
+        "sede": get_sede_name(row["sede_id"]),
+        "area": row["area"],
+        "observaciones": row["observaciones"],
+    }
 
-        # Equipos en baja
-        c.execute("""
-            SELECT ib.id as baja_id, ib.equipo_id, ib.tipo_inventario, ib.motivo_baja, ib.fecha_baja,
+
+def _tab_agrupados(conn, c, limit, offset):
+    rows, total = _paged_rows(c, """id, codigo_barras_unificado, descripcion_general, estado_general,
+                   asignado_actual, sede_id, nit, observaciones, fecha_creacion""",
+                              "equipos_agrupados", "id DESC", limit, offset)
+    return [normalize_inventory_item(row, 'agrupado') for row in rows], total
+
+
+def _tab_individuales(conn, c, limit, offset):
+    rows, total = _paged_rows(c, """id, codigo_barras_individual, codigo_unificado, serial, marca, modelo, tecnologia,
+                   estado, asignado_nuevo, area, sede_id, observaciones""",
+                              "equipos_individuales", "id DESC", limit, offset)
+    return [normalize_inventory_item(row) for row in rows], total
+
+
+def _tab_por_sede(conn, c, limit, offset):
+    return _page_of([
+        {
+            "sede": get_sede_name(row["clave"]),
+            "total": row["total"],
+            "disponibles": row["disponibles"],
+            "asignados": row["asignados"],
+            "bajas": row["bajas"],
+        }
+        for row in summary_rows(conn, "sede")
+    ], limit, offset)
+
+
+def _tab_por_usuario(conn, c, limit, offset):
+    return _page_of([
+        {
+            "usuario": row["clave"],
+            "total": row["total"],
+            "activos": row["activos"],
+            "bajas": row["bajas"],
+        }
+        for row in summary_rows(conn, "usuario")
+        if row["clave"]
+    ], limit, offset)
+
+
+def _tab_por_area(conn, c, limit, offset):
+    return _page_of([
+        {"area": row["clave"], "total": row["total"], "bajas": row["bajas"]}
+        for row in summary_rows(conn, "area")
+        if row["clave"]
+    ], limit, offset)
+
+
+def _category_tab(category):
+    def build(conn, c, limit, offset):
+        where = category_filter(conn, category)
+        rows, total = _paged_rows(c, _CATEGORY_COLUMNS, f"equipos_individuales WHERE {where}", "id",
+                                  limit, offset)
+        return [_map_with_sede(row) for row in rows], total
+    return build
+
+
+def _tab_componentes_adicionales(conn, c, limit, offset):
+    # Componentes registrados en el propio equipo y en equipos_adicionales (si existe)
+    union = """
+        SELECT 0 AS origen, id, codigo_barras_individual, serial, marca, modelo, tecnologia, estado,
+               asignado_nuevo, sede_id, area, observaciones,
+               tipo_componente_adicional AS tipo_componente,
+               marca_modelo_componente_adicional AS descripcion_componente,
+               serial_componente_adicional AS serial_componente
+          FROM equipos_individuales
+         WHERE tipo_componente_adicional IS NOT NULL AND TRIM(tipo_componente_adicional) != ''
+    """
+    try:
+        c.execute("SELECT 1 FROM equipos_adicionales LIMIT 0")
+        union += """
+        UNION ALL
+        SELECT 1, ea.id, ea.codigo_barras_individual, ea.serial, ea.marca, ea.modelo, NULL, ea.estado,
+               ei.asignado_nuevo, ei.sede_id, ei.area, ea.observaciones,
+               ea.tipo_accesorio, COALESCE(ea.caracteristicas, ea.modelo), ea.serial
+          FROM equipos_adicionales ea
+     LEFT JOIN equipos_individuales ei ON ei.id = ea.equipo_principal_id
+        """
+    except sqlite3.OperationalError:
+        pass
+    rows, total = _paged_rows(c, "*", f"({union}) componentes", "origen, id", limit, offset)
+    items = []
+    for row in rows:
+        item = _map_with_sede(row)
+        item.update({
+            "tipo_componente": row["tipo_componente"],
+            "descripcion_componente": row["descripcion_componente"],
+            "serial_componente": row["serial_componente"],
+        })
+        items.append(item)
+    return items, total
+
+
+def _tab_tecnologias(conn, c, limit, offset):
+    return _page_of([
+        {
+            "tecnologia": row["clave"] or "Sin tecnologia",
+            "total": row["total"],
+            "disponibles": row["disponibles"],
+            "bajas": row["bajas"],
+        }
+        for row in summary_rows(conn, "tecnologia")
+    ], limit, offset)
+
+
+def _tab_asignados(conn, c, limit, offset):
+    union = """
+        SELECT 'individual' AS tipo, id, codigo_barras_individual AS codigo, serial, marca, modelo, estado,
+               asignado_nuevo AS usuario, sede_id, fecha, area
+          FROM equipos_individuales
+         WHERE (asignado_nuevo IS NOT NULL AND TRIM(asignado_nuevo) != '')
+            OR LOWER(COALESCE(estado,'')) = 'asignado'
+        UNION ALL
+        SELECT 'agrupado', id, codigo_barras_unificado, NULL, descripcion_general, NULL, estado_general,
+               asignado_actual, sede_id, fecha_creacion, NULL
+          FROM equipos_agrupados
+         WHERE asignado_actual IS NOT NULL AND TRIM(asignado_actual) != ''
+    """
+    rows, total = _paged_rows(c, "*", f"({union}) asignados", "tipo DESC, id", limit, offset)
+    items = []
+    for row in rows:
+        item = dict(row)
+        item["sede"] = get_sede_name(item.pop("sede_id"))
+        items.append(item)
+    return items, total
+
+
+def _tab_bajas(conn, c, limit, offset):
+    try:
+        rows, total = _paged_rows(c, """ib.id as baja_id, ib.equipo_id, ib.tipo_inventario, ib.motivo_baja, ib.fecha_baja,
                    ib.responsable_baja, ib.observaciones,
                    ei.codigo_barras_individual AS codigo_individual,
                    ei.serial AS serial_individual,
@@ -859,66 +730,111 @@ def api_inventarios_dashboard():
                    ea.descripcion_general AS descripcion_agrupado,
                    ea.estado_general AS estado_agrupado,
                    ea.asignado_actual AS asignado_agrupado,
-                   ea.sede_id AS sede_agrupado
-              FROM inventario_bajas ib
+                   ea.sede_id AS sede_agrupado""", """inventario_bajas ib
          LEFT JOIN equipos_individuales ei ON ib.tipo_inventario = 'individual' AND ei.id = ib.equipo_id
-         LEFT JOIN equipos_agrupados ea ON ib.tipo_inventario = 'agrupado' AND ea.id = ib.equipo_id
-             ORDER BY ib.fecha_baja DESC
-        """)
-        bajas = []
-        for row in c.fetchall():
-            sede_id = row["sede_individual"] or row["sede_agrupado"]
-            bajas.append({
-                "id": row["baja_id"],
-                "equipo_id": row["equipo_id"],
-                "tipo": row["tipo_inventario"],
-                "motivo": row["motivo_baja"],
-                "fecha": row["fecha_baja"],
-                "responsable": row["responsable_baja"],
-                "observaciones": row["observaciones"],
-                "codigo": row["codigo_individual"] or row["codigo_agrupado"],
-                "serial": row["serial_individual"],
-                "marca": row["marca_individual"] or row["descripcion_agrupado"],
-                "modelo": row["modelo_individual"],
-                "estado": row["estado_individual"] or row["estado_agrupado"],
-                "asignado": row["asignado_individual"] or row["asignado_agrupado"],
-                "sede": get_sede_name(sede_id),
-            })
+         LEFT JOIN equipos_agrupados ea ON ib.tipo_inventario = 'agrupado' AND ea.id = ib.equipo_id""",
+                                  "ib.fecha_baja DESC", limit, offset)
+    except sqlite3.OperationalError:
+        return [], 0
+    bajas = []
+    for row in rows:
+        sede_id = row["sede_individual"] or row["sede_agrupado"]
+        bajas.append({
+            "id": row["baja_id"],
+            "equipo_id": row["equipo_id"],
+            "tipo": row["tipo_inventario"],
+            "motivo": row["motivo_baja"],
+            "fecha": row["fecha_baja"],
+            "responsable": row["responsable_baja"],
+            "observaciones": row["observaciones"],
+            "codigo": row["codigo_individual"] or row["codigo_agrupado"],
+            "serial": row["serial_individual"],
+            "marca": row["marca_individual"] or row["descripcion_agrupado"],
+            "modelo": row["modelo_individual"],
+            "estado": row["estado_individual"] or row["estado_agrupado"],
+            "asignado": row["asignado_individual"] or row["asignado_agrupado"],
+            "sede": get_sede_name(sede_id),
+        })
+    return bajas, total
 
-        # Tandas nuevas
-        c.execute("""
-            SELECT id, numero_tanda, descripcion, fecha_ingreso, cantidad_equipos, proveedor,
-                   valor_total, estado, observaciones, created_at
-              FROM tandas_equipos_nuevos
-             ORDER BY fecha_ingreso DESC
-        """)
-        tandas = [dict(row) for row in c.fetchall()]
 
+def _tab_tandas(conn, c, limit, offset):
+    try:
+        rows, total = _paged_rows(c, """id, numero_tanda, descripcion, fecha_ingreso, cantidad_equipos, proveedor,
+                   valor_total, estado, observaciones, created_at""",
+                                  "tandas_equipos_nuevos", "fecha_ingreso DESC", limit, offset)
+    except sqlite3.OperationalError:
+        return [], 0
+    return [dict(row) for row in rows], total
+
+
+# pestaña -> función (conn, cursor, limit, offset) -> (items, total)
+DASHBOARD_TABS = {
+    "agrupados": _tab_agrupados,
+    "individuales": _tab_individuales,
+    "por_sede": _tab_por_sede,
+    "por_usuario": _tab_por_usuario,
+    "por_area": _tab_por_area,
+    "repotenciados": _category_tab("repotenciados"),
+    "prestamos": _category_tab("prestamos"),
+    "telemedicina": _category_tab("telemedicina"),
+    "d2k_dme": _category_tab("d2k_dme"),
+    "componentes_adicionales": _tab_componentes_adicionales,
+    "tecnologias": _tab_tecnologias,
+    "asignados": _tab_asignados,
+    "bajas": _tab_bajas,
+    "tandas": _tab_tandas,
+}
+
+
+@inventarios_bp.route('/inventarios/api/dashboard/<tab>', methods=['GET'])
+def api_inventarios_dashboard_tab(tab):
+    """
+    Datos de una pestaña del inventario, paginados (?page=1&per_page=100;
+    per_page=0 devuelve todo). La respuesta lleva ETag y se reutiliza mientras
+    no cambie el inventario.
+    """
+    builder = DASHBOARD_TABS.get(tab)
+    if builder is None:
+        return jsonify({"error": f"Pestaña desconocida: {tab}"}), 404
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = request.args.get("per_page", DASHBOARD_PAGE_SIZE, type=int)
+    per_page = min(max(per_page, 0), DASHBOARD_MAX_PAGE_SIZE)
+    offset = (page - 1) * per_page
+
+    conn = get_connection()
+
+    def build():
+        items, total = builder(conn, conn.cursor(), per_page, offset)
+        return {"tab": tab, "items": items, "page": page, "per_page": per_page, "total": total}
+
+    try:
+        return cached_json(conn, (tab, page, per_page), build)
     finally:
         conn.close()
 
-    return jsonify({
-        "agrupados": agrupados,
-        "individuales": individuales,
-        "por_sede": por_sede,
-        "por_usuario": por_usuario,
-        "por_area": por_area,
-        "repotenciados": repotenciados,
-        "prestamos": prestamos,
-        "telemedicina": telemedicina,
-        "d2k_dme": d2k_dme,
-        "componentes_adicionales": componentes_adicionales,
-        "tecnologias": tecnologias,
-        "asignados": asignados,
-        "bajas": bajas,
-        "tandas": tandas,
-    })
+
+@inventarios_bp.route('/inventarios/api/dashboard', methods=['GET'])
+def api_inventarios_dashboard():
+    """
+    Todas las pestañas en una sola respuesta, sin paginar (compatibilidad).
+    El tablero usa /inventarios/api/dashboard/<pestaña>.
+    """
+    conn = get_connection()
+
+    def build():
+        c = conn.cursor()
+        return {tab: builder(conn, c, 0, 0)[0] for tab, builder in DASHBOARD_TABS.items()}
+
+    try:
+        return cached_json(conn, ("_all_",), build)
+    finally:
+        conn.close()
 
 @inventarios_bp.route('/inventarios/api/search/_all_')
 def api_search_all():
     """API endpoint to get the consolidated inventory with all the requested headers."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
     c = conn.cursor()
 
     c.execute("""
@@ -1137,7 +1053,7 @@ def new_inventario_agrupado():
         documentos_entrega = request.form.get('documentos_entrega')
         observaciones = request.form.get('observaciones')
 
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_connection()
         c = conn.cursor()
         # Generar código si no se proveyó
         if not codigo_barras_unificado:
@@ -1224,8 +1140,7 @@ def api_individuales_full():
     """Devuelve equipos individuales con todos los campos y filtros opcionales."""
     search_query = request.args.get('q_individual', '').strip()
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
     c = conn.cursor()
 
     column_list = ", ".join(["ei.id"] + [f"ei.{col}" for col in INDIVIDUAL_DB_COLUMNS])
@@ -1237,7 +1152,7 @@ def api_individuales_full():
                emp.apellido as empleado_apellido
           FROM equipos_individuales ei
           LEFT JOIN sedes s ON s.id = ei.sede_id
-          LEFT JOIN empleados emp ON (LOWER(emp.correo_office) = LOWER(ei.asignado_nuevo) OR LOWER(emp.nombre_completo) = LOWER(ei.asignado_nuevo))
+          LEFT JOIN empleados emp ON emp.id = {employee_ref(conn, "equipos_individuales", "ei")}
          WHERE 1=1
     """
     params = []
@@ -1271,6 +1186,212 @@ def api_individuales_full():
     return jsonify(result)
 
 
+# --- Paginación del lado del servidor (compatible con DataTables) ---
+
+# Nombres de la API (map_individual_row) que difieren de la columna real.
+INDIVIDUAL_API_ALIASES = {
+    "codigo_individual": "codigo_barras_individual",
+    "asignado_a": "asignado_nuevo",
+    "fecha_asignacion": "fecha",
+    "arquitectura_ram": "arch_ram",
+    "almacenamiento": "espacio_disco",
+}
+# Solo se ordena por columnas indexadas (ver modules/db_indexes.py).
+INDIVIDUAL_SORTABLE = {"id", "codigo_barras_individual", "serial", "sede_id", "estado", "tecnologia", "asignado_nuevo"}
+# Filtros por igualdad que aprovechan los índices de expresión.
+INDIVIDUAL_EXACT_FILTERS = {
+    "sede_id": "ei.sede_id = ?",
+    "estado": "LOWER(ei.estado) = LOWER(?)",
+    "tecnologia": "UPPER(ei.tecnologia) = UPPER(?)",
+}
+INDIVIDUAL_DEFAULT_PROJECTION = [
+    "id", "codigo_individual", "serial", "placa", "tecnologia", "marca", "modelo",
+    "estado", "asignado_a", "sede",
+]
+PAGE_MAX_LENGTH = 500
+
+
+def _resolve_individual_column(name):
+    """Nombre de la API o de la BD -> columna real de equipos_individuales (o None)."""
+    name = INDIVIDUAL_API_ALIASES.get(name, name)
+    if name in ("id", "sede_id", "sede") or name in INDIVIDUAL_DB_COLUMNS:
+        return name
+    return None
+
+
+def _encode_cursor(value, row_id):
+    raw = json.dumps([value, row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor):
+    try:
+        value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return value, int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def _datatables_columns(args):
+    """Lee columns[i][data] y columns[i][search][value] del protocolo de DataTables."""
+    columns = []
+    i = 0
+    while f"columns[{i}][data]" in args:
+        columns.append((args.get(f"columns[{i}][data]"), args.get(f"columns[{i}][search][value]", "")))
+        i += 1
+    return columns
+
+
+def _keyset_condition(sort_col, direction, value, row_id):
+    """Condición WHERE para continuar después de (value, row_id) con NULLs al inicio en ASC."""
+    if sort_col == "id":
+        return ("ei.id > ?" if direction == "asc" else "ei.id < ?"), [row_id]
+    col = f"ei.{sort_col}"
+    if direction == "asc":
+        if value is None:
+            return f"(({col} IS NULL AND ei.id > ?) OR {col} IS NOT NULL)", [row_id]
+        return f"({col} > ? OR ({col} = ? AND ei.id > ?))", [value, value, row_id]
+    if value is None:
+        return f"({col} IS NULL AND ei.id < ?)", [row_id]
+    return f"({col} < ? OR ({col} = ? AND ei.id < ?) OR {col} IS NULL)", [value, value, row_id]
+
+
+def fetch_individuales_page(conn, args):
+    """
+    Página de equipos_individuales con proyección de columnas, filtros por
+    columna, orden sobre columnas indexadas y paginación por keyset.
+
+    Parámetros (además del protocolo de DataTables: draw, start, length,
+    search[value], order[0][column], order[0][dir], columns[i][...]):
+      fields        columnas a devolver (nombres de map_individual_row), separadas por coma
+      filter[col]   filtro por columna (igualdad para sede_id/estado/tecnologia, contiene para el resto)
+      sort, dir     columna indexada y dirección (asc/desc)
+      cursor        continuar después de la última fila de la página anterior (next_cursor)
+    """
+    dt_columns = _datatables_columns(args)
+
+    fields = [f.strip() for f in args.get("fields", "").split(",") if f.strip()]
+    if not fields:
+        fields = [name for name, _ in dt_columns if name] or INDIVIDUAL_DEFAULT_PROJECTION
+    projection = [(name, _resolve_individual_column(name)) for name in fields]
+    projection = [(name, col) for name, col in projection if col]
+    if not any(col == "id" for _, col in projection):
+        projection.insert(0, ("id", "id"))
+
+    select_cols = []
+    join_sedes = False
+    for name, col in projection:
+        if col == "sede":
+            join_sedes = True
+            select_cols.append(f"COALESCE(s.nombre, '') AS \"{name}\"")
+        else:
+            select_cols.append(f"ei.{col} AS \"{name}\"")
+
+    where, params = [], []
+    filters = {key[7:-1]: value for key, value in args.items() if key.startswith("filter[") and key.endswith("]")}
+    for name, value in dt_columns:
+        if name and value:
+            filters.setdefault(name, value)
+    for name, value in filters.items():
+        col = _resolve_individual_column(name)
+        value = (value or "").strip()
+        if not col or col == "sede" or not value:
+            continue
+        if col in INDIVIDUAL_EXACT_FILTERS:
+            where.append(INDIVIDUAL_EXACT_FILTERS[col])
+            params.append(value)
+        else:
+            where.append(f"ei.{col} LIKE ?")
+            params.append(f"%{value}%")
+
+    search_value = (args.get("search[value]") or args.get("q") or "").strip()
+    if search_value:
+        # Sin índice, o un texto sin términos para FTS5 (solo signos como "-" o "*"): LIKE
+        match = search.build_match_query(search_value) if search.search_ready(conn) else ""
+        if match:
+            where.append(
+                f"ei.id IN (SELECT rowid / {search.ROWID_STRIDE} FROM {search.SEARCH_TABLE} "
+                f"WHERE {search.SEARCH_TABLE} MATCH ? AND rowid % {search.ROWID_STRIDE} = ?)"
+            )
+            params.extend([match, search.SEARCH_SOURCES["equipo"]["code"]])
+        else:
+            like = f"%{search_value}%"
+            where.append("(ei.serial LIKE ? OR ei.codigo_barras_individual LIKE ? OR ei.placa LIKE ? OR ei.asignado_nuevo LIKE ?)")
+            params.extend([like] * 4)
+
+    sort_name = args.get("sort", "")
+    direction = args.get("dir", "asc")
+    if not sort_name and "order[0][column]" in args:
+        idx = args.get("order[0][column]", type=int)
+        if idx is not None and 0 <= idx < len(dt_columns):
+            sort_name = dt_columns[idx][0]
+        direction = args.get("order[0][dir]", "asc")
+    sort_col = _resolve_individual_column(sort_name) or "id"
+    if sort_col not in INDIVIDUAL_SORTABLE:
+        sort_col = "id"
+    direction = "desc" if str(direction).lower() == "desc" else "asc"
+
+    length = args.get("length", 50, type=int)
+    length = PAGE_MAX_LENGTH if length is None or length < 0 else min(length, PAGE_MAX_LENGTH)
+    start = max(args.get("start", 0, type=int) or 0, 0)
+
+    page_where, page_params = list(where), list(params)
+    cursor = _decode_cursor(args.get("cursor", "")) if args.get("cursor") else None
+    if cursor:
+        condition, extra = _keyset_condition(sort_col, direction, *cursor)
+        page_where.append(condition)
+        page_params.extend(extra)
+        start = 0
+
+    from_sql = "FROM equipos_individuales ei"
+    if join_sedes:
+        from_sql += " LEFT JOIN sedes s ON s.id = ei.sede_id"
+    where_sql = f" WHERE {' AND '.join(page_where)}" if page_where else ""
+    order_sql = f" ORDER BY ei.{sort_col} {direction.upper()}"
+    if sort_col != "id":
+        order_sql += f", ei.id {direction.upper()}"
+
+    c = conn.cursor()
+    c.execute(
+        f"SELECT {', '.join(select_cols)}, ei.{sort_col} AS _sort_value {from_sql}{where_sql}{order_sql} LIMIT ? OFFSET ?",
+        page_params + [length, start],
+    )
+    rows = [dict(row) for row in c.fetchall()]
+
+    c.execute("SELECT COUNT(*) FROM equipos_individuales")
+    total = c.fetchone()[0]
+    if where:
+        c.execute(f"SELECT COUNT(*) FROM equipos_individuales ei WHERE {' AND '.join(where)}", params)
+        filtered = c.fetchone()[0]
+    else:
+        filtered = total
+
+    next_cursor = None
+    if rows and len(rows) == length:
+        last = rows[-1]
+        next_cursor = _encode_cursor(last["_sort_value"], last["id"])
+    for row in rows:
+        row.pop("_sort_value", None)
+
+    return {
+        "draw": args.get("draw", 0, type=int),
+        "recordsTotal": total,
+        "recordsFiltered": filtered,
+        "data": rows,
+        "next_cursor": next_cursor,
+    }
+
+
+@inventarios_bp.route('/inventarios/api/individuales/page', methods=['GET'])
+def api_individuales_page():
+    """Endpoint server-side para DataTables: tamaño de página constante sin importar el inventario."""
+    conn = get_connection()
+    try:
+        return jsonify(fetch_individuales_page(conn, request.args))
+    finally:
+        conn.close()
+
+
 @inventarios_bp.route('/inventarios/api/delete_bulk', methods=['POST'])
 def api_delete_bulk():
     """Elimina varios equipos (individual o agrupado)."""
@@ -1281,7 +1402,7 @@ def api_delete_bulk():
     if not ids or tipo not in ["individual", "grouped"]:
         return jsonify({"error": "Faltan parametros"}), 400
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     c = conn.cursor()
     try:
         if tipo == "individual":
@@ -1301,7 +1422,7 @@ def api_delete_bulk():
 
 @inventarios_bp.route('/inventario/edit/<tipo>/<int:inventario_id>', methods=['GET', 'POST'])
 def edit_inventario(tipo, inventario_id):
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     c = conn.cursor()
 
     if request.method == 'POST':
@@ -1380,7 +1501,7 @@ def edit_inventario(tipo, inventario_id):
 
 @inventarios_bp.route('/inventario/delete/<int:inventario_id>', methods=['POST'])
 def delete_inventario(inventario_id):
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     c = conn.cursor()
 
     # Check if the equipment exists
@@ -1402,7 +1523,7 @@ def delete_inventario(inventario_id):
 
 @inventarios_bp.route('/inventarios/<int:id>/components')
 def inventario_components(id):
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     c = conn.cursor()
 
     # Get grouped equipment details
@@ -1423,7 +1544,7 @@ def inventario_components(id):
 
 @inventarios_bp.route('/inventarios/individual/<int:id>')
 def inventario_individual_detail(id):
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     c = conn.cursor()
 
     # Get individual equipment details
@@ -1448,7 +1569,7 @@ def api_search_inventory(query):
         ?tecnologia=CPU&estado=asignado
     - Devuelve tanto equipos agrupados como individuales.
     """
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     c = conn.cursor()
 
     tecnologia = request.args.get('tecnologia', '').strip()
@@ -1568,7 +1689,7 @@ def api_search_grouped():
     user = data.get('user', '')
     id_param = data.get('id', '')
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     c = conn.cursor()
 
     query = "SELECT * FROM equipos_agrupados WHERE 1=1"
@@ -1622,8 +1743,7 @@ def api_search_grouped():
 @inventarios_bp.route('/inventarios/api/asignados', methods=['GET'])
 def api_get_asignados():
     """Devuelve equipos (individuales y agrupados) que tienen asignaciA3n para alimentar la pestaA�a Asignados."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
     c = conn.cursor()
     resultados = []
 
@@ -1689,7 +1809,7 @@ def api_assign_equipment():
     if not all([equipo_id, tipo_equipo, user_id, sede_id]):
         return jsonify({"error": "Todos los campos son requeridos"}), 400
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     c = conn.cursor()
 
     try:
@@ -1746,8 +1866,7 @@ def api_inventory_by_technology(tech):
     if not tech:
         return jsonify([])
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
     c = conn.cursor()
     c.execute("""
         SELECT *
@@ -1765,8 +1884,7 @@ def api_search_users_inventory(query):
     """
     API para buscar usuarios para asignación de equipos.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
     c = conn.cursor()
     try:
         c.execute("""
@@ -1800,8 +1918,7 @@ def api_life_sheet(tipo, equipo_id):
     """
     Obtiene la hoja de vida de un equipo.
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
     c = conn.cursor()
     try:
         c.execute("""
@@ -1823,7 +1940,7 @@ def api_decommission_equipment(tipo, equipo_id):
     data = request.get_json()
     reason = data.get('reason', 'Dado de baja por usuario')
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     c = conn.cursor()
     try:
         if tipo == 'grouped':
@@ -1870,7 +1987,7 @@ def api_reassign_equipment():
     if not all([equipo_id, tipo_equipo, user_id, assignment_date]):
         return jsonify({"error": "Todos los campos son requeridos"}), 400
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     c = conn.cursor()
     try:
         # Obtener info del usuario
@@ -1918,7 +2035,7 @@ def api_delete_equipment(tipo, equipo_id):
     """
     Elimina un equipo de la base de datos.
     """
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     c = conn.cursor()
     try:
         if tipo == 'individual':
@@ -1947,8 +2064,7 @@ def api_get_components(equipo_id):
     """
     Obtiene los componentes de un equipo agrupado (periféricos de equipos individuales asociados).
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_connection()
     c = conn.cursor()
     try:
         # Get the codigo_unificado of the grouped equipment
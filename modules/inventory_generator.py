@@ -2,11 +2,7 @@ import os
 import glob
 from datetime import datetime
 import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.utils import get_column_letter
-
+from modules.excel_export import StreamingWorkbook
 from modules.export_import import build_column_mapping, detect_target_from_headers, import_rows
 import re
 import unicodedata
@@ -155,18 +151,6 @@ def _deduplicar(df, columna_serial="Serial o Mac"):
 
 
 def _generar_excel(df_informe, df_sedes, output_path):
-    wb = Workbook()
-    wb.remove(wb.active)
-    c = {'p': "1F4E78", 'wh': "FFFFFF"}
-    ws_inv = wb.create_sheet("INVENTARIO_GENERAL")
-    # encabezados
-    for idx, h in enumerate(HEADERS_INVENTARIO, 1):
-        cell = ws_inv.cell(row=1, column=idx)
-        cell.value = h
-        cell.font = Font(name='Calibri', bold=True, size=9, color=c['wh'])
-        cell.fill = PatternFill(start_color=c['p'], end_color=c['p'], fill_type="solid")
-        cell.alignment = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
     mapeo = {
         'Serial o Mac': 'SERIAL',
         'Sede': 'SEDE',
@@ -192,75 +176,81 @@ def _generar_excel(df_informe, df_sedes, output_path):
     if df_sedes is not None and 'Sede' in df_sedes.columns and 'IP_Sede' in df_sedes.columns:
         sede_ip_map = df_sedes.set_index('Sede')['IP_Sede'].to_dict()
 
-    cont_ind, cont_agr = {}, {}
-    for ridx, (_, row) in enumerate(df_informe.iterrows(), 2):
-        ws_inv.cell(row=ridx, column=1).value = ridx - 1  # ID
-        sede_val = row.get('Sede', '')
-        tec_val = row.get('Tipo de dispositivo', '')
-        usuario_val = row.get('Asignado a', '')
-
-        for col_orig, col_dest in mapeo.items():
-            if col_orig in df_informe.columns and pd.notna(row.get(col_orig)):
-                ws_inv.cell(row=ridx, column=HEADERS_INVENTARIO.index(col_dest) + 1).value = str(row[col_orig])
-
-        if sede_val in sede_ip_map:
-            ws_inv.cell(row=ridx, column=HEADERS_INVENTARIO.index('IP_SEDE') + 1).value = sede_ip_map[sede_val]
-
-        cs = _codigo_sede(sede_val)
-        ct = _codigo_tecnologia(tec_val)
-        k_ind = f"{cs}-{ct}"
-        cont_ind[k_ind] = cont_ind.get(k_ind, 0) + 1
-        ci = f"{k_ind}-{cont_ind[k_ind]:03d}"
-        ws_inv.cell(row=ridx, column=HEADERS_INVENTARIO.index('CODIGO_INDIVIDUAL') + 1).value = ci
-        ws_inv.cell(row=ridx, column=HEADERS_INVENTARIO.index('PLACA') + 1).value = ci
-
-        if usuario_val:
-            k_agr = f"{cs}-AGRU"
-            cont_agr[k_agr] = cont_agr.get(k_agr, 0) + 1
-            ca = f"{k_agr}-{cont_agr[k_agr]:03d}"
-            ws_inv.cell(row=ridx, column=HEADERS_INVENTARIO.index('CODIGO_UNIFICADO') + 1).value = ca
-            ws_inv.cell(row=ridx, column=HEADERS_INVENTARIO.index('DISPONIBLE') + 1).value = "NO"
-        else:
-            ws_inv.cell(row=ridx, column=HEADERS_INVENTARIO.index('DISPONIBLE') + 1).value = "SI"
-
-        today = datetime.now().strftime("%d/%m/%Y")
-        ws_inv.cell(row=ridx, column=HEADERS_INVENTARIO.index('CREADOR') + 1).value = "Sistema"
-        ws_inv.cell(row=ridx, column=HEADERS_INVENTARIO.index('FECHA_CREACION') + 1).value = today
-        ws_inv.cell(row=ridx, column=HEADERS_INVENTARIO.index('FECHA_ULTIMA_MODIFICACION') + 1).value = today
-
-    for i in range(1, len(HEADERS_INVENTARIO) + 1):
-        ws_inv.column_dimensions[get_column_letter(i)].width = 15
-    ws_inv.freeze_panes = "A2"
-    ws_inv.auto_filter.ref = ws_inv.dimensions
+    # Columnas completas calculadas de una vez (sin recorrer fila a fila)
+    n = len(df_informe)
+    index = df_informe.index
+    vacia = pd.Series([''] * n, index=index, dtype=object)
+    inv = pd.DataFrame(index=index, columns=HEADERS_INVENTARIO, dtype=object)
+    inv['ID'] = range(1, n + 1)
+    for col_orig, col_dest in mapeo.items():
+        if col_orig in df_informe.columns:
+            valores = df_informe[col_orig]
+            inv[col_dest] = valores.astype(str).where(valores.notna(), None)
+
+    sede = df_informe['Sede'] if 'Sede' in df_informe.columns else vacia
+    tecnologia = df_informe['Tipo de dispositivo'] if 'Tipo de dispositivo' in df_informe.columns else vacia
+    usuario = df_informe['Asignado a'] if 'Asignado a' in df_informe.columns else vacia
+    if sede_ip_map:
+        inv['IP_SEDE'] = sede.map(lambda v: sede_ip_map.get(v) if v in sede_ip_map else None)
+
+    # Consecutivos por sede-tecnología y por sede (solo equipos asignados)
+    cs = sede.map(_codigo_sede)
+    k_ind = cs + "-" + tecnologia.map(_codigo_tecnologia)
+    ci = k_ind + "-" + (k_ind.groupby(k_ind).cumcount() + 1).map("{:03d}".format)
+    inv['CODIGO_INDIVIDUAL'] = ci
+    inv['PLACA'] = ci
+    asignado = usuario.map(bool)
+    k_agr = (cs + "-AGRU")[asignado]
+    inv.loc[asignado, 'CODIGO_UNIFICADO'] = k_agr + "-" + (k_agr.groupby(k_agr).cumcount() + 1).map("{:03d}".format)
+    inv['DISPONIBLE'] = asignado.map({True: "NO", False: "SI"})
+
+    today = datetime.now().strftime("%d/%m/%Y")
+    inv['CREADOR'] = "Sistema"
+    inv['FECHA_CREACION'] = today
+    inv['FECHA_ULTIMA_MODIFICACION'] = today
+
+    book = StreamingWorkbook(header_size=9)
+    book.add_sheet("INVENTARIO_GENERAL", HEADERS_INVENTARIO, widths=15).write_dataframe(inv)
 
     # Hoja combinada de materias primas de datos
-    ws_comb = wb.create_sheet("COMBINADO")
-    for row in dataframe_to_rows(df_informe, index=False, header=True):
-        ws_comb.append(list(row))
-
-    wb.save(output_path)
+    columnas = [str(c) for c in df_informe.columns]
+    book.add_sheet("COMBINADO", columnas, freeze=False, autofilter=False).write_dataframe(
+        df_informe.set_axis(columnas, axis=1)
+    )
+    book.save(output_path)
 
 
-def generar_informe_inventario(upload_folder: str, reports_dir: str):
+def generar_informe_inventario(upload_folder: str, reports_dir: str, progress=None):
+    """
+    progress → callback opcional (filas_procesadas, filas_totales) que se llama
+               tras cada bloque importado.
+    """
     try:
         lista_df = _leer_xlsx(upload_folder)
         if not lista_df:
             return None, "No se encontraron archivos .xlsx/.xls válidos."
 
-        # Procesar cada DataFrame individualmente: estandarizar, deduplicar, importar según destino
+        # Estandarizar y deduplicar antes de importar para conocer el total de filas
+        lista_df = [_deduplicar(_estandarizar(df), "Serial o Mac") for df in lista_df]
+        total = sum(len(df) for df in lista_df)
+        done = 0
+
+        # Procesar cada DataFrame individualmente: importar según destino
         cleaned_dfs = []
         stats = []
         for df in lista_df:
-            df = _estandarizar(df)
-            df = _deduplicar(df, "Serial o Mac")
             headers = list(df.columns)
             mapping, norm_headers = build_column_mapping(headers)
             target = detect_target_from_headers(norm_headers)
+            on_chunk = None
+            if progress is not None:
+                on_chunk = lambda part, done=done: progress(done + part["rows"], total)
             inserted, updated, errors, staged = import_rows(
                 df,
                 target,
                 mapping,
-                source=f"{df.get('ARCHIVO_ORIGEN', '')}::{df.get('__hoja_origen__', '')}"
+                source=f"{df.get('ARCHIVO_ORIGEN', '')}::{df.get('__hoja_origen__', '')}",
+                on_chunk=on_chunk,
             )
             stats.append({
                 "target": target,
@@ -270,6 +260,7 @@ def generar_informe_inventario(upload_folder: str, reports_dir: str):
                 "errors": errors[:5],
             })
             cleaned_dfs.append(df)
+            done += len(df)
 
         df_informe = pd.concat(cleaned_dfs, ignore_index=True, sort=False) if cleaned_dfs else pd.DataFrame()
 
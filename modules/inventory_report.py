@@ -1,13 +1,14 @@
 import os
 import shutil
 from datetime import datetime
-import io
-import pandas as pd
-from flask import Blueprint, render_template, request, redirect, url_for, send_from_directory, flash, send_file
+from flask import Blueprint, render_template, request, redirect, url_for, send_from_directory, flash
 from werkzeug.utils import secure_filename
 
 from modules.inventory_generator import generar_informe_inventario
 from modules.db_utils import get_db_connection
+from modules.excel_export import StreamingWorkbook, xlsx_response
+from modules.export_stream import QueryStream, export_query
+from modules.jobs import job_handler, list_jobs, submit_job
 
 inventory_report_bp = Blueprint("inventory_report", __name__, template_folder="../templates")
 
@@ -23,7 +24,7 @@ def _ensure_dirs():
 @inventory_report_bp.route("/inventario/report", methods=["GET"])
 def inventario_report_form():
     _ensure_dirs()
-    return render_template("inventory_report_form.html")
+    return render_template("inventory_report_form.html", jobs=list_jobs(kind="inventario_report", limit=5))
 
 
 @inventory_report_bp.route("/inventario/report", methods=["POST"])
@@ -42,23 +43,28 @@ def inventario_report_generate():
             fname = secure_filename(f.filename)
             f.save(os.path.join(temp_dir, fname))
 
-    report_path, result = generar_informe_inventario(temp_dir, REPORTS_DIR)
-    shutil.rmtree(temp_dir, ignore_errors=True)
+    # La importación y el Excel se generan en segundo plano
+    job_id = submit_job("inventario_report", {"temp_dir": temp_dir})
+    flash(f"Reporte en proceso (trabajo #{job_id}). Aparecerá abajo cuando termine.", "info")
+    return redirect(url_for("inventory_report.inventario_report_form"))
 
-    if isinstance(result, str):
-        flash(result, "danger")
-        return redirect(url_for("inventory_report.inventario_report_form"))
 
-    report_name = os.path.basename(report_path)
-    if isinstance(result, list):
-        for stat in result:
-            flash(
-                f"[{stat['target']}] Insertados: {stat['inserted']}, Actualizados: {stat['updated']}, "
-                f"Staging: {stat['staged']}, Errores: {len(stat['errors'])}",
-                "info",
-            )
-    flash("Reporte generado con exito.", "success")
-    return redirect(url_for("inventory_report.inventario_report_success", filename=report_name))
+@job_handler("inventario_report")
+def run_report_job(job):
+    """Genera el consolidado; si se reanuda, vuelve a procesar la carpeta completa."""
+    temp_dir = job.params["temp_dir"]
+    try:
+        report_path, result = generar_informe_inventario(
+            temp_dir,
+            REPORTS_DIR,
+            progress=lambda processed, total: job.progress(processed=processed, total=total),
+        )
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    if isinstance(result, str):
+        raise RuntimeError(result)
+    return {"filename": os.path.basename(report_path), "stats": result}
 
 
 @inventory_report_bp.route("/inventario/report/success/<filename>")
@@ -100,23 +106,16 @@ def inventario_report_db_view():
 def inventario_report_db_export():
     """Exporta una tabla de la BD a Excel para descarga directa."""
     table = request.args.get("table", "equipos_individuales")
-    conn = get_db_connection()
     try:
-        df = pd.read_sql_query(f"SELECT * FROM {table}", conn)
+        stream = QueryStream(export_query(table))
     except Exception as e:
-        conn.close()
         flash(f"No se pudo exportar la tabla {table}: {e}", "danger")
         return redirect(url_for("inventory_report.inventario_report_db_view"))
-    conn.close()
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df.to_excel(writer, sheet_name=table[:28], index=False)
-    output.seek(0)
+    try:
+        book = StreamingWorkbook()
+        book.add_sheet(table[:28], stream.columns).write_batches(stream.batches())
+    finally:
+        stream.close()
     filename = f"{table}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    return send_file(
-        output,
-        as_attachment=True,
-        download_name=filename,
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-    )
+    return xlsx_response(book, filename)
 
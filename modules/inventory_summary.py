@@ -0,0 +1,399 @@
+"""
+Resumen materializado del inventario individual.
+
+inventario_resumen guarda, por dimensión (global, sede, estado, tecnología,
+área, usuario y sede+tecnología), los conteos que antes cada tablero
+recalculaba con COUNT/SUM(CASE ...) sobre equipos_individuales en cada
+petición. Triggers AFTER INSERT/UPDATE/DELETE suman y restan la fila afectada,
+de modo que leer un resumen cuesta O(grupos) y no O(equipos).
+
+Medidas por grupo (mismas reglas que usaban los tableros):
+    total          todas las filas
+    disponibles    estado disponible/activo/nuevo/buen estado/bueno
+    asignados      estado asignado/en uso/usado o con asignado_nuevo
+    bajas          estado que empieza por "baja"
+    activos        estado asignado/activo/usado
+    con_asignado   asignado_nuevo no vacío
+    disponible_si  columna disponible = 'Si'
+
+La clave de cada grupo es texto; los valores nulos y vacíos se guardan como ''.
+El resumen y sus triggers los crea la migración del esquema derivado
+(modules/derived_schema.py: al arrancar la app o con python migrate.py
+esquema); las lecturas no ejecutan DDL y, mientras no esté instalado, calculan
+las mismas agrupaciones en vivo. Para reconstruirlo:
+    python migrate.py resumen
+
+Las importaciones grandes envuelven su trabajo en deferred_summary(): mientras
+haya alguna en curso los triggers no actualizan el resumen y, al terminar la
+última, se recalcula completo con GROUP BY (mucho más barato que el trigger
+fila a fila cuando se escriben muchas filas). Cada diferimiento queda
+registrado con su propietario (el trabajo en segundo plano que lo pidió): un
+trabajo reanudado reutiliza el suyo, y en cada lectura se liberan los de
+trabajos que ya no están en ejecución (fallidos, cancelados, en cola para
+reanudarse o sin latido porque su proceso cayó).
+
+Con bases de datos distintas de SQLite no se crean triggers y summary_rows()
+calcula las mismas agrupaciones en vivo.
+"""
+
+import os
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+from modules.db_utils import derived_ready, get_db_connection, pool_key, schema_objects, table_columns
+from modules.inventory_tabs import bump_inventory_version
+
+SUMMARY_TABLE = "inventario_resumen"
+CONTROL_TABLE = "inventario_resumen_control"
+DEFER_TABLE = "inventario_resumen_diferidos"
+SOURCE_TABLE = "equipos_individuales"
+# Recalcular cuesta por fila existente ~1/8 de lo que cuesta el trigger por fila
+# escrita: se difiere cuando se escribirán al menos total/8 filas.
+SUMMARY_REBUILD_RATIO = 8
+# Un diferimiento sin trabajo asociado más antiguo que esto se considera
+# abandonado (proceso caído)
+SUMMARY_DEFER_STALE_SECONDS = int(os.getenv("SUMMARY_DEFER_STALE_SECONDS", "21600"))
+
+# Columnas de equipos_individuales que intervienen en el resumen. Si alguna no
+# existe en la instalación se usa NULL en su lugar.
+SOURCE_COLUMNS = ("sede_id", "estado", "tecnologia", "area", "asignado_nuevo", "disponible")
+
+_ESTADO = "LOWER(COALESCE({estado}, ''))"
+_CON_ASIGNADO = "TRIM(COALESCE({asignado_nuevo}, '')) != ''"
+
+MEASURES = {
+    "total": "1",
+    "disponibles": f"CASE WHEN {_ESTADO} IN ('disponible','activo','nuevo','buen estado','bueno') THEN 1 ELSE 0 END",
+    "asignados": f"CASE WHEN {_ESTADO} IN ('asignado','en uso','usado') OR {_CON_ASIGNADO} THEN 1 ELSE 0 END",
+    "bajas": f"CASE WHEN {_ESTADO} LIKE 'baja%' THEN 1 ELSE 0 END",
+    "activos": f"CASE WHEN {_ESTADO} IN ('asignado','activo','usado') THEN 1 ELSE 0 END",
+    "con_asignado": f"CASE WHEN {_CON_ASIGNADO} THEN 1 ELSE 0 END",
+    "disponible_si": "CASE WHEN {disponible} = 'Si' THEN 1 ELSE 0 END",
+}
+
+# {texto}: tipo de texto del motor en CAST (MySQL no admite CAST ... AS TEXT)
+_SEDE = "COALESCE(CAST({sede_id} AS {texto}), '')"
+_TECNOLOGIA = "COALESCE({tecnologia}, '')"
+
+# dimensión -> (expresión de clave, expresión de subclave)
+DIMENSIONS = {
+    "global": ("''", "''"),
+    "sede": (_SEDE, "''"),
+    "estado": ("COALESCE({estado}, '')", "''"),
+    "tecnologia": (_TECNOLOGIA, "''"),
+    "area": ("TRIM(COALESCE({area}, ''))", "''"),
+    "usuario": ("TRIM(COALESCE({asignado_nuevo}, ''))", "''"),
+    "sede_tecnologia": (_SEDE, _TECNOLOGIA),
+}
+
+SUMMARY_TRIGGERS = ("resumen_ei_ai", "resumen_ei_au", "resumen_ei_ad")
+
+
+def _render(template, existing, prefix="", texto="TEXT"):
+    columns = {col: f"{prefix}{col}" if col in existing else "NULL" for col in SOURCE_COLUMNS}
+    return template.format(texto=texto, **columns)
+
+
+def _create_summary_table(conn):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CONTROL_TABLE} (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            diferidos INTEGER NOT NULL DEFAULT 0,
+            desde TEXT
+        )
+    """)
+    conn.execute(f"INSERT OR IGNORE INTO {CONTROL_TABLE} (id, diferidos) VALUES (1, 0)")
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DEFER_TABLE} (
+            propietario TEXT PRIMARY KEY,
+            job_id INTEGER,
+            desde TEXT NOT NULL
+        )
+    """)
+    measures = ",\n".join(f"            {name} INTEGER NOT NULL DEFAULT 0" for name in MEASURES)
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {SUMMARY_TABLE} (
+            dimension TEXT NOT NULL,
+            clave TEXT NOT NULL,
+            subclave TEXT NOT NULL DEFAULT '',
+{measures},
+            PRIMARY KEY (dimension, clave, subclave)
+        )
+    """)
+
+
+def _add_row_sql(existing, prefix):
+    """Suma la fila new./old. a cada grupo (UPSERT)."""
+    names = ", ".join(MEASURES)
+    updates = ", ".join(f"{name} = {name} + excluded.{name}" for name in MEASURES)
+    values = ", ".join(_render(expr, existing, prefix) for expr in MEASURES.values())
+    statements = []
+    for dimension, (clave, subclave) in DIMENSIONS.items():
+        statements.append(
+            f"INSERT INTO {SUMMARY_TABLE} (dimension, clave, subclave, {names}) "
+            f"VALUES ('{dimension}', {_render(clave, existing, prefix)}, {_render(subclave, existing, prefix)}, {values}) "
+            f"ON CONFLICT (dimension, clave, subclave) DO UPDATE SET {updates};"
+        )
+    return "\n".join(statements)
+
+
+def _remove_row_sql(existing, prefix):
+    """Resta la fila old. de cada grupo y elimina los grupos que quedan vacíos."""
+    updates = ", ".join(f"{name} = {name} - ({_render(expr, existing, prefix)})" for name, expr in MEASURES.items())
+    statements = []
+    for dimension, (clave, subclave) in DIMENSIONS.items():
+        where = (
+            f"dimension = '{dimension}' AND clave = {_render(clave, existing, prefix)} "
+            f"AND subclave = {_render(subclave, existing, prefix)}"
+        )
+        statements.append(f"UPDATE {SUMMARY_TABLE} SET {updates} WHERE {where};")
+        statements.append(f"DELETE FROM {SUMMARY_TABLE} WHERE {where} AND total <= 0;")
+    return "\n".join(statements)
+
+
+def _create_triggers(conn, existing):
+    watched = ", ".join(col for col in SOURCE_COLUMNS if col in existing)
+    update_of = f"UPDATE OF {watched}" if watched else "UPDATE"
+    active = f"WHEN (SELECT diferidos FROM {CONTROL_TABLE} WHERE id = 1) = 0"
+    conn.executescript(f"""
+        DROP TRIGGER IF EXISTS resumen_ei_ai;
+        DROP TRIGGER IF EXISTS resumen_ei_au;
+        DROP TRIGGER IF EXISTS resumen_ei_ad;
+        CREATE TRIGGER resumen_ei_ai AFTER INSERT ON {SOURCE_TABLE} {active} BEGIN
+            {_add_row_sql(existing, 'new.')}
+        END;
+        CREATE TRIGGER resumen_ei_au AFTER {update_of} ON {SOURCE_TABLE} {active} BEGIN
+            {_remove_row_sql(existing, 'old.')}
+            {_add_row_sql(existing, 'new.')}
+        END;
+        CREATE TRIGGER resumen_ei_ad AFTER DELETE ON {SOURCE_TABLE} {active} BEGIN
+            {_remove_row_sql(existing, 'old.')}
+        END;
+    """)
+
+
+def _aggregate_sql(existing, dimension, where="", texto="TEXT"):
+    """SELECT que agrupa equipos_individuales igual que el resumen."""
+    clave, subclave = DIMENSIONS[dimension]
+    clave, subclave = _render(clave, existing, texto=texto), _render(subclave, existing, texto=texto)
+    sums = ", ".join(f"SUM({_render(expr, existing)}) AS {name}" for name, expr in MEASURES.items())
+    return (
+        f"SELECT '{dimension}' AS dimension, {clave} AS clave, {subclave} AS subclave, {sums} "
+        f"FROM {SOURCE_TABLE} {where} GROUP BY {clave}, {subclave}"
+    )
+
+
+def _backfill(conn, existing):
+    conn.execute(f"DELETE FROM {SUMMARY_TABLE}")
+    names = ", ".join(MEASURES)
+    for dimension in DIMENSIONS:
+        conn.execute(
+            f"INSERT INTO {SUMMARY_TABLE} (dimension, clave, subclave, {names}) "
+            f"SELECT dimension, clave, subclave, {names} FROM ({_aggregate_sql(existing, dimension)})"
+        )
+    # Las pestañas por_sede, por_usuario... se cachean por inventario_version
+    bump_inventory_version(conn)
+
+
+def rebuild_inventory_summary(conn):
+    """
+    Recrea los triggers y recalcula el resumen desde equipos_individuales.
+    Devuelve {dimensión: grupos}.
+    """
+    existing = table_columns(conn, SOURCE_TABLE)
+    _create_summary_table(conn)
+    _create_triggers(conn, existing)
+    _backfill(conn, existing)
+    conn.execute(f"DELETE FROM {DEFER_TABLE}")
+    conn.execute(f"UPDATE {CONTROL_TABLE} SET diferidos = 0, desde = NULL WHERE id = 1")
+    conn.commit()
+    return {
+        dimension: conn.execute(
+            f"SELECT COUNT(*) FROM {SUMMARY_TABLE} WHERE dimension = ?", (dimension,)
+        ).fetchone()[0]
+        for dimension in DIMENSIONS
+    }
+
+
+def install_inventory_summary(conn):
+    """
+    Paso de migración: crea el resumen y sus triggers si faltan y lo calcula
+    desde los equipos existentes. Devuelve False si la base de datos no es
+    SQLite o no existe la tabla de equipos.
+    """
+    if not isinstance(conn, sqlite3.Connection):
+        return False
+    existing = table_columns(conn, SOURCE_TABLE)
+    if not existing:
+        return False
+    _create_summary_table(conn)
+    if not set(SUMMARY_TRIGGERS) <= schema_objects(conn, "trigger"):
+        _create_triggers(conn, existing)
+        _backfill(conn, existing)
+    conn.commit()
+    return True
+
+
+def _summary_installed(conn):
+    expected = (SUMMARY_TABLE, CONTROL_TABLE, DEFER_TABLE, *SUMMARY_TRIGGERS)
+    found = conn.execute(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE name IN ({', '.join('?' * len(expected))})", expected
+    ).fetchone()[0]
+    return found == len(expected), True
+
+
+def summary_ready(conn):
+    """True si el resumen y sus triggers están instalados."""
+    return derived_ready(conn, "resumen", _summary_installed)
+
+
+def _release_deferrals(conn, owners):
+    """
+    Quita los diferimientos de `owners`, actualiza el contador de control y
+    recalcula el resumen si no queda ninguno. No hace commit.
+    """
+    conn.executemany(f"DELETE FROM {DEFER_TABLE} WHERE propietario = ?", [(owner,) for owner in owners])
+    conn.execute(
+        f"UPDATE {CONTROL_TABLE} SET diferidos = (SELECT COUNT(*) FROM {DEFER_TABLE}), "
+        f"desde = (SELECT MIN(desde) FROM {DEFER_TABLE}) WHERE id = 1"
+    )
+    if conn.execute(f"SELECT diferidos FROM {CONTROL_TABLE} WHERE id = 1").fetchone()[0] == 0:
+        _backfill(conn, table_columns(conn, SOURCE_TABLE))
+
+
+def release_stale_deferrals(conn):
+    """
+    Libera los diferimientos abandonados: los de trabajos que no están en
+    ejecución o llevan más de JOB_STALE_SECONDS sin latido, y los que no tienen
+    trabajo y superan SUMMARY_DEFER_STALE_SECONDS. Devuelve True si el resumen
+    sigue diferido.
+    """
+    row = conn.execute(f"SELECT diferidos FROM {CONTROL_TABLE} WHERE id = 1").fetchone()
+    if not row or not row[0]:
+        return False
+    # jobs -> metrics -> inventory_summary: importación diferida
+    from modules.jobs import JOB_STALE_SECONDS
+
+    now = datetime.now()
+    job_stale = (now - timedelta(seconds=JOB_STALE_SECONDS)).isoformat(timespec="seconds")
+    defer_stale = (now - timedelta(seconds=SUMMARY_DEFER_STALE_SECONDS)).isoformat(timespec="seconds")
+    owners = conn.execute(f"SELECT propietario, job_id, desde FROM {DEFER_TABLE}").fetchall()
+    job_ids = [owner[1] for owner in owners if owner[1] is not None]
+    running = set()
+    if job_ids:
+        running = {
+            r[0] for r in conn.execute(
+                f"SELECT id FROM background_jobs WHERE id IN ({', '.join('?' * len(job_ids))}) "
+                "AND status = 'running' AND heartbeat_at >= ?",
+                (*job_ids, job_stale),
+            ).fetchall()
+        }
+    stale = [
+        owner for owner, job_id, desde in owners
+        if (job_id not in running if job_id is not None else desde < defer_stale)
+    ]
+    if not stale and len(owners) == row[0]:
+        return True
+    # También corrige un contador sin propietarios (versiones anteriores)
+    _release_deferrals(conn, stale)
+    conn.commit()
+    return len(owners) > len(stale)
+
+
+@contextmanager
+def deferred_summary(rows=None, job_id=None):
+    """
+    Suspende los triggers del resumen durante una escritura masiva y lo recalcula
+    al salir del último bloque diferido. rows: filas que se escribirán (si se
+    conoce); con pocas filas frente al tamaño del inventario no se difiere.
+    job_id: trabajo en segundo plano dueño del diferimiento; si se reanuda
+    tras una caída reutiliza el mismo y, si deja de ejecutarse, el
+    diferimiento se libera en la siguiente lectura del resumen.
+    """
+    owner = f"job:{job_id}" if job_id is not None else uuid.uuid4().hex
+    conn = get_db_connection()
+    try:
+        deferred = summary_ready(conn)
+        if deferred and rows is not None:
+            deferred = rows * SUMMARY_REBUILD_RATIO >= summary_totals(conn)["total"]
+        if deferred:
+            conn.execute(
+                f"INSERT OR IGNORE INTO {DEFER_TABLE} (propietario, job_id, desde) VALUES (?, ?, ?)",
+                (owner, job_id, datetime.now().isoformat(timespec="seconds")),
+            )
+            conn.execute(
+                f"UPDATE {CONTROL_TABLE} SET diferidos = (SELECT COUNT(*) FROM {DEFER_TABLE}), "
+                f"desde = (SELECT MIN(desde) FROM {DEFER_TABLE}) WHERE id = 1"
+            )
+            conn.commit()
+    finally:
+        conn.close()
+    try:
+        yield
+    finally:
+        if deferred:
+            conn = get_db_connection()
+            try:
+                _release_deferrals(conn, [owner])
+                conn.commit()
+            finally:
+                conn.close()
+
+
+def summary_rows(conn, dimension, clave=None):
+    """
+    Grupos de una dimensión como dicts {clave, subclave, total, disponibles, ...},
+    ordenados por total descendente. clave filtra un grupo (p. ej. una sede).
+    """
+    if summary_ready(conn):
+        release_stale_deferrals(conn)
+        sql = f"SELECT clave, subclave, {', '.join(MEASURES)} FROM {SUMMARY_TABLE} WHERE dimension = ?"
+        params = [dimension]
+        if clave is not None:
+            sql += " AND clave = ?"
+            params.append(str(clave))
+    else:
+        # Sin resumen instalado (otro motor o migración pendiente): en vivo
+        sqlite = isinstance(conn, sqlite3.Connection)
+        existing = table_columns(conn, SOURCE_TABLE) if sqlite else _table_columns_generic(conn)
+        if not existing:
+            return []  # base SQLite sin tabla de equipos
+        texto = "CHAR" if _is_mysql(conn) else "TEXT"
+        where = ""
+        params = []
+        if clave is not None:
+            where = f"WHERE {_render(DIMENSIONS[dimension][0], existing, texto=texto)} = {'?' if sqlite else '%s'}"
+            params.append(str(clave))
+        sql = (
+            f"SELECT clave, subclave, {', '.join(MEASURES)} "
+            f"FROM ({_aggregate_sql(existing, dimension, where, texto)}) resumen"
+        )
+    sql += " ORDER BY total DESC, clave"
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    names = ["clave", "subclave", *MEASURES]
+    return [dict(zip(names, row)) for row in cur.fetchall()]
+
+
+def summary_totals(conn, dimension="global", clave=""):
+    """Medidas de un único grupo (por defecto, el total del inventario)."""
+    rows = summary_rows(conn, dimension, clave)
+    if rows:
+        return rows[0]
+    return {"clave": clave, "subclave": "", **{name: 0 for name in MEASURES}}
+
+
+def _is_mysql(conn):
+    """True si la conexión del pool apunta a MySQL/MariaDB (según la URL)."""
+    scheme = urlparse(pool_key(conn) or "").scheme
+    return "mysql" in scheme or "mariadb" in scheme
+
+
+def _table_columns_generic(conn):
+    """Columnas de equipos_individuales en PostgreSQL/MySQL."""
+    cur = conn.cursor()
+    cur.execute(f"SELECT * FROM {SOURCE_TABLE} WHERE 1 = 0")
+    return {d[0] for d in cur.description}
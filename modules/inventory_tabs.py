@@ -0,0 +1,248 @@
+"""
+Soporte de las pestañas del tablero de inventarios (/inventarios/api/dashboard/<pestaña>).
+
+Categorías precalculadas
+    Las vistas de repotenciados, préstamos, telemedicina y D2K/DME buscaban
+    subcadenas (LIKE '%repot%') en estado, tecnología y observaciones en cada
+    lectura. En SQLite, equipos_individuales tiene ahora una columna de marca
+    por categoría (cat_repotenciado, ...) que un trigger recalcula al insertar o
+    al cambiar esas columnas, con un índice parcial por marca; leer una
+    categoría es un recorrido de índice. En otras bases de datos se sigue usando
+    la condición LIKE original.
+
+Caché de respuestas
+    inventario_version lleva un contador que los triggers incrementan con cada
+    escritura en las tablas que alimentan el tablero (y el recálculo de
+    inventario_resumen al terminar una importación diferida). Las respuestas se guardan
+    en memoria por (base de datos, pestaña, página) junto con la versión con la
+    que se calcularon, y se sirven con un ETag derivado de esa versión: si el
+    cliente ya tiene la versión vigente recibe 304 sin que se ejecute ninguna
+    consulta del tablero.
+
+Las marcas y los triggers los instala la migración del esquema derivado
+(install_inventory_tabs); las lecturas solo comprueban que estén y, si falta
+algo, usan la condición LIKE y no guardan respuestas. Al instalar, las marcas
+se calculan antes de crear los triggers de versión, y los triggers de
+actualización no vigilan las marcas ni empleado_id: recalcularlas (o volver a
+vincular empleados) no incrementa la versión una vez por fila.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from flask import Response, jsonify, request
+
+from modules.db_utils import derived_ready, pool_key, schema_objects, table_columns
+
+VERSION_TABLE = "inventario_version"
+SOURCE_TABLE = "equipos_individuales"
+# Tablas cuyas escrituras invalidan las respuestas del tablero
+VERSIONED_TABLES = (
+    "equipos_individuales",
+    "equipos_agrupados",
+    "equipos_adicionales",
+    "inventario_bajas",
+    "tandas_equipos_nuevos",
+)
+
+# Respuestas guardadas en memoria por proceso
+DASHBOARD_CACHE_SIZE = int(os.getenv("DASHBOARD_CACHE_SIZE", "128"))
+
+_TEXT = "LOWER(COALESCE({prefix}{col}, ''))"
+
+
+def _contains(columns, needles, prefix=""):
+    return "(" + " OR ".join(
+        f"{_TEXT.format(prefix=prefix, col=col)} LIKE '%{needle}%'" for needle in needles for col in columns
+    ) + ")"
+
+
+# categoría -> (columna de marca, columnas revisadas, subcadenas)
+CATEGORIES = {
+    "repotenciados": ("cat_repotenciado", ("estado", "observaciones"), ("repot",)),
+    "prestamos": ("cat_prestamo", ("estado", "observaciones"), ("prest",)),
+    "telemedicina": ("cat_telemedicina", ("tecnologia", "observaciones"), ("telemed",)),
+    "d2k_dme": ("cat_d2k_dme", ("tecnologia", "observaciones"), ("d2k", "dme")),
+}
+
+CATEGORY_FLAGS = tuple(flag for flag, _, _ in CATEGORIES.values())
+# Columnas que escriben otros triggers y no cambian lo que muestra el tablero:
+# las marcas y el vínculo con empleados (employee_links.LINK_COLUMN)
+UNWATCHED_COLUMNS = CATEGORY_FLAGS + ("empleado_id",)
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def category_condition(category, prefix=""):
+    """Condición LIKE original de la categoría (sin marcas precalculadas)."""
+    _, columns, needles = CATEGORIES[category]
+    return _contains(columns, needles, prefix)
+
+
+def _create_category_flags(conn, existing):
+    for flag, _, _ in CATEGORIES.values():
+        if flag not in existing:
+            conn.execute(f"ALTER TABLE {SOURCE_TABLE} ADD COLUMN {flag} INTEGER NOT NULL DEFAULT 0")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_ei_{flag} ON {SOURCE_TABLE} (id) WHERE {flag} = 1")
+
+    assignments = ", ".join(
+        f"{flag} = {category_condition(name, 'new.')}" for name, (flag, _, _) in CATEGORIES.items()
+    )
+    changed = " OR ".join(
+        f"{flag} != {category_condition(name, 'new.')}" for name, (flag, _, _) in CATEGORIES.items()
+    )
+    watched = sorted({col for _, columns, _ in CATEGORIES.values() for col in columns})
+    # Solo se reescribe la fila si alguna marca cambia
+    update = f"UPDATE {SOURCE_TABLE} SET {assignments} WHERE id = new.id AND ({changed});"
+    conn.executescript(f"""
+        DROP TRIGGER IF EXISTS categorias_ei_ai;
+        DROP TRIGGER IF EXISTS categorias_ei_au;
+        CREATE TRIGGER categorias_ei_ai AFTER INSERT ON {SOURCE_TABLE} BEGIN {update} END;
+        CREATE TRIGGER categorias_ei_au AFTER UPDATE OF {', '.join(watched)} ON {SOURCE_TABLE} BEGIN {update} END;
+    """)
+    conn.execute(
+        f"UPDATE {SOURCE_TABLE} SET "
+        + ", ".join(f"{flag} = {category_condition(name)}" for name, (flag, _, _) in CATEGORIES.items())
+    )
+
+
+def _version_events(conn, table):
+    """Eventos de los triggers de versión; la actualización sin UNWATCHED_COLUMNS."""
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+    watched = [col for col in columns if col not in UNWATCHED_COLUMNS]
+    update = f"UPDATE OF {', '.join(watched)}" if len(watched) < len(columns) else "UPDATE"
+    return (("ai", "INSERT"), ("au", update), ("ad", "DELETE"))
+
+
+def _drop_version_triggers(conn, tables):
+    conn.executescript("\n".join(
+        f"DROP TRIGGER IF EXISTS version_{table}_{suffix};" for table in tables for suffix in ("ai", "au", "ad")
+    ))
+
+
+def _create_version_triggers(conn, tables):
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    conn.execute(f"INSERT OR IGNORE INTO {VERSION_TABLE} (id, version) VALUES (1, 0)")
+    bump = f"UPDATE {VERSION_TABLE} SET version = version + 1 WHERE id = 1;"
+    for table in tables:
+        statements = []
+        for suffix, event in _version_events(conn, table):
+            statements.append(f"DROP TRIGGER IF EXISTS version_{table}_{suffix};")
+            statements.append(f"CREATE TRIGGER version_{table}_{suffix} AFTER {event} ON {table} BEGIN {bump} END;")
+        conn.executescript("\n".join(statements))
+
+
+def install_inventory_tabs(conn):
+    """
+    Paso de migración: crea las marcas de categoría (calculándolas para los
+    equipos existentes) y recrea los triggers de versión. Devuelve False si la
+    base de datos no es SQLite o no hay inventario.
+    """
+    if not isinstance(conn, sqlite3.Connection):
+        return False
+    existing = table_columns(conn, SOURCE_TABLE)
+    if not existing:
+        return False
+    tables = [table for table in VERSIONED_TABLES if table_columns(conn, table)]
+    backfill = "categorias_ei_ai" not in schema_objects(conn, "trigger") or not set(CATEGORY_FLAGS) <= existing
+    if backfill:
+        # Sin triggers de versión mientras se escriben las marcas de todas las filas
+        _drop_version_triggers(conn, tables)
+        _create_category_flags(conn, existing)
+    _create_version_triggers(conn, tables)
+    if backfill:
+        bump_inventory_version(conn)
+    conn.commit()
+    return True
+
+
+def _tabs_installed(conn):
+    tables = schema_objects(conn, "table")
+    triggers = schema_objects(conn, "trigger")
+    if VERSION_TABLE not in tables or not {"categorias_ei_ai", "categorias_ei_au"} <= triggers:
+        return False, False
+    present = [table for table in VERSIONED_TABLES if table in tables]
+    installed = all(f"version_{table}_ai" in triggers for table in present)
+    return installed, len(present) == len(VERSIONED_TABLES)
+
+
+def tabs_ready(conn):
+    """True si las marcas y los triggers de versión de las tablas que existen están instalados."""
+    return derived_ready(conn, "pestanas", _tabs_installed)
+
+
+def category_filter(conn, category, prefix=""):
+    """WHERE de una categoría: la marca precalculada si existe, si no la condición LIKE."""
+    if tabs_ready(conn):
+        return f"{prefix}{CATEGORIES[category][0]} = 1"
+    return category_condition(category, prefix)
+
+
+def inventory_version(conn):
+    """Versión actual de los datos del tablero, o None si no se puede cachear."""
+    if not tabs_ready(conn):
+        return None
+    row = conn.execute(f"SELECT version FROM {VERSION_TABLE} WHERE id = 1").fetchone()
+    return row[0] if row else None
+
+
+def bump_inventory_version(conn):
+    """
+    Invalida las respuestas guardadas tras una escritura que no pasa por los
+    triggers de versión (p. ej. el recálculo de inventario_resumen). No hace commit.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (VERSION_TABLE,)).fetchone():
+        conn.execute(f"UPDATE {VERSION_TABLE} SET version = version + 1 WHERE id = 1")
+
+
+def response_etag(conn, version, *parts):
+    """Valor del ETag (débil) de una respuesta calculada con `version`."""
+    raw = "|".join(str(p) for p in (pool_key(conn), version, *parts))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def cached_json(conn, parts, build):
+    """
+    Respuesta JSON de build() identificada por `parts` (pestaña, página...).
+    Responde 304 si el cliente ya tiene la versión vigente y reutiliza el
+    cuerpo guardado si otro cliente ya la pidió; build() solo se ejecuta si
+    no hay ninguna de las dos. Sin versión (no SQLite) no se cachea.
+    """
+    version = inventory_version(conn)
+    if version is None:
+        return jsonify(build())
+    etag = response_etag(conn, version, *parts)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        key = (pool_key(conn), *parts)
+        with _cache_lock:
+            entry = _cache.get(key)
+            if entry is not None and entry[0] == version:
+                _cache.move_to_end(key)
+        if entry is None or entry[0] != version:
+            entry = (version, jsonify(build()).get_data())
+            with _cache_lock:
+                _cache[key] = entry
+                _cache.move_to_end(key)
+                while len(_cache) > DASHBOARD_CACHE_SIZE:
+                    _cache.popitem(last=False)
+        response = Response(entry[1], mimetype="application/json")
+    response.set_etag(etag, weak=True)
+    # El navegador guarda la respuesta pero la revalida siempre con If-None-Match
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
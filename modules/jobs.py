@@ -0,0 +1,393 @@
+"""
+Trabajos en segundo plano (importaciones y reportes).
+
+Las rutas encolan el trabajo en la tabla background_jobs y responden de
+inmediato con su id; un pool de hilos lo ejecuta fuera de la petición HTTP.
+El manejador informa su avance por bloques con job.progress(), que también
+guarda el punto de control y detiene el trabajo si se pidió cancelarlo.
+Mientras el manejador corre, un hilo de latido actualiza heartbeat_at cada
+JOB_HEARTBEAT_SECONDS aunque un bloque tarde más que JOB_STALE_SECONDS: solo
+queda sin latido un trabajo cuyo proceso terminó. En ese caso, al arrancar
+la aplicación se vuelve a encolar y el manejador continúa desde el último
+punto de control.
+
+Registro de un manejador:
+
+    @job_handler("importador")
+    def run_import(job):
+        ...
+        job.progress(processed=n, total=total, checkpoint={...}, inserted=i)
+        return {"inserted": i}
+
+processed cuenta filas salvo que el manejador se registre con rows=False
+(p. ej. secciones de un archivo): esos trabajos no suman a las métricas de
+filas (workmanager_job_rows_total y _per_second).
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from modules import metrics
+from modules.db_utils import get_db_connection, pool_key
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Un trabajo en ejecución sin latido durante este tiempo se considera huérfano
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "300"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", str(JOB_STALE_SECONDS / 5)))
+
+FINISHED_STATES = ("done", "failed", "cancelled")
+
+_JOBS_TABLE = """
+    CREATE TABLE IF NOT EXISTS background_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        params TEXT,
+        processed INTEGER DEFAULT 0,
+        total INTEGER,
+        stats TEXT,
+        checkpoint TEXT,
+        result TEXT,
+        error TEXT,
+        cancel_requested INTEGER DEFAULT 0,
+        created_at TEXT,
+        started_at TEXT,
+        heartbeat_at TEXT,
+        finished_at TEXT
+    )
+"""
+
+_HANDLERS = {}
+# Tipos cuyo avance no se mide en filas
+_NON_ROW_KINDS = set()
+# Bases de datos (clave del pool) donde ya existe la tabla
+_SCHEMA_READY = set()
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+class JobCancelled(BaseException):
+    """
+    Se lanza desde job.progress() cuando se pidió cancelar el trabajo.
+    Hereda de BaseException para atravesar los `except Exception` genéricos de
+    los manejadores (igual que asyncio.CancelledError).
+    """
+
+
+def job_handler(kind, rows=True):
+    """
+    Registra la función que ejecuta los trabajos de un tipo. rows=False si
+    job.progress(processed=...) no cuenta filas.
+    """
+    def decorator(func):
+        _HANDLERS[kind] = func
+        if rows:
+            _NON_ROW_KINDS.discard(kind)
+        else:
+            _NON_ROW_KINDS.add(kind)
+        return func
+    return decorator
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _conn():
+    conn = get_db_connection()
+    key = pool_key(conn)
+    if key is None or key not in _SCHEMA_READY:
+        conn.execute(_JOBS_TABLE)
+        conn.commit()
+        if key is not None:
+            _SCHEMA_READY.add(key)
+    return conn
+
+
+def _loads(value, default=None):
+    if not value:
+        return default
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _row_to_dict(row):
+    job = dict(row)
+    job["params"] = _loads(job.get("params"), {})
+    job["stats"] = _loads(job.get("stats"), {})
+    job["checkpoint"] = _loads(job.get("checkpoint"))
+    job["result"] = _loads(job.get("result"))
+    job["cancel_requested"] = bool(job.get("cancel_requested"))
+    total = job.get("total")
+    job["percent"] = round(100.0 * (job.get("processed") or 0) / total, 1) if total else None
+    return job
+
+
+class Job:
+    """Vista del trabajo en ejecución que recibe el manejador."""
+
+    def __init__(self, row):
+        self.id = row["id"]
+        self.kind = row["kind"]
+        self.params = row["params"]
+        self.checkpoint = row["checkpoint"]
+        self.stats = dict(row["stats"] or {})
+        self.processed = row["processed"] or 0
+        self.total = row["total"]
+
+    def progress(self, processed=None, total=None, checkpoint=None, **stats):
+        """
+        Guarda avance, contadores y punto de control (late el trabajo).
+        Lanza JobCancelled si se pidió cancelar; conviene llamarlo justo
+        después de confirmar cada bloque para que el punto de control sea exacto.
+        """
+        if processed is not None:
+            if processed > self.processed and self.kind not in _NON_ROW_KINDS:
+                metrics.job_rows.inc(processed - self.processed, kind=self.kind)
+            self.processed = processed
+        if total is not None:
+            self.total = total
+        if checkpoint is not None:
+            self.checkpoint = checkpoint
+        self.stats.update(stats)
+
+        conn = _conn()
+        try:
+            conn.execute(
+                "UPDATE background_jobs SET processed = ?, total = ?, stats = ?, checkpoint = ?, heartbeat_at = ? "
+                "WHERE id = ?",
+                (
+                    self.processed,
+                    self.total,
+                    json.dumps(self.stats, default=str),
+                    json.dumps(self.checkpoint, default=str) if self.checkpoint is not None else None,
+                    _now(),
+                    self.id,
+                ),
+            )
+            conn.commit()
+            row = conn.execute("SELECT cancel_requested FROM background_jobs WHERE id = ?", (self.id,)).fetchone()
+        finally:
+            conn.close()
+        if row and row[0]:
+            raise JobCancelled()
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _schedule(job_id):
+    _get_executor().submit(run_job, job_id)
+
+
+def submit_job(kind, params=None):
+    """Encola un trabajo y devuelve su id."""
+    if kind not in _HANDLERS:
+        raise ValueError(f"Tipo de trabajo no registrado: {kind}")
+    conn = _conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO background_jobs (kind, status, params, created_at) VALUES (?, 'queued', ?, ?)",
+            (kind, json.dumps(params or {}, default=str), _now()),
+        )
+        job_id = cur.lastrowid
+        conn.commit()
+    finally:
+        conn.close()
+    _schedule(job_id)
+    return job_id
+
+
+def _finish(job_id, status, result=None, error=None):
+    conn = _conn()
+    try:
+        conn.execute(
+            "UPDATE background_jobs SET status = ?, result = ?, error = ?, finished_at = ?, heartbeat_at = ? "
+            "WHERE id = ?",
+            (status, json.dumps(result, default=str) if result is not None else None, error, _now(), _now(), job_id),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _heartbeat(job_id, stop):
+    """Late el trabajo cada JOB_HEARTBEAT_SECONDS hasta que se active `stop`."""
+    while not stop.wait(JOB_HEARTBEAT_SECONDS):
+        try:
+            conn = _conn()
+            try:
+                conn.execute(
+                    "UPDATE background_jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running'",
+                    (_now(), job_id),
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            logging.warning("Latido del trabajo %s: %s", job_id, e)
+
+
+def run_job(job_id):
+    """
+    Ejecuta un trabajo encolado en el hilo actual. Solo el primer proceso que
+    lo reclama (queued -> running) lo ejecuta; los demás no hacen nada.
+    """
+    conn = _conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "UPDATE background_jobs SET status = 'running', started_at = COALESCE(started_at, ?), heartbeat_at = ? "
+            "WHERE id = ? AND status = 'queued'",
+            (_now(), _now(), job_id),
+        )
+        claimed = cur.rowcount == 1
+        conn.commit()
+        row = conn.execute("SELECT * FROM background_jobs WHERE id = ?", (job_id,)).fetchone() if claimed else None
+    finally:
+        conn.close()
+    if row is None:
+        return
+
+    job = Job(_row_to_dict(row))
+    handler = _HANDLERS.get(job.kind)
+    if handler is None:
+        _finish(job_id, "failed", error=f"Tipo de trabajo no registrado: {job.kind}")
+        return
+    started, first_row = time.monotonic(), job.processed
+    status = "done"
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(job_id, stop), name=f"job-{job_id}-latido", daemon=True).start()
+    try:
+        result = handler(job)
+    except JobCancelled:
+        status = "cancelled"
+        _finish(job_id, status, result=job.stats)
+    except Exception as e:
+        status = "failed"
+        logging.exception("Trabajo %s (%s) falló", job_id, job.kind)
+        _finish(job_id, status, result=job.stats, error=str(e))
+    else:
+        _finish(job_id, status, result=result)
+    finally:
+        stop.set()
+        metrics.jobs_finished.inc(kind=job.kind, status=status)
+        elapsed = time.monotonic() - started
+        if job.processed > first_row and elapsed > 0 and job.kind not in _NON_ROW_KINDS:
+            metrics.job_rate.set(round((job.processed - first_row) / elapsed, 1), kind=job.kind)
+
+
+def cancel_job(job_id):
+    """
+    Pide cancelar un trabajo. Si aún está en cola se cancela de inmediato;
+    si está en ejecución se detiene en su próximo job.progress().
+    """
+    conn = _conn()
+    try:
+        conn.execute(
+            "UPDATE background_jobs SET cancel_requested = 1 WHERE id = ? AND status IN ('queued', 'running')",
+            (job_id,),
+        )
+        conn.execute(
+            "UPDATE background_jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+            (_now(), job_id),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return get_job(job_id)
+
+
+def get_job(job_id):
+    conn = _conn()
+    try:
+        row = conn.execute("SELECT * FROM background_jobs WHERE id = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    return _row_to_dict(row) if row else None
+
+
+def list_jobs(kind=None, limit=10):
+    sql = "SELECT * FROM background_jobs"
+    params = []
+    if kind:
+        sql += " WHERE kind = ?"
+        params.append(kind)
+    sql += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+    conn = _conn()
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+    return [_row_to_dict(row) for row in rows]
+
+
+def resume_jobs():
+    """
+    Vuelve a encolar los trabajos huérfanos (en ejecución sin latido reciente)
+    y programa todos los pendientes. Devuelve los ids programados.
+    """
+    stale_before = (datetime.now() - timedelta(seconds=JOB_STALE_SECONDS)).isoformat(timespec="seconds")
+    conn = _conn()
+    try:
+        conn.execute(
+            "UPDATE background_jobs SET status = 'queued' WHERE status = 'running' AND heartbeat_at < ?",
+            (stale_before,),
+        )
+        conn.commit()
+        rows = conn.execute(
+            "SELECT id, kind FROM background_jobs WHERE status = 'queued' ORDER BY id"
+        ).fetchall()
+    finally:
+        conn.close()
+    scheduled = []
+    for job_id, kind in rows:
+        if kind in _HANDLERS:
+            _schedule(job_id)
+            scheduled.append(job_id)
+    return scheduled
+
+
+def stream_job(job_id, interval=1.0):
+    """Eventos SSE con el estado del trabajo hasta que termina."""
+    last = None
+    while True:
+        job = get_job(job_id)
+        if job is None:
+            yield "event: error\ndata: {\"error\": \"Trabajo no encontrado\"}\n\n"
+            return
+        payload = json.dumps(job, default=str)
+        if payload != last:
+            yield f"data: {payload}\n\n"
+            last = payload
+        if job["status"] in FINISHED_STATES:
+            return
+        time.sleep(interval)
+
+
+def init_app(app):
+    """Reanuda los trabajos pendientes de una ejecución anterior."""
+    try:
+        resumed = resume_jobs()
+    except Exception as e:
+        app.logger.warning("No se pudieron reanudar los trabajos en segundo plano: %s", e)
+        return
+    if resumed:
+        app.logger.info("Trabajos en segundo plano reanudados: %s", resumed)
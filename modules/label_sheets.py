@@ -0,0 +1,139 @@
+"""
+Hojas de etiquetas con códigos de barras Code128 en PDF.
+
+Los códigos se dibujan como gráficos vectoriales de reportlab (un trazado de
+rectángulos por código) en lugar de rasterizarlos a PNG con python-barcode y
+PIL: el PDF pesa una fracción y se imprime nítido a cualquier resolución. La
+geometría de cada código (posición y ancho de las barras, ya como operadores
+PDF) se calcula una vez y se guarda en un LRU, de modo que las etiquetas
+repetidas no la recalculan.
+
+Las selecciones grandes se dividen en lotes de páginas que se generan en el
+pool de procesos compartido (modules/process_pool) y se unen con pypdf; sin pypdf, o con pocas páginas, todo se
+genera en el proceso actual.
+
+    pdf_bytes = render_label_sheet([("MED-MON-001", "Dell P2419", "SN123"), ...])
+"""
+
+import importlib.util
+import io
+import logging
+import os
+from functools import lru_cache
+
+from reportlab.graphics.barcode.code128 import Code128
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+
+from modules.process_pool import imap
+from modules.report_engine import merge_pdfs
+
+logger = logging.getLogger(__name__)
+
+# Plantilla de 30 etiquetas por hoja carta (3 columnas x 10 filas)
+LABEL_WIDTH = 2.625 * inch
+LABEL_HEIGHT = 1 * inch
+LEFT_MARGIN = 0.18 * inch
+TOP_MARGIN = 0.5 * inch
+X_GAP = 0.14 * inch
+COLS = 3
+ROWS = 10
+LABELS_PER_PAGE = COLS * ROWS
+
+BARCODE_WIDTH = 2.4 * inch
+BARCODE_HEIGHT = 0.4 * inch
+# Ancho máximo de la barra más delgada (los códigos cortos no se estiran de más)
+MAX_MODULE_WIDTH = 1.2
+
+BARCODE_CACHE_SIZE = int(os.getenv("BARCODE_CACHE_SIZE", "4096"))
+# Páginas por lote y lotes en curso por petición (0 = siempre en el proceso actual)
+LABEL_PAGES_PER_BATCH = int(os.getenv("LABEL_PAGES_PER_BATCH", "25"))
+LABEL_WORKERS = int(os.getenv("LABEL_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+@lru_cache(maxsize=BARCODE_CACHE_SIZE)
+def barcode_bars(value):
+    """
+    Barras del Code128 de `value`: ((inicio, ancho), ...) en módulos y el
+    ancho total en módulos.
+    """
+    code = Code128(value, barWidth=1, quiet=0)
+    code.validate()
+    code.encode()
+    code.decompose()
+    bars = []
+    left = 0
+    for symbol in code.decomposed:
+        if symbol.islower():
+            left += ord(symbol) - ord("a") + 1
+        else:
+            width = ord(symbol) - ord("A") + 1
+            bars.append((left, width))
+            left += width
+    return tuple(bars), left
+
+
+@lru_cache(maxsize=BARCODE_CACHE_SIZE)
+def _barcode_operators(value, height):
+    """Operadores PDF de las barras (en módulos de ancho) como un solo relleno."""
+    bars, _ = barcode_bars(value)
+    return " ".join(f"{start} 0 {width} {height:g} re" for start, width in bars) + " f"
+
+
+def draw_barcode(c, value, x, y, max_width=BARCODE_WIDTH, height=BARCODE_HEIGHT):
+    """Dibuja el código centrado en [x, x + max_width] con un solo trazado."""
+    _, modules = barcode_bars(value)
+    if not modules:
+        return
+    module = min(max_width / modules, MAX_MODULE_WIDTH)
+    left = x + (max_width - modules * module) / 2
+    # Las barras se escriben en módulos y la matriz las escala al ancho real
+    c.saveState()
+    c.transform(module, 0, 0, 1, left, y)
+    c.addLiteral(_barcode_operators(value, height))
+    c.restoreState()
+
+
+def _draw_label(c, label, x, y):
+    value, line1, line2 = label
+    draw_barcode(c, value, x + 0.1 * inch, y + 0.4 * inch)
+    c.drawString(x + 0.1 * inch, y + 0.25 * inch, line1[:45])
+    c.drawString(x + 0.1 * inch, y + 0.15 * inch, line2[:45])
+    c.drawCentredString(x + LABEL_WIDTH / 2, y + 0.05 * inch, value)
+
+
+def _render_pages(labels):
+    """PDF (bytes) con las etiquetas dadas, LABELS_PER_PAGE por página."""
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter, pageCompression=1)
+    _, height = letter
+    for start in range(0, len(labels), LABELS_PER_PAGE):
+        c.setFont("Helvetica", 7)
+        for i, label in enumerate(labels[start:start + LABELS_PER_PAGE]):
+            row, col = divmod(i, COLS)
+            x = LEFT_MARGIN + col * (LABEL_WIDTH + X_GAP)
+            y = height - TOP_MARGIN - LABEL_HEIGHT - row * LABEL_HEIGHT
+            _draw_label(c, label, x, y)
+        c.showPage()
+    if not labels:
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def render_label_sheet(labels, workers=None):
+    """
+    PDF (bytes) con una etiqueta por tupla (código, línea 1, línea 2). Con más
+    de un lote de páginas y workers > 1 los lotes se generan en paralelo.
+    """
+    labels = [(str(v), str(l1 or ""), str(l2 or "")) for v, l1, l2 in labels if v]
+    workers = LABEL_WORKERS if workers is None else workers
+    batch = max(LABEL_PAGES_PER_BATCH, 1) * LABELS_PER_PAGE
+    batches = [labels[i:i + batch] for i in range(0, len(labels), batch)]
+    if workers > 1 and len(batches) > 1 and importlib.util.find_spec("pypdf") is not None:
+        try:
+            return merge_pdfs(list(imap(_render_pages, ((b,) for b in batches), workers)))
+        except Exception as e:
+            logger.warning("Falló la generación en paralelo de etiquetas (%s); se reintenta en serie", e)
+    return _render_pages(labels)
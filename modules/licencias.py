@@ -5,6 +5,8 @@ import csv
 from datetime import datetime
 import io
 import pandas as pd
+from modules.db_utils import get_db_connection
+from modules.employee_links import employee_ref
 
 licencias_bp = Blueprint(
     "licencias",
@@ -13,16 +15,6 @@ licencias_bp = Blueprint(
     template_folder="templates"
 )
 
-DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "workmanager_erp.db")
-
-
-def get_db_connection():
-    # Si estás usando ruta relativa diferente en tu proyecto, ajusta aquí.
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-
 def ensure_licencias_tables(conn):
     """
     Asegura que las tablas necesarias para licencias existan.
@@ -39,6 +31,7 @@ def ensure_licencias_tables(conn):
             tipo_licencia TEXT,
             usuario_asignado TEXT,
             cedula_usuario TEXT,
+            empleado_id INTEGER,
             sede_id INTEGER,
             estado TEXT DEFAULT 'activa',
             fecha_asignacion TEXT,
@@ -99,7 +92,8 @@ def dashboard_licencias():
     resumen = cur.fetchall()
 
     # Detalle por usuario / correo
-    query = """
+    employee = employee_ref(conn, "licencias_office365", "l")
+    query = f"""
         SELECT l.*,
                e.id as empleado_id,
                e.nombre as empleado_nombre,
@@ -109,7 +103,7 @@ def dashboard_licencias():
                e.departamento as empleado_departamento,
                s.nombre as sede_nombre
         FROM licencias_office365 l
-        LEFT JOIN empleados e ON (LOWER(e.correo_office) = LOWER(l.email) OR e.cedula = l.cedula_usuario)
+        LEFT JOIN empleados e ON e.id = {employee}
         LEFT JOIN sedes s ON e.sede_id = s.id OR l.sede_id = s.id
     """
     params = []
@@ -494,13 +488,14 @@ def api_assign_by_sede():
         return jsonify({"error": "sede_id requerido"}), 400
 
     conn = get_db_connection()
+    employee = employee_ref(conn, "licencias_office365", "l")
     cur = conn.cursor()
     try:
         # Obtener usuarios de la sede sin licencia asignada
-        cur.execute("""
+        cur.execute(f"""
             SELECT e.id, e.nombre, e.apellido, e.cedula, e.correo_office
             FROM empleados e
-            LEFT JOIN licencias_office365 l ON LOWER(e.correo_office) = LOWER(l.email)
+            LEFT JOIN licencias_office365 l ON {employee} = e.id
             WHERE e.sede_id = ? AND l.id IS NULL
             LIMIT ?
         """, (sede_id, cantidad))
@@ -596,9 +591,10 @@ def api_filter_by_sede(sede_id):
     Filtra licencias por sede específica.
     """
     conn = get_db_connection()
+    employee = employee_ref(conn, "licencias_office365", "l")
     cur = conn.cursor()
     try:
-        cur.execute("""
+        cur.execute(f"""
             SELECT l.*,
                    e.nombre AS empleado_nombre,
                    e.apellido AS empleado_apellido,
@@ -606,7 +602,7 @@ def api_filter_by_sede(sede_id):
                    e.cargo AS empleado_cargo,
                    e.departamento AS empleado_departamento
             FROM licencias_office365 l
-            LEFT JOIN empleados e ON LOWER(e.correo_office) = LOWER(l.email)
+            LEFT JOIN empleados e ON e.id = {employee}
             WHERE l.sede_id = ?
             ORDER BY l.usuario_asignado ASC
         """, (sede_id,))
@@ -624,14 +620,15 @@ def licencia_modal_producto(producto):
     Busca usuarios que tengan asignada una licencia que contenga el nombre del producto.
     """
     conn = get_db_connection()
+    employee = employee_ref(conn, "licencias_office365", "l")
     cur = conn.cursor()
     try:
         # Busca usuarios con ese tipo de licencia
-        cur.execute("""
+        cur.execute(f"""
             SELECT l.email, l.usuario_asignado, l.estado, l.fecha_asignacion,
                    e.cargo, e.departamento
             FROM licencias_office365 l
-            LEFT JOIN empleados e ON LOWER(e.correo_office) = LOWER(l.email)
+            LEFT JOIN empleados e ON e.id = {employee}
             WHERE l.tipo_licencia LIKE ?
             ORDER BY l.usuario_asignado
         """, (f"%{producto}%",))
@@ -649,16 +646,17 @@ def api_licencia_detail(licencia_id):
     Devuelve los detalles completos de una licencia específica en formato JSON.
     """
     conn = get_db_connection()
+    employee = employee_ref(conn, "licencias_office365", "l")
     cur = conn.cursor()
     try:
-        cur.execute("""
+        cur.execute(f"""
             SELECT l.*,
                    e.nombre AS empleado_nombre,
                    e.apellido AS empleado_apellido,
                    e.cargo AS empleado_cargo,
                    e.departamento AS empleado_departamento
             FROM licencias_office365 l
-            LEFT JOIN empleados e ON LOWER(e.correo_office) = LOWER(l.email)
+            LEFT JOIN empleados e ON e.id = {employee}
             WHERE l.id = ?
         """, (licencia_id,))
         licencia = cur.fetchone()
@@ -675,6 +673,7 @@ def exportar_licencias(format):
     Exporta los datos de licencias, aplicando los filtros de búsqueda y ordenamiento.
     """
     conn = get_db_connection()
+    employee = employee_ref(conn, "licencias_office365", "l")
     cur = conn.cursor()
 
     # 1. Obtener filtros de la URL
@@ -693,12 +692,12 @@ def exportar_licencias(format):
         sort_dir = 'asc'
 
     # 2. Construir la consulta con filtros
-    query = """
+    query = f"""
         SELECT
             l.usuario_asignado, l.email, l.tipo_licencia, l.estado,
             l.fecha_asignacion, e.cedula, e.cargo, e.departamento
         FROM licencias_office365 l
-        LEFT JOIN empleados e ON (LOWER(e.correo_office) = LOWER(l.email))
+        LEFT JOIN empleados e ON e.id = {employee}
     """
     params = []
     if search_query:
@@ -0,0 +1,266 @@
+"""
+Hojas de vida de equipos en PDF con caché por contenido y descarga masiva en ZIP.
+
+Cada PDF se guarda en disco con el hash de su contenido (tabla, columnas y
+valores de la fila) como nombre: mientras la fila no cambie (incluido su
+updated_at) se sirve el mismo archivo sin volver a maquetarlo, y cualquier
+cambio produce otro hash, así que no hace falta invalidar nada. Cambiar
+LIFE_SHEET_TEMPLATE_VERSION descarta todas las entradas anteriores.
+
+Las entradas de versiones viejas de cada fila se eliminan por uso: cada
+lectura actualiza la fecha del archivo y, como mucho cada
+LIFE_SHEET_PRUNE_INTERVAL segundos, al guardar un PDF se borran los que no se
+usan hace más de LIFE_SHEET_CACHE_MAX_DAYS días y, si la caché sigue
+ocupando más de LIFE_SHEET_CACHE_MAX_MB, los de uso más antiguo.
+
+La descarga masiva (auditorías de una sede completa) genera los PDF que no
+están en caché en el pool de procesos compartido (modules/process_pool) y va
+escribiendo el ZIP a medida que cada uno termina, de modo que el cliente
+empieza a recibir datos de inmediato y el servidor nunca guarda el ZIP
+completo en memoria.
+
+    rows = conn.execute("SELECT * FROM equipos_individuales WHERE sede_id = ?", (1,))
+    columns = [d[0] for d in rows.description]
+    chunks = zip_chunks(iter_life_sheets("equipos_individuales", columns, rows.fetchall()))
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+from itertools import islice
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Table, TableStyle
+
+from modules.metrics import record_cache
+from modules.process_pool import get_process_pool
+
+logger = logging.getLogger(__name__)
+
+LIFE_SHEET_CACHE_DIR = os.getenv("LIFE_SHEET_CACHE_DIR", os.path.join("tmp_imports", "hojas_vida"))
+# Subir al cambiar el diseño del PDF
+LIFE_SHEET_TEMPLATE_VERSION = "1"
+LIFE_SHEET_CACHE_MAX_MB = int(os.getenv("LIFE_SHEET_CACHE_MAX_MB", "512"))
+LIFE_SHEET_CACHE_MAX_DAYS = int(os.getenv("LIFE_SHEET_CACHE_MAX_DAYS", "30"))
+LIFE_SHEET_PRUNE_INTERVAL = 600
+# Procesos por descarga masiva (0 o 1 = siempre en el proceso actual)
+LIFE_SHEET_WORKERS = int(os.getenv("LIFE_SHEET_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Máximo de equipos por descarga masiva
+LIFE_SHEET_BULK_MAX = int(os.getenv("LIFE_SHEET_BULK_MAX", "5000"))
+
+
+def render_life_sheet(columns, values):
+    """PDF (bytes) de la hoja de vida de una fila."""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    styles = getSampleStyleSheet()
+    details = [[str(col).upper(), str(value)] for col, value in zip(columns, values)]
+    table = Table(details)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), '#343a40'),
+        ('TEXTCOLOR', (0, 0), (0, -1), '#ffffff'),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('GRID', (0, 0), (-1, -1), 1, '#000000'),
+    ]))
+    doc.build([Paragraph("HOJA DE VIDA DEL EQUIPO", styles['Title']), table])
+    return buffer.getvalue()
+
+
+def content_key(table, columns, values):
+    """Hash del contenido que determina el PDF."""
+    raw = json.dumps(
+        [LIFE_SHEET_TEMPLATE_VERSION, table, list(columns), [str(v) for v in values]],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _cache_path(key):
+    return os.path.join(LIFE_SHEET_CACHE_DIR, key[:2], f"{key}.pdf")
+
+
+def cached_pdf(key):
+    """PDF guardado para `key`, o None."""
+    path = _cache_path(key)
+    try:
+        with open(path, "rb") as fh:
+            pdf = fh.read()
+    except OSError:
+        return None
+    try:
+        # La fecha del archivo es la del último uso (ver prune_cache)
+        os.utime(path)
+    except OSError:
+        pass
+    return pdf
+
+
+_last_prune = 0.0
+_prune_lock = threading.Lock()
+
+
+def prune_cache(now=None):
+    """
+    Borra los PDF sin uso hace más de LIFE_SHEET_CACHE_MAX_DAYS días y, mientras
+    la caché ocupe más de LIFE_SHEET_CACHE_MAX_MB, los de uso más antiguo.
+    Los temporales de escrituras en curso (menos de una hora) se respetan.
+    Devuelve cuántos archivos se borraron.
+    """
+    now = time.time() if now is None else now
+    entries = []
+    for root, _, files in os.walk(LIFE_SHEET_CACHE_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if name.endswith(".tmp") and now - stat.st_mtime < 3600:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    max_age = LIFE_SHEET_CACHE_MAX_DAYS * 86400
+    max_bytes = LIFE_SHEET_CACHE_MAX_MB * 1024 * 1024
+    removed = 0
+    for mtime, size, path in entries:
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+def _maybe_prune():
+    global _last_prune
+    if time.monotonic() - _last_prune < LIFE_SHEET_PRUNE_INTERVAL or not _prune_lock.acquire(blocking=False):
+        return
+    try:
+        _last_prune = time.monotonic()
+        prune_cache()
+    except OSError as e:
+        logger.warning("No se pudo limpiar la caché de hojas de vida: %s", e)
+    finally:
+        _prune_lock.release()
+
+
+def store_pdf(key, pdf):
+    """Guarda el PDF de forma atómica; un fallo de disco no impide responder."""
+    path = _cache_path(key)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp, "wb") as fh:
+            fh.write(pdf)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("No se pudo guardar la hoja de vida en caché: %s", e)
+    _maybe_prune()
+
+
+def life_sheet_pdf(table, columns, values):
+    """PDF de la hoja de vida, desde la caché si la fila no ha cambiado."""
+    key = content_key(table, columns, values)
+    pdf = cached_pdf(key)
+    record_cache("hojas_vida", "miss" if pdf is None else "disk")
+    if pdf is None:
+        pdf = render_life_sheet(columns, values)
+        store_pdf(key, pdf)
+    return pdf
+
+
+def _entry_name(columns, values):
+    row = dict(zip(columns, values))
+    return f"hoja_vida_{row.get('id', '')}.pdf"
+
+
+def iter_life_sheets(table, columns, rows, workers=None):
+    """
+    Genera (nombre, pdf) por fila: primero las que ya están en caché y luego
+    las demás en el orden en que terminan. Con workers > 1 y más de una fila
+    pendiente se maquetan en paralelo.
+    """
+    workers = LIFE_SHEET_WORKERS if workers is None else workers
+    pending = []
+    for values in rows:
+        values = tuple(values)
+        key = content_key(table, columns, values)
+        pdf = cached_pdf(key)
+        record_cache("hojas_vida", "miss" if pdf is None else "disk")
+        if pdf is None:
+            pending.append((key, _entry_name(columns, values), values))
+        else:
+            yield _entry_name(columns, values), pdf
+
+    if workers <= 1 or len(pending) <= 1:
+        for key, name, values in pending:
+            pdf = render_life_sheet(columns, values)
+            store_pdf(key, pdf)
+            yield name, pdf
+        return
+
+    # Como mucho 2 * workers hojas de esta descarga en el pool a la vez
+    pool = get_process_pool()
+    pending = iter(pending)
+    futures = {}
+    try:
+        while True:
+            for key, name, values in islice(pending, 2 * workers - len(futures)):
+                futures[pool.submit(render_life_sheet, columns, values)] = (key, name)
+            if not futures:
+                return
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                key, name = futures.pop(future)
+                pdf = future.result()
+                store_pdf(key, pdf)
+                yield name, pdf
+    finally:
+        # Si el cliente se desconecta no se siguen maquetando las pendientes
+        for future in futures:
+            future.cancel()
+
+
+class _ChunkSink:
+    """Destino no posicionable para zipfile: acumula lo escrito hasta drain()."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def zip_chunks(entries):
+    """Bytes de un ZIP con los (nombre, contenido) de `entries`, archivo a archivo."""
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in entries:
+            archive.writestr(name, content)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
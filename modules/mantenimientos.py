@@ -1,7 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
-import sqlite3
-import os
 from datetime import datetime, timezone
+from modules.db_utils import get_db_connection
 
 mantenimientos_bp = Blueprint(
     "mantenimientos",
@@ -11,13 +10,8 @@ mantenimientos_bp = Blueprint(
     static_folder="../static",
 )
 
-DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "workmanager_erp.db")
-
-
 def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_db_connection()
 
 
 def _fetch_equipo_display(equipo_id, tipo):
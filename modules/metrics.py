@@ -0,0 +1,385 @@
+"""
+Métricas operativas en formato de texto de Prometheus.
+
+/metrics devolvía conteos de seis tablas calculados con COUNT(*) en cada
+consulta. Ahora las métricas se acumulan en memoria desde los hooks de la
+petición y de los módulos, y leerlas cuesta recorrer unos diccionarios más
+una consulta a una tabla de pocas filas, apto para un scrape cada 15 s:
+
+    workmanager_http_requests_total            peticiones por endpoint, método y estado
+    workmanager_http_errors_total              respuestas 5xx por endpoint
+    workmanager_http_request_duration_seconds  histograma de latencia por endpoint
+    workmanager_db_seconds_total               tiempo en SQL por endpoint (modules/query_stats)
+    workmanager_db_statements_total            sentencias por endpoint
+    workmanager_db_pool_*                      uso del pool de conexiones
+    workmanager_job_rows_total                 filas procesadas por tipo de trabajo (los que cuentan filas)
+    workmanager_job_rows_per_second            ritmo del último trabajo terminado
+    workmanager_jobs_finished_total            trabajos terminados por tipo y estado
+    workmanager_export_bytes_total             bytes de descargas enviados por formato
+    workmanager_cache_requests_total           consultas a cachés por nivel de acierto
+    workmanager_log_records_dropped_total      registros de log descartados (modules/app_logging)
+    workmanager_table_rows                     filas de las tablas de negocio
+
+Prometheus recibe este formato al pedir text/plain u OpenMetrics en Accept
+(o con ?format=prometheus); sin esa preferencia /metrics sigue devolviendo
+el JSON de conteos por tabla.
+
+Conteos de negocio: conteos_tablas guarda las filas de cada tabla, mantenidas
+por triggers de INSERT/DELETE; equipos_individuales sale del resumen
+materializado del inventario. La tabla y los triggers los instala la
+migración del esquema derivado (install_table_counts); mientras falte alguno,
+y con bases de datos distintas de SQLite, se cuentan en vivo.
+
+Cada proceso (worker de gunicorn) tiene sus propios contadores.
+"""
+
+import sqlite3
+import threading
+import time
+
+from flask import Response, g, request
+
+from modules.db_utils import derived_ready, pool_stats, schema_objects
+from modules.inventory_summary import summary_totals
+from modules.query_stats import current_recorder
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+COUNTS_TABLE = "conteos_tablas"
+# Claves del JSON de /metrics (compatibles con la versión anterior)
+COUNTED_TABLES = ("empleados", "equipos_agrupados", "equipos_individuales", "licencias_office365", "facturas", "tickets")
+# Se cuentan desde el resumen materializado del inventario
+SUMMARY_COUNTED = "equipos_individuales"
+
+EXPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/json": "json",
+    "application/pdf": "pdf",
+    "application/zip": "zip",
+    "text/plain": "txt",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "xlsx",
+}
+
+_START_KEY = "_metrics_start"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels[name]) for name in self.label_names), 0)
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [f"{self.name}{_labels(self.label_names, key)} {_number(v)}" for key, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # [conteo por bucket (no acumulado)..., suma, total]
+                entry = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+                    break
+            entry[-2] += value
+            entry[-1] += 1
+
+    def render(self):
+        with self._lock:
+            items = sorted((key, list(entry)) for key, entry in self._values.items())
+        lines = self._header()
+        for key, entry in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, {'le': _number(bound)})} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, {'le': '+Inf'})} {entry[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(entry[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {entry[-1]}")
+        return lines
+
+
+http_requests = Counter(
+    "workmanager_http_requests_total", "Peticiones HTTP atendidas.", ("endpoint", "method", "status")
+)
+http_errors = Counter("workmanager_http_errors_total", "Respuestas HTTP 5xx.", ("endpoint", "method"))
+http_latency = Histogram(
+    "workmanager_http_request_duration_seconds", "Duración de las peticiones HTTP.", ("endpoint", "method")
+)
+db_seconds = Counter("workmanager_db_seconds_total", "Tiempo en consultas SQL durante peticiones.", ("endpoint",))
+db_statements = Counter("workmanager_db_statements_total", "Sentencias SQL ejecutadas durante peticiones.", ("endpoint",))
+job_rows = Counter("workmanager_job_rows_total", "Filas procesadas por trabajos en segundo plano.", ("kind",))
+job_rate = Gauge(
+    "workmanager_job_rows_per_second", "Filas por segundo del último trabajo terminado.", ("kind",)
+)
+jobs_finished = Counter("workmanager_jobs_finished_total", "Trabajos en segundo plano terminados.", ("kind", "status"))
+export_bytes = Counter("workmanager_export_bytes_total", "Bytes de descargas enviados.", ("format",))
+cache_requests = Counter(
+    "workmanager_cache_requests_total",
+    "Consultas a cachés; result: nivel que respondió (request, local, shared, disk) o miss.",
+    ("cache", "result"),
+)
+log_dropped = Counter(
+    "workmanager_log_records_dropped_total",
+    "Registros de log descartados porque la cola de escritura estaba llena.",
+    ("logger",),
+)
+
+REGISTRY = (
+    http_requests, http_errors, http_latency, db_seconds, db_statements,
+    job_rows, job_rate, jobs_finished, export_bytes, cache_requests, log_dropped,
+)
+
+
+def record_cache(cache, result):
+    """Registra una consulta a una caché (result: nivel que respondió o 'miss')."""
+    cache_requests.inc(cache=cache, result=result)
+
+
+# --- Conteos de negocio ---
+
+def _counted_tables(conn):
+    """Tablas de COUNTED_TABLES (salvo la del resumen) que existen."""
+    tables = schema_objects(conn, "table")
+    return [t for t in COUNTED_TABLES if t != SUMMARY_COUNTED and t in tables], tables
+
+
+def install_table_counts(conn):
+    """
+    Paso de migración: crea conteos_tablas y los triggers de conteo de las
+    tablas que existan. Devuelve False si la base de datos no es SQLite.
+    """
+    if not isinstance(conn, sqlite3.Connection):
+        return False
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {COUNTS_TABLE} (tabla TEXT PRIMARY KEY, filas INTEGER NOT NULL)")
+    triggers = schema_objects(conn, "trigger")
+    for table in _counted_tables(conn)[0]:
+        if f"conteo_{table}_ai" in triggers:
+            continue
+        conn.executescript(f"""
+            DROP TRIGGER IF EXISTS conteo_{table}_ad;
+            CREATE TRIGGER conteo_{table}_ai AFTER INSERT ON {table}
+            BEGIN UPDATE {COUNTS_TABLE} SET filas = filas + 1 WHERE tabla = '{table}'; END;
+            CREATE TRIGGER conteo_{table}_ad AFTER DELETE ON {table}
+            BEGIN UPDATE {COUNTS_TABLE} SET filas = filas - 1 WHERE tabla = '{table}'; END;
+        """)
+        conn.execute(
+            f"INSERT OR REPLACE INTO {COUNTS_TABLE} (tabla, filas) SELECT ?, COUNT(*) FROM {table}", (table,)
+        )
+    conn.commit()
+    return True
+
+
+def _counts_installed(conn):
+    counted, tables = _counted_tables(conn)
+    if COUNTS_TABLE not in tables:
+        return False, False
+    triggers = schema_objects(conn, "trigger")
+    # Una tabla creada después de la migración (p. ej. facturas) aún no tiene triggers
+    installed = all(f"conteo_{table}_ai" in triggers for table in counted)
+    return installed, len(counted) == len(COUNTED_TABLES) - 1
+
+
+def table_counts_ready(conn):
+    """True si conteos_tablas existe y cada tabla contada que existe tiene sus triggers."""
+    return derived_ready(conn, "conteos", _counts_installed)
+
+
+def table_counts(conn):
+    """{tabla: filas} de COUNTED_TABLES (0 si la tabla no existe)."""
+    counts = dict.fromkeys(COUNTED_TABLES, 0)
+    if table_counts_ready(conn):
+        counts.update(dict(conn.execute(f"SELECT tabla, filas FROM {COUNTS_TABLE}").fetchall()))
+        try:
+            counts[SUMMARY_COUNTED] = summary_totals(conn)["total"] or 0
+        except sqlite3.Error:
+            pass
+        return counts
+    cur = conn.cursor()
+    for table in COUNTED_TABLES:
+        try:
+            cur.execute(f"SELECT COUNT(*) FROM {table}")
+            counts[table] = cur.fetchone()[0]
+        except Exception:
+            conn.rollback()
+    return counts
+
+
+# --- Exposición ---
+
+def _pool_lines():
+    gauges = (
+        ("workmanager_db_pool_size", "gauge", "Conexiones abiertas del pool.", "size"),
+        ("workmanager_db_pool_in_use", "gauge", "Conexiones prestadas.", "in_use"),
+        ("workmanager_db_pool_max_size", "gauge", "Tamaño máximo del pool.", "max_size"),
+        ("workmanager_db_pool_waits_total", "counter", "Esperas por una conexión libre.", "waits"),
+        ("workmanager_db_pool_wait_seconds_total", "counter", "Tiempo esperando conexiones.", "wait_time_total"),
+        ("workmanager_db_pool_timeouts_total", "counter", "Esperas agotadas (PoolTimeout).", "timeouts"),
+    )
+    pools = pool_stats()
+    lines = []
+    for name, kind, help_text, field in gauges:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for index, stats in enumerate(pools):
+            # La ruta o URL del pool puede incluir credenciales: se identifica por posición
+            lines.append(f'{name}{{pool="{index}"}} {_number(stats[field])}')
+    return lines
+
+
+def render_prometheus(conn=None):
+    """Texto de exposición de Prometheus con todas las métricas del proceso."""
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.render()
+    lines += _pool_lines()
+    if conn is not None:
+        lines += ["# HELP workmanager_table_rows Filas de las tablas de negocio.", "# TYPE workmanager_table_rows gauge"]
+        for table, rows in table_counts(conn).items():
+            lines.append(f'workmanager_table_rows{{table="{table}"}} {rows}')
+    return "\n".join(lines) + "\n"
+
+
+def wants_prometheus():
+    """True si el cliente prefiere el formato de texto (Prometheus) sobre JSON."""
+    if request.args.get("format") == "prometheus":
+        return True
+    # Prometheus envía tipos con parámetros (text/plain;version=0.0.4), que
+    # best_match no compara con el tipo sin parámetros
+    quality = {}
+    for value, q in request.accept_mimetypes:
+        mimetype = value.split(";", 1)[0].strip().lower()
+        quality[mimetype] = max(quality.get(mimetype, 0), q)
+    text = max(quality.get("application/openmetrics-text", 0), quality.get("text/plain", 0))
+    return text > quality.get("application/json", 0)
+
+
+def prometheus_response(conn=None):
+    return Response(render_prometheus(conn), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+class _CountedBody:
+    """Cuerpo de respuesta que suma a export_bytes lo que se envía."""
+
+    def __init__(self, body, fmt):
+        self._body = body
+        self._format = fmt
+
+    def __iter__(self):
+        for chunk in self._body:
+            export_bytes.inc(len(chunk), format=self._format)
+            yield chunk
+
+    def close(self):
+        if hasattr(self._body, "close"):
+            self._body.close()
+
+
+def _count_export(response):
+    if "attachment" not in response.headers.get("Content-Disposition", ""):
+        return
+    fmt = EXPORT_FORMATS.get(response.mimetype, response.mimetype or "otro")
+    if response.is_streamed and not response.direct_passthrough:
+        response.response = _CountedBody(response.response, fmt)
+    else:
+        length = response.content_length
+        if length is None and not response.is_streamed:
+            length = len(response.get_data())
+        if length:
+            export_bytes.inc(length, format=fmt)
+
+
+def _start_request():
+    g.setdefault(_START_KEY, time.perf_counter())
+
+
+def _finish_request(response):
+    start = g.get(_START_KEY)
+    if start is None:
+        return response
+    endpoint = request.endpoint or "sin_endpoint"
+    elapsed = time.perf_counter() - start
+    http_requests.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    http_latency.observe(elapsed, endpoint=endpoint, method=request.method)
+    if response.status_code >= 500:
+        http_errors.inc(endpoint=endpoint, method=request.method)
+
+    recorder = current_recorder()
+    if recorder is not None:
+        db_seconds.inc(recorder.total, endpoint=endpoint)
+        db_statements.inc(recorder.count, endpoint=endpoint)
+    _count_export(response)
+    return response
+
+
+def init_app(app):
+    """Registra los hooks que alimentan las métricas HTTP."""
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+def reset():
+    """Vacía las métricas del proceso (pruebas)."""
+    for metric in REGISTRY:
+        metric.clear()
@@ -1,24 +1,22 @@
 from flask import Blueprint, render_template, jsonify
-import sqlite3
-import os
+from modules.db_utils import get_db_connection
+from modules.inventory_summary import summary_rows, summary_totals
 
-DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "workmanager_erp.db")
 
 def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_db_connection()
+
 
 monitoreo_bp = Blueprint('monitoreo', __name__)
 
 @monitoreo_bp.route('/monitoreo')
 def monitoreo():
     conn = get_conn()
-    c = conn.cursor()
-    total = c.execute("SELECT COUNT(*) FROM equipos_individuales").fetchone()[0]
-    activos = c.execute("SELECT COUNT(*) FROM equipos_individuales WHERE estado = 'asignado'").fetchone()[0]
-    disponibles = c.execute("SELECT COUNT(*) FROM equipos_individuales WHERE estado = 'disponible'").fetchone()[0]
-    bajas = c.execute("SELECT COUNT(*) FROM equipos_individuales WHERE estado = 'baja'").fetchone()[0]
+    por_estado = {row["clave"]: row["total"] for row in summary_rows(conn, "estado")}
+    total = summary_totals(conn)["total"]
+    activos = por_estado.get("asignado", 0)
+    disponibles = por_estado.get("disponible", 0)
+    bajas = por_estado.get("baja", 0)
     conn.close()
     stats = {
         "uptime": 98 if total else 0,
@@ -61,12 +59,12 @@ def seguridad():
 @monitoreo_bp.route('/monitoreo/api/resumen')
 def api_resumen_monitoreo():
     conn = get_conn()
-    c = conn.cursor()
+    por_estado = {row["clave"]: row["total"] for row in summary_rows(conn, "estado")}
     data = {
-        "total": c.execute("SELECT COUNT(*) FROM equipos_individuales").fetchone()[0],
-        "asignados": c.execute("SELECT COUNT(*) FROM equipos_individuales WHERE estado='asignado'").fetchone()[0],
-        "disponibles": c.execute("SELECT COUNT(*) FROM equipos_individuales WHERE estado='disponible'").fetchone()[0],
-        "baja": c.execute("SELECT COUNT(*) FROM equipos_individuales WHERE estado='baja'").fetchone()[0],
+        "total": summary_totals(conn)["total"],
+        "asignados": por_estado.get("asignado", 0),
+        "disponibles": por_estado.get("disponible", 0),
+        "baja": por_estado.get("baja", 0),
     }
     conn.close()
     return jsonify(data)
@@ -0,0 +1,207 @@
+"""
+Entrega de notificaciones en tiempo real por Server-Sent Events.
+
+Cada pestaña abierta consultaba /notifications/api/unread cada 60 segundos. Ahora
+mantiene una conexión SSE (/notifications/api/stream) suscrita a un pub/sub en
+memoria: create_notification() publica la notificación después del commit y
+llega al instante, sin que las pestañas inactivas consulten la base de datos
+(mientras no hay eventos solo se envían comentarios de keepalive).
+
+Varios workers (gunicorn) o scripts externos
+    La propia tabla notificaciones es el registro de eventos y su id es el
+    cursor. Mientras el proceso tiene suscriptores, un único hilo vigía lee las
+    filas con id mayor al último visto cada NOTIFICATIONS_POLL_INTERVAL
+    segundos y las publica localmente: una consulta por proceso, no por
+    pestaña. 0 lo desactiva (un solo worker).
+
+Reconexión
+    Cada evento lleva `id: <id de la notificación>`. El navegador reenvía el
+    último en la cabecera Last-Event-ID al reconectarse y se le entregan las
+    notificaciones que se perdió. Las conexiones se cierran tras
+    NOTIFICATIONS_STREAM_SECONDS para liberar hilos del servidor; el cliente se
+    reconecta solo.
+
+Hilos del servidor
+    Con gunicorn --threads 8 cada conexión SSE ocupa un hilo del worker. Un
+    proceso acepta como mucho NOTIFICATIONS_MAX_STREAMS conexiones (por
+    defecto la mitad de los hilos); por encima responde 503 con Retry-After y
+    el navegador consulta /notifications/api/unread hasta volver a intentarlo,
+    así las pestañas abiertas nunca dejan sin hilos a las peticiones normales.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from modules.db_utils import get_pool
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATIONS_POLL_INTERVAL = float(os.getenv("NOTIFICATIONS_POLL_INTERVAL", "2"))
+NOTIFICATIONS_KEEPALIVE = float(os.getenv("NOTIFICATIONS_KEEPALIVE", "15"))
+NOTIFICATIONS_STREAM_SECONDS = float(os.getenv("NOTIFICATIONS_STREAM_SECONDS", "300"))
+# Conexiones SSE simultáneas por proceso (ver "Hilos del servidor")
+NOTIFICATIONS_MAX_STREAMS = int(os.getenv("NOTIFICATIONS_MAX_STREAMS", "4"))
+# Segundos que espera el navegador tras un 503 (mismo intervalo de la consulta antigua)
+NOTIFICATIONS_BUSY_RETRY = 60
+# Milisegundos que espera el navegador antes de reconectarse
+NOTIFICATIONS_RETRY_MS = 5000
+# Notificaciones pendientes por suscriptor antes de descartar las más viejas
+SUBSCRIBER_QUEUE_SIZE = 100
+
+_COLUMNS = "id, user_id, message, url, created_at"
+
+
+def _now():
+    # Mismo formato que CURRENT_TIMESTAMP de SQLite
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class NotificationBus:
+    """Pub/sub en memoria: una cola por conexión SSE, agrupadas por usuario."""
+
+    def __init__(self, poll_interval=NOTIFICATIONS_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._watcher = None
+        self._last_seen = None
+
+    def subscribe(self, user_id, limit=None):
+        """Cola de un nuevo suscriptor, o None si ya hay `limit` en el proceso."""
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if limit is not None and sum(len(s) for s in self._subscribers.values()) >= limit:
+                return None
+            self._subscribers.setdefault(str(user_id), set()).add(subscriber)
+            if self.poll_interval > 0 and self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name="notifications-watcher", daemon=True)
+                self._watcher.start()
+        return subscriber
+
+    def unsubscribe(self, user_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(str(user_id))
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[str(user_id)]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+    def publish(self, notification):
+        """Entrega `notification` (dict con id y user_id) a las conexiones de su usuario."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(str(notification["user_id"]), ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(notification)
+            except queue.Full:
+                # Cliente que no lee: se descarta la más vieja, recuperable con Last-Event-ID
+                try:
+                    subscriber.get_nowait()
+                    subscriber.put_nowait(notification)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    def _watch(self):
+        """Publica las notificaciones creadas por otros procesos mientras haya suscriptores."""
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    # Al volver a arrancar se parte del id más reciente
+                    self._watcher = None
+                    self._last_seen = None
+                    return
+            try:
+                conn = get_pool().acquire()
+                try:
+                    if self._last_seen is None:
+                        row = conn.execute("SELECT MAX(id) FROM notificaciones").fetchone()
+                        self._last_seen = (row[0] if row else None) or 0
+                    rows = conn.execute(
+                        f"SELECT {_COLUMNS} FROM notificaciones WHERE id > ? ORDER BY id LIMIT 500",
+                        (self._last_seen,),
+                    ).fetchall()
+                finally:
+                    conn.close()
+                for row in rows:
+                    self.publish(dict(zip(_COLUMNS.split(", "), row)))
+                    self._last_seen = max(self._last_seen, row[0])
+            except Exception as e:
+                logger.warning("Vigía de notificaciones: %s", e)
+            time.sleep(self.poll_interval)
+
+
+bus = NotificationBus()
+
+
+def publish_notification(notification_id, user_id, message, url=None, created_at=None):
+    """Publica una notificación ya guardada (llamar después del commit)."""
+    bus.publish({
+        "id": notification_id,
+        "user_id": user_id,
+        "message": message,
+        "url": url,
+        "created_at": created_at or _now(),
+    })
+
+
+def notifications_after(conn, user_id, last_id, limit=50):
+    """Notificaciones del usuario con id mayor a `last_id` (reconexión)."""
+    rows = conn.execute(
+        f"SELECT {_COLUMNS} FROM notificaciones WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?",
+        (user_id, last_id, limit),
+    ).fetchall()
+    return [dict(zip(_COLUMNS.split(", "), row)) for row in rows]
+
+
+def latest_notification_id(conn):
+    row = conn.execute("SELECT MAX(id) FROM notificaciones").fetchone()
+    return (row[0] if row else None) or 0
+
+
+def _event(notification, cursor):
+    return f"id: {cursor}\nevent: notification\ndata: {json.dumps(notification, default=str)}\n\n"
+
+
+def event_stream(user_id, last_id, backlog=(), subscriber=None):
+    """
+    Eventos SSE para `user_id`: primero `backlog` (perdidas durante la
+    desconexión) y luego lo que se publique, hasta NOTIFICATIONS_STREAM_SECONDS.
+    No consulta la base de datos.
+    """
+    subscriber = subscriber or bus.subscribe(user_id)
+    deadline = time.monotonic() + NOTIFICATIONS_STREAM_SECONDS
+    try:
+        # El id inicial fija el cursor del navegador aunque no haya eventos aún
+        yield f"retry: {NOTIFICATIONS_RETRY_MS}\nid: {last_id}\nevent: ready\ndata: {{}}\n\n"
+        # El vigía puede repetir una ya publicada localmente, o entregar una de
+        # otro worker con id menor a la última enviada
+        start_id = last_id
+        delivered = set()
+        pending = list(backlog)
+        while True:
+            if not pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    pending.append(subscriber.get(timeout=min(NOTIFICATIONS_KEEPALIVE, remaining)))
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+            notification = pending.pop(0)
+            if notification["id"] <= start_id or notification["id"] in delivered:
+                continue
+            delivered.add(notification["id"])
+            last_id = max(last_id, notification["id"])
+            yield _event(notification, last_id)
+    finally:
+        bus.unsubscribe(user_id, subscriber)
@@ -1,13 +1,18 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from flask_login import login_required, current_user
-import sqlite3
+from modules.db_utils import get_db_connection
+from modules.notification_events import (
+    NOTIFICATIONS_BUSY_RETRY,
+    NOTIFICATIONS_MAX_STREAMS,
+    bus,
+    event_stream,
+    latest_notification_id,
+    notifications_after,
+    publish_notification,
+)
 
 notifications_bp = Blueprint('notifications', __name__, url_prefix='/notifications')
 
-def get_db_connection():
-    conn = sqlite3.connect('workmanager_erp.db')
-    conn.row_factory = sqlite3.Row
-    return conn
 
 def create_notification(user_id, message, url=None):
     """
@@ -16,11 +21,12 @@ def create_notification(user_id, message, url=None):
     """
     conn = get_db_connection()
     try:
-        conn.execute(
+        cursor = conn.execute(
             "INSERT INTO notificaciones (user_id, message, url) VALUES (?, ?, ?)",
             (user_id, message, url)
         )
         conn.commit()
+        publish_notification(cursor.lastrowid, user_id, message, url)
     except Exception as e:
         print(f"Error al crear notificación: {e}") # Log a un archivo en producción
     finally:
@@ -44,6 +50,43 @@ def get_unread_notifications():
         'notifications': [dict(n) for n in notifications]
     })
 
+@notifications_bp.route('/api/stream')
+@login_required
+def stream_notifications():
+    """
+    Canal SSE de notificaciones del usuario actual. Al reconectarse, el
+    navegador envía Last-Event-ID y recibe las que se perdió. Con el cupo de
+    conexiones del proceso lleno responde 503 (el cliente vuelve a consultar
+    /api/unread).
+    """
+    user_id = current_user.id
+    # Suscribirse antes de leer el pendiente para no perder las que lleguen entre medio
+    subscriber = bus.subscribe(user_id, limit=NOTIFICATIONS_MAX_STREAMS)
+    if subscriber is None:
+        return Response(status=503, headers={'Retry-After': str(NOTIFICATIONS_BUSY_RETRY)})
+    conn = get_db_connection()
+    try:
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_id')
+        try:
+            last_id = int(last_event_id)
+            backlog = notifications_after(conn, user_id, last_id)
+        except (TypeError, ValueError):
+            last_id = latest_notification_id(conn)
+            backlog = []
+    except Exception:
+        bus.unsubscribe(user_id, subscriber)
+        raise
+    finally:
+        conn.close()
+
+    response = Response(event_stream(user_id, last_id, backlog, subscriber), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+    # Si el cliente se va antes de empezar a leer, el generador nunca corre
+    response.call_on_close(lambda: bus.unsubscribe(user_id, subscriber))
+    return response
+
 @notifications_bp.route('/api/mark_as_read', methods=['POST'])
 @login_required
 def mark_as_read():
@@ -0,0 +1,67 @@
+"""
+Pool de procesos compartido para el trabajo de CPU de las peticiones
+(hojas de etiquetas, hojas de vida y reportes en PDF).
+
+Crear un ProcessPoolExecutor en cada petición hacía un fork dentro de un
+worker de gunicorn con hilos: el hijo hereda los locks tomados por otros
+hilos (logging, pool de conexiones) y puede quedar bloqueado, y cada
+petición pagaba el arranque de sus procesos. Ahora hay un único pool por
+proceso, creado en el primer uso con el método de arranque
+PROCESS_POOL_START (forkserver si el sistema lo admite, si no spawn): los
+hijos parten de un intérprete limpio y se reutilizan entre peticiones.
+
+PROCESS_POOL_WORKERS limita los procesos de todo el worker; cada llamador
+limita además cuántas tareas suyas tiene en curso a la vez (imap), así una
+selección grande no llena la cola del pool ni la memoria.
+"""
+
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+PROCESS_POOL_WORKERS = int(os.getenv("PROCESS_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+PROCESS_POOL_START = os.getenv(
+    "PROCESS_POOL_START",
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn",
+)
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool():
+    """Pool del proceso; se vuelve a crear tras un fork o si quedó roto."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        # _broken: un hijo murió y el pool ya no acepta tareas
+        if _pool is None or _pool_pid != os.getpid() or getattr(_pool, "_broken", False):
+            _pool = ProcessPoolExecutor(
+                max_workers=PROCESS_POOL_WORKERS,
+                mp_context=multiprocessing.get_context(PROCESS_POOL_START),
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def imap(func, arguments, in_flight):
+    """
+    Resultados de func(*args) por cada tupla de `arguments`, en orden, con a lo
+    sumo `in_flight` tareas en el pool a la vez (los argumentos se consumen a
+    medida que se piden resultados). Si el consumidor se detiene antes de
+    terminar, las tareas pendientes se cancelan.
+    """
+    pool = get_process_pool()
+    pending = deque()
+    try:
+        for args in arguments:
+            pending.append(pool.submit(func, *args))
+            if len(pending) >= in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,415 @@
+"""
+Instrumentación de consultas SQL por petición.
+
+Las conexiones que entrega get_db_connection() (y las SQLite abiertas con
+factory=InstrumentedConnection) registran, mientras hay una petición en curso,
+cada sentencia que ejecutan: cuántas, cuánto tiempo (execute más fetch*) y
+cuáles se repiten. Al terminar la petición:
+
+- se agrega la cabecera Server-Timing (db;dur=<ms>;desc="<n> consultas"),
+  visible en la pestaña Network del navegador;
+- el resumen queda en un historial en memoria y en los agregados por
+  endpoint que muestra /debug/queries (solo administradores);
+- las peticiones con QUERY_STATS_WARN_COUNT sentencias o más se registran como
+  warning.
+
+Repeticiones: una misma sentencia (sin contar los parámetros) ejecutada
+QUERY_REPEAT_THRESHOLD veces o más en una petición suele ser un N+1 (una
+consulta por fila de la plantilla). Los duplicados exactos (mismos
+parámetros) se cuentan aparte: son resultados que se podían reutilizar.
+
+Consultas lentas: las que superan SLOW_QUERY_MS se escriben con la SQL
+normalizada, los tipos de sus parámetros (nunca los valores: pueden ser
+contraseñas o hashes) y su EXPLAIN QUERY PLAN (SQLite) en logs/slow_queries.log, con
+rotación, a través de la cola de modules/app_logging.
+
+Fuera de una petición (trabajos en segundo plano, scripts) no se registra
+nada. El tiempo de iterar directamente un cursor (`for row in cursor`) no se
+mide. QUERY_STATS=0 desactiva todo.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from flask import Blueprint, abort, g, has_app_context, has_request_context, jsonify, render_template, request
+from flask_login import current_user, login_required
+
+QUERY_STATS_ENABLED = os.getenv("QUERY_STATS", "1") != "0"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+QUERY_REPEAT_THRESHOLD = int(os.getenv("QUERY_REPEAT_THRESHOLD", "5"))
+QUERY_STATS_WARN_COUNT = int(os.getenv("QUERY_STATS_WARN_COUNT", "100"))
+# Peticiones recientes que conserva el historial de /debug/queries
+QUERY_STATS_HISTORY = int(os.getenv("QUERY_STATS_HISTORY", "200"))
+# Texto de sentencia mostrado en resúmenes y en el log
+SQL_DISPLAY_CHARS = 500
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger("workmanager.slow_queries")
+
+_RECORDER_KEY = "_query_recorder"
+_EXPLAINABLE = {"SELECT", "WITH", "UPDATE", "DELETE", "INSERT", "REPLACE"}
+
+query_stats_bp = Blueprint("query_stats", __name__, template_folder="../templates")
+
+
+def _normalize(sql):
+    return " ".join(str(sql).split())
+
+
+class QueryRecorder:
+    """Sentencias ejecutadas durante una petición."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.duplicates = 0
+        # sentencia normalizada -> [ejecuciones, segundos]
+        self.statements = {}
+        self._seen = set()
+
+    def record(self, sql, parameters, elapsed):
+        key = _normalize(sql)
+        self.count += 1
+        self.total += elapsed
+        entry = self.statements.get(key)
+        if entry is None:
+            entry = self.statements[key] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += elapsed
+        if parameters is not None:
+            ident = (key, repr(parameters))
+            if ident in self._seen:
+                self.duplicates += 1
+            else:
+                self._seen.add(ident)
+        return key
+
+    def add_time(self, key, elapsed):
+        """Tiempo de lectura (fetch*) de una sentencia ya registrada."""
+        self.total += elapsed
+        self.statements[key][1] += elapsed
+
+    def repeated(self):
+        return sorted(
+            (
+                {"sql": sql[:SQL_DISPLAY_CHARS], "count": n, "time_ms": round(t * 1000, 2)}
+                for sql, (n, t) in self.statements.items()
+                if n >= QUERY_REPEAT_THRESHOLD
+            ),
+            key=lambda item: item["count"],
+            reverse=True,
+        )
+
+    def summary(self, top=5):
+        slowest = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)[:top]
+        return {
+            "count": self.count,
+            "time_ms": round(self.total * 1000, 2),
+            "distinct": len(self.statements),
+            "duplicates": self.duplicates,
+            "repeated": self.repeated(),
+            "slowest": [
+                {"sql": sql[:SQL_DISPLAY_CHARS], "count": n, "time_ms": round(t * 1000, 2)}
+                for sql, (n, t) in slowest
+            ],
+        }
+
+
+def current_recorder():
+    """Registro de la petición actual o None."""
+    if not has_app_context():
+        return None
+    return g.get(_RECORDER_KEY)
+
+
+def _explain(conn, sql, parameters):
+    """EXPLAIN QUERY PLAN de una sentencia SQLite (sin registrarlo)."""
+    if not isinstance(conn, sqlite3.Connection) or parameters is None and "?" in sql:
+        return None
+    if _normalize(sql).split(" ", 1)[0].upper() not in _EXPLAINABLE:
+        return None
+    try:
+        # Cursor base: no pasa por la instrumentación
+        rows = sqlite3.Cursor(conn).execute(f"EXPLAIN QUERY PLAN {sql}", parameters or ()).fetchall()
+    except Exception as e:
+        return f"(sin plan: {e})"
+    return "\n".join(f"  {row[3]}" for row in rows)
+
+
+def _describe_parameters(parameters):
+    """Cantidad y tipos de los parámetros, sin sus valores."""
+    if not parameters:
+        return "-"
+    if isinstance(parameters, dict):
+        return ", ".join(f"{name}: {type(value).__name__}" for name, value in parameters.items())
+    return f"{len(parameters)} ({', '.join(type(value).__name__ for value in parameters)})"
+
+
+def _log_slow(conn, sql, parameters, elapsed):
+    endpoint = request.endpoint if has_request_context() else None
+    plan = _explain(conn, sql, parameters)
+    slow_logger.warning(
+        "%.1f ms %s\n  SQL: %s\n  parámetros: %s%s",
+        elapsed * 1000,
+        endpoint or "-",
+        _normalize(sql)[:2000],
+        _describe_parameters(parameters),
+        f"\n  plan:\n{plan}" if plan else "",
+    )
+
+
+class _Statement:
+    """Sentencia en curso de un cursor: acumula el tiempo de execute y fetch*."""
+
+    __slots__ = ("key", "sql", "parameters", "elapsed", "logged")
+
+    def __init__(self, key, sql, parameters, elapsed):
+        self.key = key
+        self.sql = sql
+        self.parameters = parameters
+        self.elapsed = elapsed
+        self.logged = False
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor SQLite que registra sus sentencias en el QueryRecorder de la petición."""
+
+    _recorder = None
+    _statement = None
+
+    def _run(self, sql, parameters, call):
+        start = time.perf_counter()
+        try:
+            return call()
+        finally:
+            elapsed = time.perf_counter() - start
+            key = self._recorder.record(sql, parameters, elapsed)
+            self._statement = _Statement(key, sql, parameters, elapsed)
+            self._check_slow()
+
+    def _check_slow(self):
+        statement = self._statement
+        if not statement.logged and statement.elapsed * 1000 >= SLOW_QUERY_MS:
+            statement.logged = True
+            _log_slow(self.connection, statement.sql, statement.parameters, statement.elapsed)
+
+    def _fetch(self, call):
+        start = time.perf_counter()
+        try:
+            return call()
+        finally:
+            if self._statement is not None:
+                elapsed = time.perf_counter() - start
+                self._statement.elapsed += elapsed
+                self._recorder.add_time(self._statement.key, elapsed)
+                self._check_slow()
+
+    def execute(self, sql, parameters=()):
+        return self._run(sql, parameters, lambda: sqlite3.Cursor.execute(self, sql, parameters))
+
+    # Sin parámetros registrados: no cuentan como duplicados ni se explican
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(sql, None, lambda: sqlite3.Cursor.executemany(self, sql, seq_of_parameters))
+
+    def executescript(self, sql_script):
+        return self._run(sql_script, None, lambda: sqlite3.Cursor.executescript(self, sql_script))
+
+    def fetchone(self):
+        return self._fetch(lambda: sqlite3.Cursor.fetchone(self))
+
+    def fetchmany(self, *args, **kwargs):
+        return self._fetch(lambda: sqlite3.Cursor.fetchmany(self, *args, **kwargs))
+
+    def fetchall(self):
+        return self._fetch(lambda: sqlite3.Cursor.fetchall(self))
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    Conexión SQLite cuyos cursores (y conn.execute) se instrumentan mientras
+    hay una petición en curso. Para conexiones propias de un módulo:
+        sqlite3.connect(ruta, factory=InstrumentedConnection)
+    """
+
+    def cursor(self, factory=None):
+        if factory is None:
+            recorder = current_recorder()
+            if recorder is not None:
+                cur = sqlite3.Connection.cursor(self, InstrumentedCursor)
+                cur._recorder = recorder
+                return cur
+            return sqlite3.Connection.cursor(self)
+        return sqlite3.Connection.cursor(self, factory)
+
+    # sqlite3.Connection.execute* no pasan por self.cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+class InstrumentedCursorProxy:
+    """Envoltorio de cursores PostgreSQL/MySQL con el mismo registro (sin EXPLAIN)."""
+
+    def __init__(self, cursor, recorder):
+        self._cursor = cursor
+        self._recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+        return False
+
+    def _timed(self, method, sql, parameters, many=False):
+        start = time.perf_counter()
+        try:
+            return method(sql, parameters) if parameters is not None else method(sql)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._recorder.record(sql, None if many else parameters, elapsed)
+            if elapsed * 1000 >= SLOW_QUERY_MS:
+                _log_slow(None, sql, None if many else parameters, elapsed)
+
+    def execute(self, sql, parameters=None):
+        return self._timed(self._cursor.execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(self._cursor.executemany, sql, seq_of_parameters, many=True)
+
+
+def instrument_cursor(cursor):
+    """Cursor PostgreSQL/MySQL instrumentado si hay una petición en curso."""
+    recorder = current_recorder()
+    return cursor if recorder is None else InstrumentedCursorProxy(cursor, recorder)
+
+
+# --- Historial del proceso ---
+
+_lock = threading.Lock()
+_history = deque(maxlen=QUERY_STATS_HISTORY)
+_endpoints = {}
+
+
+def _remember(entry):
+    with _lock:
+        _history.appendleft(entry)
+        totals = _endpoints.get(entry["endpoint"])
+        if totals is None:
+            totals = _endpoints[entry["endpoint"]] = {
+                "endpoint": entry["endpoint"],
+                "requests": 0,
+                "statements": 0,
+                "time_ms": 0.0,
+                "max_statements": 0,
+                "duplicates": 0,
+                "repeated_requests": 0,
+            }
+        totals["requests"] += 1
+        totals["statements"] += entry["count"]
+        totals["time_ms"] += entry["time_ms"]
+        totals["max_statements"] = max(totals["max_statements"], entry["count"])
+        totals["duplicates"] += entry["duplicates"]
+        totals["repeated_requests"] += 1 if entry["repeated"] else 0
+
+
+def stats_snapshot():
+    """Historial reciente y agregados por endpoint (más sentencias primero)."""
+    with _lock:
+        history = list(_history)
+        endpoints = [dict(t) for t in _endpoints.values()]
+    for totals in endpoints:
+        totals["time_ms"] = round(totals["time_ms"], 2)
+        totals["avg_statements"] = round(totals["statements"] / totals["requests"], 1)
+    endpoints.sort(key=lambda t: t["statements"], reverse=True)
+    return {"endpoints": endpoints, "requests": history}
+
+
+def reset_stats():
+    with _lock:
+        _history.clear()
+        _endpoints.clear()
+
+
+# --- Integración con Flask ---
+
+def _start_request():
+    g.setdefault(_RECORDER_KEY, QueryRecorder())
+
+
+def _finish_request(response):
+    recorder = g.get(_RECORDER_KEY)
+    if recorder is None:
+        return response
+    summary = recorder.summary()
+    response.headers.add(
+        "Server-Timing", f'db;dur={summary["time_ms"]};desc="{summary["count"]} consultas"'
+    )
+    if request.endpoint != "query_stats.debug_queries":
+        summary.update(
+            endpoint=request.endpoint or "-",
+            method=request.method,
+            path=request.path,
+            status=response.status_code,
+            at=time.strftime("%Y-%m-%d %H:%M:%S"),
+        )
+        _remember(summary)
+    if summary["count"] >= QUERY_STATS_WARN_COUNT:
+        logger.warning(
+            "%s %s: %d consultas (%.1f ms, %d duplicadas)",
+            request.method, request.path, summary["count"], summary["time_ms"], summary["duplicates"],
+        )
+    return response
+
+
+def init_app(app, log_dir=None):
+    """Registra la instrumentación, el log de consultas lentas y /debug/queries."""
+    app.register_blueprint(query_stats_bp)
+    if not QUERY_STATS_ENABLED:
+        return
+    if log_dir and not slow_logger.handlers:
+        # Importación local: app_logging usa current_recorder de este módulo
+        from modules.app_logging import BatchedFileHandler, queued
+
+        handler = BatchedFileHandler(
+            os.path.join(log_dir, "slow_queries.log"), maxBytes=1024 * 1024, backupCount=5, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(message)s"))
+        # Escrito desde la cola de app_logging: la consulta lenta no espera al disco
+        slow_logger.addHandler(queued(handler))
+        slow_logger.setLevel(logging.WARNING)
+        slow_logger.propagate = False
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+
+
+@query_stats_bp.route("/debug/queries")
+@login_required
+def debug_queries():
+    """Panel de consultas por endpoint (solo administradores)."""
+    if getattr(current_user, "rol", None) != "admin":
+        abort(403)
+    data = stats_snapshot()
+    data.update(
+        enabled=QUERY_STATS_ENABLED,
+        slow_query_ms=SLOW_QUERY_MS,
+        repeat_threshold=QUERY_REPEAT_THRESHOLD,
+    )
+    if request.args.get("format") == "json":
+        return jsonify(data)
+    return render_template("debug_queries.html", **data)
@@ -1,13 +1,15 @@
 from flask import Blueprint, jsonify
 from modules.db_utils import get_db_connection
+from modules.employee_links import employee_ref
 
 realtime_bp = Blueprint("realtime", __name__)
 
 
 def _fetch_one(query, params):
+    """query: SQL, o función conn -> SQL si depende del esquema (vínculos de empleados)."""
     conn = get_db_connection()
     cur = conn.cursor()
-    cur.execute(query, params)
+    cur.execute(query(conn) if callable(query) else query, params)
     row = cur.fetchone()
     conn.close()
     return dict(row) if row else None
@@ -27,9 +29,9 @@ def detail(module, item_id):
             "SELECT * FROM equipos_agrupados WHERE id = ?", (item_id,)
         ),
         "licencia": lambda: _fetch_one(
-            "SELECT l.*, e.nombre AS empleado_nombre, e.apellido AS empleado_apellido "
+            lambda conn: "SELECT l.*, e.nombre AS empleado_nombre, e.apellido AS empleado_apellido "
             "FROM licencias_office365 l "
-            "LEFT JOIN empleados e ON LOWER(e.correo_office)=LOWER(l.email) "
+            f"LEFT JOIN empleados e ON e.id = {employee_ref(conn, 'licencias_office365', 'l')} "
             "WHERE l.id = ?", (item_id,)
         ),
         "empleado": lambda: _fetch_one(
@@ -0,0 +1,196 @@
+"""
+Reportes PDF de tablas largas con costo lineal.
+
+Un único platypus Table con todas las filas se mide y se parte completo antes
+de dibujar la primera página: el tiempo crece más que linealmente y la memoria
+con el total de filas. Aquí cada página es su propia tabla de
+ROWS_PER_PAGE filas con anchos de columna y alto de fila fijos (reportlab no
+mide nada), las filas se leen del cursor por lotes y cada página se dibuja en
+el canvas en cuanto se completa.
+
+Los reportes grandes se dividen en lotes de páginas que se generan en el pool
+de procesos compartido (modules/process_pool) a medida que se leen del cursor
+y se unen en orden con pypdf.
+
+    layout = ReportLayout("Inventario", ["ID", "Marca", "Serial"], weights=[1, 3, 3])
+    cursor = conn.execute("SELECT id, marca, serial FROM equipos_individuales ORDER BY id")
+    pdf_bytes = render_report(layout, cursor_rows(cursor))
+"""
+
+import datetime
+import importlib.util
+import io
+import logging
+import os
+from itertools import islice
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Table, TableStyle
+
+from modules.process_pool import imap
+
+logger = logging.getLogger(__name__)
+
+# Filas leídas del cursor por fetchmany
+REPORT_FETCH_ROWS = int(os.getenv("REPORT_FETCH_ROWS", "2000"))
+# Páginas por lote y lotes en paralelo por reporte (0 = siempre en el proceso actual)
+REPORT_PAGES_PER_BATCH = int(os.getenv("REPORT_PAGES_PER_BATCH", "50"))
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+MARGIN = 30
+HEADER_HEIGHT = 40
+CELL_PADDING = 3
+FONT = "Helvetica"
+FONT_BOLD = "Helvetica-Bold"
+
+
+class ReportLayout:
+    """
+    Geometría fija del reporte: anchos de columna (proporcionales a `weights`),
+    alto de fila y filas por página. Se calcula una vez y viaja a los procesos
+    del pool, así que solo guarda datos simples.
+    """
+
+    def __init__(self, title, headers, weights=None, pagesize=None, font_size=7, header_color="#343a40",
+                 empty=""):
+        self.title = title
+        self.headers = [str(h) for h in headers]
+        self.pagesize = pagesize or (landscape(letter) if len(self.headers) > 6 else letter)
+        self.font_size = font_size
+        self.header_color = header_color
+        self.empty = empty
+        self.generated = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+
+        weights = weights or [1] * len(self.headers)
+        page_width, page_height = self.pagesize
+        usable = page_width - 2 * MARGIN
+        self.col_widths = [usable * w / sum(weights) for w in weights]
+        self.row_height = font_size + 2 * CELL_PADDING + 2
+        self.rows_per_page = max(int((page_height - 2 * MARGIN - HEADER_HEIGHT) // self.row_height) - 1, 1)
+        # Textos de hasta esta longitud caben sin medir (el glifo más ancho mide ~1 em)
+        self._safe_chars = [max(int((w - 2 * CELL_PADDING) // font_size), 1) for w in self.col_widths]
+
+    def fit(self, text, col, font=FONT):
+        """Recorta `text` al ancho de la columna."""
+        if len(text) <= self._safe_chars[col]:
+            return text
+        available = self.col_widths[col] - 2 * CELL_PADDING
+        if stringWidth(text, font, self.font_size) <= available:
+            return text
+        low, high = 0, len(text)
+        while low < high:
+            mid = (low + high + 1) // 2
+            if stringWidth(text[:mid] + "...", font, self.font_size) <= available:
+                low = mid
+            else:
+                high = mid - 1
+        return text[:low] + "..."
+
+    def style(self):
+        return TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(self.header_color)),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), FONT_BOLD),
+            ('FONTNAME', (0, 1), (-1, -1), FONT),
+            ('FONTSIZE', (0, 0), (-1, -1), self.font_size),
+            ('LEADING', (0, 0), (-1, -1), self.font_size + 1),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('TOPPADDING', (0, 0), (-1, -1), CELL_PADDING),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), CELL_PADDING),
+            ('LEFTPADDING', (0, 0), (-1, -1), CELL_PADDING),
+            ('RIGHTPADDING', (0, 0), (-1, -1), CELL_PADDING),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor("#f8f9fa")]),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ])
+
+
+def cursor_rows(cursor, size=None):
+    """Filas de un cursor ya ejecutado, leídas por lotes."""
+    size = size or REPORT_FETCH_ROWS
+    while True:
+        batch = cursor.fetchmany(size)
+        if not batch:
+            return
+        yield from batch
+
+
+def _draw_page(c, layout, style, rows, page_number):
+    width, height = layout.pagesize
+    c.setFont(FONT_BOLD, 14)
+    c.drawString(MARGIN, height - MARGIN - 14, layout.title)
+    c.setFont(FONT, 8)
+    c.drawRightString(width - MARGIN, height - MARGIN - 12, f"Generado el: {layout.generated}")
+    c.drawRightString(width - MARGIN, MARGIN / 2, f"Página {page_number}")
+
+    headers = [layout.fit(h, i, FONT_BOLD) for i, h in enumerate(layout.headers)]
+    cells = [
+        [layout.fit(layout.empty if v is None or v == "" else str(v), i) for i, v in enumerate(row)]
+        for row in rows
+    ]
+    table = Table([headers] + cells, colWidths=layout.col_widths, rowHeights=layout.row_height)
+    table.setStyle(style)
+    _, table_height = table.wrapOn(c, width - 2 * MARGIN, height)
+    table.drawOn(c, MARGIN, height - MARGIN - HEADER_HEIGHT - table_height)
+    c.showPage()
+
+
+def render_pages(layout, rows, first_page=1):
+    """PDF (bytes) con `rows` repartidas en páginas de layout.rows_per_page."""
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=layout.pagesize, pageCompression=1)
+    style = layout.style()
+    rows = iter(rows)
+    page_number = first_page
+    page = list(islice(rows, layout.rows_per_page))
+    if not page:
+        _draw_page(c, layout, style, [], page_number)
+    while page:
+        _draw_page(c, layout, style, page, page_number)
+        page_number += 1
+        page = list(islice(rows, layout.rows_per_page))
+    c.save()
+    return buffer.getvalue()
+
+
+def merge_pdfs(parts):
+    """Une varios PDF (bytes) en orden."""
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(io.BytesIO(part))
+    output = io.BytesIO()
+    writer.write(output)
+    return output.getvalue()
+
+
+def render_report(layout, rows, workers=None):
+    """
+    PDF (bytes) del reporte. Con workers > 1 y más de un lote de páginas, los
+    lotes se generan en paralelo mientras se siguen leyendo filas; como mucho
+    2 * workers lotes están en memoria a la vez.
+    """
+    workers = REPORT_WORKERS if workers is None else workers
+    batch_rows = max(REPORT_PAGES_PER_BATCH, 1) * layout.rows_per_page
+    rows = iter(rows)
+    if workers <= 1 or importlib.util.find_spec("pypdf") is None:
+        return render_pages(layout, rows)
+
+    first = [tuple(r) for r in islice(rows, batch_rows)]
+    second = [tuple(r) for r in islice(rows, batch_rows)]
+    if not second:
+        return render_pages(layout, first)
+
+    pages_per_batch = batch_rows // layout.rows_per_page
+
+    def batches():
+        batch, index = first, 0
+        while batch:
+            yield layout, batch, index * pages_per_batch + 1
+            index += 1
+            batch = second if index == 1 else [tuple(r) for r in islice(rows, batch_rows)]
+
+    return merge_pdfs(list(imap(render_pages, batches(), 2 * workers)))
@@ -0,0 +1,257 @@
+"""
+Búsqueda global sobre un índice FTS5 de SQLite.
+
+search_index es una tabla FTS5 "sombra" con el texto buscable de equipos,
+empleados, licencias y tickets. Se mantiene sincronizada mediante triggers
+sobre las tablas origen y se consulta desde /api/search con coincidencia por
+prefijo y orden por relevancia (bm25).
+
+El tokenizador unicode61 con remove_diacritics ignora mayúsculas y tildes, igual
+que normalize_text del importador: "camara" encuentra "Cámara".
+
+El índice y sus triggers los instala la migración del esquema derivado
+(install_search_index); mientras falten, /api/search responde 501 y el listado
+de equipos filtra con LIKE. Los triggers de UPDATE solo miran las columnas
+indexadas, así que recalcular columnas internas (p. ej. empleado_id) no
+reescribe el índice. Para reconstruirlo:
+    python migrate.py search
+"""
+
+import sqlite3
+import time
+
+from flask import Blueprint, jsonify, request
+from flask_login import login_required
+
+from modules.db_utils import derived_ready, get_db_connection, schema_objects, table_columns
+from modules.export_import import normalize_text
+
+search_bp = Blueprint("search", __name__)
+
+SEARCH_TABLE = "search_index"
+# rowid del índice = id_origen * ROWID_STRIDE + código de entidad
+ROWID_STRIDE = 8
+
+# tipo -> tabla origen, código de entidad y columnas candidatas.
+# Solo se indexan las columnas que existan en la tabla (los esquemas varían
+# entre instalaciones, p. ej. tickets.titulo / tickets.title).
+SEARCH_SOURCES = {
+    "equipo": {
+        "table": "equipos_individuales",
+        "code": 1,
+        "titulo": ["codigo_barras_individual", "serial", "placa"],
+        "contenido": ["marca", "modelo", "hostname", "tecnologia", "asignado_nuevo"],
+    },
+    "empleado": {
+        "table": "empleados",
+        "code": 2,
+        "titulo": ["nombre", "apellido"],
+        "contenido": ["cedula", "correo_office", "email", "cargo"],
+    },
+    "licencia": {
+        "table": "licencias_office365",
+        "code": 3,
+        "titulo": ["email", "usuario_asignado"],
+        "contenido": ["tipo_licencia", "cedula_usuario"],
+    },
+    "ticket": {
+        "table": "tickets",
+        "code": 4,
+        "titulo": ["titulo", "title"],
+        "contenido": ["descripcion", "description", "categoria", "category"],
+    },
+}
+
+_CODE_TO_TIPO = {cfg["code"]: tipo for tipo, cfg in SEARCH_SOURCES.items()}
+
+
+def fts5_available(conn):
+    try:
+        conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp._fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE IF EXISTS temp._fts5_probe")
+        return True
+    except Exception:
+        return False
+
+
+def _text_expr(columns, prefix=""):
+    parts = [f"COALESCE({prefix}{col}, '')" for col in columns]
+    return "TRIM(" + " || ' ' || ".join(parts) + ")" if parts else "''"
+
+
+def _source_columns(conn, cfg):
+    existing = table_columns(conn, cfg["table"])
+    if not existing:
+        return None, None
+    titulo = [c for c in cfg["titulo"] if c in existing]
+    contenido = [c for c in cfg["contenido"] if c in existing]
+    return titulo, contenido
+
+
+def _create_triggers(conn, tipo, cfg, titulo, contenido):
+    table, code = cfg["table"], cfg["code"]
+    new_row = (
+        f"INSERT INTO {SEARCH_TABLE} (rowid, titulo, contenido) VALUES ("
+        f"new.id * {ROWID_STRIDE} + {code}, {_text_expr(titulo, 'new.')}, {_text_expr(contenido, 'new.')});"
+    )
+    delete_old = f"DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id * {ROWID_STRIDE} + {code};"
+    watched = ", ".join(["id", *titulo, *contenido])
+    conn.executescript(f"""
+        DROP TRIGGER IF EXISTS search_{tipo}_ai;
+        DROP TRIGGER IF EXISTS search_{tipo}_au;
+        DROP TRIGGER IF EXISTS search_{tipo}_ad;
+        CREATE TRIGGER search_{tipo}_ai AFTER INSERT ON {table} BEGIN {new_row} END;
+        CREATE TRIGGER search_{tipo}_au AFTER UPDATE OF {watched} ON {table} BEGIN {delete_old} {new_row} END;
+        CREATE TRIGGER search_{tipo}_ad AFTER DELETE ON {table} BEGIN {delete_old} END;
+    """)
+
+
+def _backfill(conn, cfg, titulo, contenido):
+    code = cfg["code"]
+    conn.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid % {ROWID_STRIDE} = {code}")
+    conn.execute(
+        f"INSERT INTO {SEARCH_TABLE} (rowid, titulo, contenido) "
+        f"SELECT id * {ROWID_STRIDE} + {code}, {_text_expr(titulo)}, {_text_expr(contenido)} "
+        f"FROM {cfg['table']}"
+    )
+
+
+def _create_search_table(conn):
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+            titulo,
+            contenido,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    """)
+
+
+def rebuild_search_index(conn):
+    """
+    Recrea los triggers y vuelve a poblar el índice desde las tablas origen.
+    Devuelve {tipo: filas indexadas}.
+    """
+    _create_search_table(conn)
+    counts = {}
+    for tipo, cfg in SEARCH_SOURCES.items():
+        titulo, contenido = _source_columns(conn, cfg)
+        if titulo is None:
+            continue
+        _create_triggers(conn, tipo, cfg, titulo, contenido)
+        _backfill(conn, cfg, titulo, contenido)
+        counts[tipo] = conn.execute(
+            f"SELECT COUNT(*) FROM {SEARCH_TABLE} WHERE rowid % {ROWID_STRIDE} = {cfg['code']}"
+        ).fetchone()[0]
+    conn.commit()
+    return counts
+
+
+def install_search_index(conn):
+    """
+    Paso de migración: crea el índice y los triggers que falten (poblando solo
+    las entidades nuevas) y actualiza los de UPDATE creados sin lista de
+    columnas. Devuelve False si la base de datos no es SQLite o no tiene FTS5.
+    """
+    if not isinstance(conn, sqlite3.Connection) or not fts5_available(conn):
+        return False
+
+    _create_search_table(conn)
+    triggers = dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall())
+    for tipo, cfg in SEARCH_SOURCES.items():
+        update = triggers.get(f"search_{tipo}_au") or ""
+        if f"search_{tipo}_ai" in triggers and " UPDATE OF " in update:
+            continue
+        titulo, contenido = _source_columns(conn, cfg)
+        if titulo is None:
+            continue
+        _create_triggers(conn, tipo, cfg, titulo, contenido)
+        # Con triggers anteriores el índice ya está poblado
+        if f"search_{tipo}_ai" not in triggers:
+            _backfill(conn, cfg, titulo, contenido)
+    conn.commit()
+    return True
+
+
+def _index_installed(conn):
+    tables = schema_objects(conn, "table")
+    if SEARCH_TABLE not in tables:
+        return False, False
+    triggers = schema_objects(conn, "trigger")
+    sources = [tipo for tipo, cfg in SEARCH_SOURCES.items() if cfg["table"] in tables]
+    installed = all(f"search_{tipo}_ai" in triggers for tipo in sources)
+    return installed, len(sources) == len(SEARCH_SOURCES)
+
+
+def search_ready(conn):
+    """True si el índice existe y cada tabla origen que existe tiene sus triggers."""
+    return derived_ready(conn, "busqueda", _index_installed)
+
+
+def build_match_query(text):
+    """
+    Convierte el texto del usuario en una consulta FTS5: cada término normalizado
+    (minúsculas, sin tildes ni separadores) se busca por prefijo.
+    """
+    terms = normalize_text(text).split()
+    return " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+
+
+def search(conn, text, tipos=None, limit=20):
+    """Busca en el índice y devuelve resultados ordenados por relevancia."""
+    match = build_match_query(text)
+    if not match:
+        return []
+    sql = (
+        f"SELECT rowid, titulo, contenido, bm25({SEARCH_TABLE}, 10.0, 1.0) AS rank "
+        f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ?"
+    )
+    params = [match]
+    codes = [SEARCH_SOURCES[t]["code"] for t in (tipos or []) if t in SEARCH_SOURCES]
+    if codes:
+        sql += f" AND rowid % {ROWID_STRIDE} IN ({', '.join('?' * len(codes))})"
+        params.extend(codes)
+    sql += " ORDER BY rank LIMIT ?"
+    params.append(limit)
+
+    results = []
+    for row in conn.execute(sql, params).fetchall():
+        rowid = row[0]
+        results.append({
+            "tipo": _CODE_TO_TIPO.get(rowid % ROWID_STRIDE),
+            "id": rowid // ROWID_STRIDE,
+            "titulo": row[1],
+            "detalle": row[2],
+            "rank": round(row[3], 4),
+        })
+    return results
+
+
+@search_bp.route("/api/search")
+@login_required
+def api_search():
+    """
+    Búsqueda global por relevancia.
+    Parámetros: q (texto), tipo (equipo,empleado,licencia,ticket), limit (máx. 100).
+    """
+    text = request.args.get("q", "").strip()
+    tipos = [t for t in request.args.get("tipo", "").split(",") if t]
+    limit = min(max(request.args.get("limit", 20, type=int), 1), 100)
+
+    conn = get_db_connection()
+    if not search_ready(conn):
+        conn.close()
+        error = "La búsqueda de texto completo requiere SQLite con FTS5 y el índice instalado (python migrate.py esquema)."
+        return jsonify({"error": error}), 501
+
+    start = time.perf_counter()
+    try:
+        results = search(conn, text, tipos, limit)
+    finally:
+        conn.close()
+    return jsonify({
+        "query": text,
+        "count": len(results),
+        "results": results,
+        "took_ms": round((time.perf_counter() - start) * 1000, 2),
+    })
@@ -0,0 +1,368 @@
+"""
+Vista precalculada de una sede (/sede/<id>).
+
+sede_detail ejecutaba una docena de consultas en cada visita, dos subconsultas
+correlacionadas por empleado y además un INSERT (el agrupado AGR-<código>) en
+cada GET. build_sede_snapshot() arma todos los paneles y contadores con
+consultas por conjunto (los resúmenes de licencias y tickets salen de sus
+propios listados) y sede_snapshot() guarda el resultado en la caché de
+modules/app_cache: una entrada por sede con su versión de datos (la de una
+versión anterior se reemplaza) y sin guardar las vistas de más de
+SEDE_SNAPSHOT_MAX_BYTES. Los empleados se leen con las columnas que muestra
+la plantilla (EMPLOYEE_COLUMNS), así que sus contraseñas no llegan a la caché.
+
+Versión de datos por sede
+    sede_versiones guarda un contador por sede que los triggers de cada tabla
+    con sede_id (y de sedes) incrementan en cada escritura, tanto para la sede
+    nueva como para la anterior de la fila. Las filas vinculadas a un empleado
+    (empleado_id) también cambian la versión de la sede del empleado, porque
+    sus conteos aparecen en el panel de empleados. Los insumos se relacionan
+    por ciudad y usan la etiqueta global "insumos" de app_cache.
+
+Agrupado de la sede
+    El trigger sede_agrupado_ai crea AGR-<código> al crear la sede (y
+    sede_agrupado_au cuando cambia su código); install_sede_snapshots() crea
+    los que falten para las sedes existentes.
+
+La tabla de versiones y los triggers los instala la migración del esquema
+derivado (install_sede_snapshots, después de los vínculos de empleados); la
+vista no se guarda en caché mientras falte algún trigger (p. ej. una tabla
+creada después de la última migración) ni mientras una importación tenga
+diferido el resumen de inventario (sus conteos aún no corresponden a la
+versión). Con bases de datos distintas de SQLite la vista se calcula en cada
+petición.
+"""
+
+import os
+import sqlite3
+
+from modules.app_cache import cached
+from modules.db_utils import derived_ready, schema_objects, table_columns
+from modules.inventory_summary import (
+    CONTROL_TABLE,
+    release_stale_deferrals,
+    summary_ready,
+    summary_rows,
+    summary_totals,
+)
+from modules.inventory_tabs import CATEGORY_FLAGS
+
+VERSION_TABLE = "sede_versiones"
+SEDE_SNAPSHOT_TTL = int(os.getenv("SEDE_SNAPSHOT_TTL", "3600"))
+# Vistas más grandes (en JSON) se calculan en cada visita en lugar de guardarse
+SEDE_SNAPSHOT_MAX_BYTES = int(os.getenv("SEDE_SNAPSHOT_MAX_BYTES", str(512 * 1024)))
+
+# Columnas de empleados que muestra sede_detail (nunca las contraseñas)
+EMPLOYEE_COLUMNS = (
+    "id", "cedula", "nombre", "apellido", "cargo", "departamento", "estado",
+    "usuario_windows", "usuario_quiron", "correo_office", "sede_id",
+)
+
+# Tablas cuyas filas aparecen en la vista de la sede
+SEDE_TABLES = (
+    "sedes",
+    "empleados",
+    "equipos_agrupados",
+    "equipos_individuales",
+    "inventario_administrativo",
+    "equipos_biomedicos",
+    "licencias_office365",
+    "tickets",
+)
+
+# Mismas reglas que usaba sede_detail: código de la sede o S<id con 3 dígitos>,
+# sin espacios y en mayúsculas
+_GROUP_CODE = (
+    "'AGR-' || UPPER(REPLACE(COALESCE(NULLIF(TRIM({p}codigo), ''), 'S' || printf('%03d', {p}id)), ' ', ''))"
+)
+
+def group_code(sede):
+    """Código AGR-<código> del agrupado de la sede (dict con id y codigo)."""
+    codigo = (sede.get("codigo") or "").strip() or f"S{str(sede['id']).zfill(3)}"
+    return f"AGR-{codigo.replace(' ', '').upper()}"
+
+
+def _follows_employee(table, columns):
+    return table not in ("sedes", "empleados") and "empleado_id" in columns
+
+
+def _affected_sedes(table, columns, refs, employee_sede):
+    """SELECT de las sedes afectadas por la fila new./old. de `table`."""
+    parts = []
+    for ref in refs:
+        parts.append(f"SELECT {ref}.{'id' if table == 'sedes' else 'sede_id'}")
+    if employee_sede and _follows_employee(table, columns):
+        ids = ", ".join(f"{ref}.empleado_id" for ref in refs)
+        parts.append(f"SELECT sede_id FROM empleados WHERE id IN ({ids})")
+    parts[0] += " AS sede"
+    return " UNION ".join(parts)
+
+
+def _create_version_triggers(conn, table, columns, employee_sede):
+    # Las marcas de categoría no aparecen en la vista: recalcularlas no cambia la versión
+    watched = [row[1] for row in conn.execute(f"PRAGMA table_info({table})").fetchall()
+               if row[1] not in CATEGORY_FLAGS]
+    update = f"UPDATE OF {', '.join(watched)}" if len(watched) < len(columns) else "UPDATE"
+    statements = []
+    for suffix, event, refs in (("ai", "INSERT", ("new",)), ("au", update, ("new", "old")),
+                                ("ad", "DELETE", ("old",))):
+        statements.append(f"DROP TRIGGER IF EXISTS sede_version_{table}_{suffix};")
+        statements.append(f"""
+            CREATE TRIGGER sede_version_{table}_{suffix} AFTER {event} ON {table}
+            BEGIN
+                INSERT INTO {VERSION_TABLE} (sede_id, version)
+                SELECT sede, 1 FROM ({_affected_sedes(table, columns, refs, employee_sede)}) WHERE sede IS NOT NULL
+                ON CONFLICT(sede_id) DO UPDATE SET version = version + 1;
+            END;
+        """)
+    conn.executescript("\n".join(statements))
+
+
+def _create_group_triggers(conn):
+    insert = """
+        INSERT INTO equipos_agrupados (
+            codigo_barras_unificado, descripcion_general, sede_id, estado_general, created_at
+        )
+        SELECT {code}, 'Equipo Agrupado - ' || COALESCE({p}nombre, ''), {p}id, 'activo', CURRENT_TIMESTAMP
+        {source}
+        WHERE NOT EXISTS (SELECT 1 FROM equipos_agrupados ea WHERE ea.codigo_barras_unificado = {code})
+    """
+    new_row = insert.format(code=_GROUP_CODE.format(p="new."), p="new.", source="")
+    conn.executescript(f"""
+        DROP TRIGGER IF EXISTS sede_agrupado_ai;
+        CREATE TRIGGER sede_agrupado_ai AFTER INSERT ON sedes BEGIN {new_row}; END;
+        DROP TRIGGER IF EXISTS sede_agrupado_au;
+        CREATE TRIGGER sede_agrupado_au AFTER UPDATE OF codigo ON sedes BEGIN {new_row}; END;
+    """)
+    # Sedes creadas antes del trigger
+    conn.execute(insert.format(code=_GROUP_CODE.format(p="s."), p="s.", source="FROM sedes s"))
+
+
+def _versioned(table, columns):
+    return table == "sedes" or "sede_id" in columns
+
+
+def _stale_version_tables(conn, tables):
+    """
+    Tablas de SEDE_TABLES con sede_id a las que les faltan los triggers de
+    versión o cuyos triggers no siguen a empleados.sede_id (creados antes de
+    que existiera la columna).
+    """
+    triggers = dict(conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger'").fetchall())
+    employee_sede = "empleados" in tables and "sede_id" in table_columns(conn, "empleados")
+    stale = []
+    for table in SEDE_TABLES:
+        if table not in tables:
+            continue
+        columns = table_columns(conn, table)
+        if not _versioned(table, columns):
+            continue
+        sql = triggers.get(f"sede_version_{table}_ai")
+        if sql is None or (employee_sede and _follows_employee(table, columns) and "FROM empleados" not in sql):
+            stale.append((table, columns))
+    return stale
+
+
+def install_sede_snapshots(conn):
+    """
+    Paso de migración: crea sede_versiones, los triggers de versión y del
+    agrupado de la sede que falten. Devuelve False si la base de datos no es
+    SQLite.
+    """
+    if not isinstance(conn, sqlite3.Connection):
+        return False
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (
+            sede_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    tables = schema_objects(conn, "table")
+    employee_sede = "empleados" in tables and "sede_id" in table_columns(conn, "empleados")
+    for table, columns in _stale_version_tables(conn, tables):
+        _create_version_triggers(conn, table, columns, employee_sede)
+    if {"sedes", "equipos_agrupados"} <= tables and "sede_agrupado_ai" not in schema_objects(conn, "trigger"):
+        _create_group_triggers(conn)
+    conn.commit()
+    return True
+
+
+def _snapshots_installed(conn):
+    tables = schema_objects(conn, "table")
+    if VERSION_TABLE not in tables or _stale_version_tables(conn, tables):
+        return False, False
+    if {"sedes", "equipos_agrupados"} <= tables and "sede_agrupado_ai" not in schema_objects(conn, "trigger"):
+        return False, False
+    # Sin empleados.sede_id los triggers se recrean cuando aparezca la columna
+    return True, set(SEDE_TABLES) <= tables and "sede_id" in table_columns(conn, "empleados")
+
+
+def sede_snapshots_ready(conn):
+    """True si cada tabla de SEDE_TABLES que existe (con sede_id) tiene sus triggers de versión al día."""
+    return derived_ready(conn, "sedes", _snapshots_installed)
+
+
+def _rows(conn, tables, table, sql, params):
+    if table not in tables:
+        return []
+    return [dict(row) for row in conn.execute(sql, params).fetchall()]
+
+
+def _count_by_estado(rows):
+    summary = {}
+    for row in rows:
+        estado = row.get("estado") or "sin_estado"
+        summary[estado] = summary.get(estado, 0) + 1
+    return summary
+
+
+def build_sede_snapshot(conn, sede_id):
+    """Paneles y contadores de la vista de la sede (dict para la plantilla) o None."""
+    sede = conn.execute("SELECT * FROM sedes WHERE id = ?", (sede_id,)).fetchone()
+    if not sede:
+        return None
+    sede = dict(sede)
+    tables = schema_objects(conn, "table")
+    ciudad = sede.get("ciudad") or ""
+
+    inventario_tecnologico_agrupado = _rows(conn, tables, "equipos_agrupados", """
+        SELECT id, codigo_barras_unificado, descripcion_general, asignado_actual, estado_general
+        FROM equipos_agrupados
+        WHERE sede_id = ?
+        ORDER BY id DESC
+    """, (sede_id,))
+    inventario_tecnologico_individual = _rows(conn, tables, "equipos_individuales", """
+        SELECT id, codigo_barras_individual, serial, marca, modelo, estado
+        FROM equipos_individuales
+        WHERE sede_id = ?
+        ORDER BY id DESC
+    """, (sede_id,))
+    inventario_administrativo = _rows(conn, tables, "inventario_administrativo", """
+        SELECT id, tipo_mueble, codigo_interno, descripcion_item, asignado_a, estado
+        FROM inventario_administrativo
+        WHERE sede_id = ?
+        ORDER BY id DESC
+    """, (sede_id,))
+    # Insumos filtrados por ciudad de la sede (no tienen sede_id)
+    insumos = _rows(conn, tables, "insumos", """
+        SELECT id, nombre_insumo, serial_equipo, cantidad_total, cantidad_disponible, asignado_a, estado, ubicacion
+        FROM insumos
+        WHERE (ubicacion IS NOT NULL AND ubicacion LIKE ?)
+    """, (f"%{ciudad}%",))
+    biomedica = _rows(conn, tables, "equipos_biomedicos", """
+        SELECT id, codigo_activo, nombre_equipo, marca, modelo, estado
+        FROM equipos_biomedicos
+        WHERE sede_id = ?
+        ORDER BY id DESC
+    """, (sede_id,))
+    licencias = _rows(conn, tables, "licencias_office365", """
+        SELECT id, email, tipo_licencia, usuario_asignado, estado, fecha_vencimiento
+        FROM licencias_office365
+        WHERE sede_id = ?
+        ORDER BY id DESC
+    """, (sede_id,))
+    tickets = _rows(conn, tables, "tickets", """
+        SELECT id, numero_ticket, titulo, categoria, prioridad, estado
+        FROM tickets
+        WHERE sede_id = ?
+        ORDER BY created_at DESC
+    """, (sede_id,))
+
+    # Empleados con sus conteos: un GROUP BY por tabla en lugar de dos
+    # subconsultas por empleado
+    counts = []
+    for table, alias in (("equipos_individuales", "equipos_asignados"), ("licencias_office365", "licencias_asignadas")):
+        if table in tables and "empleado_id" in table_columns(conn, table):
+            counts.append((alias, f"""
+                LEFT JOIN (
+                    SELECT t.empleado_id, COUNT(*) AS total
+                    FROM {table} t JOIN empleados x ON x.id = t.empleado_id
+                    WHERE x.sede_id = ?
+                    GROUP BY t.empleado_id
+                ) {alias} ON {alias}.empleado_id = e.id"""))
+        else:
+            counts.append((alias, None))
+    select = ", ".join(
+        f"COALESCE({alias}.total, 0) AS {alias}" if join else f"0 AS {alias}" for alias, join in counts
+    )
+    joins = "".join(join for _, join in counts if join)
+    # empleados.sede_id lo agrega gestion_humana en instalaciones antiguas
+    employee_columns = table_columns(conn, "empleados")
+    employees = "empleados" if "sede_id" in employee_columns else None
+    fields = "".join(
+        f"e.{col}, " if col in employee_columns else f"NULL AS {col}, " for col in EMPLOYEE_COLUMNS
+    )
+    empleados = _rows(conn, tables, employees, f"""
+        SELECT {fields}{select}
+        FROM empleados e{joins}
+        WHERE e.sede_id = ?
+        ORDER BY e.nombre, e.apellido
+    """, (sede_id,) * (len([j for _, j in counts if j]) + 1))
+
+    # Inventario individual desde el resumen materializado
+    resumen = summary_totals(conn, "sede", sede_id)
+    tecnologia_breakdown = [
+        {"tecnologia": row["subclave"] or None, "total": row["total"]}
+        for row in summary_rows(conn, "sede_tecnologia", sede_id)
+    ][:15]
+
+    licencias_summary = _count_by_estado(licencias)
+    tickets_summary = _count_by_estado(tickets)
+    sede_stats = {
+        "total_equipos_individuales": resumen.get("total", 0) or 0,
+        "disponibles": resumen.get("disponibles", 0) or 0,
+        "asignados": resumen.get("asignados", 0) or 0,
+        "bajas": resumen.get("bajas", 0) or 0,
+        "total_licencias": len(licencias),
+        "tickets": len(tickets),
+        "empleados": len(empleados),
+    }
+
+    return {
+        "sede": sede,
+        "codigo_agrupado_sede": group_code(sede),
+        "inventario_tecnologico_agrupado": inventario_tecnologico_agrupado,
+        "inventario_tecnologico_individual": inventario_tecnologico_individual,
+        "inventario_administrativo": inventario_administrativo,
+        "insumos": insumos,
+        "biomedica": biomedica,
+        "licencias": licencias,
+        "tickets": tickets,
+        "empleados": empleados,
+        "sede_stats": sede_stats,
+        "tecnologia_breakdown": tecnologia_breakdown,
+        "licencias_summary": licencias_summary,
+        "tickets_summary": tickets_summary,
+    }
+
+
+def sede_version(conn, sede_id):
+    """
+    Versión de datos de la sede, o None si no se debe guardar en caché (sin
+    triggers o con el resumen de inventario diferido).
+    """
+    if not sede_snapshots_ready(conn) or not summary_ready(conn):
+        return None
+    row = conn.execute(
+        f"SELECT (SELECT version FROM {VERSION_TABLE} WHERE sede_id = ?), "
+        f"(SELECT diferidos FROM {CONTROL_TABLE} WHERE id = 1)",
+        (sede_id,),
+    ).fetchone()
+    if row[1] and release_stale_deferrals(conn):
+        return None
+    return row[0] or 0
+
+
+def sede_snapshot(conn, sede_id):
+    """Vista de la sede desde la caché mientras su versión de datos no cambie."""
+    version = sede_version(conn, sede_id)
+    if version is None:
+        return build_sede_snapshot(conn, sede_id)
+    return cached(
+        f"sede_snapshot:{sede_id}",
+        ("insumos",),
+        lambda c: build_sede_snapshot(c, sede_id),
+        ttl=SEDE_SNAPSHOT_TTL,
+        version=version,
+        max_bytes=SEDE_SNAPSHOT_MAX_BYTES,
+    )
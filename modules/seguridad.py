@@ -1,13 +1,10 @@
 from flask import Blueprint, render_template, jsonify
-import sqlite3
-import os
+from modules.db_utils import get_db_connection
 
-DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "workmanager_erp.db")
 
 def get_conn():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_db_connection()
+
 
 seguridad_bp = Blueprint('seguridad', __name__)
 
@@ -1,11 +1,13 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 import sqlite3
+from modules.db_utils import get_db_connection
+from modules.query_stats import InstrumentedConnection
 
 sistemas_bp = Blueprint('sistemas', __name__, template_folder='../templates', static_folder='../static')
 
 @sistemas_bp.route('/sistemas')
 def sistemas():
-    conn = sqlite3.connect('workmanager_erp.db')
+    conn = get_db_connection()
     c = conn.cursor()
 
     # Get statistics for dashboard
@@ -70,7 +72,7 @@ def new_sistema():
         name = request.form['name']
         description = request.form['description']
         version = request.form['version']
-        conn = sqlite3.connect('todo.db')
+        conn = sqlite3.connect('todo.db', factory=InstrumentedConnection)
         c = conn.cursor()
         c.execute("INSERT INTO sistemas (name, description, version) VALUES (?, ?, ?)", (name, description, version))
         conn.commit()
@@ -81,7 +83,7 @@ def new_sistema():
 
 @sistemas_bp.route('/sistema/<int:sistema_id>/edit', methods=['GET', 'POST'])
 def edit_sistema(sistema_id):
-    conn = sqlite3.connect('todo.db')
+    conn = sqlite3.connect('todo.db', factory=InstrumentedConnection)
     c = conn.cursor()
     if request.method == 'POST':
         name = request.form['name']
@@ -99,7 +101,7 @@ def edit_sistema(sistema_id):
 
 @sistemas_bp.route('/sistema/<int:sistema_id>/delete', methods=['POST'])
 def delete_sistema(sistema_id):
-    conn = sqlite3.connect('todo.db')
+    conn = sqlite3.connect('todo.db', factory=InstrumentedConnection)
     c = conn.cursor()
     c.execute("DELETE FROM sistemas WHERE id=?", (sistema_id,))
     conn.commit()
@@ -109,7 +111,7 @@ def delete_sistema(sistema_id):
 
 @sistemas_bp.route('/api/sistemas', methods=['GET'])
 def api_sistemas():
-    conn = sqlite3.connect('todo.db')
+    conn = sqlite3.connect('todo.db', factory=InstrumentedConnection)
     c = conn.cursor()
     c.execute("SELECT * FROM sistemas")
     sistemas = c.fetchall()
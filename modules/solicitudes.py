@@ -3,16 +3,12 @@ from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
 from wtforms import StringField, SubmitField, SelectField, DateField, TextAreaField
 from wtforms.validators import DataRequired, Optional, Length
-import sqlite3
 from datetime import datetime
 from .notifications import create_notification
+from modules.db_utils import get_db_connection
 
 solicitudes_bp = Blueprint('solicitudes', __name__, url_prefix='/solicitudes', template_folder='../templates')
 
-def get_db_connection():
-    conn = sqlite3.connect('workmanager_erp.db')
-    conn.row_factory = sqlite3.Row
-    return conn
 
 class SolicitudForm(FlaskForm):
     """Formulario para crear y editar solicitudes."""
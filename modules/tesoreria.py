@@ -1,14 +1,14 @@
 from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
 from flask_login import login_required, current_user
-import sqlite3
 from functools import wraps
+from modules.db_utils import get_db_connection
 
 tesoreria_bp = Blueprint('tesoreria', __name__, url_prefix='/tesoreria', template_folder='../templates')
 
+
 def get_conn():
-    conn = sqlite3.connect('workmanager_erp.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    return get_db_connection()
+
 
 @tesoreria_bp.route('/')
 @login_required
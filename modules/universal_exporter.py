@@ -1,20 +1,19 @@
-from flask import Blueprint, request, Response, flash, redirect, url_for
-import sqlite3
-import pandas as pd
-import io
+from flask import Blueprint, request, flash, redirect, url_for
 from datetime import datetime
+from modules.db_utils import get_db_connection
+from modules.employee_links import employee_ref
+from modules.excel_export import StreamingWorkbook, xlsx_response
+from modules.export_stream import QueryStream, csv_chunks, streaming_response
 
 universal_exporter_bp = Blueprint('universal_exporter', __name__, url_prefix='/export')
 
-def get_db_connection():
-    conn = sqlite3.connect('workmanager_erp.db')
-    conn.row_factory = sqlite3.Row
-    return conn
 
 # Configuración de qué se puede exportar
 EXPORT_CONFIG = {
     'licencias': {
-        'query': "SELECT l.usuario_asignado, l.email, l.tipo_licencia, l.estado, l.fecha_asignacion, e.cedula, e.cargo, e.departamento FROM licencias_office365 l LEFT JOIN empleados e ON (LOWER(e.correo_office) = LOWER(l.email))",
+        'query': "SELECT l.usuario_asignado, l.email, l.tipo_licencia, l.estado, l.fecha_asignacion, e.cedula, e.cargo, e.departamento FROM licencias_office365 l LEFT JOIN empleados e ON e.id = {employee}",
+        # {employee}: empleado de la fila (tabla, alias), ver employee_links.employee_ref
+        'employee_links': ('licencias_office365', 'l'),
         'filename': 'licencias'
     },
     'empleados': {
@@ -47,36 +46,27 @@ def export_data(data_source, file_format):
         return redirect(request.referrer or url_for('index'))
 
     config = EXPORT_CONFIG[data_source]
-    conn = get_db_connection()
-    
-    try:
-        # Aquí se podrían añadir filtros basados en request.args si se quisiera
-        df = pd.read_sql_query(config['query'], conn)
-        
-        output = io.BytesIO()
-        filename = f"{config['filename']}_{datetime.now().strftime('%Y%m%d')}"
-
-        if file_format == 'excel':
-            df.to_excel(output, index=False, sheet_name=data_source)
-            mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            filename += '.xlsx'
-        elif file_format == 'csv':
-            df.to_csv(output, index=False, encoding='utf-8-sig')
-            mimetype = 'text/csv'
-            filename += '.csv'
-        else:
-            flash(f"Formato de archivo '{file_format}' no soportado.", "danger")
-            return redirect(request.referrer or url_for('index'))
+    filename = f"{config['filename']}_{datetime.now().strftime('%Y%m%d')}"
 
-        output.seek(0)
+    if file_format not in ('csv', 'excel'):
+        flash(f"Formato de archivo '{file_format}' no soportado.", "danger")
+        return redirect(request.referrer or url_for('index'))
 
-        return Response(
-            output,
-            mimetype=mimetype,
-            headers={"Content-Disposition": f"attachment;filename={filename}"}
-        )
+    try:
+        # Aquí se podrían añadir filtros basados en request.args si se quisiera
+        # Lectura por lotes directamente desde el cursor, sin cargar la consulta completa
+        query = config['query']
+        if config.get('employee_links'):
+            query = query.format(employee=employee_ref(get_db_connection(), *config['employee_links']))
+        stream = QueryStream(query)
+        if file_format == 'csv':
+            return streaming_response(csv_chunks(stream, bom=True), stream, 'text/csv', filename + '.csv')
+        try:
+            book = StreamingWorkbook()
+            book.add_sheet(data_source, stream.columns).write_batches(stream.batches())
+        finally:
+            stream.close()
+        return xlsx_response(book, filename + '.xlsx')
     except Exception as e:
         flash(f"Error al exportar los datos: {e}", "danger")
         return redirect(request.referrer or url_for('index'))
-    finally:
-        conn.close()
\ No newline at end of file
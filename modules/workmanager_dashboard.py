@@ -1,8 +1,5 @@
-import os
-import sqlite3
 from flask import Blueprint, render_template
-
-DB_PATH = os.path.join(os.path.dirname(__file__), "..", "workmanager_erp.db")
+from modules.db_utils import get_db_connection
 
 workmanager_dashboard_bp = Blueprint(
     "workmanager_dashboard",
@@ -39,7 +36,7 @@ def _get_stats():
         "proveedores": 0,
     }
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db_connection()
         cur = conn.cursor()
         cur.execute("SELECT COUNT(*) FROM equipos_individuales")
         stats["equipos"] = cur.fetchone()[0]
@@ -27,7 +27,11 @@ class AutoInventoryImporter:
 
     def connect_db(self):
         """Connect to the database"""
-        return sqlite3.connect(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        # INSERT OR REPLACE must fire the DELETE triggers of the replaced row
+        # (inventory summary, table counts, search index)
+        conn.execute("PRAGMA recursive_triggers=ON")
+        return conn
 
     def import_equipos_agrupados(self, data):
         """Import equipos agrupados data"""
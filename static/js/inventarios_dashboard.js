@@ -1,4 +1,7 @@
-let dashboardData = null;
+// Respuestas por pestaña y página; el servidor las revalida con ETag
+const tabCache = {};
+const tabPages = {};
+const PAGE_SIZE = 100;
 
 function formatEstadoBadge(value) {
     if (!value) return '<span class="badge bg-light text-dark">N/A</span>';
@@ -55,13 +58,14 @@ function renderSimpleTable(tableId, columns, rows) {
     });
 }
 
-async function ensureDashboardData() {
-    if (dashboardData) return Promise.resolve(dashboardData);
+async function fetchTab(tab, page = 1) {
+    const key = `${tab}:${page}`;
+    if (tabCache[key]) return tabCache[key];
     try {
-        const response = await fetch('/inventarios/api/dashboard');
+        const response = await fetch(`/inventarios/api/dashboard/${tab}?page=${page}&per_page=${PAGE_SIZE}`);
         if (!response.ok) throw new Error('La respuesta de la red no fue correcta');
-        dashboardData = await response.json();
-        return dashboardData;
+        tabCache[key] = await response.json();
+        return tabCache[key];
     } catch (error) {
         console.error('Error cargando dashboard de inventarios:', error);
         alert('No se pudo cargar la data del dashboard de inventarios.');
@@ -69,63 +73,93 @@ async function ensureDashboardData() {
     }
 }
 
-function loadGeneralInventory() {
-    ensureDashboardData().then(data => {
-        renderSimpleTable('generalTable', [
-            { key: 'codigo', label: 'Código' },
-            { key: 'serial', label: 'Serial' },
-            { key: 'marca', label: 'Marca' },
-            { key: 'modelo', label: 'Modelo' },
-            { key: 'estado', label: 'Estado', formatter: formatEstadoBadge },
-            { key: 'asignado', label: 'Asignado a' },
-            { key: 'sede', label: 'Sede' },
-            { key: 'id', label: 'Acciones', formatter: (id, row) => buildActionButtons(row) }
-        ], data.individuales);
+function renderPager(tableId, data, reload) {
+    const table = document.getElementById(tableId);
+    if (!table) return;
+    let pager = document.getElementById(`${tableId}Pager`);
+    if (!pager) {
+        pager = document.createElement('div');
+        pager.id = `${tableId}Pager`;
+        pager.className = 'd-flex justify-content-between align-items-center mt-2';
+        table.parentNode.after(pager);
+    }
+    const pages = Math.max(Math.ceil(data.total / (data.per_page || data.total || 1)), 1);
+    if (pages <= 1) {
+        pager.innerHTML = '';
+        return;
+    }
+    pager.innerHTML = `
+        <small class="text-muted">Página ${data.page} de ${pages} (${data.total} registros)</small>
+        <div>
+            <button class="btn btn-sm btn-outline-secondary" data-page="${data.page - 1}" ${data.page <= 1 ? 'disabled' : ''}>Anterior</button>
+            <button class="btn btn-sm btn-outline-secondary" data-page="${data.page + 1}" ${data.page >= pages ? 'disabled' : ''}>Siguiente</button>
+        </div>`;
+    pager.querySelectorAll('button[data-page]').forEach(btn => {
+        btn.addEventListener('click', () => reload(parseInt(btn.dataset.page, 10)));
     });
 }
 
-function loadAssignedInventory() {
-    ensureDashboardData().then(data => {
-        renderSimpleTable('asignadosTable', [
-            { key: 'codigo', label: 'Código' },
-            { key: 'marca', label: 'Marca' },
-            { key: 'serial', label: 'Serial' },
-            { key: 'usuario', label: 'Usuario Asignado' },
-            { key: 'sede', label: 'Sede' },
-            { key: 'fecha', label: 'Fecha Asignación' },
-            { key: 'id', label: 'Acciones', formatter: (id, row) => buildActionButtons(row) }
-        ], data.asignados);
+function loadTab(tab, tableId, columns, page) {
+    if (page !== undefined) tabPages[tab] = page;
+    const current = tabPages[tab] || 1;
+    const reload = p => loadTab(tab, tableId, columns, p);
+    return fetchTab(tab, current).then(data => {
+        renderSimpleTable(tableId, columns, data.items);
+        renderPager(tableId, data, reload);
     });
 }
 
-function loadDecommissionedInventory() {
-    ensureDashboardData().then(data => {
-        renderSimpleTable('bajasTable', [
-            { key: 'codigo', label: 'Código' },
-            { key: 'marca', label: 'Marca' },
-            { key: 'serial', label: 'Serial' },
-            { key: 'motivo', label: 'Motivo de Baja' },
-            { key: 'fecha', label: 'Fecha de Baja' }
-        ], data.bajas);
-    });
+function loadGeneralInventory(page) {
+    loadTab('individuales', 'generalTable', [
+        { key: 'codigo', label: 'Código' },
+        { key: 'serial', label: 'Serial' },
+        { key: 'marca', label: 'Marca' },
+        { key: 'modelo', label: 'Modelo' },
+        { key: 'estado', label: 'Estado', formatter: formatEstadoBadge },
+        { key: 'asignado', label: 'Asignado a' },
+        { key: 'sede', label: 'Sede' },
+        { key: 'id', label: 'Acciones', formatter: (id, row) => buildActionButtons(row) }
+    ], page);
 }
 
-function loadSedeResumen() {
-    ensureDashboardData().then(data => renderSimpleTable('sedeTable', [
+function loadAssignedInventory(page) {
+    loadTab('asignados', 'asignadosTable', [
+        { key: 'codigo', label: 'Código' },
+        { key: 'marca', label: 'Marca' },
+        { key: 'serial', label: 'Serial' },
+        { key: 'usuario', label: 'Usuario Asignado' },
+        { key: 'sede', label: 'Sede' },
+        { key: 'fecha', label: 'Fecha Asignación' },
+        { key: 'id', label: 'Acciones', formatter: (id, row) => buildActionButtons(row) }
+    ], page);
+}
+
+function loadDecommissionedInventory(page) {
+    loadTab('bajas', 'bajasTable', [
+        { key: 'codigo', label: 'Código' },
+        { key: 'marca', label: 'Marca' },
+        { key: 'serial', label: 'Serial' },
+        { key: 'motivo', label: 'Motivo de Baja' },
+        { key: 'fecha', label: 'Fecha de Baja' }
+    ], page);
+}
+
+function loadSedeResumen(page) {
+    loadTab('por_sede', 'sedeTable', [
         { key: 'sede', label: 'Sede' }, { key: 'total', label: 'Total' }, { key: 'disponibles', label: 'Disponibles' }, { key: 'asignados', label: 'Asignados' }, { key: 'bajas', label: 'Bajas' }
-    ], data.por_sede));
+    ], page);
 }
 
-function loadUsuarioResumen() {
-    ensureDashboardData().then(data => renderSimpleTable('usuarioTable', [
+function loadUsuarioResumen(page) {
+    loadTab('por_usuario', 'usuarioTable', [
         { key: 'usuario', label: 'Usuario' }, { key: 'total', label: 'Total' }, { key: 'activos', label: 'Activos' }, { key: 'bajas', label: 'Bajas' }
-    ], data.por_usuario));
+    ], page);
 }
 
-function loadAreaResumen() {
-    ensureDashboardData().then(data => renderSimpleTable('areaTable', [
+function loadAreaResumen(page) {
+    loadTab('por_area', 'areaTable', [
         { key: 'area', label: 'Área' }, { key: 'total', label: 'Total' }, { key: 'bajas', label: 'Bajas' }
-    ], data.por_area));
+    ], page);
 }
 
 async function deleteItem(table, id) {
@@ -152,8 +186,18 @@ async function deleteItem(table, id) {
     }
 }
 
+// Objeto que mapea el ID de la pestaña con la función que carga sus datos
+const tabHandlers = {
+    'general-tab': loadGeneralInventory,
+    'asignados-tab': loadAssignedInventory,
+    'bajas-tab': loadDecommissionedInventory,
+    'por-sede-tab': loadSedeResumen,
+    'por-usuario-tab': loadUsuarioResumen,
+    'por-area-tab': loadAreaResumen,
+};
+
 function reloadDashboardData() {
-    dashboardData = null;
+    Object.keys(tabCache).forEach(key => delete tabCache[key]);
     const activeTab = document.querySelector('.nav-tabs .nav-link.active');
     if (activeTab) {
         const handler = tabHandlers[activeTab.id];
@@ -165,16 +209,6 @@ document.addEventListener('DOMContentLoaded', () => {
     const inventoryTabs = document.querySelector('#inventoryTabs');
     if (!inventoryTabs) return;
 
-    // Objeto que mapea el ID de la pestaña con la función que carga sus datos
-    const tabHandlers = {
-        'general-tab': loadGeneralInventory,
-        'asignados-tab': loadAssignedInventory,
-        'bajas-tab': loadDecommissionedInventory,
-        'por-sede-tab': loadSedeResumen,
-        'por-usuario-tab': loadUsuarioResumen,
-        'por-area-tab': loadAreaResumen,
-    };
-
     // Escuchar cuando se muestra una nueva pestaña
     inventoryTabs.addEventListener('shown.bs.tab', (event) => {
         const handler = tabHandlers[event.target.id];
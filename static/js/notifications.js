@@ -77,5 +77,33 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // Iniciar el proceso
     fetchNotifications();
-    setInterval(fetchNotifications, 60000); // Refrescar cada 60 segundos
+
+    // Canal SSE: el servidor avisa al instante y las pestañas inactivas no consultan la BD.
+    // EventSource se reconecta solo y reenvía Last-Event-ID para recuperar las perdidas.
+    // Si el servidor no tiene cupo (503) EventSource se cierra: se consulta como antes
+    // y se vuelve a intentar el canal pasado un minuto.
+    if (window.EventSource) {
+        let pending = null;
+        let source = null;
+        const connect = () => {
+            source = new EventSource('/notifications/api/stream');
+            source.addEventListener('notification', () => {
+                // Agrupar ráfagas de avisos en una sola consulta
+                clearTimeout(pending);
+                pending = setTimeout(fetchNotifications, 250);
+            });
+            source.addEventListener('error', () => {
+                if (source.readyState === EventSource.CLOSED) {
+                    setTimeout(() => {
+                        fetchNotifications();
+                        connect();
+                    }, 60000);
+                }
+            });
+        };
+        connect();
+        window.addEventListener('beforeunload', () => source.close());
+    } else {
+        setInterval(fetchNotifications, 60000); // Navegadores sin SSE: refrescar cada 60 segundos
+    }
 });
\ No newline at end of file
@@ -0,0 +1,70 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+import pytest
+
+from create_production_db import create_tables
+from modules.derived_schema import upgrade_derived_schema
+from modules import app_cache, db_utils, export_import, inventory_tabs, metrics
+
+
+def pytest_configure(config):
+    """
+    Los tests que importan app (test_basic, test_truncate_table) arrancan la
+    aplicación al recolectarse: se les da una base temporal para que ni el
+    arranque ni los tests escriban en workmanager_erp.db de la raíz.
+    """
+    config._workmanager_tmp = tempfile.mkdtemp(prefix="workmanager-tests-")
+    path = os.path.join(config._workmanager_tmp, "erp.db")
+    conn = sqlite3.connect(path)
+    create_tables(conn, "sqlite")
+    conn.close()
+    db_utils.load_active_db_path = lambda: path
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(getattr(config, "_workmanager_tmp", ""), ignore_errors=True)
+
+
+def _new_database(tmp_path, monkeypatch, upgrade):
+    path = str(tmp_path / "erp.db")
+    conn = sqlite3.connect(path)
+    create_tables(conn, "sqlite")
+    if upgrade:
+        upgrade_derived_schema(conn)
+    conn.close()
+    monkeypatch.setattr(db_utils, "load_active_db_path", lambda: path)
+    monkeypatch.setattr(app_cache, "shared_store", None)
+    monkeypatch.setattr(export_import, "TABLE_COL_CACHE", {})
+    db_utils.reset_derived_ready()
+    app_cache.clear_local()
+    inventory_tabs.clear_cache()
+    metrics.reset()
+    return path
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """
+    Base SQLite nueva con el esquema de create_tables y el esquema derivado
+    migrado, activa para get_db_connection(), y sin estado heredado de otros
+    tests (cachés en memoria y bases ya preparadas).
+    """
+    return _new_database(tmp_path, monkeypatch, upgrade=True)
+
+
+@pytest.fixture
+def legacy_db_path(tmp_path, monkeypatch):
+    """Como db_path, pero sin migrar el esquema derivado (base anterior a la migración)."""
+    return _new_database(tmp_path, monkeypatch, upgrade=False)
+
+
+@pytest.fixture
+def db(db_path):
+    """Conexión directa (fuera del pool) a la base de db_path."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
@@ -0,0 +1,122 @@
+import sqlite3
+
+import pytest
+from flask import Flask
+
+from modules import app_cache, db_utils
+from modules.app_cache import SQLiteStore, cached
+
+
+@pytest.fixture
+def app(db_path, db):
+    db.execute("INSERT INTO sedes (nombre) VALUES ('Cali')")
+    db.commit()
+    app = Flask(__name__)
+    db_utils.init_app(app)
+    app.config["DB_PATH"] = db_path
+    return app
+
+
+def _sedes(calls):
+    def load(conn):
+        calls.append(1)
+        return [dict(r) for r in conn.execute("SELECT id, nombre FROM sedes ORDER BY nombre").fetchall()]
+    return cached("sedes", ("sedes",), load)
+
+
+def test_cached_until_source_table_changes(app):
+    calls = []
+    with app.test_request_context():
+        assert [s["nombre"] for s in _sedes(calls)] == ["Cali"]
+        _sedes(calls)  # misma petición
+    with app.test_request_context():
+        _sedes(calls)  # caché del proceso
+    assert len(calls) == 1
+
+    # Escritura desde otra conexión (p. ej. otro worker): cambia la versión
+    conn = sqlite3.connect(app.config["DB_PATH"])
+    conn.execute("INSERT INTO sedes (nombre) VALUES ('Bogota')")
+    conn.commit()
+    conn.close()
+    with app.test_request_context():
+        assert [s["nombre"] for s in _sedes(calls)] == ["Bogota", "Cali"]
+    assert len(calls) == 2
+
+    # Otras etiquetas no invalidan este valor
+    conn = sqlite3.connect(app.config["DB_PATH"])
+    conn.execute("UPDATE usuarios SET nombre = nombre")
+    conn.commit()
+    conn.close()
+    with app.test_request_context():
+        _sedes(calls)
+    assert len(calls) == 2
+
+
+def test_shared_store_between_workers(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(app_cache, "shared_store", SQLiteStore(str(tmp_path / "shared.db")))
+    calls = []
+    with app.test_request_context():
+        _sedes(calls)
+    app_cache.clear_local()  # otro worker: caché local vacía
+    with app.test_request_context():
+        assert [s["nombre"] for s in _sedes(calls)] == ["Cali"]
+    assert len(calls) == 1
+
+
+def test_unmigrated_database_is_not_cached_nor_altered(legacy_db_path):
+    conn = sqlite3.connect(legacy_db_path)
+    conn.execute("INSERT INTO sedes (nombre) VALUES ('Cali')")
+    conn.commit()
+    schema = conn.execute("SELECT type, name FROM sqlite_master ORDER BY name").fetchall()
+    app = Flask(__name__)
+    db_utils.init_app(app)
+    calls = []
+    for _ in range(2):
+        with app.test_request_context():
+            assert [s["nombre"] for s in _sedes(calls)] == ["Cali"]
+    # Sin triggers no se puede saber si las sedes cambiaron: no se guarda
+    assert len(calls) == 2
+    assert conn.execute("SELECT type, name FROM sqlite_master ORDER BY name").fetchall() == schema
+
+    assert app_cache.install_cache_versions(conn)
+    for _ in range(2):
+        with app.test_request_context():
+            _sedes(calls)
+    assert len(calls) == 3
+    conn.close()
+
+
+class _ServerConnection:
+    """Conexión de PostgreSQL/MySQL (sin cache_versiones ni triggers)."""
+
+    _pool = type("Pool", (), {"key": "postgresql://app:secreto@db/erp"})()
+
+    def close(self):
+        pass
+
+
+def test_server_databases_only_reuse_within_the_request(monkeypatch):
+    monkeypatch.setattr(app_cache, "get_db_connection", _ServerConnection)
+    app = Flask(__name__)
+    calls = []
+
+    def permissions():
+        return cached("permisos:1", ("permisos",), lambda conn: calls.append(1) or ["ver"])
+
+    for _ in range(2):
+        with app.test_request_context():
+            assert permissions() == ["ver"]
+            permissions()
+    # Un permiso revocado en la base no puede seguir vigente desde la caché
+    assert len(calls) == 2
+
+
+def test_shared_sqlite_store_hashes_keys(tmp_path):
+    store = SQLiteStore(str(tmp_path / "shared.db"))
+    key = "postgresql://app:secreto@db/erp|sedes|sedes=3"
+    store.set(key, ["Cali"], 60)
+    assert store.get(key) == ["Cali"]
+    conn = sqlite3.connect(str(tmp_path / "shared.db"))
+    keys = [row[0] for row in conn.execute("SELECT clave FROM cache")]
+    conn.close()
+    assert len(keys) == 1 and "secreto" not in keys[0]
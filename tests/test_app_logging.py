@@ -0,0 +1,138 @@
+import json
+import logging
+import queue
+
+import pandas as pd
+import pytest
+from flask import Flask
+
+from modules import app_logging, db_utils, metrics, query_stats
+from modules.db_utils import get_db_connection
+from modules.export_import import import_rows, log_import_errors, summarize_errors
+
+
+@pytest.fixture
+def loggers():
+    """Restaura los handlers de los loggers que configura app_logging.init_app."""
+    names = ("workmanager.requests", "modules")
+    saved = {name: (list(logging.getLogger(name).handlers), logging.getLogger(name).level) for name in names}
+    yield
+    for name, (handlers, level) in saved.items():
+        logging.getLogger(name).handlers[:] = handlers
+        logging.getLogger(name).setLevel(level)
+
+
+@pytest.fixture
+def app(db_path, tmp_path, monkeypatch, loggers):
+    monkeypatch.setattr(app_logging, "LOG_CONSOLE", False)
+
+    app = Flask("logs_app")
+    db_utils.init_app(app)
+    query_stats.init_app(app)
+    app.config["LOG_HANDLER"] = app_logging.init_app(app, str(tmp_path))
+    app.config["LOG_PATH"] = str(tmp_path / "app.log")
+
+    @app.route("/sedes")
+    def sedes():
+        get_db_connection().execute("SELECT COUNT(*) FROM sedes").fetchone()
+        app.logger.info("sedes consultadas")
+        return "ok"
+
+    @app.route("/falla")
+    def falla():
+        return "error", 500
+
+    return app
+
+
+def _records(app):
+    app.config["LOG_HANDLER"].listener.stop()
+    with open(app.config["LOG_PATH"], encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_access_records_are_json_with_request_id_and_db_time(app):
+    client = app.test_client()
+    response = client.get("/sedes", headers={"X-Request-ID": "req-42"})
+    assert response.headers["X-Request-ID"] == "req-42"
+    generated = client.get("/falla").headers["X-Request-ID"]
+
+    records = _records(app)
+    message = next(r for r in records if r["message"] == "sedes consultadas")
+    access = next(r for r in records if r["logger"] == "workmanager.requests" and r["path"] == "/sedes")
+    assert message["request_id"] == access["request_id"] == "req-42"
+    assert access["status"] == 200 and access["endpoint"] == "sedes" and access["db_statements"] == 1
+    assert access["duration_ms"] >= access["db_ms"] >= 0
+    error = next(r for r in records if r["path"] == "/falla")
+    assert error["level"] == "WARNING" and error["request_id"] == generated and "keep" not in error
+
+
+def test_sampling_keeps_whole_requests_and_always_keeps_warnings():
+    sampler = app_logging.SamplingFilter(rate=0.5)
+
+    def record(level, request_id, **extra):
+        rec = logging.LogRecord("x", level, __file__, 1, "m", (), None)
+        rec.request_id = request_id
+        rec.__dict__.update(extra)
+        return rec
+
+    decisions = {rid: sampler.filter(record(logging.INFO, rid)) for rid in (f"r{i}" for i in range(200))}
+    assert 60 < sum(decisions.values()) < 140
+    # La misma petición siempre recibe la misma decisión
+    assert all(sampler.filter(record(logging.INFO, rid)) == kept for rid, kept in decisions.items())
+    dropped = next(rid for rid, kept in decisions.items() if not kept)
+    assert sampler.filter(record(logging.WARNING, dropped))
+    assert sampler.filter(record(logging.INFO, dropped, keep=True))
+
+
+def test_listener_writes_batches_and_full_queue_drops(tmp_path):
+    class Capture(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.batches = []
+
+        def emit_batch(self, records):
+            self.batches.append([r.getMessage() for r in records])
+
+    log_queue = queue.Queue(5)
+    handler = app_logging.LogQueueHandler(log_queue)
+    logger = logging.getLogger("tests.app_logging.batch")
+    logger.propagate = False
+    logger.addHandler(handler)
+    metrics.log_dropped.clear()
+    for i in range(7):
+        logger.warning("linea %d", i)
+    assert metrics.log_dropped.value(logger=logger.name) == 2
+
+    capture = Capture()
+    listener = app_logging.BatchQueueListener(log_queue, capture, batch_size=100)
+    listener.start()
+    listener.stop()
+    logger.removeHandler(handler)
+    assert capture.batches == [[f"linea {i}" for i in range(5)]]
+
+    # Escritura real: varias líneas JSON en un solo write
+    path = tmp_path / "lote.log"
+    file_handler = app_logging.BatchedFileHandler(str(path), encoding="utf-8")
+    file_handler.setFormatter(app_logging.JsonFormatter())
+    file_handler.emit_batch([logging.LogRecord("x", logging.INFO, __file__, 1, "l%d", (i,), None) for i in range(3)])
+    file_handler.close()
+    assert [json.loads(line)["message"] for line in path.read_text(encoding="utf-8").splitlines()] == ["l0", "l1", "l2"]
+
+
+def test_import_errors_are_grouped_and_logged_once(db_path, caplog):
+    df = pd.DataFrame({"Correo": [f"u{i}@x.com" for i in range(8)], "Cedula": [str(i) for i in range(8)]})
+    _, _, errors, _ = import_rows(df, "licencias", {"Correo": "email", "Cedula": "columna_inexistente"})
+    assert len(errors) == 8
+
+    summary = summarize_errors(errors[:3])
+    summary = summarize_errors(errors[3:], summary)
+    assert len(summary) == 1
+    (entry,) = summary.values()
+    assert entry == {"count": 8, "rows": [1, 2, 3, 4, 5]}
+
+    with caplog.at_level(logging.WARNING, logger="modules.export_import"):
+        log_import_errors(summary, source="licencias.xlsx", target="licencias")
+    (record,) = [r for r in caplog.records if r.name == "modules.export_import"]
+    assert "8 filas con error (1 causas)" in record.getMessage()
+    assert record.errors[0]["count"] == 8
@@ -7,6 +7,7 @@ def test_health():
     r = client.get('/health')
     assert r.status_code == 200
     assert r.get_json()['status'] == 'ok'
+    assert 'database' in r.get_json()
 
 def test_routes_endpoint():
     app.config['TESTING'] = True
@@ -0,0 +1,56 @@
+import sqlite3
+
+from benchmarks import datagen
+from benchmarks.runner import compare
+from modules.export_import import iter_dataframes
+
+
+def _dump(path):
+    conn = sqlite3.connect(path)
+    rows = {
+        table: conn.execute(f"SELECT * FROM {table} ORDER BY id").fetchall()
+        for table in ("sedes", "empleados", "equipos_individuales", "licencias_office365", "tickets")
+    }
+    conn.close()
+    return rows
+
+
+def test_same_seed_generates_the_same_database(tmp_path):
+    scale = {"sedes": 3, "empleados": 40, "equipos": 200, "licencias": 30, "tickets": 25}
+    counts = datagen.generate_database(str(tmp_path / "a.db"), scale, seed=7)
+    datagen.generate_database(str(tmp_path / "b.db"), scale, seed=7)
+    datagen.generate_database(str(tmp_path / "c.db"), scale, seed=8)
+
+    assert counts == {"sedes": 3, "empleados": 40, "equipos_individuales": 200, "licencias_office365": 30, "tickets": 25}
+    first = _dump(tmp_path / "a.db")
+    assert first == _dump(tmp_path / "b.db")
+    assert first["equipos_individuales"] != _dump(tmp_path / "c.db")["equipos_individuales"]
+
+
+def test_messy_workbook_is_readable_by_the_importer(tmp_path):
+    paths = datagen.generate_workbooks(str(tmp_path), rows=40, seed=7, sheets=2)
+    batches = list(iter_dataframes(paths["inventario_sedes"]))
+
+    assert {frame for frame, _ in batches} == {0, 1}
+    for _, batch in batches:
+        code = next(c for c in batch.columns if c.strip().lower().startswith("codigo"))
+        assert batch[code].str.startswith("IMP-").sum() >= 18
+    assert paths["inventario_desorganizado"].endswith(".xlsx")
+
+
+def test_compare_flags_slower_medians_and_extra_statements():
+    baseline = {"results": {
+        "sedes": {"median_ms": 100.0, "statements": 6},
+        "busqueda": {"median_ms": 2.0, "statements": 2},
+        "nuevo": None,
+    }}
+    report = {"results": {
+        "sedes": {"median_ms": 150.0, "statements": 7},
+        # Más lento en proporción, pero por debajo del umbral de ruido
+        "busqueda": {"median_ms": 4.0, "statements": 2},
+        "nuevo": {"median_ms": 9.0, "statements": 1},
+    }}
+
+    regressions = compare(report, baseline, tolerance=0.25)
+    assert [(r["name"], r["metric"]) for r in regressions] == [("sedes", "median_ms"), ("sedes", "statements")]
+    assert compare(report, baseline, tolerance=0.6)[0]["metric"] == "statements"
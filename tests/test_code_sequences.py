@@ -0,0 +1,72 @@
+import sqlite3
+import threading
+
+import pandas as pd
+import pytest
+
+from modules.code_sequences import reserve_codes
+from modules.export_import import import_rows
+from modules.inventario_maestro.inventario_maestro import InventarioMaestro
+from modules.inventarios import generar_codigo_agrupado, generar_codigo_individual
+
+
+@pytest.fixture
+def conn(db):
+    db.execute("INSERT INTO sedes (id, nombre, codigo) VALUES (1, 'Medellin', 'MED')")
+    db.commit()
+    return db
+
+
+def test_sequence_starts_after_numeric_maximum(conn):
+    conn.executemany(
+        "INSERT INTO equipos_individuales (codigo_barras_individual) VALUES (?)",
+        [("MED-MON-999",), ("MED-MON-1000",), ("MED-MON-002",), ("MED-MONX-5000",)],
+    )
+    conn.commit()
+    assert generar_codigo_individual(conn, 1, "Monitor") == "MED-MON-1001"
+    assert generar_codigo_individual(conn, 1, "monitor") == "MED-MON-1002"
+    assert generar_codigo_individual(conn, 99, None) == "GEN-TEC-001"
+    assert generar_codigo_agrupado(conn, 1) == "MED-AGRU-001"
+    assert reserve_codes(conn, "MED", "PC", 3) == ["MED-PC-001", "MED-PC-002", "MED-PC-003"]
+
+
+def test_imported_codes_are_not_handed_out_again(conn):
+    assert generar_codigo_individual(conn, 1, "PC") == "MED-PC-001"
+    conn.commit()
+    df = pd.DataFrame({"Codigo de barras": ["MED-PC-050", "MED-PC-007"], "Marca": ["Dell", "HP"]})
+    import_rows(df, "inventario", {"Codigo de barras": "codigo_barras_individual", "Marca": "marca"})
+    # La secuencia ya existía (last_value = 1): continúa tras lo importado
+    assert generar_codigo_individual(conn, 1, "PC") == "MED-PC-051"
+    assert reserve_codes(conn, "MED", "PC", 2) == ["MED-PC-052", "MED-PC-053"]
+
+
+def test_concurrent_reservations_do_not_repeat(db_path, conn):
+    codes, errors = [], []
+
+    def worker():
+        c = sqlite3.connect(db_path, timeout=10)
+        try:
+            for _ in range(20):
+                block = reserve_codes(c, "MED", "PC", 5)
+                c.commit()
+                codes.extend(block)
+        except Exception as e:  # pragma: no cover - se reporta abajo
+            errors.append(e)
+        finally:
+            c.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(codes) == len(set(codes)) == 400
+
+
+def test_maestro_import_reserves_block_per_technology(conn):
+    conn.execute("INSERT INTO equipos_individuales (codigo_barras_individual) VALUES ('MON-0007')")
+    conn.commit()
+    maestro = InventarioMaestro(conn=conn)
+    codigos = maestro._reservar_codigos_barras(pd.Series(["Monitor", "Portátil Dell", "Pantalla", None]))
+    assert codigos == ["MON-0008", "GEN-0001", "MON-0009", "GEN-0002"]
@@ -0,0 +1,98 @@
+import sqlite3
+
+from create_production_db import create_tables
+from modules.db_indexes import advise_indexes, apply_index_pack, index_sql
+
+
+def _db(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "idx.db"))
+    create_tables(conn, "sqlite")
+    return conn
+
+
+def _lookup_scans(conn):
+    report = {entry["name"]: entry for entry in advise_indexes(conn)}
+    return report["importador_lookup"]["full_scans"]
+
+
+def test_index_pack_removes_importer_full_scan(tmp_path):
+    conn = _db(tmp_path)
+    assert _lookup_scans(conn) == ["equipos_individuales"]
+
+    summary = apply_index_pack(conn, "sqlite")
+    assert "idx_ei_serial" in summary["created"]
+    assert "idx_ei_lower_estado" in summary["created"]
+    # licencias_office365 no existe en este esquema: se omite sin fallar
+    assert any(name == "idx_lic_email" for name, _ in summary["skipped"])
+    assert _lookup_scans(conn) == []
+
+
+def test_index_pack_is_idempotent(tmp_path):
+    conn = _db(tmp_path)
+    first = apply_index_pack(conn, "sqlite")
+    second = apply_index_pack(conn, "sqlite")
+    assert second["created"] == []
+    assert sorted(second["unchanged"]) == sorted(first["created"])
+
+
+def test_mysql_prefix_only_on_long_string_columns():
+    types = {"serial": "text", "codigo": "varchar(255)", "estado": "varchar(50)", "sede_id": "int(11)"}
+    assert index_sql("idx_a", "t", ["serial", "sede_id"], "mysql", types) == (
+        "CREATE INDEX idx_a ON t (serial(191), sede_id)"
+    )
+    assert index_sql("idx_b", "t", ["codigo", "estado"], "mysql", types) == (
+        "CREATE INDEX idx_b ON t (codigo(191), estado)"
+    )
+    assert index_sql("idx_c", "t", ["LOWER(estado)"], "mysql", types) is None
+
+
+class _MySQLCursor:
+    """Cursor MySQL mínimo: solo equipos_individuales, con idx_ei_serial ya creado."""
+
+    columns = [("codigo_barras_individual", "varchar(100)"), ("serial", "text"), ("sede_id", "int(11)"),
+               ("estado", "varchar(50)"), ("asignado_nuevo", "text"), ("tecnologia", "text"),
+               ("empleado_id", "int(11)")]
+
+    def __init__(self):
+        self.executed = []
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        self.executed.append(sql)
+        if "information_schema.columns" in sql:
+            self._rows = self.columns if params[0] == "equipos_individuales" else []
+        elif "information_schema.statistics" in sql:
+            self._rows = [(1,)] if params[1] == "idx_ei_serial" else []
+        else:
+            self._rows = []
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def close(self):
+        pass
+
+
+class _MySQLConn:
+    def __init__(self):
+        self.cur = _MySQLCursor()
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        pass
+
+
+def test_mysql_pack_checks_existing_indexes():
+    conn = _MySQLConn()
+    summary = apply_index_pack(conn, "mysql")
+    creates = [sql for sql in conn.cur.executed if sql.startswith("CREATE INDEX")]
+    assert "CREATE INDEX idx_ei_codigo_barras ON equipos_individuales (codigo_barras_individual)" in creates
+    assert "CREATE INDEX idx_ei_sede_estado ON equipos_individuales (sede_id, estado)" in creates
+    # Ya existía: se registra sin volver a crearlo
+    assert not any("idx_ei_serial" in sql for sql in creates)
+    assert "idx_ei_serial" in summary["created"]
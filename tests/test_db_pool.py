@@ -0,0 +1,93 @@
+import sqlite3
+
+import pytest
+from flask import Flask
+
+from modules import db_utils
+from modules.db_utils import ConnectionPool, PoolTimeout, get_db_connection
+
+
+def _sqlite_pool(tmp_path, **kwargs):
+    return ConnectionPool("test", db_utils._connect_sqlite(str(tmp_path / "pool.db")), **kwargs)
+
+
+def test_pool_reuses_released_connections(tmp_path):
+    pool = _sqlite_pool(tmp_path, max_size=2)
+    conn = pool.acquire()
+    assert isinstance(conn, sqlite3.Connection)
+    conn.close()
+    conn.close()  # doble close() no duplica la conexión en el pool
+    again = pool.acquire()
+    assert again is conn
+    stats = pool.stats()
+    assert stats["created"] == 1
+    assert stats["in_use"] == 1
+    assert stats["idle"] == 0
+
+
+def test_pool_is_bounded_and_reports_timeouts(tmp_path):
+    pool = _sqlite_pool(tmp_path, max_size=1, timeout=0.05)
+    held = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.stats()["timeouts"] == 1
+    held.close()
+    assert pool.acquire() is held
+
+
+def test_release_rolls_back_uncommitted_work(tmp_path):
+    pool = _sqlite_pool(tmp_path, max_size=1)
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.execute("INSERT INTO t VALUES (1)")
+    conn.row_factory = None
+    conn.close()
+    conn = pool.acquire()
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    assert conn.row_factory is sqlite3.Row
+
+
+def test_request_shares_one_connection(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_utils, "load_active_db_path", lambda: str(tmp_path / "req.db"))
+    app = Flask(__name__)
+    db_utils.init_app(app)
+
+    with app.test_request_context("/"):
+        first = get_db_connection()
+        first.close()  # no-op mientras la petición esté activa
+        assert get_db_connection() is first
+        pool = first._pool
+        assert pool.stats()["in_use"] == 1
+
+    assert pool.stats()["in_use"] == 0
+    assert pool.stats()["idle"] == 1
+
+
+def test_sqlite_connections_use_pragma_profile(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLITE_PRAGMAS", "busy_timeout=7000")
+    conn = _sqlite_pool(tmp_path).acquire()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 7000
+    assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2
+
+
+def test_startup_check_reports_effective_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_utils, "load_active_db_path", lambda: str(tmp_path / "health.db"))
+    settings = db_utils.check_database_settings()
+    assert settings["engine"] == "sqlite"
+    assert settings["pragmas"]["journal_mode"] == "wal"
+    assert settings["warnings"] == []
+
+
+def test_readers_are_not_blocked_by_open_write(tmp_path):
+    pool = _sqlite_pool(tmp_path, max_size=2)
+    writer = pool.acquire()
+    writer.execute("CREATE TABLE t (x INTEGER)")
+    writer.execute("INSERT INTO t VALUES (1)")
+    writer.commit()
+    writer.execute("INSERT INTO t VALUES (2)")  # transacción abierta
+    reader = pool.acquire()
+    assert reader.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 1
+    writer.commit()
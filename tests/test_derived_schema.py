@@ -0,0 +1,29 @@
+import logging
+import sqlite3
+
+from flask import Flask
+
+from modules import db_utils, derived_schema
+
+
+def _schema(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT type, name FROM sqlite_master ORDER BY name").fetchall()
+    conn.close()
+    return rows
+
+
+def test_app_start_only_reports_pending_steps(legacy_db_path, caplog):
+    app = Flask(__name__)
+    db_utils.init_app(app)
+    before = _schema(legacy_db_path)
+    with caplog.at_level(logging.WARNING):
+        derived_schema.init_app(app)
+    assert _schema(legacy_db_path) == before
+    assert "vinculos" in caplog.text and "migrate.py esquema" in caplog.text
+
+    conn = sqlite3.connect(legacy_db_path)
+    installed = derived_schema.upgrade_derived_schema(conn)
+    assert installed["vinculos"] and installed["resumen"]
+    assert "vinculos" not in derived_schema.pending_steps(conn)
+    conn.close()
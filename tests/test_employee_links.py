@@ -0,0 +1,143 @@
+import sqlite3
+
+import pytest
+from flask import Flask
+
+from modules import db_utils, employee_links
+from modules.employee_links import (
+    employee_ref,
+    install_employee_links,
+    links_ready,
+    run_relink_job,
+    unresolved_names,
+)
+from modules.licencias import ensure_licencias_tables
+
+
+class _Job:
+    checkpoint = None
+
+    def __init__(self):
+        self.updates = []
+
+    def progress(self, **kwargs):
+        self.updates.append(kwargs)
+
+
+@pytest.fixture
+def conn(db):
+    db.executemany(
+        "INSERT INTO empleados (cedula, nombre, apellido, correo_office) VALUES (?, ?, ?, ?)",
+        [("100", "Ana", "Ruiz", "ana@empresa.com"), ("200", "Luis", "Gómez", None), ("300", "Luis", "Gómez", None)],
+    )
+    db.commit()
+    return db
+
+
+def _empleado_id(conn, table, row_id):
+    return conn.execute(f"SELECT empleado_id FROM {table} WHERE id = ?", (row_id,)).fetchone()[0]
+
+
+def test_assignments_resolve_on_write_and_follow_employee_changes(conn):
+    conn.execute("INSERT INTO equipos_individuales (codigo_barras_individual, asignado_nuevo) VALUES ('A', ' ANA@empresa.com')")
+    assert links_ready(conn)
+    cur = conn.execute(
+        "INSERT INTO equipos_individuales (codigo_barras_individual, asignado_nuevo) VALUES ('B', 'luis gómez')"
+    )
+    ambiguous = cur.lastrowid
+    conn.execute("INSERT INTO equipos_individuales (codigo_barras_individual, asignado_nuevo) VALUES ('C', '200')")
+    conn.commit()
+
+    assert _empleado_id(conn, "equipos_individuales", 1) == 1
+    # Dos empleados con el mismo nombre: no se adivina
+    assert _empleado_id(conn, "equipos_individuales", ambiguous) is None
+    assert _empleado_id(conn, "equipos_individuales", 3) == 2
+
+    version = conn.execute("SELECT version FROM inventario_version").fetchone()[0]
+    conn.execute("DELETE FROM empleados WHERE id = 3")
+    assert _empleado_id(conn, "equipos_individuales", ambiguous) == 2
+    # Volver a vincular no invalida las pestañas del tablero
+    assert conn.execute("SELECT version FROM inventario_version").fetchone()[0] == version
+    conn.execute("UPDATE empleados SET correo_office = 'ana.ruiz@empresa.com' WHERE id = 1")
+    assert _empleado_id(conn, "equipos_individuales", 1) is None
+    conn.execute("UPDATE equipos_individuales SET asignado_nuevo = 'ana.ruiz@empresa.com' WHERE id = 1")
+    assert _empleado_id(conn, "equipos_individuales", 1) == 1
+
+    plan = " ".join(
+        row[3] for row in conn.execute("EXPLAIN QUERY PLAN SELECT * FROM equipos_individuales WHERE empleado_id = 1")
+    )
+    assert "idx_ei_empleado" in plan
+
+
+def test_licenses_link_and_unresolved_report(conn):
+    ensure_licencias_tables(conn)
+    conn.executemany(
+        "INSERT INTO licencias_office365 (email, usuario_asignado) VALUES (?, ?)",
+        [
+            ("ana@empresa.com", "Ana Ruiz"),
+            ("lg1@empresa.com", "Luis Gómez"),
+            ("lg2@empresa.com", "Luis Gómez"),
+            ("nadie@empresa.com", "Nadie"),
+        ],
+    )
+    conn.commit()
+
+    # Tabla creada después de la migración: las lecturas resuelven en vivo
+    assert not links_ready(conn)
+    live = conn.execute(
+        f"SELECT e.id FROM licencias_office365 l "
+        f"LEFT JOIN empleados e ON e.id = {employee_ref(conn, 'licencias_office365', 'l')} ORDER BY l.id"
+    ).fetchall()
+    assert [row[0] for row in live] == [1, None, None, None]
+
+    # La siguiente migración instala sus triggers y vincula las filas existentes
+    assert install_employee_links(conn)
+    assert links_ready(conn)
+    linked = conn.execute("SELECT empleado_id FROM licencias_office365 ORDER BY id").fetchall()
+    assert [row[0] for row in linked] == [1, None, None, None]
+
+    report = {(r["tabla"], r["valor"]): r for r in unresolved_names(conn)}
+    assert report[("licencias_office365", "Luis Gómez")]["filas"] == 2
+    assert report[("licencias_office365", "Luis Gómez")]["candidatos"] == 2
+    assert report[("licencias_office365", "Nadie")]["candidatos"] == 0
+
+
+def test_relink_job_backfills_rows_written_without_triggers(monkeypatch, conn):
+    monkeypatch.setattr(employee_links, "BACKFILL_BATCH", 2)
+    conn.execute("DROP TRIGGER vinculo_equipos_individuales_ai")
+    conn.executemany(
+        "INSERT INTO equipos_individuales (codigo_barras_individual, asignado_nuevo) VALUES (?, ?)",
+        [(f"C{i}", "100" if i % 2 else "sin dueño") for i in range(5)],
+    )
+    conn.commit()
+    assert conn.execute("SELECT COUNT(*) FROM equipos_individuales WHERE empleado_id IS NOT NULL").fetchone()[0] == 0
+
+    app = Flask(__name__)
+    db_utils.init_app(app)
+    job = _Job()
+    with app.app_context():
+        result = run_relink_job(job)
+
+    assert conn.execute("SELECT COUNT(*) FROM equipos_individuales WHERE empleado_id = 1").fetchone()[0] == 2
+    assert result["equipos_individuales"] == 3
+    assert job.updates[-1]["processed"] == 5
+
+
+def test_install_creates_employee_indexes_before_the_backfill(legacy_db_path):
+    conn = sqlite3.connect(legacy_db_path)
+    conn.execute("INSERT INTO empleados (cedula, nombre, correo_office) VALUES ('100', 'Ana', 'ana@empresa.com')")
+    conn.execute("INSERT INTO equipos_individuales (codigo_barras_individual, asignado_nuevo) VALUES ('A', '100')")
+    statements = []
+    conn.set_trace_callback(statements.append)
+    install_employee_links(conn)
+    conn.set_trace_callback(None)
+
+    first_index = next(i for i, sql in enumerate(statements) if "idx_empleados_vinculo_" in sql)
+    backfill = next(
+        i for i, sql in enumerate(statements) if sql.startswith("UPDATE equipos_individuales SET empleado_id")
+    )
+    assert first_index < backfill
+    plan = " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {statements[backfill]}").fetchall())
+    assert "SCAN empleados" not in plan
+    assert _empleado_id(conn, "equipos_individuales", 1) == 1
+    conn.close()
@@ -0,0 +1,56 @@
+import io
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from modules import excel_export
+from modules.excel_export import StreamingWorkbook
+from modules.inventory_generator import HEADERS_INVENTARIO, _generar_excel
+
+
+def test_multi_sheet_batches_with_styles_and_widths(monkeypatch):
+    monkeypatch.setattr(excel_export, "DATAFRAME_BATCH_ROWS", 2)
+    book = StreamingWorkbook()
+    book.add_sheet("Equipos", ["serial", "ram"]).write_batches(
+        [[("SN1", 8), ("SN-muy-largo-0001", None)], [("SN3", 16)]]
+    )
+    df = pd.DataFrame({"correo": ["a@x.com", None, "c@x.com"], "n": [1, np.nan, 3]})
+    book.add_sheet("Licencias", ["correo", "n"], widths=20, freeze=False).write_dataframe(df)
+    output = io.BytesIO()
+    book.save(output)
+
+    wb = load_workbook(output)
+    ws = wb["Equipos"]
+    assert [list(r) for r in ws.values] == [["serial", "ram"], ["SN1", 8], ["SN-muy-largo-0001", None], ["SN3", 16]]
+    assert ws["A1"].font.bold and ws["A1"].fill.start_color.rgb.endswith("1F4E78")
+    assert ws.freeze_panes == "A2" and ws.auto_filter.ref == "A1:B4"
+    assert ws.column_dimensions["A"].width == len("SN-muy-largo-0001") + 2
+
+    ws = wb["Licencias"]
+    assert [list(r) for r in ws.values][1:] == [["a@x.com", 1], [None, None], ["c@x.com", 3]]
+    assert ws.column_dimensions["B"].width == 20 and ws.freeze_panes is None
+
+
+def test_inventory_report_codes(tmp_path):
+    df = pd.DataFrame({
+        "Serial o Mac": ["S1", "S2", "S3", "S4"],
+        "Sede": ["Bogota", "Bogota", "Cali", "Bogota"],
+        "Tipo de dispositivo": ["PC", "PC", "Monitor", "Portátil"],
+        "Asignado a": ["Ana", "", "Luis", "Eva"],
+        "Cantidad de ram": [8, np.nan, 16, 4],
+    })
+    path = tmp_path / "informe.xlsx"
+    _generar_excel(df, pd.DataFrame({"Sede": ["Cali"], "IP_Sede": ["10.0.0.1"]}), str(path))
+
+    wb = load_workbook(path)
+    rows = list(wb["INVENTARIO_GENERAL"].values)
+    assert list(rows[0]) == HEADERS_INVENTARIO
+    col = {h: i for i, h in enumerate(HEADERS_INVENTARIO)}
+    assert [r[col["CODIGO_INDIVIDUAL"]] for r in rows[1:]] == ["BOG-PC-001", "BOG-PC-002", "CLI-MON-001", "BOG-PORT-001"]
+    assert [r[col["CODIGO_UNIFICADO"]] for r in rows[1:]] == ["BOG-AGRU-001", None, "CLI-AGRU-001", "BOG-AGRU-002"]
+    assert [r[col["DISPONIBLE"]] for r in rows[1:]] == ["NO", "SI", "NO", "NO"]
+    assert [r[col["IP_SEDE"]] for r in rows[1:]] == [None, None, "10.0.0.1", None]
+    assert [r[col["ID"]] for r in rows[1:]] == [1, 2, 3, 4]
+    combinado = list(wb["COMBINADO"].values)
+    assert combinado[2][4] is None and len(combinado) == 5
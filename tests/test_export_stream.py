@@ -0,0 +1,80 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+from flask import Flask
+
+from modules import db_utils, export_stream
+from modules.export_import_updated import export_import_bp
+from modules.export_stream import QueryStream, csv_chunks
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    db.executemany(
+        "INSERT INTO empleados (cedula, nombre, apellido) VALUES (?, ?, ?)",
+        [(str(i), f"Nombre {i}", "Pérez" if i % 2 else None) for i in range(25)],
+    )
+    db.commit()
+    monkeypatch.setattr(export_stream, "STREAM_BATCH_ROWS", 10)
+
+    app = Flask(__name__)
+    app.register_blueprint(export_import_bp, url_prefix="/export_import")
+    db_utils.init_app(app)
+    return app.test_client()
+
+
+def test_csv_is_sent_in_batches_and_releases_connection(client):
+    response = client.get("/export_import/export/csv/empleados?columns=cedula,apellido", buffered=False)
+    chunks = list(response.response)
+    response.close()
+    assert len(chunks) == 3  # 25 filas en lotes de 10
+
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert rows[0] == ["cedula", "apellido"]
+    assert rows[1:3] == [["0", ""], ["1", "Pérez"]]
+    assert len(rows) == 26
+    assert db_utils.get_pool().stats()["in_use"] == 0
+
+
+def test_json_and_txt_exports(client):
+    data = json.loads(client.get("/export_import/export/json/empleados").data)
+    assert len(data) == 25
+    assert data[1]["apellido"] == "Pérez" and data[0]["apellido"] is None
+
+    text = client.get("/export_import/export/txt/empleados").data.decode("utf-8")
+    assert text.startswith("REPORTE DE EMPLEADOS")
+    assert text.count("cedula: ") == 25
+
+
+def test_gzip_when_client_accepts_it(client):
+    response = client.get("/export_import/export/json/empleados", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(json.loads(gzip.decompress(response.data))) == 25
+
+    plain = client.get("/export_import/export/json/empleados?gzip=0", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in plain.headers
+
+
+def test_sql_errors_happen_before_streaming(client):
+    response = client.get("/export_import/export/csv/empleados?columns=no_existe")
+    assert response.status_code == 500
+    assert db_utils.get_pool().stats()["in_use"] == 0
+
+
+def test_empty_result_still_has_header(client):
+    stream = QueryStream("SELECT cedula, nombre FROM empleados WHERE 0", batch_size=5)
+    assert b"".join(csv_chunks(stream, bom=True)).decode("utf-8") == "\ufeffcedula,nombre\r\n"
+
+
+def test_excel_export_uses_selected_columns(client):
+    from openpyxl import load_workbook
+
+    response = client.get("/export_import/export/excel/empleados?columns=apellido,cedula,no_existe")
+    assert response.status_code == 200
+    rows = list(load_workbook(io.BytesIO(response.data), read_only=True).active.values)
+    assert rows[:2] == [("apellido", "cedula"), (None, "0")]
+    assert len(rows) == 26
+    assert db_utils.get_pool().stats()["in_use"] == 0
@@ -0,0 +1,91 @@
+import io
+
+import pandas as pd
+from openpyxl import Workbook
+from werkzeug.datastructures import FileStorage
+
+from modules.export_import import iter_dataframes, load_dataframes, preview_file
+
+MESSY_CSV = (
+    "INVENTARIO SEDE NORTE\n"
+    "\n"
+    "Codigo;Serial;Marca;Cedula\n"
+    "BOG-1;SN1;Dell;00123\n"
+    ";;;\n"
+    "BOG-2;SN2;HP;\n"
+    "BOG-3;SN3;Lenovo;456\n"
+) + "".join(f"BOG-{i};SN{i};Dell;{i}\n" for i in range(4, 40))
+
+
+def test_csv_batches_share_detected_header(tmp_path):
+    path = tmp_path / "inventario.csv"
+    path.write_text(MESSY_CSV, encoding="latin1")
+
+    batches = list(iter_dataframes(str(path), batch_rows=2))
+    assert len(batches) > 1
+    assert {frame for frame, _ in batches} == {0}
+    assert all(list(b.columns) == ["Codigo", "Serial", "Marca", "Cedula"] for _, b in batches)
+
+    df = pd.concat(b for _, b in batches)
+    # Índice = fila en el archivo; filas vacías descartadas; sin inferencia de tipos
+    assert list(df.index[:3]) == [3, 5, 6]
+    assert len(df) == 39
+    assert list(df["Cedula"].fillna("")[:3]) == ["00123", "", "456"]
+    assert load_dataframes(str(path))[0].equals(df)
+
+
+def test_ragged_csv_falls_back_without_losing_rows(tmp_path):
+    path = tmp_path / "ragged.csv"
+    lines = ["codigo,serial,marca"] + [f"C{i},S{i},Dell" for i in range(5)] + ["C5,S5,HP,1,2", 'C6,"S6,HP']
+    path.write_text("\n".join(lines), encoding="latin1")
+
+    df = pd.concat(b for _, b in iter_dataframes(str(path), batch_rows=2))
+    assert list(df["codigo"]) == [f"C{i}" for i in range(7)]
+    assert list(df.columns) == ["codigo", "serial", "marca"]
+
+
+def test_xlsx_is_read_per_sheet_in_batches(tmp_path):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Reporte de equipos"])
+    ws.append(["Serial", "Marca", "Ram", "Hostname"])
+    for i in range(30):
+        ws.append([f"SN{i}", "Dell", 8 if i != 2 else None, f"PC{i}"])
+    empty = wb.create_sheet("Vacia")
+    empty.append([None])
+    other = wb.create_sheet("Licencias")
+    other.append(["Correo", "Licencia", "Usuario"])
+    other.append(["a@x.com", "E3", "Ana"])
+    path = tmp_path / "inventario.xlsx"
+    wb.save(path)
+
+    batches = list(iter_dataframes(str(path), batch_rows=10))
+    assert [frame for frame, _ in batches] == [0, 0, 1]
+    sheets = load_dataframes(str(path))
+    assert len(sheets) == 2
+    assert list(sheets[0]["Ram"][:4]) == [8, 8, None, 8]
+    assert len(sheets[0]) == 30
+    assert list(sheets[1].columns) == ["Correo", "Licencia", "Usuario"]
+
+
+def test_uploaded_file_object_is_streamed():
+    upload = FileStorage(stream=io.BytesIO(MESSY_CSV.encode("latin1")), filename="subida.csv")
+    frames = load_dataframes(upload)
+    assert list(frames[0]["Codigo"][:3]) == ["BOG-1", "BOG-2", "BOG-3"]
+    assert not upload.stream.closed
+
+
+def test_preview_samples_without_reading_whole_file(tmp_path):
+    big = tmp_path / "grande.csv"
+    big.write_text("Codigo;Marca\n" + "".join(f"C{i};Dell\n" for i in range(5000)), encoding="latin1")
+    small = tmp_path / "chico.csv"
+    small.write_text(MESSY_CSV.split("BOG-10;")[0], encoding="latin1")
+
+    [preview] = preview_file(str(big), rows=5)
+    assert preview["headers"] == ["Codigo", "Marca"]
+    assert list(preview["sample"]["Codigo"]) == [f"C{i}" for i in range(5)]
+    assert not preview["rows_exact"]
+    assert 4000 < preview["rows_estimate"] < 6000
+
+    [preview] = preview_file(str(small))
+    assert preview["rows_exact"] and preview["rows_estimate"] == 9
@@ -0,0 +1,97 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from create_production_db import create_tables
+from modules import export_import
+from modules.export_import import import_inventario_row, import_rows
+
+
+@pytest.fixture(autouse=True)
+def seed(db, monkeypatch):
+    db.execute(
+        "INSERT INTO equipos_individuales (codigo_barras_individual, serial, marca) VALUES ('BOG-1', 'SN-OLD', 'HP')"
+    )
+    db.commit()
+    monkeypatch.setattr(export_import, "IMPORT_CHUNK_SIZE", 3)
+
+
+def _inventory_df():
+    return pd.DataFrame({
+        "Codigo de barras": ["BOG-1", "BOG-2", None, "BOG-2", None, "BOG-3", None],
+        "Serial": ["SN-1", "SN-2", "SN-3", np.nan, "SN-1", None, None],
+        "Marca": [" Dell ", "Lenovo", "HP", None, "Asus", "Acer", None],
+        "Columna rara": [None, "x", None, None, None, None, None],
+    }, index=range(1, 8))
+
+
+def _snapshot(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute(
+        "SELECT id, codigo_barras_individual, serial, marca, observaciones FROM equipos_individuales ORDER BY id"
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+def _row_by_row(path, df, mapping):
+    """Referencia: el recorrido fila a fila original."""
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    cur = conn.cursor()
+    inserted = updated = 0
+    for _, row in df.iterrows():
+        data = {}
+        extras = {}
+        for col, canonical in mapping.items():
+            if pd.isna(row[col]):
+                continue
+            if canonical is None:
+                extras[col] = str(row[col]).strip()
+            else:
+                data[canonical] = str(row[col]).strip()
+        if extras:
+            data["observaciones"] = " | ".join(f"{k}:{v}" for k, v in extras.items())
+        inserted, updated = import_inventario_row(cur, data, inserted, updated)
+    conn.commit()
+    conn.close()
+    return inserted, updated
+
+
+def test_bulk_import_matches_row_by_row(db_path, tmp_path):
+    df = _inventory_df()
+    mapping = {"Codigo de barras": "codigo_barras_individual", "Serial": "serial", "Marca": "marca", "Columna rara": None}
+
+    inserted, updated, errors, staged = import_rows(df, "inventario", mapping, source="test.xlsx")
+
+    reference = str(tmp_path / "reference.db")
+    conn = sqlite3.connect(reference)
+    create_tables(conn, "sqlite")
+    conn.execute(
+        "INSERT INTO equipos_individuales (codigo_barras_individual, serial, marca) VALUES ('BOG-1', 'SN-OLD', 'HP')"
+    )
+    conn.commit()
+    conn.close()
+    assert (inserted, updated) == _row_by_row(reference, df, mapping) == (3, 3)
+    assert errors == []
+    assert staged == 1
+    assert _snapshot(db_path) == _snapshot(reference)
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT row_index, payload FROM import_unmapped").fetchall() == [
+        (3, '{"Columna rara": "x"}')
+    ]
+    conn.close()
+
+
+def test_failing_chunk_falls_back_to_per_row_errors(db_path):
+    df = pd.DataFrame({"Correo": ["a@x.com", "b@x.com"], "Cedula": ["1", "2"]})
+    mapping = {"Correo": "email", "Cedula": "columna_inexistente"}
+
+    inserted, updated, errors, staged = import_rows(df, "licencias", mapping)
+
+    assert (inserted, updated, staged) == (0, 0, 0)
+    assert len(errors) == 2
+    assert errors[0].startswith("Fila 1:")
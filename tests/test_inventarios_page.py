@@ -0,0 +1,65 @@
+import sqlite3
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from create_production_db import create_tables
+from modules.inventarios import fetch_individuales_page
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "page.db"))
+    conn.row_factory = sqlite3.Row
+    create_tables(conn, "sqlite")
+    conn.execute("INSERT INTO sedes (id, codigo, nombre) VALUES (1, 'BOG', 'Bogota')")
+    for i in range(25):
+        conn.execute(
+            "INSERT INTO equipos_individuales (codigo_barras_individual, serial, tecnologia, estado, sede_id) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (f"BOG-CPU-{i:03d}", f"SN{i:03d}", "CPU" if i % 2 else "Portatil",
+             None if i % 5 == 0 else ("asignado" if i % 3 else "disponible"), 1),
+        )
+    conn.commit()
+    return conn
+
+
+def test_page_has_constant_size_and_counts(conn):
+    page = fetch_individuales_page(conn, MultiDict({"length": "10", "draw": "3", "fields": "codigo_individual,sede"}))
+    assert page["draw"] == 3
+    assert page["recordsTotal"] == page["recordsFiltered"] == 25
+    assert len(page["data"]) == 10
+    assert set(page["data"][0]) == {"id", "codigo_individual", "sede"}
+    assert page["data"][0]["sede"] == "Bogota"
+
+
+def test_filters_reduce_filtered_count(conn):
+    page = fetch_individuales_page(conn, MultiDict({"filter[tecnologia]": "cpu", "length": "100"}))
+    assert page["recordsTotal"] == 25
+    assert page["recordsFiltered"] == 12
+    assert all(row["tecnologia"] == "CPU" for row in page["data"])
+
+
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+def test_keyset_pages_cover_every_row_once(conn, direction):
+    seen = []
+    args = {"sort": "estado", "dir": direction, "length": "4", "fields": "id,estado"}
+    while True:
+        page = fetch_individuales_page(conn, MultiDict(args))
+        seen.extend(row["id"] for row in page["data"])
+        if not page["next_cursor"]:
+            break
+        args["cursor"] = page["next_cursor"]
+    assert sorted(seen) == list(range(1, 26))
+    assert len(seen) == 25
+
+
+@pytest.mark.parametrize("text, expected", [("-", 25), ("*", 0), ("cpu-007", 1)])
+def test_search_without_fts_terms_falls_back_to_like(conn, text, expected):
+    from modules.search import fts5_available, install_search_index
+
+    if not fts5_available(conn):
+        pytest.skip("SQLite sin FTS5")
+    install_search_index(conn)
+    page = fetch_individuales_page(conn, MultiDict({"search[value]": text, "length": "100"}))
+    assert page["recordsFiltered"] == expected
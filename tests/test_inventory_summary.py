@@ -0,0 +1,216 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from modules import jobs
+from modules.db_utils import table_columns
+from modules.inventory_summary import (
+    DIMENSIONS,
+    _aggregate_sql,
+    deferred_summary,
+    install_inventory_summary,
+    summary_ready,
+    summary_rows,
+    summary_totals,
+)
+
+ROWS = [
+    ("S1", 1, "Disponible", "PC", "Sistemas", None, "Si"),
+    ("S2", 1, "asignado", "PC", " Sistemas ", "Ana", "No"),
+    ("S3", 2, "baja", "Monitor", None, "", None),
+    ("S4", None, "en uso", None, "", "Luis", "No"),
+]
+
+
+@pytest.fixture
+def conn(db):
+    db.row_factory = None
+    return db
+
+
+def _insert(conn, rows):
+    conn.executemany(
+        "INSERT INTO equipos_individuales (serial, sede_id, estado, tecnologia, area, asignado_nuevo, disponible) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    conn.commit()
+
+
+def _assert_matches_live(conn):
+    existing = table_columns(conn, "equipos_individuales")
+    for dimension in DIMENSIONS:
+        live = sorted(tuple(r) for r in conn.execute(_aggregate_sql(existing, dimension)).fetchall())
+        stored = sorted(
+            tuple(r) for r in conn.execute(
+                "SELECT dimension, clave, subclave, total, disponibles, asignados, bajas, activos, "
+                "con_asignado, disponible_si FROM inventario_resumen WHERE dimension = ?",
+                (dimension,),
+            ).fetchall()
+        )
+        assert stored == live, dimension
+
+
+def _schema(conn):
+    return sorted(conn.execute("SELECT type, name FROM sqlite_master").fetchall())
+
+
+def test_triggers_keep_summary_in_sync(conn):
+    assert summary_ready(conn)
+    _insert(conn, ROWS)
+    _assert_matches_live(conn)
+
+    conn.execute("UPDATE equipos_individuales SET estado = 'baja', sede_id = 2 WHERE serial = 'S2'")
+    conn.execute("UPDATE equipos_individuales SET marca = 'HP' WHERE serial = 'S1'")
+    conn.execute("DELETE FROM equipos_individuales WHERE serial = 'S4'")
+    conn.commit()
+    _assert_matches_live(conn)
+    # Los grupos que quedan vacíos se eliminan
+    assert [r["clave"] for r in summary_rows(conn, "usuario")] == ["", "Ana"]
+
+    totals = summary_totals(conn)
+    assert (totals["total"], totals["disponibles"], totals["bajas"], totals["disponible_si"]) == (3, 1, 2, 1)
+    assert summary_totals(conn, "sede", 9)["total"] == 0
+
+
+def test_unified_keys_and_measures(legacy_db_path):
+    conn = sqlite3.connect(legacy_db_path)
+    _insert(conn, ROWS)
+    assert install_inventory_summary(conn)  # backfill de datos existentes
+    assert summary_ready(conn)
+    areas = {r["clave"]: r["total"] for r in summary_rows(conn, "area")}
+    assert areas == {"Sistemas": 2, "": 2}
+    sede1 = summary_totals(conn, "sede", 1)
+    assert (sede1["total"], sede1["asignados"], sede1["activos"]) == (2, 1, 1)
+    assert summary_totals(conn, "sede", "")["asignados"] == 1  # 'en uso' cuenta como asignado
+    breakdown = {(r["clave"], r["subclave"]): r["total"] for r in summary_rows(conn, "sede_tecnologia")}
+    assert breakdown == {("1", "PC"): 2, ("2", "Monitor"): 1, ("", ""): 1}
+    conn.close()
+
+
+def test_reads_without_migration_run_no_ddl(legacy_db_path):
+    conn = sqlite3.connect(legacy_db_path)
+    _insert(conn, ROWS)
+    before = _schema(conn)
+    assert not summary_ready(conn)
+    # Mismos valores que con el resumen, calculados en vivo
+    assert {r["clave"]: r["total"] for r in summary_rows(conn, "area")} == {"Sistemas": 2, "": 2}
+    assert summary_totals(conn, "sede", 1)["asignados"] == 1
+    with deferred_summary(rows=len(ROWS)):
+        _insert(conn, [("S5", 1, "disponible", "PC", None, None, "Si")])
+    assert summary_totals(conn)["total"] == 5
+    assert _schema(conn) == before
+    conn.close()
+
+
+class _MySQLConnection:
+    """Conexión MySQL del pool que solo registra las consultas."""
+
+    _pool = type("Pool", (), {"key": "mysql://app:secreto@db/erp"})()
+
+    def __init__(self):
+        self.queries = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=()):
+        self.queries.append(sql)
+        self.description = [(col,) for col in ("id", "serial", "sede_id", "estado")]
+
+    def fetchall(self):
+        return []
+
+
+def test_live_fallback_casts_sede_as_char_on_mysql():
+    conn = _MySQLConnection()
+    summary_rows(conn, "sede", 1)
+    # MySQL no admite CAST(... AS TEXT)
+    assert "CAST(sede_id AS CHAR)" in conn.queries[-1]
+    assert "AS TEXT" not in conn.queries[-1]
+
+
+def test_deferred_summary_rebuilds_at_the_end(conn):
+    with deferred_summary(rows=len(ROWS)):
+        with deferred_summary():
+            _insert(conn, ROWS)
+        # Sigue diferido mientras el bloque externo no termine
+        assert summary_totals(conn)["total"] == 0
+    assert conn.execute("SELECT diferidos FROM inventario_resumen_control").fetchone()[0] == 0
+    _assert_matches_live(conn)
+
+    # Pocas filas frente al inventario: no se difiere y actúan los triggers
+    _insert(conn, [(f"X{i}", 3, "disponible", "PC", None, None, "Si") for i in range(20)])
+    with deferred_summary(rows=1):
+        assert conn.execute("SELECT diferidos FROM inventario_resumen_control").fetchone()[0] == 0
+        _insert(conn, [("S5", 1, "disponible", "PC", None, None, "Si")])
+    assert summary_totals(conn)["total"] == 25
+
+
+def test_insert_or_replace_subtracts_the_replaced_row(db_path, conn):
+    from modules.db_utils import get_db_connection
+    from scripts.auto_import_inventory import AutoInventoryImporter
+
+    # Escritura del trabajo auto_import (conexión propia del script)
+    importer = AutoInventoryImporter(db_path)
+    importer.import_equipos_individuales([{"codigo_barras_individual": "C1", "estado": "disponible", "sede_id": 1}])
+    importer.import_equipos_individuales([{"codigo_barras_individual": "C1", "estado": "asignado", "sede_id": 2}])
+    # Conexión del pool con el perfil de PRAGMAs
+    pooled = get_db_connection()
+    try:
+        pooled.execute(
+            "INSERT OR REPLACE INTO equipos_individuales (codigo_barras_individual, estado, sede_id) "
+            "VALUES ('C1', 'baja', 2)"
+        )
+        pooled.commit()
+    finally:
+        pooled.close()
+
+    assert conn.execute("SELECT COUNT(*) FROM equipos_individuales").fetchone()[0] == 1
+    _assert_matches_live(conn)
+    assert (summary_totals(conn)["total"], summary_totals(conn)["bajas"]) == (1, 1)
+
+
+def _crashed_import(conn, job_id, heartbeat):
+    """Estado que deja un proceso que cae dentro de deferred_summary(job_id=...)."""
+    jobs._conn().close()  # crea background_jobs
+    conn.execute(
+        "INSERT INTO background_jobs (id, kind, status, heartbeat_at) VALUES (?, 'importador', 'running', ?)",
+        (job_id, heartbeat),
+    )
+    conn.execute(
+        "INSERT INTO inventario_resumen_diferidos (propietario, job_id, desde) VALUES (?, ?, ?)",
+        (f"job:{job_id}", job_id, heartbeat),
+    )
+    conn.execute("UPDATE inventario_resumen_control SET diferidos = diferidos + 1")
+    conn.commit()
+
+
+def test_resumed_or_dead_job_releases_its_deferral(conn):
+    now = datetime.now().isoformat(timespec="seconds")
+    _crashed_import(conn, 7, now)
+    _insert(conn, ROWS[:2])
+    # Con latido reciente el trabajo sigue en curso: el resumen espera
+    assert summary_totals(conn)["total"] == 0
+
+    # Reanudado: reutiliza su diferimiento y al terminar recalcula
+    with deferred_summary(rows=len(ROWS), job_id=7):
+        assert conn.execute("SELECT diferidos FROM inventario_resumen_control").fetchone()[0] == 1
+        _insert(conn, ROWS[2:])
+    assert conn.execute("SELECT diferidos FROM inventario_resumen_control").fetchone()[0] == 0
+    _assert_matches_live(conn)
+
+    # Un trabajo que cae y no vuelve (sin latido) se libera en la siguiente lectura
+    old = (datetime.now() - timedelta(seconds=jobs.JOB_STALE_SECONDS + 60)).isoformat(timespec="seconds")
+    _crashed_import(conn, 8, old)
+    _insert(conn, [("S5", 1, "disponible", "PC", None, None, "Si")])
+    assert summary_totals(conn)["total"] == 5
+    _assert_matches_live(conn)
+
+    # Igual con uno que terminó como fallido o cancelado
+    _crashed_import(conn, 9, now)
+    conn.execute("UPDATE background_jobs SET status = 'cancelled' WHERE id = 9")
+    _insert(conn, [("S6", 1, "disponible", "PC", None, None, "Si")])
+    assert summary_totals(conn)["total"] == 6
+    assert conn.execute("SELECT COUNT(*) FROM inventario_resumen_diferidos").fetchone()[0] == 0
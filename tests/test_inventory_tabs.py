@@ -0,0 +1,153 @@
+import sqlite3
+
+import pytest
+from flask import Flask
+
+from modules import db_utils, inventory_tabs
+from modules.inventarios import DASHBOARD_TABS, inventarios_bp
+from modules.inventory_summary import deferred_summary
+from modules.inventory_tabs import category_condition
+
+ROWS = [
+    ("S1", "disponible", "PC", "Equipo repotenciado 2023"),
+    ("S2", "En préstamo", "PC", None),
+    ("S3", "asignado", "Telemedicina carro", "kit D2K"),
+    ("S4", "disponible", "Monitor", None),
+]
+
+
+@pytest.fixture
+def client(db_path, db):
+    db.executemany(
+        "INSERT INTO equipos_individuales (serial, estado, tecnologia, observaciones, sede_id) VALUES (?, ?, ?, ?, 1)",
+        ROWS,
+    )
+    db.commit()
+    app = Flask(__name__)
+    app.register_blueprint(inventarios_bp)
+    db_utils.init_app(app)
+    return app.test_client()
+
+
+def _serials(client, tab):
+    return [item["serial"] for item in client.get(f"/inventarios/api/dashboard/{tab}").get_json()["items"]]
+
+
+def test_category_flags_match_substring_scan(client, db_path):
+    assert _serials(client, "repotenciados") == ["S1"]
+    assert _serials(client, "telemedicina") == ["S3"]
+    assert _serials(client, "d2k_dme") == ["S3"]
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE equipos_individuales SET observaciones = 'Préstamo temporal' WHERE serial = 'S4'")
+    conn.execute("UPDATE equipos_individuales SET estado = 'asignado' WHERE serial = 'S2'")
+    conn.execute("INSERT INTO equipos_individuales (serial, tecnologia) VALUES ('S5', 'DME portátil')")
+    conn.commit()
+    for category, (flag, _, _) in inventory_tabs.CATEGORIES.items():
+        flagged = conn.execute(f"SELECT serial FROM equipos_individuales WHERE {flag} = 1 ORDER BY id").fetchall()
+        scanned = conn.execute(
+            f"SELECT serial FROM equipos_individuales WHERE {category_condition(category)} ORDER BY id"
+        ).fetchall()
+        assert flagged == scanned, category
+    conn.close()
+    assert _serials(client, "d2k_dme") == ["S3", "S5"]
+
+
+def test_pagination_and_etag_revalidation(client, db_path, monkeypatch):
+    calls = []
+    builder = DASHBOARD_TABS["individuales"]
+    monkeypatch.setitem(DASHBOARD_TABS, "individuales", lambda *a: calls.append(1) or builder(*a))
+
+    first = client.get("/inventarios/api/dashboard/individuales?page=2&per_page=3")
+    data = first.get_json()
+    assert (data["total"], data["page"], [i["serial"] for i in data["items"]]) == (4, 2, ["S1"])
+    etag = first.headers["ETag"]
+
+    assert client.get("/inventarios/api/dashboard/individuales?page=2&per_page=3",
+                      headers={"If-None-Match": etag}).status_code == 304
+    # Otro cliente sin ETag recibe el cuerpo guardado
+    assert client.get("/inventarios/api/dashboard/individuales?page=2&per_page=3").get_json() == data
+    assert len(calls) == 1
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO equipos_individuales (serial) VALUES ('S0')")
+    conn.commit()
+    conn.close()
+    fresh = client.get("/inventarios/api/dashboard/individuales?page=2&per_page=3",
+                       headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.headers["ETag"] != etag
+    assert [i["serial"] for i in fresh.get_json()["items"]] == ["S2", "S1"]
+    assert len(calls) == 2
+
+
+def test_summary_tabs_and_legacy_endpoint(client):
+    sedes = client.get("/inventarios/api/dashboard/por_sede").get_json()["items"]
+    assert [(s["total"], s["disponibles"]) for s in sedes] == [(4, 2)]
+    assert client.get("/inventarios/api/dashboard/no_existe").status_code == 404
+
+    legacy = client.get("/inventarios/api/dashboard").get_json()
+    assert set(legacy) == set(DASHBOARD_TABS)
+    assert len(legacy["individuales"]) == 4 and legacy["bajas"] == []
+
+
+def test_summary_tabs_revalidate_after_deferred_import(client, db):
+    first = client.get("/inventarios/api/dashboard/por_sede")
+    with deferred_summary(rows=100):
+        db.executemany(
+            "INSERT INTO equipos_individuales (serial, estado, sede_id) VALUES (?, 'disponible', 1)",
+            [(f"N{i}",) for i in range(3)],
+        )
+        db.commit()
+        # Durante la importación se sirve (y se guarda) el resumen anterior
+        during = client.get("/inventarios/api/dashboard/por_sede")
+        assert during.get_json()["items"][0]["total"] == 4
+    after = client.get("/inventarios/api/dashboard/por_sede", headers={"If-None-Match": during.headers["ETag"]})
+    assert after.status_code == 200
+    assert after.headers["ETag"] not in (first.headers["ETag"], during.headers["ETag"])
+    assert [(s["total"], s["disponibles"]) for s in after.get_json()["items"]] == [(7, 5)]
+
+
+def _version(conn):
+    return conn.execute("SELECT version FROM inventario_version").fetchone()[0]
+
+
+def test_install_backfills_flags_with_a_single_version_bump(legacy_db_path):
+    conn = sqlite3.connect(legacy_db_path)
+    conn.executemany(
+        "INSERT INTO equipos_individuales (serial, estado, tecnologia, observaciones) VALUES (?, ?, ?, ?)", ROWS
+    )
+    conn.commit()
+    schema = conn.execute("SELECT type, name FROM sqlite_master ORDER BY name").fetchall()
+    # Sin migrar: condición LIKE, sin versión y sin DDL en la lectura
+    assert inventory_tabs.category_filter(conn, "prestamos") == category_condition("prestamos")
+    assert inventory_tabs.inventory_version(conn) is None
+    assert conn.execute("SELECT type, name FROM sqlite_master ORDER BY name").fetchall() == schema
+
+    assert inventory_tabs.install_inventory_tabs(conn)
+    assert inventory_tabs.tabs_ready(conn)
+    assert _version(conn) == 1
+    assert conn.execute("SELECT serial FROM equipos_individuales WHERE cat_repotenciado = 1").fetchall() == [("S1",)]
+
+    # El trigger de categoría reescribe la marca sin volver a incrementar la versión
+    conn.execute("UPDATE equipos_individuales SET observaciones = 'repotenciado' WHERE serial = 'S4'")
+    assert conn.execute("SELECT cat_repotenciado FROM equipos_individuales WHERE serial = 'S4'").fetchone()[0] == 1
+    assert _version(conn) == 2
+    # Reinstalar (siguiente arranque) no recalcula ni invalida nada
+    assert inventory_tabs.install_inventory_tabs(conn)
+    assert _version(conn) == 2
+    conn.close()
+
+
+def test_exports_leave_out_internal_columns(db_path, db):
+    from modules.export_import_updated import export_import_bp
+
+    db.executemany(
+        "INSERT INTO equipos_individuales (serial, estado, tecnologia, observaciones) VALUES (?, ?, ?, ?)", ROWS
+    )
+    db.commit()
+    app = Flask(__name__)
+    app.register_blueprint(export_import_bp, url_prefix="/export_import")
+    db_utils.init_app(app)
+    data = app.test_client().get("/export_import/export/json/individuales").get_json()
+    assert [row["serial"] for row in data] == ["S1", "S2", "S3", "S4"]
+    assert not any(column.startswith("cat_") or column == "empleado_id" for column in data[0])
@@ -0,0 +1,200 @@
+import sqlite3
+import time
+
+import pandas as pd
+import pytest
+
+from modules import export_import, export_import_updated, jobs
+
+
+@pytest.fixture(autouse=True)
+def inline_jobs(db_path, monkeypatch):
+    # Los trabajos se ejecutan en el hilo del test con jobs.run_job
+    monkeypatch.setattr(jobs, "_schedule", lambda job_id: None)
+
+
+@jobs.job_handler("test_pasos")
+def _run_steps(job):
+    start = (job.checkpoint or {}).get("step", 0)
+    for step in range(start, job.params["steps"]):
+        if step == job.params.get("fail_at"):
+            raise RuntimeError("fallo simulado")
+        if step == job.params.get("cancel_at"):
+            jobs.cancel_job(job.id)
+        job.progress(processed=step + 1, total=job.params["steps"], checkpoint={"step": step + 1}, ultimo=step)
+    return {"pasos": job.params["steps"] - start}
+
+
+def test_job_runs_to_completion_with_progress(db_path):
+    job_id = jobs.submit_job("test_pasos", {"steps": 4})
+    assert jobs.get_job(job_id)["status"] == "queued"
+    jobs.run_job(job_id)
+    job = jobs.get_job(job_id)
+    assert job["status"] == "done"
+    assert (job["processed"], job["total"], job["percent"]) == (4, 4, 100.0)
+    assert job["result"] == {"pasos": 4}
+    jobs.run_job(job_id)  # un trabajo terminado no se vuelve a ejecutar
+    assert jobs.get_job(job_id)["result"] == {"pasos": 4}
+
+
+def test_cancel_stops_at_next_checkpoint(db_path):
+    queued = jobs.submit_job("test_pasos", {"steps": 4})
+    assert jobs.cancel_job(queued)["status"] == "cancelled"
+
+    job_id = jobs.submit_job("test_pasos", {"steps": 4, "cancel_at": 2})
+    jobs.run_job(job_id)
+    job = jobs.get_job(job_id)
+    assert job["status"] == "cancelled"
+    assert job["checkpoint"] == {"step": 3}
+    assert job["stats"] == {"ultimo": 2}
+
+
+def test_failed_job_records_error(db_path):
+    job_id = jobs.submit_job("test_pasos", {"steps": 4, "fail_at": 1})
+    jobs.run_job(job_id)
+    job = jobs.get_job(job_id)
+    assert job["status"] == "failed"
+    assert job["error"] == "fallo simulado"
+    assert job["checkpoint"] == {"step": 1}
+
+
+def test_stale_job_resumes_from_checkpoint(db_path, monkeypatch):
+    job_id = jobs.submit_job("test_pasos", {"steps": 5})
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "UPDATE background_jobs SET status = 'running', checkpoint = '{\"step\": 3}', heartbeat_at = '2000-01-01T00:00:00' "
+        "WHERE id = ?",
+        (job_id,),
+    )
+    conn.commit()
+    conn.close()
+
+    scheduled = []
+    monkeypatch.setattr(jobs, "_schedule", scheduled.append)
+    assert jobs.resume_jobs() == [job_id]
+    jobs.run_job(scheduled[0])
+    assert jobs.get_job(job_id)["result"] == {"pasos": 2}
+
+
+def test_import_job_reports_chunk_progress(db_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(export_import, "IMPORT_CHUNK_SIZE", 2)
+    monkeypatch.setattr(export_import_updated, "TMP_DIR", str(tmp_path))
+    pd.DataFrame({
+        "Codigo de barras": [f"BOG-{i}" for i in range(5)],
+        "Marca": ["Dell"] * 5,
+        "Hostname": [f"PC{i}" for i in range(5)],
+    }).to_csv(tmp_path / "equipos.csv", index=False)
+
+    totals = []
+    progress = jobs.Job.progress
+
+    def recording(job, *args, **kwargs):
+        totals.append(job.total)
+        return progress(job, *args, **kwargs)
+
+    monkeypatch.setattr(jobs.Job, "progress", recording)
+
+    job_id = jobs.submit_job("importador", {"tmp_file": "equipos.csv", "target": "inventario"})
+    jobs.run_job(job_id)
+
+    job = jobs.get_job(job_id)
+    assert job["status"] == "done", job["error"]
+    assert (job["processed"], job["total"]) == (5, 5)
+    # El total se conoce desde el primer bloque (archivo subido sin manifiesto)
+    assert totals[1:] and None not in totals[1:]
+    assert job["result"]["inserted"] == 5
+    assert job["checkpoint"]["row"] == 6  # fila 0 = encabezado
+    assert not (tmp_path / "equipos.csv").exists()
+
+
+def test_failed_import_job_removes_the_upload(db_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(export_import_updated, "TMP_DIR", str(tmp_path))
+    pd.DataFrame({"Codigo de barras": ["BOG-1"], "Marca": ["Dell"]}).to_csv(tmp_path / "equipos.csv", index=False)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("fallo simulado")
+
+    monkeypatch.setattr(export_import_updated, "import_rows", fail)
+    job_id = jobs.submit_job("importador", {"tmp_file": "equipos.csv", "target": "inventario"})
+    jobs.run_job(job_id)
+    assert jobs.get_job(job_id)["status"] == "failed"
+    assert not (tmp_path / "equipos.csv").exists()
+
+
+def test_import_job_streams_manifest_sources(db_path, tmp_path, monkeypatch):
+    monkeypatch.setattr(export_import_updated, "TMP_DIR", str(tmp_path))
+    folder = tmp_path / "carpeta"
+    folder.mkdir()
+    for name, start in (("a.csv", 0), ("b.csv", 3)):
+        pd.DataFrame({
+            "Codigo de barras": [f"BOG-{i}" for i in range(start, start + 3)],
+            "Marca": ["Dell"] * 3,
+            "Hostname" if start else "Serial": [f"X{i}" for i in range(3)],
+        }).to_csv(folder / name, index=False)
+    sources = [(name, str(folder / name), False) for name in ("a.csv", "b.csv")]
+
+    files, samples, previews, errors = export_import_updated._sample_sources(sources)
+    assert errors == [] and [p["rows"] for p in previews] == [3, 3]
+    headers = ["Codigo de barras", "Marca", "Serial", "Hostname"]
+    manifest = export_import_updated._write_manifest(files, headers)
+
+    job_id = jobs.submit_job("importador", {
+        "tmp_file": manifest, "target": "inventario", "user_mapping": {"map-1": "marca"},
+    })
+    jobs.run_job(job_id)
+
+    job = jobs.get_job(job_id)
+    assert job["status"] == "done", job["error"]
+    assert (job["processed"], job["total"]) == (6, 6)
+    assert job["result"]["inserted"] == 6
+    assert job["checkpoint"]["source"] == 1
+    # Los originales de la carpeta no se borran; el manifiesto sí
+    assert (folder / "a.csv").exists() and (folder / "b.csv").exists()
+    assert not (tmp_path / manifest).exists()
+
+
+@jobs.job_handler("test_lento")
+def _run_slow(job):
+    # Un bloque largo sin job.progress(): solo late el hilo de latido
+    conn = sqlite3.connect(job.params["db"])
+    conn.execute("UPDATE background_jobs SET heartbeat_at = '2000-01-01T00:00:00' WHERE id = ?", (job.id,))
+    conn.commit()
+    conn.close()
+    time.sleep(0.3)
+    return {"requeued": jobs.resume_jobs()}
+
+
+def test_heartbeat_keeps_a_long_step_from_being_requeued(db_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_HEARTBEAT_SECONDS", 0.05)
+    job_id = jobs.submit_job("test_lento", {"db": db_path})
+    jobs.run_job(job_id)
+    job = jobs.get_job(job_id)
+    assert job["status"] == "done"
+    assert job["result"] == {"requeued": []}
+
+
+def test_auto_import_upload_is_removed_when_the_job_fails(tmp_path):
+    from modules import auto_import  # noqa: F401 - registra el manejador
+
+    upload = tmp_path / "auto_import_1.json"
+    upload.write_text("{no es json", encoding="utf-8")
+    job_id = jobs.submit_job("auto_import", {"path": str(upload)})
+    jobs.run_job(job_id)
+    assert jobs.get_job(job_id)["status"] == "failed"
+    assert not upload.exists()
+
+
+@jobs.job_handler("test_secciones", rows=False)
+def _run_sections(job):
+    job.progress(processed=3, total=3)
+    return {}
+
+
+def test_non_row_jobs_stay_out_of_row_metrics(db_path):
+    from modules import metrics
+
+    jobs.run_job(jobs.submit_job("test_secciones"))
+    jobs.run_job(jobs.submit_job("test_pasos", {"steps": 2}))
+    assert metrics.job_rows.value(kind="test_secciones") == 0
+    assert metrics.job_rows.value(kind="test_pasos") == 2
+    assert metrics.jobs_finished.value(kind="test_secciones", status="done") == 1
@@ -0,0 +1,49 @@
+import io
+
+from pypdf import PdfReader
+
+from modules import label_sheets, process_pool
+from modules.label_sheets import barcode_bars, render_label_sheet
+
+
+def _labels(n):
+    return [(f"MED-MON-{i:04d}", f"Dell P24{i % 10}", f"SN{i}") for i in range(n)]
+
+
+def _pages(pdf):
+    return len(PdfReader(io.BytesIO(pdf)).pages)
+
+
+def test_barcode_geometry_is_cached():
+    barcode_bars.cache_clear()
+    bars, modules = barcode_bars("MED-MON-001")
+    assert bars and modules == bars[-1][0] + bars[-1][1]
+    assert barcode_bars("MED-MON-001") is barcode_bars("MED-MON-001")
+    assert barcode_bars.cache_info().hits >= 2
+
+
+def test_label_sheet_pages_and_empty_codes():
+    labels = _labels(61) + [(None, "sin", "código"), ("", "x", "y")]
+    pdf = render_label_sheet(labels, workers=1)
+    assert pdf.startswith(b"%PDF")
+    assert _pages(pdf) == 3
+    assert _pages(render_label_sheet([], workers=1)) == 1
+
+
+def test_parallel_batches_match_serial(monkeypatch):
+    monkeypatch.setattr(label_sheets, "LABEL_PAGES_PER_BATCH", 1)
+    serial = render_label_sheet(_labels(95), workers=1)
+    parallel = render_label_sheet(_labels(95), workers=2)
+    assert _pages(serial) == _pages(parallel) == 4
+    text = PdfReader(io.BytesIO(parallel)).pages[3].extract_text()
+    assert "MED-MON-0094" in text
+
+
+def test_batches_reuse_the_shared_process_pool(monkeypatch):
+    monkeypatch.setattr(label_sheets, "LABEL_PAGES_PER_BATCH", 1)
+    render_label_sheet(_labels(61), workers=2)
+    pool = process_pool.get_process_pool()
+    render_label_sheet(_labels(61), workers=2)
+    assert process_pool.get_process_pool() is pool
+    # Los hijos no salen de un fork del worker con hilos
+    assert pool._mp_context.get_start_method() in ("forkserver", "spawn")
@@ -0,0 +1,108 @@
+import io
+import os
+import sqlite3
+import time
+import zipfile
+
+import pytest
+from flask import Flask
+
+from modules import db_utils, life_sheets
+from modules.export_import_updated import export_import_bp
+from modules.life_sheets import content_key, iter_life_sheets, zip_chunks
+
+
+@pytest.fixture
+def client(db, tmp_path, monkeypatch):
+    db.executemany(
+        "INSERT INTO equipos_individuales (codigo_barras_individual, tecnologia, sede_id) VALUES (?, ?, ?)",
+        [(f"MED-MON-{i:03d}", "Monitor" if i % 2 else "Portatil", 1 if i < 6 else 2) for i in range(8)],
+    )
+    db.commit()
+    monkeypatch.setattr(life_sheets, "LIFE_SHEET_CACHE_DIR", str(tmp_path / "cache"))
+
+    app = Flask(__name__)
+    app.register_blueprint(export_import_bp, url_prefix="/export_import")
+    db_utils.init_app(app)
+    return app.test_client()
+
+
+def test_life_sheet_is_served_from_cache_until_row_changes(client, monkeypatch):
+    calls = []
+    render = life_sheets.render_life_sheet
+    monkeypatch.setattr(life_sheets, "render_life_sheet", lambda *a: calls.append(a) or render(*a))
+
+    first = client.get("/export_import/export/life_sheet/1?table=individuales")
+    assert first.status_code == 200 and first.data.startswith(b"%PDF")
+    assert client.get("/export_import/export/life_sheet/1?table=individuales").data == first.data
+    assert len(calls) == 1
+
+    conn = sqlite3.connect(db_utils.load_active_db_path())
+    conn.execute("UPDATE equipos_individuales SET estado = 'baja' WHERE id = 1")
+    conn.commit()
+    conn.close()
+    client.get("/export_import/export/life_sheet/1?table=individuales")
+    assert len(calls) == 2
+
+
+def test_bulk_zip_by_sede_and_technology(client):
+    response = client.get("/export_import/export/life_sheets?sede=1&tecnologia=monitor", buffered=False)
+    data = b"".join(response.response)
+    response.close()
+    assert response.mimetype == "application/zip"
+    names = sorted(zipfile.ZipFile(io.BytesIO(data)).namelist())
+    assert names == ["hoja_vida_2.pdf", "hoja_vida_4.pdf", "hoja_vida_6.pdf"]
+
+    assert client.get("/export_import/export/life_sheets").status_code == 400
+    assert client.get("/export_import/export/life_sheets?ids=999").status_code == 404
+
+
+def test_parallel_rendering_fills_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(life_sheets, "LIFE_SHEET_CACHE_DIR", str(tmp_path))
+    columns = ["id", "serial"]
+    rows = [(i, f"SN{i}") for i in range(1, 5)]
+    chunks = list(zip_chunks(iter_life_sheets("equipos_individuales", columns, rows, workers=2)))
+    assert len(chunks) >= 4
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(chunks)))
+    assert sorted(archive.namelist()) == [f"hoja_vida_{i}.pdf" for i in range(1, 5)]
+    for row in rows:
+        key = content_key("equipos_individuales", columns, row)
+        assert os.path.exists(tmp_path / key[:2] / f"{key}.pdf")
+
+
+def test_cache_prunes_unused_and_oversized_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(life_sheets, "LIFE_SHEET_CACHE_DIR", str(tmp_path))
+    now = time.time()
+    for key, age_days in (("aa01", 40), ("bb02", 5), ("cc03", 1), ("dd04", 0)):
+        life_sheets.store_pdf(key, b"x" * 1024)
+        path = tmp_path / key[:2] / f"{key}.pdf"
+        os.utime(path, (now - age_days * 86400, now - age_days * 86400))
+    # Leer una entrada la marca como usada
+    assert life_sheets.cached_pdf("bb02") == b"x" * 1024
+
+    assert life_sheets.prune_cache(now=now + 1) == 1
+    assert life_sheets.cached_pdf("aa01") is None
+
+    monkeypatch.setattr(life_sheets, "LIFE_SHEET_CACHE_MAX_MB", 0)
+    assert life_sheets.prune_cache(now=now + 1) == 3
+    assert not list(tmp_path.rglob("*.pdf"))
+
+
+def test_life_sheets_leave_out_internal_columns(client, monkeypatch):
+    from modules import export_import_updated
+    from modules.export_stream import INTERNAL_COLUMNS
+
+    rendered = []
+    render = life_sheets.render_life_sheet
+    monkeypatch.setattr(life_sheets, "render_life_sheet", lambda c, v: rendered.append(c) or render(c, v))
+    assert client.get("/export_import/export/life_sheet/1?table=individuales").status_code == 200
+
+    bulk = []
+    monkeypatch.setattr(
+        export_import_updated, "iter_life_sheets", lambda table, columns, rows: bulk.append(columns) or iter(())
+    )
+    client.get("/export_import/export/life_sheets?sede=1").close()
+
+    for columns in rendered + bulk:
+        assert "codigo_barras_individual" in columns
+        assert not INTERNAL_COLUMNS & set(columns)
@@ -0,0 +1,116 @@
+import sqlite3
+
+import pytest
+from flask import Flask, Response, jsonify
+
+from modules import db_utils, metrics, query_stats
+from modules.db_utils import get_db_connection
+
+PROMETHEUS_ACCEPT = "application/openmetrics-text;version=1.0.0,text/plain;version=0.0.4;q=0.5,*/*;q=0.1"
+
+
+@pytest.fixture
+def app(db_path, db):
+    db.executemany("INSERT INTO empleados (cedula, nombre) VALUES (?, ?)", [("1", "Ana"), ("2", "Luis")])
+    db.executemany(
+        "INSERT INTO equipos_individuales (codigo_barras_individual) VALUES (?)", [(f"C{i}",) for i in range(3)]
+    )
+    db.commit()
+
+    app = Flask(__name__)
+    db_utils.init_app(app)
+    query_stats.init_app(app)
+    metrics.init_app(app)
+    app.config["DB_PATH"] = db_path
+
+    @app.route("/metrics")
+    def metrics_view():
+        conn = get_db_connection()
+        if metrics.wants_prometheus():
+            return metrics.prometheus_response(conn)
+        return jsonify(metrics.table_counts(conn))
+
+    @app.route("/export")
+    def export():
+        chunks = (b"x" * 100 for _ in range(3))
+        return Response(chunks, mimetype="text/csv", headers={"Content-Disposition": "attachment; filename=a.csv"})
+
+    @app.route("/falla")
+    def falla():
+        get_db_connection().execute("SELECT 1").fetchone()
+        return "error", 503
+
+    return app
+
+
+def test_prometheus_text_is_negotiated_and_json_stays_default(app):
+    client = app.test_client()
+    client.get("/falla")
+    assert client.get("/metrics").get_json()["empleados"] == 2
+
+    response = client.get("/metrics", headers={"Accept": PROMETHEUS_ACCEPT})
+    assert response.content_type == metrics.PROMETHEUS_CONTENT_TYPE
+    text = response.get_data(as_text=True)
+    assert 'workmanager_http_requests_total{endpoint="falla",method="GET",status="503"} 1' in text
+    assert 'workmanager_http_errors_total{endpoint="falla",method="GET"} 1' in text
+    assert 'workmanager_http_request_duration_seconds_bucket{endpoint="falla",method="GET",le="+Inf"} 1' in text
+    assert 'workmanager_db_statements_total{endpoint="falla"} 1' in text
+    assert 'workmanager_db_pool_max_size{pool="0"}' in text
+    assert 'workmanager_table_rows{table="equipos_individuales"} 3' in text
+    assert client.get("/metrics?format=prometheus").content_type == metrics.PROMETHEUS_CONTENT_TYPE
+
+
+def test_table_counts_are_kept_by_triggers(app):
+    with app.app_context():
+        conn = get_db_connection()
+        assert metrics.table_counts(conn)["empleados"] == 2
+        conn.execute("INSERT INTO empleados (cedula, nombre) VALUES ('3', 'Eva')")
+        conn.execute("DELETE FROM empleados WHERE cedula = '1'")
+        conn.execute("INSERT INTO equipos_individuales (codigo_barras_individual) VALUES ('C9')")
+        conn.commit()
+        counts = metrics.table_counts(conn)
+    assert counts["empleados"] == 2 and counts["equipos_individuales"] == 4 and counts["tickets"] == 0
+    conn = sqlite3.connect(app.config["DB_PATH"])
+    assert conn.execute("SELECT filas FROM conteos_tablas WHERE tabla = 'empleados'").fetchone()[0] == 2
+    conn.close()
+
+
+def test_insert_or_replace_does_not_inflate_counts(app):
+    with app.app_context():
+        conn = get_db_connection()
+        metrics.table_counts(conn)
+        conn.execute("INSERT OR REPLACE INTO empleados (cedula, nombre) VALUES ('1', 'Ana María')")
+        conn.commit()
+        assert metrics.table_counts(conn)["empleados"] == 2
+
+
+def test_streamed_export_bytes_and_histogram_buckets(app):
+    assert len(app.test_client().get("/export").data) == 300
+    assert metrics.export_bytes.value(format="csv") == 300
+
+    histogram = metrics.Histogram("prueba_seconds", "Prueba.", ("endpoint",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, endpoint="x")
+    lines = histogram.render()
+    assert 'prueba_seconds_bucket{endpoint="x",le="0.1"} 1' in lines
+    assert 'prueba_seconds_bucket{endpoint="x",le="1.0"} 2' in lines
+    assert 'prueba_seconds_bucket{endpoint="x",le="+Inf"} 3' in lines
+    assert 'prueba_seconds_count{endpoint="x"} 3' in lines
+
+
+def test_unmigrated_database_counts_live_without_ddl(legacy_db_path):
+    from modules.derived_schema import upgrade_derived_schema
+
+    conn = sqlite3.connect(legacy_db_path)
+    conn.execute("INSERT INTO empleados (cedula, nombre) VALUES ('1', 'Ana')")
+    conn.commit()
+    schema = conn.execute("SELECT type, name FROM sqlite_master ORDER BY name").fetchall()
+    assert not metrics.table_counts_ready(conn)
+    assert metrics.table_counts(conn)["empleados"] == 1
+    assert conn.execute("SELECT type, name FROM sqlite_master ORDER BY name").fetchall() == schema
+
+    assert upgrade_derived_schema(conn)["conteos"]
+    assert metrics.table_counts_ready(conn)
+    conn.execute("INSERT INTO empleados (cedula, nombre) VALUES ('2', 'Luis')")
+    assert metrics.table_counts(conn)["empleados"] == 2
+    conn.close()
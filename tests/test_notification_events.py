@@ -0,0 +1,94 @@
+import json
+import sqlite3
+import time
+
+import pytest
+from flask import Flask
+from flask_login import LoginManager, UserMixin
+
+from modules import db_utils, notification_events
+from modules.notification_events import NotificationBus, bus
+from modules.notifications import create_notification, notifications_bp
+
+
+class _User(UserMixin):
+    id = 1
+
+
+def _events(chunks):
+    return [dict(line.split(": ", 1) for line in chunk.decode().strip().splitlines()) for chunk in chunks]
+
+
+@pytest.fixture
+def app(db_path, monkeypatch):
+    monkeypatch.setattr(bus, "poll_interval", 0)
+    monkeypatch.setattr(notification_events, "NOTIFICATIONS_KEEPALIVE", 0.05)
+    app = Flask(__name__)
+    app.secret_key = "test"
+    login = LoginManager(app)
+    login.request_loader(lambda request: _User())
+    app.register_blueprint(notifications_bp)
+    db_utils.init_app(app)
+    return app
+
+
+def test_stream_replays_after_last_event_id_and_pushes_new(app):
+    with app.app_context():
+        create_notification(1, "primera")
+        create_notification(1, "segunda")
+        create_notification(2, "de otro usuario")
+
+    response = app.test_client().get(
+        "/notifications/api/stream", headers={"Last-Event-ID": "1"}, buffered=False
+    )
+    assert response.mimetype == "text/event-stream"
+    chunks = iter(response.response)
+    ready, missed = _events([next(chunks), next(chunks)])
+    assert ready["event"] == "ready" and ready["id"] == "1"
+    assert missed["id"] == "2" and json.loads(missed["data"])["message"] == "segunda"
+
+    with app.app_context():
+        create_notification(1, "nueva")
+    pushed = next(c for c in chunks if c.startswith(b"id:"))
+    assert json.loads(_events([pushed])[0]["data"])["message"] == "nueva"
+    response.close()
+    assert bus.subscriber_count() == 0
+
+
+def test_watcher_publishes_rows_from_other_processes(db_path):
+    local = NotificationBus(poll_interval=0.02)
+    subscriber = local.subscribe(7)
+    deadline = time.monotonic() + 2
+    while local._last_seen is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO notificaciones (user_id, message) VALUES (7, 'desde otro worker')")
+    conn.commit()
+    conn.close()
+
+    assert subscriber.get(timeout=2)["message"] == "desde otro worker"
+    local.unsubscribe(7, subscriber)
+    deadline = time.monotonic() + 2
+    while local._watcher is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert local._watcher is None
+
+
+def test_streams_above_the_process_limit_get_503(app, monkeypatch):
+    from modules import notifications
+
+    monkeypatch.setattr(notifications, "NOTIFICATIONS_MAX_STREAMS", 1)
+    client = app.test_client()
+    first = client.get("/notifications/api/stream", buffered=False)
+    assert first.status_code == 200 and bus.subscriber_count() == 1
+
+    busy = client.get("/notifications/api/stream", buffered=False)
+    assert busy.status_code == 503 and busy.headers["Retry-After"] == "60"
+    assert bus.subscriber_count() == 1
+
+    first.close()
+    assert bus.subscriber_count() == 0
+    second = client.get("/notifications/api/stream", buffered=False)
+    assert second.status_code == 200
+    second.close()
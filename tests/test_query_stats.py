@@ -0,0 +1,105 @@
+import logging
+import sqlite3
+
+import pytest
+from flask import Flask, jsonify
+from flask_login import LoginManager, UserMixin
+
+from modules import db_utils, query_stats
+from modules.db_utils import get_db_connection
+
+
+class _User(UserMixin):
+    id = 1
+
+    def __init__(self, rol):
+        self.rol = rol
+
+
+@pytest.fixture
+def app(db):
+    db.executemany("INSERT INTO sedes (nombre) VALUES (?)", [(f"Sede {i}",) for i in range(6)])
+    db.commit()
+    query_stats.reset_stats()
+
+    app = Flask(__name__)
+    app.secret_key = "test"
+    app.config["ROL"] = "admin"
+    login = LoginManager(app)
+    login.request_loader(lambda request: _User(app.config["ROL"]))
+    db_utils.init_app(app)
+    query_stats.init_app(app)
+
+    @app.route("/sedes")
+    def sedes():
+        conn = get_db_connection()
+        ids = [row["id"] for row in conn.execute("SELECT id FROM sedes ORDER BY id").fetchall()]
+        # Una consulta por fila (N+1) y una repetida con los mismos parámetros
+        names = [conn.execute("SELECT nombre FROM sedes WHERE id = ?", (i,)).fetchone()[0] for i in ids]
+        conn.cursor().execute("SELECT nombre FROM sedes WHERE id = ?", (ids[0],)).fetchall()
+        return jsonify(names)
+
+    return app
+
+
+def test_request_statements_are_counted_and_reported(app):
+    response = app.test_client().get("/sedes")
+    assert response.status_code == 200
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith("db;dur=") and '"8 consultas"' in timing
+
+    stats = query_stats.stats_snapshot()
+    endpoint = next(e for e in stats["endpoints"] if e["endpoint"] == "sedes")
+    assert endpoint["statements"] == 8 and endpoint["duplicates"] == 1 and endpoint["repeated_requests"] == 1
+    repeated = stats["requests"][0]["repeated"]
+    assert repeated[0]["sql"] == "SELECT nombre FROM sedes WHERE id = ?" and repeated[0]["count"] == 7
+
+    # Fuera de una petición no se registra nada
+    conn = db_utils.get_pool().acquire()
+    try:
+        assert type(conn.cursor()) is sqlite3.Cursor
+    finally:
+        conn.close()
+
+
+def test_slow_queries_are_logged_with_plan(app, monkeypatch, caplog):
+    monkeypatch.setattr(query_stats, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(query_stats, "slow_logger", logging.getLogger("tests.slow_queries"))
+    with caplog.at_level(logging.WARNING, logger="tests.slow_queries"):
+        app.test_client().get("/sedes")
+    messages = [r.getMessage() for r in caplog.records if r.name == "tests.slow_queries"]
+    by_id = next(m for m in messages if "WHERE id = ?" in m)
+    assert "sedes" in by_id.split("\n")[0]
+    assert "plan:" in by_id and "INTEGER PRIMARY KEY" in by_id
+    # Cada sentencia se registra una sola vez aunque se sume el tiempo de fetch
+    assert len(messages) == 8
+
+
+def test_slow_query_log_omits_parameter_values(app, monkeypatch, caplog):
+    monkeypatch.setattr(query_stats, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(query_stats, "slow_logger", logging.getLogger("tests.slow_queries"))
+
+    def login():
+        conn = get_db_connection()
+        conn.execute("SELECT id FROM sedes WHERE nombre = ? AND id > ?", ("pbkdf2:sha256$secreto", 0)).fetchall()
+        conn.execute("SELECT id FROM sedes WHERE nombre = :nombre", {"nombre": "clave123"}).fetchall()
+        return ""
+
+    app.add_url_rule("/login", "login", login)
+    with caplog.at_level(logging.WARNING, logger="tests.slow_queries"):
+        app.test_client().get("/login")
+    text = "\n".join(r.getMessage() for r in caplog.records if r.name == "tests.slow_queries")
+    assert "secreto" not in text and "clave123" not in text
+    assert "parámetros: 2 (str, int)" in text and "parámetros: nombre: str" in text
+    assert "WHERE nombre = ? AND id > ?" in text
+
+
+def test_debug_panel_is_admin_only(app):
+    client = app.test_client()
+    client.get("/sedes")
+    data = client.get("/debug/queries?format=json").get_json()
+    assert data["endpoints"][0]["endpoint"] == "sedes"
+    assert all(r["endpoint"] != "query_stats.debug_queries" for r in data["requests"])
+
+    app.config["ROL"] = "usuario"
+    assert client.get("/debug/queries?format=json").status_code == 403
@@ -0,0 +1,58 @@
+import io
+
+from flask import Flask
+from pypdf import PdfReader
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from modules import db_utils, report_engine
+from modules.report_engine import ReportLayout, cursor_rows, render_report
+from modules.report_generator import report_generator_bp
+
+
+def _pages(pdf):
+    return PdfReader(io.BytesIO(pdf)).pages
+
+
+def test_rows_are_split_into_fixed_pages():
+    layout = ReportLayout("Prueba", ["ID", "Serial"], weights=[1, 4])
+    rows = [(i, f"SN{i}") for i in range(layout.rows_per_page * 2 + 1)]
+    pages = _pages(render_report(layout, iter(rows), workers=1))
+    assert len(pages) == 3
+    assert "Página 3" in pages[2].extract_text()
+    assert len(_pages(render_report(layout, [], workers=1))) == 1
+
+
+def test_long_values_are_cut_to_column_width():
+    layout = ReportLayout("Prueba", ["A", "B"], weights=[1, 9])
+    text = layout.fit("W" * 200, 0)
+    assert text.endswith("...") and len(text) < 200
+    assert stringWidth(text, "Helvetica", layout.font_size) <= layout.col_widths[0]
+    assert layout.fit("corto", 0) == "corto"
+
+
+def test_parallel_batches_keep_order(monkeypatch):
+    monkeypatch.setattr(report_engine, "REPORT_PAGES_PER_BATCH", 1)
+    layout = ReportLayout("Prueba", ["ID"])
+    rows = [(i,) for i in range(layout.rows_per_page * 4)]
+    pages = _pages(render_report(layout, rows, workers=2))
+    assert len(pages) == 4
+    last = pages[3].extract_text()
+    assert "Página 4" in last and str(rows[-1][0]) in last
+
+
+def test_inventory_report_route_streams_from_cursor(db):
+    db.executemany(
+        "INSERT INTO equipos_individuales (codigo_barras_individual, marca, serial) VALUES (?, ?, ?)",
+        [(f"C{i}", "Dell" if i % 2 else None, f"SN{i}") for i in range(120)],
+    )
+    db.commit()
+    cursor = db.execute("SELECT id FROM equipos_individuales")
+    assert sum(1 for _ in cursor_rows(cursor, size=7)) == 120
+
+    app = Flask(__name__)
+    app.register_blueprint(report_generator_bp)
+    db_utils.init_app(app)
+    response = app.test_client().get("/report/inventory/pdf")
+    assert response.status_code == 200
+    pages = _pages(response.data)
+    assert "N/A" in pages[0].extract_text()
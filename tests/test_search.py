@@ -0,0 +1,73 @@
+import sqlite3
+
+import pytest
+
+from create_production_db import create_tables
+from modules.search import fts5_available, install_search_index, rebuild_search_index, search, search_ready
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "search.db"))
+    if not fts5_available(conn):
+        pytest.skip("SQLite sin FTS5")
+    create_tables(conn, "sqlite")
+    conn.execute(
+        "INSERT INTO equipos_individuales (codigo_barras_individual, serial, marca, modelo) VALUES (?, ?, ?, ?)",
+        ("BOG-CPU-001", "SN123", "Dell", "OptiPlex 7090"),
+    )
+    conn.commit()
+    return conn
+
+
+def test_existing_rows_are_backfilled_and_prefix_matched(conn):
+    assert not search_ready(conn)
+    assert install_search_index(conn)
+    assert search_ready(conn)
+    results = search(conn, "opti")
+    assert [(r["tipo"], r["id"]) for r in results] == [("equipo", 1)]
+    assert search(conn, "bog-cpu")[0]["titulo"].startswith("BOG-CPU-001")
+
+
+def test_triggers_keep_index_in_sync_and_ignore_accents(conn):
+    install_search_index(conn)
+    conn.execute(
+        "INSERT INTO empleados (cedula, nombre, apellido, correo_office) VALUES (?, ?, ?, ?)",
+        ("1010", "Andrés", "Muñoz", "andres.munoz@example.com"),
+    )
+    conn.commit()
+    assert search(conn, "andres munoz")[0]["tipo"] == "empleado"
+    assert search(conn, "MUÑOZ", tipos=["equipo"]) == []
+
+    conn.execute("UPDATE equipos_individuales SET marca = 'Lenovo' WHERE id = 1")
+    assert search(conn, "dell") == []
+    assert search(conn, "lenovo")[0]["id"] == 1
+
+    conn.execute("DELETE FROM equipos_individuales WHERE id = 1")
+    assert search(conn, "lenovo") == []
+
+
+def test_rebuild_reports_counts(conn):
+    assert rebuild_search_index(conn)["equipo"] == 1
+
+
+def test_internal_columns_do_not_rewrite_the_index(conn):
+    install_search_index(conn)
+    changes = conn.total_changes
+    conn.execute("UPDATE equipos_individuales SET empleado_id = 7 WHERE id = 1")
+    assert conn.total_changes - changes == 1
+    conn.execute("UPDATE equipos_individuales SET marca = 'HP' WHERE id = 1")
+    assert conn.total_changes - changes > 2
+
+
+def test_install_upgrades_triggers_without_column_list(conn):
+    install_search_index(conn)
+    conn.executescript("""
+        DROP TRIGGER search_equipo_au;
+        CREATE TRIGGER search_equipo_au AFTER UPDATE ON equipos_individuales BEGIN SELECT 1; END;
+    """)
+    assert install_search_index(conn)
+    sql = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'search_equipo_au'").fetchone()[0]
+    assert "UPDATE OF id, codigo_barras_individual" in sql
+    # Sin volver a poblar: cada equipo sigue indexado una sola vez
+    assert conn.execute("SELECT COUNT(*) FROM search_index WHERE rowid % 8 = 1").fetchone()[0] == 1
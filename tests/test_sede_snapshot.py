@@ -0,0 +1,165 @@
+import sqlite3
+
+import pytest
+from flask import Flask
+
+from modules import db_utils, inventory_summary, sede_snapshot
+from modules.db_utils import get_db_connection
+from modules.derived_schema import upgrade_derived_schema
+
+
+@pytest.fixture
+def app(db_path, db):
+    db.execute("ALTER TABLE empleados ADD COLUMN sede_id INTEGER")
+    db.execute("INSERT INTO sedes (id, codigo, nombre) VALUES (1, 'bog 1', 'Bogota')")
+    db.execute("INSERT INTO sedes (id, nombre) VALUES (2, 'Cali')")
+    db.executemany(
+        "INSERT INTO empleados (cedula, nombre, sede_id) VALUES (?, ?, ?)",
+        [("100", "Ana", 1), ("200", "Luis", 1), ("300", "Eva", 2)],
+    )
+    db.commit()
+    # empleados.sede_id llegó después de la migración: la del siguiente arranque
+    upgrade_derived_schema(db)
+    app = Flask(__name__)
+    db_utils.init_app(app)
+    app.config["DB_PATH"] = db_path
+    return app
+
+
+def _write(app, sql, params=()):
+    conn = sqlite3.connect(app.config["DB_PATH"])
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def _snapshot(app, sede_id=1):
+    with app.test_request_context():
+        conn = get_db_connection()
+        return sede_snapshot.sede_snapshot(conn, sede_id)
+
+
+def test_group_is_created_with_the_sede_not_on_view(app):
+    _write(app, "INSERT INTO sedes (id, codigo, nombre) VALUES (3, 'MED', 'Medellin')")
+
+    conn = sqlite3.connect(app.config["DB_PATH"])
+    codes = [r[0] for r in conn.execute("SELECT codigo_barras_unificado FROM equipos_agrupados ORDER BY sede_id")]
+    conn.close()
+    assert codes == ["AGR-BOG1", "AGR-S002", "AGR-MED"]
+
+    snapshot = _snapshot(app, sede_id=3)
+    assert snapshot["codigo_agrupado_sede"] == "AGR-MED"
+    assert [r["codigo_barras_unificado"] for r in snapshot["inventario_tecnologico_agrupado"]] == ["AGR-MED"]
+    assert _snapshot(app, sede_id=99) is None
+
+
+def test_snapshot_is_cached_until_the_sede_changes(app, monkeypatch):
+    calls = []
+    build = sede_snapshot.build_sede_snapshot
+
+    def counting(conn, sede_id):
+        calls.append(sede_id)
+        return build(conn, sede_id)
+
+    monkeypatch.setattr(sede_snapshot, "build_sede_snapshot", counting)
+    _write(app, "INSERT INTO equipos_individuales (codigo_barras_individual, sede_id, asignado_nuevo) VALUES ('A', 1, '100')")
+
+    first = _snapshot(app)
+    assert _snapshot(app) == first and calls == [1]
+    assert first["sede_stats"]["total_equipos_individuales"] == 1
+    counts = {e["cedula"]: e["equipos_asignados"] for e in first["empleados"]}
+    assert counts == {"100": 1, "200": 0}
+
+    # Otra sede no invalida la vista
+    _write(app, "INSERT INTO equipos_individuales (codigo_barras_individual, sede_id) VALUES ('B', 2)")
+    _snapshot(app)
+    assert calls == [1]
+
+    # Un equipo de otra sede asignado a un empleado de esta sí
+    _write(app, "INSERT INTO equipos_individuales (codigo_barras_individual, sede_id, asignado_nuevo) VALUES ('C', 2, '200')")
+    updated = _snapshot(app)
+    assert calls == [1, 1]
+    assert {e["cedula"]: e["equipos_asignados"] for e in updated["empleados"]} == {"100": 1, "200": 1}
+    assert updated["sede_stats"]["total_equipos_individuales"] == 1
+
+
+def test_deferred_inventory_summary_is_not_cached(app, monkeypatch):
+    calls = []
+    build = sede_snapshot.build_sede_snapshot
+    monkeypatch.setattr(
+        sede_snapshot, "build_sede_snapshot",
+        lambda conn, sede_id: calls.append(sede_id) or build(conn, sede_id),
+    )
+    with app.test_request_context():
+        with inventory_summary.deferred_summary():
+            _snapshot(app)
+            _snapshot(app)
+    assert len(calls) == 2
+
+
+def test_cache_holds_one_entry_per_sede_without_credentials(app, monkeypatch):
+    from modules import app_cache
+
+    _write(app, "UPDATE empleados SET contrasena_windows = 'secreta', contrasena_quiron = 'otra'")
+    first = _snapshot(app)
+    assert "contrasena_windows" not in first["empleados"][0]
+    assert first["empleados"][0]["nombre"] == "Ana"
+
+    _write(app, "INSERT INTO equipos_individuales (codigo_barras_individual, sede_id) VALUES ('A', 1)")
+    _snapshot(app)
+    entries = [key for key in app_cache.local_cache._data if "sede_snapshot:1" in key]
+    assert len(entries) == 1
+    assert "secreta" not in str(app_cache.local_cache._data[entries[0]])
+
+    # Una vista más grande que el límite no se guarda
+    monkeypatch.setattr(sede_snapshot, "SEDE_SNAPSHOT_MAX_BYTES", 10)
+    _snapshot(app, sede_id=2)
+    assert not [key for key in app_cache.local_cache._data if "sede_snapshot:2" in key]
+
+
+def test_snapshot_refreshes_after_an_import(app, monkeypatch):
+    import pandas as pd
+
+    from modules.export_import import import_rows
+
+    calls = []
+    build = sede_snapshot.build_sede_snapshot
+    monkeypatch.setattr(
+        sede_snapshot, "build_sede_snapshot",
+        lambda conn, sede_id: calls.append(sede_id) or build(conn, sede_id),
+    )
+    assert _snapshot(app)["sede_stats"]["total_equipos_individuales"] == 0
+    df = pd.DataFrame({"Codigo de barras": ["I1", "I2", "I3"], "Sede": [1, 1, 2]})
+    with app.app_context(), inventory_summary.deferred_summary(rows=len(df)):
+        import_rows(df, "inventario", {"Codigo de barras": "codigo_barras_individual", "Sede": "sede_id"})
+    assert _snapshot(app)["sede_stats"]["total_equipos_individuales"] == 2
+    assert _snapshot(app)["sede_stats"]["total_equipos_individuales"] == 2
+    assert calls == [1, 1]
+
+
+def test_not_cached_while_a_table_lacks_its_triggers(legacy_db_path, monkeypatch):
+    conn = sqlite3.connect(legacy_db_path)
+    upgrade_derived_schema(conn)
+    # Columna agregada después de la migración (gestion_humana en instalaciones antiguas)
+    conn.execute("ALTER TABLE empleados ADD COLUMN sede_id INTEGER")
+    conn.execute("INSERT INTO sedes (id, nombre) VALUES (1, 'Bogota')")
+    conn.commit()
+    schema = conn.execute("SELECT type, name FROM sqlite_master ORDER BY name").fetchall()
+    app = Flask(__name__)
+    db_utils.init_app(app)
+    calls = []
+    build = sede_snapshot.build_sede_snapshot
+    monkeypatch.setattr(
+        sede_snapshot, "build_sede_snapshot",
+        lambda c, sede_id: calls.append(sede_id) or build(c, sede_id),
+    )
+    _snapshot(app)
+    _snapshot(app)
+    assert calls == [1, 1]
+    assert conn.execute("SELECT type, name FROM sqlite_master ORDER BY name").fetchall() == schema
+
+    upgrade_derived_schema(conn)
+    _snapshot(app)
+    _snapshot(app)
+    assert calls == [1, 1, 1]
+    conn.close()